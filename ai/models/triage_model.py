@@ -4,10 +4,13 @@ NLP-based symptom analysis and severity scoring.
 """
 
 import re
-import numpy as np
-from typing import List, Dict, Tuple
+from typing import List
 from dataclasses import dataclass
 
+# Symptom text normalization and phrase lookup are shared with the backend
+# triage engine (the backend directory must be on PYTHONPATH)
+from app.services.symptom_text import PhraseIndex, SymptomTokens, normalize, tokenize
+
 
 @dataclass
 class TriageResult:
@@ -77,6 +80,18 @@ class SymptomAnalyzer:
             "musculoskeletal": ["bone", "joint", "muscle", "back pain"],
             "dermatological": ["skin", "rash", "itching", "wound"]
         }
+        
+        # Phrase indexes over the keywords above (word-level, negation aware;
+        # critical ones are only negated right after the negator)
+        self.symptom_index = PhraseIndex(self.symptom_severity, strict=[
+            i for i, severity in enumerate(self.symptom_severity.values()) if severity == 5
+        ])
+        self.body_system_index = PhraseIndex(
+            keyword for keywords in self.body_systems.values() for keyword in keywords
+        )
+        self._body_system_of = [
+            system for system, keywords in self.body_systems.items() for _ in keywords
+        ]
     
     def analyze(self, symptoms: List[str], description: str = "") -> TriageResult:
         """
@@ -89,10 +104,11 @@ class SymptomAnalyzer:
         Returns:
             TriageResult with severity score and recommendations
         """
-        combined_text = " ".join(symptoms).lower() + " " + description.lower()
+        tokens = tokenize(*symptoms, description)
+        combined_text = tokens.affirmed_text()
         
         # Find matching symptoms
-        matched = self._match_symptoms(combined_text)
+        matched = self._match_symptoms(tokens, combined_text)
         
         # Calculate severity score
         severity = self._calculate_severity(matched)
@@ -114,14 +130,10 @@ class SymptomAnalyzer:
             explanation=explanation
         )
     
-    def _match_symptoms(self, text: str) -> List[str]:
-        """Match symptoms from text using keywords and patterns."""
-        matched = []
-        
+    def _match_symptoms(self, tokens: SymptomTokens, text: str) -> List[str]:
+        """Match symptoms using keywords (on tokens) and patterns (on the affirmed text)."""
         # Direct keyword matching
-        for symptom in self.symptom_severity.keys():
-            if symptom in text:
-                matched.append(symptom)
+        matched = [self.symptom_index.phrases[i] for i in self.symptom_index.find(tokens)]
         
         # Pattern matching for complex symptoms
         for symptom, pattern in self.symptom_patterns.items():
@@ -153,7 +165,7 @@ class SymptomAnalyzer:
         base_confidence = min(len(matched) * 0.2, 0.8)
         
         # Boost for exact matches
-        exact_boost = sum(0.05 for m in matched if m in text)
+        exact_boost = sum(0.05 for m in matched if normalize(m) in text)
         
         return min(base_confidence + exact_boost, 0.95)
     
@@ -180,13 +192,10 @@ class SymptomAnalyzer:
     
     def get_specialty_recommendation(self, symptoms: List[str]) -> str:
         """Recommend medical specialty based on symptoms."""
-        combined = " ".join(symptoms).lower()
-        
         scores = {}
-        for specialty, keywords in self.body_systems.items():
-            score = sum(1 for kw in keywords if kw in combined)
-            if score > 0:
-                scores[specialty] = score
+        for keyword_id in self.body_system_index.find(tokenize(*symptoms)):
+            specialty = self._body_system_of[keyword_id]
+            scores[specialty] = scores.get(specialty, 0) + 1
         
         if scores:
             return max(scores, key=scores.get)
@@ -4,20 +4,32 @@ SmartCare Comprehensive Queue API
 All-in-one API for queue, triage, crowd management, and emergencies.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request, Response
+from fastapi.exceptions import RequestValidationError
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from collections import Counter
+from typing import Dict, List, Optional
 from datetime import datetime
-from pydantic import BaseModel, Field
+import asyncio
+from pydantic import BaseModel, Field, ValidationError
 
+from app.core.config import settings
 from app.db.session import get_db
 from app.services.triage_engine import TriageEngine, triage_patient
+from app.services.triage_cache import get_triage_cache
+from app.services.triage_rules import get_rules_status, reload_rules
 from app.services.priority_queue import get_priority_queue
 from app.services.crowd_manager import get_crowd_manager
 from app.services.spare_doctor_pool import get_spare_doctor_pool
 from app.services.emergency_override import get_override_system, OverrideReason
 from app.services.ai_doctor_allocator import get_ai_allocator
+from app.services.arrival_forecast import get_arrival_forecaster
 from app.services.activity_logger import get_activity_logger
+from app.services.id_allocator import get_entry_id_allocator, next_entry_id, queue_token
+from app.services.allocation_worker import schedule_allocation
+from app.services.periodic_jobs import get_periodic_scheduler
+from app.services.partner_federation import get_partner_federation
+from app.services.state_lock import STATE_LOCK, state_locked
 
 router = APIRouter()
 
@@ -36,6 +48,17 @@ class TriageRequest(BaseModel):
     self_severity: int = Field(default=5, ge=1, le=10)
 
 
+class BatchTriageRequest(BaseModel):
+    patients: List[TriageRequest] = Field(..., min_length=1, max_length=100_000)
+
+
+# /triage/assess/batch validates its body itself (off the event loop); documented here
+_BATCH_TRIAGE_SCHEMA = {
+    k: v for k, v in BatchTriageRequest.model_json_schema(ref_template="#/components/schemas/{model}").items()
+    if k != "$defs"
+}
+
+
 class CheckInRequest(BaseModel):
     patient_id: int
     patient_name: str
@@ -48,6 +71,10 @@ class CheckInRequest(BaseModel):
     department: str = "GENERAL"
 
 
+class BatchCheckInRequest(BaseModel):
+    patients: List[CheckInRequest] = Field(..., min_length=1, max_length=5000)
+
+
 class EmergencyRequest(BaseModel):
     queue_entry_id: int
     patient_id: int
@@ -92,6 +119,60 @@ async def assess_patient(request: TriageRequest):
     return {"success": True, "triage": result}
 
 
+@router.post("/triage/assess/batch", openapi_extra={"requestBody": {
+    "required": True,
+    "content": {"application/json": {"schema": _BATCH_TRIAGE_SCHEMA}}
+}})
+async def assess_patients_batch(request: Request):
+    """
+    AI Triage Assessment for many patients (nightly re-triage of tele-consult
+    and referral backlogs). Same results as /triage/assess, in request order,
+    scored together in one vectorized pass.
+
+    A backlog of 100k patients takes seconds to validate and score, so the
+    body is read raw and both run in a worker thread, off the event loop.
+    """
+    body = await request.body()
+    return await asyncio.to_thread(_assess_batch, body)
+
+
+def _assess_batch(body: bytes) -> Dict:
+    try:
+        batch = BatchTriageRequest.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+        )
+    results = TriageEngine.perform_triage_batch(batch.model_dump()["patients"])
+    return {"success": True, "count": len(results), "triage": results}
+
+
+@router.get("/triage/rules")
+async def triage_rules():
+    """Triage rules in force in this process: version, source and revision."""
+    return {"success": True, "rules": get_rules_status()}
+
+
+@router.post("/triage/rules/reload")
+async def reload_triage_rules():
+    """
+    Recompile the triage rules from TRIAGE_RULES_FILE (or the built-in
+    constants) now, instead of waiting for the watcher. Only this worker
+    reloads; the others pick up file changes on their next check.
+    """
+    try:
+        reload_rules(settings.TRIAGE_RULES_FILE or None)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"success": True, "rules": get_rules_status()}
+
+
+@router.get("/triage/cache")
+async def triage_cache_stats():
+    """Triage result cache: size, hit rate, evictions and invalidations."""
+    return {"success": True, "cache": get_triage_cache().get_stats()}
+
+
 # =============================================================================
 # QUEUE ENDPOINTS
 # =============================================================================
@@ -115,294 +196,415 @@ async def checkin_patient(request: CheckInRequest):
     # Normalize department to lowercase
     department = request.department.lower() if request.department else "general"
     
-    entry_id = int(datetime.utcnow().timestamp() * 1000) % 1000000
+    entry_id = next_entry_id()
     age_factor = TriageEngine.get_age_risk_factor(request.age)
     chronic_boost, _ = TriageEngine.calculate_chronic_boost(request.chronic_conditions)
+    critical = triage_result["severity_level"].upper() in ["CRITICAL", "HIGH"]
     
-    priority = pq.push(
-        patient_id=request.patient_id,
-        entry_id=entry_id,
-        triage_score=triage_result["triage_score"],
-        age_factor=age_factor,
-        chronic_factor=chronic_boost
-    )
-    
-    # Store patient info for display
-    pq._patient_info[entry_id] = {
-        "name": request.patient_name,
-        "age": request.age,
-        "symptoms": request.symptoms,
-        "chronic_conditions": request.chronic_conditions,
-        "department": department,
-        "severity": triage_result["severity_level"],
-        "explanation": triage_result["explanation"]
-    }
-    
-    queue_list = pq.get_queue_list()
-    position = next((q["position"] for q in queue_list if q["entry_id"] == entry_id), 1)
-    
-    # Count patients in this department
-    dept_patient_count = len([p for p in queue_list if p.get("department", "").lower() == department])
-    
-    # Update department status with actual queue count
-    dept_status = cm.update_department_status(
-        department=department,
-        current_queue=dept_patient_count,
-        active_doctors=2  # Default doctors per department
-    )
-    
-    wait = cm.calculate_expected_wait(
-        position=position,
-        triage_score=triage_result["triage_score"],
-        active_doctors=dept_status.active_doctors if dept_status else 1
-    )
-    
-    teleconsult = cm.should_redirect_to_teleconsult(
-        triage_score=triage_result["triage_score"],
-        crowd_level=dept_status.crowd_level if dept_status else "low"
-    )
-    
-    # AUTO WAIT TIME PROTECTION: If critical patient, auto-assign spare doctors
-    wait_protection = None
-    if triage_result["severity_level"].upper() in ["CRITICAL", "HIGH"]:
-        allocator = get_ai_allocator()
-        wait_protection = allocator.protect_wait_times(department)
-    
-    # Log patient check-in activity
-    logger = get_activity_logger()
-    logger.log_patient_checkin(
-        patient_name=request.patient_name,
-        patient_id=request.patient_id,
-        entry_id=entry_id,
-        token=f"TKN-{entry_id}",
-        department=department,
-        symptoms=request.symptoms,
-        triage_score=triage_result["triage_score"],
-        severity_level=triage_result["severity_level"],
-        priority_score=round(priority, 3),
-        wait_minutes=wait.get("estimated_minutes", 0)
-    )
-    
-    # Run AI auto-allocation check after check-in
-    allocator = get_ai_allocator()
-    ai_result = allocator.auto_allocate_all_departments()
-    ai_actions = [r for r in ai_result if r.get("executed")]
+    async with state_locked():
+        priority = pq.push(
+            patient_id=request.patient_id,
+            entry_id=entry_id,
+            triage_score=triage_result["triage_score"],
+            age_factor=age_factor,
+            chronic_factor=chronic_boost,
+            # Patient info for display
+            patient_info={
+                "name": request.patient_name,
+                "age": request.age,
+                "symptoms": request.symptoms,
+                "chronic_conditions": request.chronic_conditions,
+                "department": department,
+                "severity": triage_result["severity_level"],
+                "explanation": triage_result["explanation"]
+            }
+        )
+        
+        position = pq.rank(entry_id) or 1
+        get_ai_allocator().record_arrivals(department)
+        
+        # Count patients in this department
+        dept_patient_count = pq.department_size(department)
+        
+        # Update department status with actual queue count
+        dept_status = cm.update_department_status(
+            department=department,
+            current_queue=dept_patient_count,
+            active_doctors=2  # Default doctors per department
+        )
+        
+        wait = cm.calculate_expected_wait(
+            position=position,
+            triage_score=triage_result["triage_score"],
+            active_doctors=dept_status.active_doctors if dept_status else 1
+        )
+        
+        teleconsult = cm.should_redirect_to_teleconsult(
+            triage_score=triage_result["triage_score"],
+            crowd_level=dept_status.crowd_level if dept_status else "low"
+        )
+        
+        # Log patient check-in activity
+        logger = get_activity_logger()
+        logger.log_patient_checkin(
+            patient_name=request.patient_name,
+            patient_id=request.patient_id,
+            entry_id=entry_id,
+            token=queue_token(entry_id),
+            department=department,
+            symptoms=request.symptoms,
+            triage_score=triage_result["triage_score"],
+            severity_level=triage_result["severity_level"],
+            priority_score=round(priority, 3),
+            wait_minutes=wait.get("estimated_minutes", 0)
+        )
+        
+        # AI allocation (and wait time protection for critical patients, which
+        # auto-assigns spare doctors) runs in the background allocation worker
+        allocation = schedule_allocation([department], [department] if critical else [])
     
     return {
         "success": True,
         "entry_id": entry_id,
-        "token": f"TKN-{entry_id}",
+        "token": queue_token(entry_id),
         "position": position,
         "priority_score": round(priority, 3),
         "triage": triage_result,
         "triage_score_10": triage_result["triage_score"],  # Already 1-10 scale
         "wait_estimate": wait,
         "teleconsult": teleconsult,
-        "wait_time_protection": wait_protection,
+        "wait_time_protection": allocation["wait_time_protection"].get(department) if allocation else None,
         "department": department,
-        "ai_actions_taken": len(ai_actions)
+        "ai_actions_taken": allocation["ai_actions_taken"] if allocation else 0,
+        "ai_allocation": "completed" if allocation else "scheduled"
     }
 
 
-@router.get("/status")
-async def get_queue_status():
-    """Get quick queue status overview for display."""
+@router.post("/checkin/batch")
+async def checkin_batch(request: BatchCheckInRequest):
+    """
+    Check in many patients at once (kiosks, referral feeds).
+    
+    Triage runs as one vectorized batch, the queue insert is a single bulk build,
+    crowd updates run once per department and one AI allocation round
+    (with wait-time protection) is scheduled for the whole batch.
+    """
     pq = get_priority_queue()
     cm = get_crowd_manager()
-    pool = get_spare_doctor_pool()
-    
-    stats = pq.get_stats()
-    pool_status = pool.get_pool_status()
-    
-    # Get queue by department from actual patient data
-    queue_list = pq.get_queue_list()
-    dept_counts = {}
-    for patient in queue_list:
-        dept = patient.get("department", "general").lower()
-        if dept not in dept_counts:
-            dept_counts[dept] = {"count": 0, "critical": 0}
-        dept_counts[dept]["count"] += 1
-        if patient.get("triage_score", 3) >= 5:
-            dept_counts[dept]["critical"] += 1
     
-    # Standard departments
-    departments = ["general", "emergency", "pediatrics", "cardiology", "neurology", "orthopedics"]
-    dept_list = []
-    total_doctors = 0
+    triages = TriageEngine.perform_triage_batch([
+        {
+            "symptoms": p.symptoms,
+            "description": p.description,
+            "age": p.age,
+            "chronic_conditions": p.chronic_conditions,
+            "duration_hours": p.duration_hours,
+            "self_severity": p.self_severity
+        }
+        for p in request.patients
+    ])
+    departments = [p.department.lower() if p.department else "general" for p in request.patients]
+    entry_ids = get_entry_id_allocator().next_ids(len(request.patients))
+    
+    items = [
+        {
+            "patient_id": p.patient_id,
+            "entry_id": entry_id,
+            "triage_score": triage["triage_score"],
+            "age_factor": TriageEngine.get_age_risk_factor(p.age),
+            "chronic_factor": TriageEngine.calculate_chronic_boost(p.chronic_conditions)[0],
+            "patient_info": {
+                "name": p.patient_name,
+                "age": p.age,
+                "symptoms": p.symptoms,
+                "chronic_conditions": p.chronic_conditions,
+                "department": department,
+                "severity": triage["severity_level"],
+                "explanation": triage["explanation"]
+            }
+        }
+        for p, triage, department, entry_id in zip(request.patients, triages, departments, entry_ids)
+    ]
+    critical_departments = {
+        department for department, triage in zip(departments, triages)
+        if triage["severity_level"].upper() in ["CRITICAL", "HIGH"]
+    }
     
-    for dept in departments:
-        dept_status = cm.get_department_status(dept)
-        active_docs = dept_status.active_doctors if dept_status else 2
-        total_doctors += active_docs
-        queue_count = dept_counts.get(dept, {}).get("count", 0)
+    async with state_locked():
+        priorities = pq.push_many(items)
         
-        dept_list.append({
-            "name": dept,
-            "queue_count": queue_count,
-            "crowd_level": "low" if queue_count < 10 else "moderate" if queue_count < 20 else "high",
-            "avg_wait": round(queue_count * 8 / max(active_docs, 1), 0)
-        })
-    
-    total_queue = stats.get("total_patients", 0)
-    avg_wait = round(total_queue * 8 / max(total_doctors, 1), 1) if total_queue > 0 else 0
+        # Department status once per department touched
+        dept_statuses = {
+            department: cm.update_department_status(
+                department=department,
+                current_queue=pq.department_size(department),
+                active_doctors=2  # Default doctors per department
+            )
+            for department in set(departments)
+        }
+        allocator = get_ai_allocator()
+        for department, count in Counter(departments).items():
+            allocator.record_arrivals(department, count)
+        
+        logger = get_activity_logger()
+        results = []
+        for p, triage, department, entry_id, priority in zip(
+            request.patients, triages, departments, entry_ids, priorities
+        ):
+            position = pq.rank(entry_id) or 1
+            dept_status = dept_statuses[department]
+            wait = cm.calculate_expected_wait(
+                position=position,
+                triage_score=triage["triage_score"],
+                active_doctors=dept_status.active_doctors if dept_status else 1
+            )
+            logger.log_patient_checkin(
+                patient_name=p.patient_name,
+                patient_id=p.patient_id,
+                entry_id=entry_id,
+                token=queue_token(entry_id),
+                department=department,
+                symptoms=p.symptoms,
+                triage_score=triage["triage_score"],
+                severity_level=triage["severity_level"],
+                priority_score=round(priority, 3),
+                wait_minutes=wait.get("estimated_minutes", 0)
+            )
+            results.append({
+                "patient_id": p.patient_id,
+                "entry_id": entry_id,
+                "token": queue_token(entry_id),
+                "position": position,
+                "priority_score": round(priority, 3),
+                "triage_score_10": triage["triage_score"],
+                "severity_level": triage["severity_level"],
+                "wait_estimate": wait,
+                "teleconsult": cm.should_redirect_to_teleconsult(
+                    triage_score=triage["triage_score"],
+                    crowd_level=dept_status.crowd_level if dept_status else "low"
+                ),
+                "department": department
+            })
+        
+        # One background allocation round for the whole batch, with wait time
+        # protection for every department that received a critical patient
+        allocation = schedule_allocation(set(departments), critical_departments)
     
     return {
         "success": True,
-        "total_in_queue": total_queue,
-        "avg_wait_minutes": avg_wait,
-        "total_doctors": total_doctors,
-        "spare_doctors_available": pool_status.get("available", 0),
-        "critical_patients": stats.get("critical_count", 0),
-        "departments": dept_list
+        "checked_in": len(results),
+        "patients": results,
+        "wait_time_protection": allocation["wait_time_protection"] if allocation else {},
+        "ai_actions_taken": allocation["ai_actions_taken"] if allocation else 0,
+        "ai_allocation": "completed" if allocation else "scheduled"
     }
 
 
+@router.get("/status")
+async def get_queue_status():
+    """Get quick queue status overview for display."""
+    async with state_locked():
+        pq = get_priority_queue()
+        cm = get_crowd_manager()
+        pool = get_spare_doctor_pool()
+        
+        stats = pq.get_stats()
+        pool_status = pool.get_pool_status()
+        
+        # Standard departments
+        departments = ["general", "emergency", "pediatrics", "cardiology", "neurology", "orthopedics"]
+        dept_list = []
+        total_doctors = 0
+        
+        for dept in departments:
+            dept_status = cm.get_department_status(dept)
+            active_docs = dept_status.active_doctors if dept_status else 2
+            total_doctors += active_docs
+            queue_count = pq.department_size(dept)
+            
+            dept_list.append({
+                "name": dept,
+                "queue_count": queue_count,
+                "crowd_level": "low" if queue_count < 10 else "moderate" if queue_count < 20 else "high",
+                "avg_wait": round(queue_count * 8 / max(active_docs, 1), 0)
+            })
+        
+        total_queue = stats.get("total_patients", 0)
+        avg_wait = round(total_queue * 8 / max(total_doctors, 1), 1) if total_queue > 0 else 0
+        
+        return {
+            "success": True,
+            "total_in_queue": total_queue,
+            "avg_wait_minutes": avg_wait,
+            "total_doctors": total_doctors,
+            "spare_doctors_available": pool_status.get("available", 0),
+            "critical_patients": stats.get("critical_count", 0),
+            "departments": dept_list,
+            "queue_version": pq.version
+        }
+
+
+def _queue_etag(version: int, *parts) -> str:
+    """Weak ETag derived from a queue mutation version and request params."""
+    return 'W/"' + "-".join(str(p) for p in (version, *parts)) + '"'
+
+
 @router.get("/list")
-async def get_queue_list(department: Optional[str] = None, limit: int = 50):
-    """Get full priority queue, optionally filtered by department."""
-    pq = get_priority_queue()
-    pool = get_spare_doctor_pool()
-    
-    queue_list = pq.get_queue_list()
-    
-    # Filter by department if specified
-    if department:
-        queue_list = [p for p in queue_list if p.get("department", "").lower() == department.lower()]
-    
-    # Limit results
-    queue_list = queue_list[:limit]
+async def get_queue_list(
+    response: Response,
+    department: Optional[str] = None,
+    limit: int = 50,
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Get full priority queue, optionally filtered by department.
     
-    # Calculate expected wait for each patient
-    cm = get_crowd_manager()
-    for patient in queue_list:
-        dept = patient.get("department", "general")
-        dept_status = cm.get_department_status(dept)
-        active_docs = dept_status.active_doctors if dept_status else 2
-        patient["expected_wait_minutes"] = cm.calculate_expected_wait(
-            patient["position"], patient["triage_score"], active_docs
+    Supports conditional requests: the ETag changes whenever anything in
+    the response may have - the listed queue (mutation, aging tick or change
+    of order), the hospital-wide stats, department doctor counts or the
+    spare pool - so pollers sending If-None-Match get a 304 when nothing changed.
+    """
+    async with state_locked():
+        pq = get_priority_queue()
+        cm = get_crowd_manager()
+        pool = get_spare_doctor_pool()
+        
+        # Stats (and the spare doctor alert) are hospital-wide, so the global
+        # version counts for department lists too; expected waits follow the
+        # crowd manager's doctor counts, the alert the spare pool
+        etag = _queue_etag(
+            pq.version, *pq.list_stamp(department), cm.version, pool.version, department or "all", limit
         )
-        patient["teleconsult_eligible"] = patient.get("triage_score", 3) <= 2
-    
-    stats = pq.get_stats()
-    
-    # Check if spare doctors should be activated
-    total_queue = stats.get("total_patients", 0)
-    if total_queue > 10:  # Threshold for spare doctor activation
-        activation = pool.should_activate_spare_doctors("general", total_queue, 15, len(pool.get_assigned_doctors()))
-        if activation.get("should_activate"):
-            stats["spare_doctor_alert"] = {
-                "needed": True,
-                "reason": activation.get("reason", "High patient load"),
-                "recommended_count": activation.get("recommended_count", 1)
-            }
-    
-    return {
-        "success": True,
-        "queue": queue_list,
-        "stats": stats
-    }
+        if if_none_match == etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        
+        # Department lists read only that department's sub-queue
+        # (positions are then department-relative)
+        queue_list = pq.get_queue_list(department)
+        
+        # Limit results (copy entries - the queue snapshot dicts are shared)
+        queue_list = [dict(p) for p in queue_list[:limit]]
+        
+        # Calculate expected wait for each patient
+        for patient in queue_list:
+            dept = patient.get("department", "general")
+            dept_status = cm.get_department_status(dept)
+            active_docs = dept_status.active_doctors if dept_status else 2
+            patient["expected_wait_minutes"] = cm.calculate_expected_wait(
+                patient["position"], patient["triage_score"], active_docs
+            )
+            patient["teleconsult_eligible"] = patient.get("triage_score", 3) <= 2
+        
+        stats = pq.get_stats()
+        
+        # Check if spare doctors should be activated
+        total_queue = stats.get("total_patients", 0)
+        if total_queue > 10:  # Threshold for spare doctor activation
+            activation = pool.should_activate_spare_doctors("general", total_queue, 15, pool.count_assigned())
+            if activation.get("should_activate"):
+                stats["spare_doctor_alert"] = {
+                    "needed": True,
+                    "reason": activation.get("reason", "High patient load"),
+                    "recommended_count": activation.get("recommended_count", 1)
+                }
+        
+        return {
+            "success": True,
+            "queue": queue_list,
+            "stats": stats,
+            "queue_version": pq.version
+        }
 
 
 @router.get("/position/{entry_id}")
 async def get_position(entry_id: int):
-    """Get patient's queue position."""
-    pq = get_priority_queue()
-    cm = get_crowd_manager()
-    
-    for item in pq.get_queue_list():
-        if item["entry_id"] == entry_id:
-            wait = cm.calculate_expected_wait(item["position"], item["triage_score"])
-            return {"success": True, "position": item["position"], "wait": wait, "item": item}
-    
-    raise HTTPException(404, "Not found")
+    """Get patient's queue position (O(log n) rank lookup, no full sort)."""
+    async with state_locked():
+        pq = get_priority_queue()
+        cm = get_crowd_manager()
+        
+        item = pq.get_entry(entry_id)
+        if item is None:
+            raise HTTPException(404, "Not found")
+        
+        wait = cm.calculate_expected_wait(item["position"], item["triage_score"])
+    return {
+        "success": True,
+        "position": item["position"],
+        "department_position": item["department_position"],
+        "wait": wait,
+        "item": item
+    }
 
 
 @router.post("/next")
 async def call_next(department: Optional[str] = None):
     """Call next patient from queue."""
-    pq = get_priority_queue()
+    async with state_locked():
+        pq = get_priority_queue()
+        
+        # Check-current, pop and set-current happen as one step (atomic on shared backends)
+        outcome, patient = pq.call_next(department)
     
-    # Check if there's already a patient being seen
-    current = pq.get_current_patient(department or "general")
-    if current:
+    if outcome == "busy":
         return {
             "success": False, 
             "message": "Complete current patient first",
-            "current_patient": current
+            "current_patient": patient
         }
-    
-    # Get queue list to find next patient (optionally filtered by department)
-    queue_list = pq.get_queue_list()
-    
-    if department:
-        queue_list = [p for p in queue_list if p.get("department", "").lower() == department.lower()]
-    
-    if not queue_list:
+    if outcome == "empty":
         return {"success": False, "message": "No patients in queue" + (f" for {department}" if department else "")}
     
-    # Get the first (highest priority) patient
-    next_patient = queue_list[0]
-    entry_id = next_patient["entry_id"]
-    
-    # Remove from queue
-    pq.remove(entry_id)
-    
-    # Build patient data
-    patient_data = {
-        "entry_id": str(next_patient.get("entry_id", "")),
-        "patient_name": next_patient.get("patient_name", f"Patient #{next_patient.get('patient_id', '')}"),
-        "symptoms": next_patient.get("symptoms", []),
-        "chronic_conditions": next_patient.get("chronic_conditions", []),
-        "severity": next_patient.get("severity", "MEDIUM"),
-        "triage_explanation": next_patient.get("triage_explanation", []),
-        "check_in_time": next_patient.get("check_in_time", ""),
-        "age": next_patient.get("age", 0),
-        "department": next_patient.get("department", "general"),
-        "priority_score": next_patient.get("priority_score", 0)
-    }
-    
-    # Set as current patient being seen
-    pq.set_current_patient(department or "general", patient_data)
-    
-    # Also remove from patient_info
-    if entry_id in pq._patient_info:
-        del pq._patient_info[entry_id]
-    
     return {
         "success": True,
-        "patient": patient_data
+        "patient": patient
     }
 
 
 @router.get("/current")
 async def get_current_patient(department: Optional[str] = None):
     """Get the current patient being seen for a department."""
-    pq = get_priority_queue()
-    patient = pq.get_current_patient(department or "general")
-    return {
-        "success": True,
-        "patient": patient,
-        "has_patient": patient is not None
-    }
+    async with state_locked():
+        pq = get_priority_queue()
+        patient = pq.get_current_patient(department or "general")
+        return {
+            "success": True,
+            "patient": patient,
+            "has_patient": patient is not None
+        }
 
 
 @router.post("/complete")
 async def complete_patient(department: Optional[str] = None):
     """Mark current patient consultation as complete."""
-    pq = get_priority_queue()
-    cleared = pq.clear_current_patient(department or "general")
-    return {
-        "success": cleared,
-        "message": "Patient consultation completed" if cleared else "No patient was being seen"
-    }
+    async with state_locked():
+        pq = get_priority_queue()
+        cleared = pq.clear_current_patient(department or "general")
+        return {
+            "success": cleared,
+            "message": "Patient consultation completed" if cleared else "No patient was being seen"
+        }
 
 
 @router.post("/recalculate")
 async def recalculate():
-    """Recalculate all priorities."""
-    pq = get_priority_queue()
-    count = pq.recalculate_all_priorities()
-    return {"success": True, "updated": count}
+    """Apply wait-time cap crossings (aging itself needs no recalculation)."""
+    async with state_locked():
+        pq = get_priority_queue()
+        count = pq.recalculate_all_priorities()
+        return {"success": True, "updated": count}
+
+
+@router.get("/scheduler/jobs")
+async def scheduler_jobs():
+    """Timing metrics of the periodic background jobs."""
+    scheduler = get_periodic_scheduler()
+    return {
+        "success": True,
+        "running": scheduler is not None,
+        "jobs": scheduler.metrics() if scheduler else {}
+    }
 
 
 # =============================================================================
@@ -412,65 +614,61 @@ async def recalculate():
 @router.get("/crowd/status")
 async def crowd_status():
     """Hospital crowd overview with real queue data."""
-    cm = get_crowd_manager()
-    pq = get_priority_queue()
-    
-    # Get actual queue counts by department
-    queue_list = pq.get_queue_list()
-    dept_counts = {}
-    for patient in queue_list:
-        dept = patient.get("department", "general").lower()
-        if dept not in dept_counts:
-            dept_counts[dept] = 0
-        dept_counts[dept] += 1
-    
-    # Update department statuses with real counts
-    standard_depts = ["general", "emergency", "pediatrics", "cardiology", "neurology", "orthopedics"]
-    for dept in standard_depts:
-        count = dept_counts.get(dept, 0)
-        cm.update_department_status(
-            department=dept,
-            current_queue=count,
-            active_doctors=2  # Default
-        )
-    
-    return {
-        "success": True,
-        "overview": cm.get_hospital_overview(),
-        "departments": cm.get_all_departments_status()
-    }
+    async with state_locked():
+        cm = get_crowd_manager()
+        pq = get_priority_queue()
+        
+        # Update department statuses with real counts (O(1) per department)
+        standard_depts = ["general", "emergency", "pediatrics", "cardiology", "neurology", "orthopedics"]
+        for dept in standard_depts:
+            count = pq.department_size(dept)
+            cm.update_department_status(
+                department=dept,
+                current_queue=count,
+                active_doctors=2  # Default
+            )
+        
+        return {
+            "success": True,
+            "overview": cm.get_hospital_overview(),
+            "departments": cm.get_all_departments_status()
+        }
 
 
 @router.post("/crowd/department")
 async def update_department(request: DepartmentUpdate):
     """Update department status."""
-    cm = get_crowd_manager()
-    status = cm.update_department_status(
-        request.department, request.current_queue, 
-        request.active_doctors, request.spare_doctors
-    )
-    return {"success": True, "status": status.to_dict()}
+    async with state_locked():
+        cm = get_crowd_manager()
+        status = cm.update_department_status(
+            request.department, request.current_queue, 
+            request.active_doctors, request.spare_doctors
+        )
+        return {"success": True, "status": status.to_dict()}
 
 
 @router.get("/crowd/suggestions")
 async def load_suggestions():
     """Get load balancing suggestions."""
-    cm = get_crowd_manager()
-    return {"success": True, "suggestions": cm.get_load_balancing_suggestions()}
+    async with state_locked():
+        cm = get_crowd_manager()
+        return {"success": True, "suggestions": cm.get_load_balancing_suggestions()}
 
 
 @router.get("/crowd/teleconsult")
 async def teleconsult_queue():
     """Get teleconsult queue."""
-    cm = get_crowd_manager()
-    return {"success": True, "queue": cm.get_teleconsult_queue()}
+    async with state_locked():
+        cm = get_crowd_manager()
+        return {"success": True, "queue": cm.get_teleconsult_queue()}
 
 
 @router.post("/crowd/redirect-teleconsult")
 async def redirect_teleconsult(data: dict):
     """Redirect patient to teleconsult."""
-    cm = get_crowd_manager()
-    return cm.add_to_teleconsult_queue(data)
+    async with state_locked():
+        cm = get_crowd_manager()
+        return cm.add_to_teleconsult_queue(data)
 
 
 # =============================================================================
@@ -480,27 +678,38 @@ async def redirect_teleconsult(data: dict):
 @router.get("/doctors/spare")
 async def spare_pool():
     """Spare doctor pool status with all doctors."""
-    pool = get_spare_doctor_pool()
-    all_doctors = [doc.to_dict() for doc in pool._pool.values()]
-    available = pool.get_available_doctors()
-    assigned = pool.get_assigned_doctors()
-    
-    return {
-        "success": True,
-        "doctors": all_doctors,
-        "available_count": len(available),
-        "assigned_count": len(assigned),
-        "status": pool.get_pool_status(),
-        "specialties": pool.get_specialties_available()
-    }
+    async with state_locked():
+        pool = get_spare_doctor_pool()
+        all_doctors = [doc.to_dict() for doc in pool.get_all_doctors()]
+        available = pool.get_available_doctors()
+        assigned = pool.get_assigned_doctors()
+        
+        return {
+            "success": True,
+            "doctors": all_doctors,
+            "available_count": len(available),
+            "assigned_count": len(assigned),
+            "status": pool.get_pool_status(),
+            "specialties": pool.get_specialties_available()
+        }
 
 
 @router.get("/doctors/spare/available")
 async def available_doctors(specialty: Optional[str] = None):
     """Available spare doctors."""
-    pool = get_spare_doctor_pool()
-    doctors = pool.get_available_doctors(specialty)
-    return {"success": True, "doctors": [d.to_dict() for d in doctors]}
+    async with state_locked():
+        pool = get_spare_doctor_pool()
+        doctors = pool.get_available_doctors(specialty)
+        return {"success": True, "doctors": [d.to_dict() for d in doctors]}
+
+
+@router.get("/doctors/spare/partners")
+async def partner_hospitals():
+    """Partner hospitals lending spare doctors: cached availability, latency and errors."""
+    federation = get_partner_federation()
+    if federation is None:
+        return {"success": True, "enabled": False, "partners": {}}
+    return {"success": True, "enabled": True, **federation.get_status()}
 
 
 class AssignDoctorRequest(BaseModel):
@@ -509,24 +718,26 @@ class AssignDoctorRequest(BaseModel):
     reason: str = "Manual assignment"
 
 @router.post("/doctors/spare/assign")
-async def assign_doctor(request: AssignDoctorRequest):
+def assign_doctor(request: AssignDoctorRequest):
     """Assign spare doctor to a department."""
-    pool = get_spare_doctor_pool()
-    logger = get_activity_logger()
-    
-    result = pool.assign_doctor(request.doctor_id, request.department, request.reason, "admin")
-    if not result:
-        raise HTTPException(404, "Doctor not found or not available")
-    
-    if result.get("success"):
-        doctor = result.get("doctor", {})
-        logger.log_doctor_assigned(
-            doctor_id=request.doctor_id,
-            doctor_name=doctor.get("name", f"Doctor #{request.doctor_id}"),
-            department=request.department,
-            reason=request.reason,
-            initiated_by="admin"
-        )
+    # Plain def endpoint: assignments may wait on partner hospitals (see state_lock.py)
+    with STATE_LOCK:
+        pool = get_spare_doctor_pool()
+        logger = get_activity_logger()
+        
+        result = pool.assign_doctor(request.doctor_id, request.department, request.reason, "admin")
+        if not result:
+            raise HTTPException(404, "Doctor not found or not available")
+        
+        if result.get("success"):
+            doctor = result.get("doctor", {})
+            logger.log_doctor_assigned(
+                doctor_id=request.doctor_id,
+                doctor_name=doctor.get("name", f"Doctor #{request.doctor_id}"),
+                department=request.department,
+                reason=request.reason,
+                initiated_by="admin"
+            )
     
     return {"success": True, **result}
 
@@ -538,26 +749,27 @@ class ReleaseDoctorRequest(BaseModel):
 @router.post("/doctors/spare/release")
 async def release_doctor(request: ReleaseDoctorRequest):
     """Release spare doctor from assignment."""
-    pool = get_spare_doctor_pool()
-    logger = get_activity_logger()
-    
-    # Get doctor info before release
-    doctor_info = pool._pool.get(request.doctor_id)
-    old_department = doctor_info.assigned_department if doctor_info else "unknown"
-    
-    result = pool.release_doctor(request.doctor_id, request.reason, "admin")
-    if not result:
-        raise HTTPException(404, "Doctor not found or not assigned")
-    
-    if result.get("success"):
-        doctor = result.get("doctor", {})
-        logger.log_doctor_released(
-            doctor_id=request.doctor_id,
-            doctor_name=doctor.get("name", f"Doctor #{request.doctor_id}"),
-            department=old_department,
-            reason=request.reason,
-            initiated_by="admin"
-        )
+    async with state_locked():
+        pool = get_spare_doctor_pool()
+        logger = get_activity_logger()
+        
+        # Get doctor info before release
+        doctor_info = pool.get_doctor(request.doctor_id)
+        old_department = doctor_info.assigned_department if doctor_info else "unknown"
+        
+        result = pool.release_doctor(request.doctor_id, request.reason, "admin")
+        if not result:
+            raise HTTPException(404, "Doctor not found or not assigned")
+        
+        if result.get("success"):
+            doctor = result.get("doctor", {})
+            logger.log_doctor_released(
+                doctor_id=request.doctor_id,
+                doctor_name=doctor.get("name", f"Doctor #{request.doctor_id}"),
+                department=old_department,
+                reason=request.reason,
+                initiated_by="admin"
+            )
     
     return {"success": True, **result}
 
@@ -565,8 +777,9 @@ async def release_doctor(request: ReleaseDoctorRequest):
 @router.get("/doctors/spare/logs")
 async def spare_logs(limit: int = 50):
     """Spare doctor assignment logs."""
-    pool = get_spare_doctor_pool()
-    return {"success": True, "logs": pool.get_assignment_logs(limit)}
+    async with state_locked():
+        pool = get_spare_doctor_pool()
+        return {"success": True, "logs": pool.get_assignment_logs(limit)}
 
 
 # =============================================================================
@@ -582,78 +795,29 @@ class SimpleEscalateRequest(BaseModel):
 @router.post("/emergency/escalate")
 async def emergency_escalate(request: SimpleEscalateRequest):
     """Emergency escalate to top of queue - simplified API."""
-    pq = get_priority_queue()
-    activity_logger = get_activity_logger()
-    
-    # Find entry in queue using _entries dict
-    entry = pq._entries.get(request.entry_id)
-    
-    if not entry:
-        raise HTTPException(404, "Patient not found in queue")
-    
-    # Get patient info
-    patient_info = pq._patient_info.get(request.entry_id, {})
-    patient_name = patient_info.get("name", f"Patient #{entry.patient_id}")
-    department = patient_info.get("department", "general")
-    age = patient_info.get("age", 30)
-    chronic_conditions = patient_info.get("chronic_conditions", [])
-    
-    # Update to critical priority
-    old_score = entry.triage_score
-    entry.triage_score = 10  # Max score
-    entry.is_emergency = True
-    
-    # Update patient info severity
-    if request.entry_id in pq._patient_info:
-        pq._patient_info[request.entry_id]["severity"] = "CRITICAL"
-    
-    # Recalculate priority with emergency boost
-    now = datetime.utcnow()
-    wait_minutes = (now - entry.timestamp).total_seconds() / 60
-    wait_norm = min(1.0, wait_minutes / 120)
-    
-    severity_norm = entry.triage_score / 10.0
-    age_factor = 0.5  # Default mid factor
-    if age < 5 or age > 70:
-        age_factor = 0.8
-    chronic_factor = 0.3 if chronic_conditions else 0.0
-    
-    # Max priority calculation with emergency boost
-    new_priority = (
-        severity_norm * 0.4 +
-        wait_norm * 0.25 +
-        age_factor * 0.15 +
-        chronic_factor * 0.10 +
-        1.0 * 0.10  # Full emergency boost
-    ) + 10.0  # Massive emergency addition
-    
-    # Update the entry's priority in heap (using update_priority method pattern)
-    pq._entries[request.entry_id] = entry
-    
-    # Log the override (note: entry_id must be string for the method)
-    activity_logger.log_emergency_override(
-        patient_name=patient_name,
-        entry_id=str(entry.entry_id),
-        old_severity=str(old_score),
-        new_severity="10",
-        reason=request.reason,
-        authorized_by=request.authorized_by
-    )
-    
-    # Recalculate position based on new priority
-    queue_list = pq.get_queue_list()
-    new_position = 1
-    for item in queue_list:
-        if item["entry_id"] == entry.entry_id:
-            new_position = item["position"]
-            break
+    async with state_locked():
+        # Update to critical priority (max score + emergency boost) in one
+        # queue call, so a shared queue cannot lose the entry midway
+        escalated = get_priority_queue().escalate(request.entry_id, triage_score=10, severity="CRITICAL")
+        if escalated is None:
+            raise HTTPException(404, "Patient not found in queue")
+        
+        # Log the override (note: entry_id must be string for the method)
+        get_activity_logger().log_emergency_override(
+            patient_name=escalated["patient_name"],
+            entry_id=str(request.entry_id),
+            old_severity=str(escalated["old_triage_score"]),
+            new_severity="10",
+            reason=request.reason,
+            authorized_by=request.authorized_by
+        )
     
     return {
         "success": True,
-        "message": f"Patient {patient_name} escalated to CRITICAL",
-        "new_position": new_position,
-        "new_priority": round(new_priority, 3),
-        "entry_id": entry.entry_id
+        "message": f"Patient {escalated['patient_name']} escalated to CRITICAL",
+        "new_position": escalated["position"],
+        "new_priority": round(escalated["new_priority"], 3),
+        "entry_id": request.entry_id
     }
 
 
@@ -671,10 +835,11 @@ async def emergency_escalate(
     except:
         reason = OverrideReason.OTHER
     
-    result = system.emergency_escalate(
-        request.queue_entry_id, request.patient_id, request.patient_name,
-        auth_id, auth_name, auth_role, reason, request.reason_notes
-    )
+    async with state_locked():
+        result = system.emergency_escalate(
+            request.queue_entry_id, request.patient_id, request.patient_name,
+            auth_id, auth_name, auth_role, reason, request.reason_notes
+        )
     if not result["success"]:
         raise HTTPException(403, result.get("error"))
     return result
@@ -694,10 +859,11 @@ async def priority_boost(
     except:
         reason = OverrideReason.OTHER
     
-    result = system.priority_boost(
-        request.queue_entry_id, request.patient_id, request.patient_name,
-        request.boost_amount or 1, auth_id, auth_name, auth_role, reason, request.reason_notes
-    )
+    async with state_locked():
+        result = system.priority_boost(
+            request.queue_entry_id, request.patient_id, request.patient_name,
+            request.boost_amount or 1, auth_id, auth_name, auth_role, reason, request.reason_notes
+        )
     if not result["success"]:
         raise HTTPException(403, result.get("error"))
     return result
@@ -706,15 +872,17 @@ async def priority_boost(
 @router.get("/emergency/logs")
 async def override_logs(limit: int = 100):
     """Emergency override audit logs."""
-    system = get_override_system()
-    return {"success": True, "logs": system.get_override_logs(limit)}
+    async with state_locked():
+        system = get_override_system()
+        return {"success": True, "logs": system.get_override_logs(limit)}
 
 
 @router.get("/emergency/stats")
 async def override_stats():
     """Override statistics."""
-    system = get_override_system()
-    return {"success": True, "stats": system.get_override_stats()}
+    async with state_locked():
+        system = get_override_system()
+        return {"success": True, "stats": system.get_override_stats()}
 
 
 # =============================================================================
@@ -722,7 +890,7 @@ async def override_stats():
 # =============================================================================
 
 @router.post("/demo/seed")
-async def seed_demo_data():
+def seed_demo_data():
     """Seed demo data for hackathon demonstration."""
     import random
     from datetime import datetime, timedelta
@@ -758,86 +926,84 @@ async def seed_demo_data():
             duration_hours=p["duration"]
         )
         
-        entry_id = int(datetime.utcnow().timestamp() * 1000) % 1000000 + i
+        entry_id = next_entry_id()
         age_factor = TriageEngine.get_age_risk_factor(p["age"])
         chronic_boost, _ = TriageEngine.calculate_chronic_boost(p["chronic"])
         
-        priority = pq.push(
-            patient_id=100 + i,
-            entry_id=entry_id,
-            triage_score=triage_result["triage_score"],
-            age_factor=age_factor,
-            chronic_factor=chronic_boost
-        )
+        with STATE_LOCK:
+            priority = pq.push(
+                patient_id=100 + i,
+                entry_id=entry_id,
+                triage_score=triage_result["triage_score"],
+                age_factor=age_factor,
+                chronic_factor=chronic_boost,
+                # Patient info for display
+                patient_info={
+                    "name": p["name"],
+                    "age": p["age"],
+                    "symptoms": p["symptoms"],
+                    "chronic_conditions": p["chronic"],
+                    "department": p["dept"],
+                    "severity": triage_result["severity_level"],
+                    "explanation": triage_result["explanation"]
+                }
+            )
+            
+            cm.update_department_status(p["dept"], random.randint(3, 12), random.randint(2, 5))
+            
+            # Log to activity logger
+            logger = get_activity_logger()
+            logger.log_patient_checkin(
+                patient_name=p["name"],
+                patient_id=100 + i,
+                entry_id=entry_id,
+                token=queue_token(entry_id),
+                department=p["dept"],
+                symptoms=p["symptoms"],
+                triage_score=triage_result["triage_score"],
+                severity_level=triage_result["severity_level"],
+                priority_score=round(priority, 3),
+                wait_minutes=0
+            )
+            
+            results.append({
+                "name": p["name"],
+                "severity": triage_result["severity_level"],
+                "score": round(triage_result["triage_score"], 1),
+                "score_10": triage_result["triage_score"],  # Already 1-10 scale
+                "priority": round(priority, 3)
+            })
+    
+    # Run AI auto-allocation after seeding (a plain def endpoint: the
+    # allocation may wait on partner hospitals, see state_lock.py)
+    with STATE_LOCK:
+        allocator = get_ai_allocator()
+        ai_results = allocator.auto_allocate_all_departments()
+        ai_actions = [r for r in ai_results if r.get("executed")]
         
-        # Store patient info for display
-        pq._patient_info[entry_id] = {
-            "name": p["name"],
-            "age": p["age"],
-            "symptoms": p["symptoms"],
-            "chronic_conditions": p["chronic"],
-            "department": p["dept"],
-            "severity": triage_result["severity_level"],
-            "explanation": triage_result["explanation"]
+        return {
+            "success": True,
+            "message": f"Seeded {len(results)} demo patients",
+            "patients": results,
+            "stats": pq.get_stats(),
+            "ai_actions_taken": len(ai_actions)
         }
-        
-        cm.update_department_status(p["dept"], random.randint(3, 12), random.randint(2, 5))
-        
-        # Log to activity logger
-        logger = get_activity_logger()
-        logger.log_patient_checkin(
-            patient_name=p["name"],
-            patient_id=100 + i,
-            entry_id=entry_id,
-            token=f"TKN-{entry_id}",
-            department=p["dept"],
-            symptoms=p["symptoms"],
-            triage_score=triage_result["triage_score"],
-            severity_level=triage_result["severity_level"],
-            priority_score=round(priority, 3),
-            wait_minutes=0
-        )
-        
-        results.append({
-            "name": p["name"],
-            "severity": triage_result["severity_level"],
-            "score": round(triage_result["triage_score"], 1),
-            "score_10": triage_result["triage_score"],  # Already 1-10 scale
-            "priority": round(priority, 3)
-        })
-    
-    # Run AI auto-allocation after seeding
-    allocator = get_ai_allocator()
-    ai_results = allocator.auto_allocate_all_departments()
-    ai_actions = [r for r in ai_results if r.get("executed")]
-    
-    return {
-        "success": True,
-        "message": f"Seeded {len(results)} demo patients",
-        "patients": results,
-        "stats": pq.get_stats(),
-        "ai_actions_taken": len(ai_actions)
-    }
 
 
 @router.delete("/demo/clear")
 async def clear_demo_data():
     """Clear all queue data for demo reset."""
-    pq = get_priority_queue()
-    cm = get_crowd_manager()
-    
-    # Clear queue
-    pq._heap = []
-    pq._entries = {}
-    pq._removed = set()
-    pq._patient_info = {}
-    pq._current_patients = {}
-    
-    # Reset crowd manager
-    cm._department_stats = {}
-    cm._teleconsult_queue = []
-    
-    return {"success": True, "message": "Demo data cleared"}
+    async with state_locked():
+        pq = get_priority_queue()
+        cm = get_crowd_manager()
+        
+        # Clear queue
+        pq.clear()
+        
+        # Reset crowd manager
+        cm.reset()
+        
+        return {"success": True, "message": "Demo data cleared"}
 
 
 # =============================================================================
@@ -854,8 +1020,29 @@ async def ai_insights():
     - Queue predictions
     - Staffing recommendations
     """
-    allocator = get_ai_allocator()
-    return allocator.get_ai_insights()
+    async with state_locked():
+        allocator = get_ai_allocator()
+        return allocator.get_ai_insights()
+
+
+@router.get("/ai/forecast")
+async def ai_forecast():
+    """
+    Queue length and arrival forecasts (15/30/60 min) per department, with
+    the measured error of past forecasts and surge prediction hit rates.
+    """
+    async with state_locked():
+        allocator = get_ai_allocator()
+        return {"success": True, "departments": allocator.get_forecasts()}
+
+
+@router.get("/ai/arrival-profiles")
+async def ai_arrival_profiles():
+    """
+    Learned hour-of-week arrival profiles per department (refitted in the
+    background) with the next 24 hours of expected check-ins.
+    """
+    return {"success": True, **get_arrival_forecaster().get_profiles()}
 
 
 @router.post("/ai/analyze/{department}")
@@ -865,11 +1052,12 @@ async def ai_analyze_department(department: str):
     
     Returns detailed metrics and allocation recommendation.
     """
-    allocator = get_ai_allocator()
-    
-    metrics = allocator.analyze_department(department)
-    decision = allocator.make_allocation_decision(department)
-    score, factors = allocator.calculate_assignment_score(metrics)
+    async with state_locked():
+        allocator = get_ai_allocator()
+        
+        metrics = allocator.analyze_department(department)
+        decision = allocator.make_allocation_decision(department)
+        score, factors = allocator.calculate_assignment_score(metrics)
     
     return {
         "department": department,
@@ -898,7 +1086,7 @@ async def ai_analyze_department(department: str):
 
 
 @router.post("/ai/auto-allocate")
-async def ai_auto_allocate():
+def ai_auto_allocate():
     """
     Run AI auto-allocation across all departments.
     
@@ -911,23 +1099,25 @@ async def ai_auto_allocate():
     
     Returns list of actions taken.
     """
-    allocator = get_ai_allocator()
-    logger = get_activity_logger()
-    
-    results = allocator.auto_allocate_all_departments()
-    
-    actions_taken = [r for r in results if r.get("executed")]
-    
-    # Log each AI action
-    for action in actions_taken:
-        logger.log_ai_allocation(
-            action=action.get("decision", {}).get("action", "unknown"),
-            department=action.get("department", "unknown"),
-            doctor_name=action.get("doctor_assigned", {}).get("name") or action.get("doctor_released", {}).get("name"),
-            reason=action.get("decision", {}).get("reason", "AI decision"),
-            confidence=action.get("decision", {}).get("confidence", 0),
-            executed=True
-        )
+    # Plain def endpoint: assignments may wait on partner hospitals (see state_lock.py)
+    with STATE_LOCK:
+        allocator = get_ai_allocator()
+        logger = get_activity_logger()
+        
+        results = allocator.auto_allocate_all_departments()
+        
+        actions_taken = [r for r in results if r.get("executed")]
+        
+        # Log each AI action
+        for action in actions_taken:
+            logger.log_ai_allocation(
+                action=action.get("decision", {}).get("action", "unknown"),
+                department=action.get("department", "unknown"),
+                doctor_name=action.get("doctor_assigned", {}).get("name") or action.get("doctor_released", {}).get("name"),
+                reason=action.get("decision", {}).get("reason", "AI decision"),
+                confidence=action.get("decision", {}).get("confidence", 0),
+                executed=True
+            )
     
     return {
         "success": True,
@@ -938,74 +1128,76 @@ async def ai_auto_allocate():
 
 
 @router.post("/ai/auto-allocate/{department}")
-async def ai_auto_allocate_department(department: str):
+def ai_auto_allocate_department(department: str):
     """
     Run AI auto-allocation for a specific department.
     
     Analyzes department and executes allocation decision if confidence is high.
     """
-    allocator = get_ai_allocator()
-    pool = get_spare_doctor_pool()
-    logger = get_activity_logger()
-    
-    decision = allocator.make_allocation_decision(department)
-    
-    result = {
-        "department": department,
-        "decision": {
-            "action": decision.action,
-            "confidence": round(decision.confidence, 2),
-            "reason": decision.reason,
-            "factors": decision.factors
-        },
-        "executed": False
-    }
-    
-    # Execute if appropriate
-    if decision.action == "assign" and decision.doctor_id:
-        assignment = pool.assign_doctor(
-            decision.doctor_id,
-            department,
-            f"AI Auto-Assignment: {decision.reason}",
-            "ai_system"
-        )
-        if assignment and assignment.get("success"):
-            result["executed"] = True
-            result["doctor_assigned"] = {
-                "id": decision.doctor_id,
-                "name": decision.doctor_name
-            }
-            # Log AI action
-            logger.log_ai_allocation(
-                action="assign",
-                department=department,
-                doctor_name=decision.doctor_name,
-                reason=decision.reason,
-                confidence=decision.confidence,
-                executed=True
+    # Plain def endpoint: assignments may wait on partner hospitals (see state_lock.py)
+    with STATE_LOCK:
+        allocator = get_ai_allocator()
+        pool = get_spare_doctor_pool()
+        logger = get_activity_logger()
+        
+        decision = allocator.make_allocation_decision(department)
+        
+        result = {
+            "department": department,
+            "decision": {
+                "action": decision.action,
+                "confidence": round(decision.confidence, 2),
+                "reason": decision.reason,
+                "factors": decision.factors
+            },
+            "executed": False
+        }
+        
+        # Execute if appropriate
+        if decision.action == "assign" and decision.doctor_id:
+            assignment = pool.assign_doctor(
+                decision.doctor_id,
+                department,
+                f"AI Auto-Assignment: {decision.reason}",
+                "ai_system"
             )
-            
-    elif decision.action == "release" and decision.doctor_id:
-        release = pool.release_doctor(
-            decision.doctor_id,
-            f"AI Auto-Release: {decision.reason}",
-            "ai_system"
-        )
-        if release and release.get("success"):
-            result["executed"] = True
-            result["doctor_released"] = {
-                "id": decision.doctor_id,
-                "name": decision.doctor_name
-            }
-            # Log AI action
-            logger.log_ai_allocation(
-                action="release",
-                department=department,
-                doctor_name=decision.doctor_name,
-                reason=decision.reason,
-                confidence=decision.confidence,
-                executed=True
+            if assignment and assignment.get("success"):
+                result["executed"] = True
+                result["doctor_assigned"] = {
+                    "id": decision.doctor_id,
+                    "name": decision.doctor_name
+                }
+                # Log AI action
+                logger.log_ai_allocation(
+                    action="assign",
+                    department=department,
+                    doctor_name=decision.doctor_name,
+                    reason=decision.reason,
+                    confidence=decision.confidence,
+                    executed=True
+                )
+                
+        elif decision.action == "release" and decision.doctor_id:
+            release = pool.release_doctor(
+                decision.doctor_id,
+                f"AI Auto-Release: {decision.reason}",
+                "ai_system"
             )
+            if release and release.get("success"):
+                result["executed"] = True
+                result["doctor_released"] = {
+                    "id": decision.doctor_id,
+                    "name": decision.doctor_name
+                }
+                # Log AI action
+                logger.log_ai_allocation(
+                    action="release",
+                    department=department,
+                    doctor_name=decision.doctor_name,
+                    reason=decision.reason,
+                    confidence=decision.confidence,
+                    executed=True
+                )
     
     return result
 
@@ -1029,9 +1221,10 @@ async def get_activity_logs(
     - AI allocation decisions
     - Emergency overrides
     """
-    logger = get_activity_logger()
-    logs = logger.get_logs(limit=limit, activity_type=activity_type, department=department)
-    stats = logger.get_stats()
+    async with state_locked():
+        logger = get_activity_logger()
+        logs = logger.get_logs(limit=limit, activity_type=activity_type, department=department)
+        stats = logger.get_stats()
     
     return {
         "success": True,
@@ -1044,11 +1237,12 @@ async def get_activity_logs(
 @router.get("/activity/stats")
 async def get_activity_stats():
     """Get activity statistics."""
-    logger = get_activity_logger()
-    return {
-        "success": True,
-        "stats": logger.get_stats()
-    }
+    async with state_locked():
+        logger = get_activity_logger()
+        return {
+            "success": True,
+            "stats": logger.get_stats()
+        }
 
 
 # =============================================================================
@@ -1063,13 +1257,14 @@ async def get_wait_time_impact(department: str):
     Shows how critical patients affect wait times for regular patients
     and recommends spare doctor assignments to protect wait times.
     """
-    allocator = get_ai_allocator()
-    impact = allocator.calculate_wait_time_impact(department)
-    return impact
+    async with state_locked():
+        allocator = get_ai_allocator()
+        impact = allocator.calculate_wait_time_impact(department)
+        return impact
 
 
 @router.post("/ai/protect-wait-times/{department}")
-async def protect_wait_times(department: str):
+def protect_wait_times(department: str):
     """
     Automatically assign spare doctors to protect wait times.
     
@@ -1077,19 +1272,23 @@ async def protect_wait_times(department: str):
     existing patients, this endpoint assigns spare doctors to handle
     the surge and maintain original wait time commitments.
     """
-    allocator = get_ai_allocator()
-    result = allocator.protect_wait_times(department)
-    return result
+    # Plain def endpoint: assignments may wait on partner hospitals (see state_lock.py)
+    with STATE_LOCK:
+        allocator = get_ai_allocator()
+        result = allocator.protect_wait_times(department)
+        return result
 
 
 @router.post("/ai/protect-all")
-async def protect_all_wait_times():
+def protect_all_wait_times():
     """
     Run wait time protection for ALL departments.
     
     Automatically checks each department and assigns spare doctors
     where needed to prevent wait time increases from critical patients.
     """
-    allocator = get_ai_allocator()
-    result = allocator.auto_protect_all_departments()
-    return result
+    # Plain def endpoint: assignments may wait on partner hospitals (see state_lock.py)
+    with STATE_LOCK:
+        allocator = get_ai_allocator()
+        result = allocator.auto_protect_all_departments()
+        return result
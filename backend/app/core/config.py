@@ -38,8 +38,28 @@ class Settings(BaseSettings):
     USE_ML_MODEL: bool = False  # Set True only if you have trained a model
     
     # Queue Settings
-    QUEUE_UPDATE_INTERVAL: int = 300  # 5 minutes
+    QUEUE_UPDATE_INTERVAL: int = 300  # 5 minutes between periodic re-prioritization / status refresh jobs
+    QUEUE_UPDATE_JITTER: float = 0.1  # each run fires within ±10% of the interval
+    ARRIVAL_REFIT_INTERVAL: int = 3600  # seconds between incremental arrival-profile refits
     MAX_QUEUE_SIZE: int = 500
+    QUEUE_BACKEND: str = "indexed"  # "indexed", "columnar" (NumPy, mass screening) or "redis" (multi-node)
+    QUEUE_JOURNAL_DIR: str = ""  # WAL + snapshots (one pickle per mutation), e.g. "./data/queue_journal"; empty = off
+    ENTRY_ID_NODE: int = -1  # 0-15, unique per API process; -1 = claim a free one (Redis lease with QUEUE_BACKEND=redis, else per host)
+    SHARED_STATE_ADDRESS: str = ""  # Unix socket of the state owner (multi-worker); empty = in-process
+    ALLOCATION_DEBOUNCE_MS: int = 100  # background AI allocation runs once queue changes pause this long...
+    ALLOCATION_MAX_STALENESS_MS: int = 1000  # ...but never later than this after the first change
+    
+    # Triage
+    TRIAGE_CACHE_SIZE: int = 4096  # memoized triage results (LRU); 0 disables the cache
+    TRIAGE_CACHE_TTL_SECONDS: int = 600  # cached results are reused this long
+    TRIAGE_RULES_FILE: str = ""  # versioned JSON rules file overriding app/core/constants.py; empty = constants
+    TRIAGE_RULES_CHECK_SECONDS: float = 5.0  # how often every process checks the rules file for changes
+    
+    # Partner hospitals lending spare doctors
+    PARTNER_HOSPITALS: List[str] = []  # "Name=http://host:port" entries; empty = demo pool only
+    PARTNER_TIMEOUT_MS: int = 500  # per-partner limit for each availability/reservation call
+    PARTNER_CACHE_TTL_SECONDS: int = 30  # availability answers are reused this long
+    PARTNER_RESERVATION_TTL_SECONDS: int = 120  # partners free unconfirmed reservations after this
     
     class Config:
         env_file = ".env"
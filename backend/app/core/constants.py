@@ -50,6 +50,29 @@ ROUTINE_SYMPTOMS = {
     "consultation": 1, "general checkup": 1
 }
 
+# Keyword tiers of the legacy TriageService (1-5 scale, scored 5/4/3/2);
+# kept apart from the tiers above so its scores do not shift with them
+TRIAGE_SERVICE_SYMPTOMS = {
+    "CRITICAL": [
+        "chest pain", "difficulty breathing", "severe bleeding",
+        "unconscious", "stroke", "heart attack", "seizure",
+        "severe allergic reaction", "anaphylaxis"
+    ],
+    "URGENT": [
+        "high fever", "severe pain", "vomiting blood",
+        "confusion", "severe headache", "abdominal pain",
+        "broken bone", "deep cut", "burns"
+    ],
+    "MODERATE": [
+        "fever", "persistent cough", "minor injury",
+        "infection", "rash", "ear pain", "sore throat"
+    ],
+    "LOW": [
+        "cold", "mild headache", "runny nose",
+        "minor pain", "prescription refill", "follow-up"
+    ]
+}
+
 # =============================================================================
 # AGE RISK FACTORS
 # =============================================================================
@@ -18,6 +18,13 @@ from app.models.patient import Patient
 from app.models.doctor import Doctor
 from app.models.appointment import Appointment
 from app.models.queue import QueueEntry
+from app.services.priority_queue import get_priority_queue
+from app.services.queue_journal import open_queue_journal, close_queue_journal
+from app.services.shared_state import connect_shared_state
+from app.services.allocation_worker import start_allocation_worker, stop_allocation_worker
+from app.services.periodic_jobs import start_periodic_jobs, stop_periodic_jobs
+from app.services.partner_federation import start_partner_federation, stop_partner_federation
+from app.services.triage_rules import start_rules_watcher, stop_rules_watcher, get_rules
 
 
 @asynccontextmanager
@@ -28,9 +35,32 @@ async def lifespan(app: FastAPI):
     print("📦 Creating database tables...")
     Base.metadata.create_all(bind=engine)
     print("✅ Database tables created!")
+    if settings.SHARED_STATE_ADDRESS:
+        # The state owner process recovers and journals the queue and runs
+        # the periodic jobs
+        connect_shared_state(settings.SHARED_STATE_ADDRESS, settings.SECRET_KEY)
+        print(f"🔗 Using shared queue state at {settings.SHARED_STATE_ADDRESS}")
+    elif settings.QUEUE_JOURNAL_DIR and settings.QUEUE_BACKEND != "redis":
+        recovery = open_queue_journal(settings.QUEUE_JOURNAL_DIR, get_priority_queue())
+        print(f"💾 Queue recovered: {recovery['entries']} patients "
+              f"({recovery['replayed']} log records replayed) in {recovery['elapsed_ms']} ms")
+    if not settings.SHARED_STATE_ADDRESS:
+        if start_partner_federation():
+            print(f"🤝 Spare doctors from {len(settings.PARTNER_HOSPITALS)} partner hospitals")
+        start_periodic_jobs()
+    start_allocation_worker()
+    # Triage runs in every worker, so every worker watches the rules file
+    if start_rules_watcher():
+        rules = get_rules()
+        print(f"📋 Triage rules {rules.version} from {rules.source}")
     yield
     # Shutdown
     print("👋 SmartCare API Shutting down...")
+    await stop_periodic_jobs()
+    stop_allocation_worker()
+    stop_partner_federation()
+    stop_rules_watcher()
+    close_queue_journal()
 
 
 app = FastAPI(
@@ -0,0 +1,96 @@
+"""
+Partner Federation Benchmark
+Starts local stub partner hospitals (app/scripts/partner_stub.py), each
+answering after a fixed latency, and times an availability refresh and a
+reservation round across all of them: concurrently through the
+federation, and one partner after another as before.
+
+Run from the backend directory:
+   cd backend && python -m app.scripts.benchmark_partner_federation [partners] [latency_ms]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import threading
+import time
+from typing import List
+
+import httpx
+import uvicorn
+
+from app.scripts.partner_stub import create_partner_app, demo_doctors
+from app.services.partner_federation import PartnerFederation, PartnerHospital
+from app.services.spare_doctor_pool import get_spare_doctor_pool
+from app.services.state_lock import STATE_LOCK
+
+BASE_PORT = 9400
+
+
+def start_stubs(partners: int, latency_ms: float) -> List[uvicorn.Server]:
+    servers = []
+    for i in range(partners):
+        name = f"Partner {i:02d}"
+        app = create_partner_app(name, demo_doctors(name, 10, seed=i), latency_ms)
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=BASE_PORT + i, log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        servers.append(server)
+    while not all(server.started for server in servers):
+        time.sleep(0.05)
+    return servers
+
+
+def sequential_refresh(partners: List[PartnerHospital]) -> float:
+    """The one-partner-at-a-time order; returns elapsed ms."""
+    started = time.perf_counter()
+    with httpx.Client() as client:
+        for partner in partners:
+            client.get(f"{partner.base_url}/spare-doctors").raise_for_status()
+    return (time.perf_counter() - started) * 1000
+
+
+def main(partners: int = 20, latency_ms: float = 50.0):
+    servers = start_stubs(partners, latency_ms)
+    hospitals = [PartnerHospital(f"Partner {i:02d}", f"http://127.0.0.1:{BASE_PORT + i}") for i in range(partners)]
+    federation = PartnerFederation(hospitals, timeout_ms=int(latency_ms * 4) + 200)
+    federation.start()
+    pool = get_spare_doctor_pool()
+    pool.set_partner_gateway(federation)
+
+    print(f"\n⏱️  {partners} partner hospitals, {latency_ms:.0f} ms each\n")
+    try:
+        sequential_ms = sequential_refresh(hospitals)
+
+        started = time.perf_counter()
+        status = federation.refresh(force=True)
+        concurrent_ms = (time.perf_counter() - started) * 1000
+        offered = sum(p["doctors_offered"] for p in status["partners"].values())
+
+        # One partner doctor per partner, reserved in a single round
+        wanted = []
+        for doctor in pool.get_available_doctors():
+            if doctor.partner and doctor.partner not in {d.partner for d, _ in wanted}:
+                wanted.append((doctor, "general"))
+        started = time.perf_counter()
+        with STATE_LOCK:  # the pool releases it for the round trip
+            reserved = pool.reserve_doctors([(doctor.doctor_id, dept) for doctor, dept in wanted])
+        reserve_ms = (time.perf_counter() - started) * 1000
+
+        print(f"   {'step':<28}{'ms':>10}")
+        print(f"   {'availability, sequential':<28}{sequential_ms:>10.1f}")
+        print(f"   {'availability, concurrent':<28}{concurrent_ms:>10.1f}   ({offered} doctors offered)")
+        print(f"   {'reservations, concurrent':<28}{reserve_ms:>10.1f}   "
+              f"({sum(reserved.values())}/{len(reserved)} reserved)")
+        print(f"\n   concurrent refresh = {concurrent_ms / latency_ms:.1f} round trips "
+              f"(sequential {sequential_ms / latency_ms:.1f})\n")
+    finally:
+        pool.set_partner_gateway(None)
+        federation.stop()
+        for server in servers:
+            server.should_exit = True
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:3]
+    main(int(args[0]) if args else 20, float(args[1]) if len(args) > 1 else 50.0)
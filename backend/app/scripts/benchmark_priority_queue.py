@@ -0,0 +1,180 @@
+"""
+Priority Queue Microbenchmark
+Runs a mixed push/update/pop workload against the indexed-heap
+SmartPriorityQueue and the previous lazy-deletion implementation, then
+times a periodic wait-time recalculation on each.
+
+Run from the backend directory:
+   cd backend && python -m app.scripts.benchmark_priority_queue
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import heapq
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.services.priority_queue import SmartPriorityQueue, QueueItem
+
+
+class LazyDeletionQueue(SmartPriorityQueue):
+    """
+    The pre-indexed-heap engine, kept for comparison only.
+    Every update pushes a fresh tuple and leaves a tombstone behind.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._heap = []
+        self._removed = set()
+
+    def push(self, patient_id, entry_id, triage_score, age_factor=1.0,
+             chronic_factor=0.0, is_emergency=False, check_in_time=None):
+        check_in_time = check_in_time or datetime.utcnow()
+        score = self.calculate_priority_score(triage_score, 0, age_factor, chronic_factor, is_emergency)
+        item = QueueItem(-score, check_in_time, patient_id, entry_id, triage_score, is_emergency)
+        heapq.heappush(self._heap, (item.priority, item.timestamp, item))
+        self._entries[entry_id] = item
+        return score
+
+    def pop(self):
+        while self._heap:
+            _, _, item = heapq.heappop(self._heap)
+            if item.entry_id in self._removed:
+                self._removed.discard(item.entry_id)
+                continue
+            self._entries.pop(item.entry_id, None)
+            return item
+        return None
+
+    def update_priority(self, entry_id, new_triage_score=None, age_factor=None,
+                        chronic_factor=None, is_emergency=None, wait_minutes=None):
+        if entry_id not in self._entries:
+            return None
+        old = self._entries[entry_id]
+        self._removed.add(entry_id)
+        score = self.calculate_priority_score(
+            new_triage_score or old.triage_score, wait_minutes or 0,
+            age_factor or 1.0, chronic_factor or 0.0,
+            is_emergency if is_emergency is not None else old.is_emergency
+        )
+        item = QueueItem(-score, old.timestamp, old.patient_id, entry_id,
+                         new_triage_score or old.triage_score, old.is_emergency)
+        heapq.heappush(self._heap, (item.priority, item.timestamp, item))
+        self._entries[entry_id] = item
+        self._removed.discard(entry_id)
+        return score
+
+    def recalculate_all_priorities(self, current_time=None):
+        # Old behaviour: re-push every entry with its current wait time
+        current_time = current_time or datetime.utcnow()
+        for entry_id, item in list(self._entries.items()):
+            wait_minutes = (current_time - item.timestamp).total_seconds() / 60
+            self.update_priority(entry_id, wait_minutes=int(wait_minutes))
+        return len(self._entries)
+
+
+def build_workload(operations: int, seed: int = 42):
+    """Mixed workload: 45% push, 40% update (re-triage), 15% pop."""
+    rng = random.Random(seed)
+    # Check-ins spread over the last hour or so, so entries are still aging
+    start = datetime.utcnow() - timedelta(milliseconds=40 * operations)
+    workload = []
+    live = []
+    next_id = 1
+    for _ in range(operations):
+        roll = rng.random()
+        if roll < 0.45 or not live:
+            workload.append(("push", next_id, rng.randint(1, 10),
+                             start + timedelta(milliseconds=40 * next_id)))
+            live.append(next_id)
+            next_id += 1
+        elif roll < 0.85:
+            workload.append(("update", rng.choice(live), rng.randint(1, 10)))
+        else:
+            workload.append(("pop",))
+            live.pop(rng.randrange(len(live)))
+    return workload
+
+
+def heap_size(queue: SmartPriorityQueue) -> int:
+    """Physical heap slots, including tombstones for the lazy engine."""
+    if isinstance(queue, LazyDeletionQueue):
+        return len(queue._heap)
+    return sum(len(dq) for dq in queue._departments.values())
+
+
+def apply(queue: SmartPriorityQueue, op) -> None:
+    kind = op[0]
+    if kind == "push":
+        queue.push(patient_id=op[1], entry_id=op[1], triage_score=op[2], check_in_time=op[3])
+    elif kind == "update":
+        queue.update_priority(op[1], new_triage_score=op[2])
+    else:
+        queue.pop()
+
+
+def run(queue_factory, workload) -> dict:
+    """
+    Time the workload on a fresh queue, then replay it on another one to
+    measure the peak heap size (kept out of the timed pass: summing the
+    department lanes after every op would cost more than the op itself).
+    """
+    queue = queue_factory()
+    started = time.perf_counter()
+    for op in workload:
+        apply(queue, op)
+    elapsed = time.perf_counter() - started
+
+    peak_heap = 0
+    replay = queue_factory()
+    for op in workload:
+        apply(replay, op)
+        size = heap_size(replay)
+        if size > peak_heap:
+            peak_heap = size
+    return {
+        "queue": queue,
+        "ops_per_sec": len(workload) / elapsed,
+        "elapsed_s": elapsed,
+        "peak_heap": peak_heap,
+        "live_entries": len(queue),
+    }
+
+
+def time_recalculation(queue: SmartPriorityQueue, rounds: int = 12) -> dict:
+    """Periodic recalculation every 10 minutes of simulated time."""
+    clock = max(item.timestamp for item in queue._entries.values())
+    touched = 0
+    started = time.perf_counter()
+    for _ in range(rounds):
+        clock += timedelta(minutes=10)
+        touched += queue.recalculate_all_priorities(clock)
+    elapsed = time.perf_counter() - started
+    return {"ms_per_round": elapsed / rounds * 1000, "touched_per_round": touched / rounds}
+
+
+def main(operations: int = 100_000):
+    workload = build_workload(operations)
+    print(f"\n⏱️  {operations:,} mixed push/update/pop operations\n")
+    print(f"   {'engine':<16}{'ops/sec':>12}{'elapsed':>10}{'peak heap':>12}{'live':>8}")
+    engines = []
+    for name, factory in (("lazy-deletion", LazyDeletionQueue), ("indexed-heap", SmartPriorityQueue)):
+        r = run(factory, workload)
+        print(f"   {name:<16}{r['ops_per_sec']:>12,.0f}{r['elapsed_s']:>9.2f}s"
+              f"{r['peak_heap']:>12,}{r['live_entries']:>8,}")
+        engines.append((name, r["queue"]))
+
+    print(f"\n⏱️  Periodic recalculation (10 min of simulated time per round)\n")
+    print(f"   {'engine':<16}{'ms/round':>12}{'entries touched':>18}")
+    for name, queue in engines:
+        r = time_recalculation(queue)
+        print(f"   {name:<16}{r['ms_per_round']:>12.2f}{r['touched_per_round']:>18,.0f}")
+    print()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
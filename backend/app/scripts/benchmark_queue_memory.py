@@ -0,0 +1,90 @@
+"""
+Queue Memory Benchmark
+Compares bytes per queued patient and full-scan costs of the indexed-heap
+SmartPriorityQueue and the columnar (NumPy) backend.
+
+Run from the backend directory:
+   cd backend && python -m app.scripts.benchmark_queue_memory
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import gc
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from app.services.priority_queue import SmartPriorityQueue
+from app.services.columnar_queue import ColumnarPriorityQueue
+
+DEPARTMENTS = ["general", "emergency", "pediatrics", "cardiology", "orthopedics", "neurology"]
+
+
+def fill(queue: SmartPriorityQueue, patients: int, seed: int = 7) -> None:
+    """Mass-screening style check-ins spread over the last two hours."""
+    rng = random.Random(seed)
+    start = datetime.utcnow() - timedelta(hours=2)
+    for i in range(patients):
+        queue.push(
+            patient_id=i,
+            entry_id=100_000 + i,
+            triage_score=rng.randint(1, 10),
+            age_factor=rng.choice([1.0, 1.1, 1.3, 1.5]),
+            chronic_factor=rng.choice([0.0, 0.0, 0.2, 0.3]),
+            is_emergency=rng.random() < 0.02,
+            check_in_time=start + timedelta(seconds=rng.randrange(7200)),
+            department=rng.choice(DEPARTMENTS)
+        )
+
+
+def measure(engine, patients: int) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    queue = engine()
+    fill(queue, patients)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    queue.get_stats()
+    stats_ms = (time.perf_counter() - started) * 1000
+
+    # Re-triage every entry (e.g. after a scoring rule change)
+    started = time.perf_counter()
+    if isinstance(queue, ColumnarPriorityQueue):
+        queue.rescore()
+    else:
+        for item in list(queue.iter_items()):
+            queue.update_priority(item.entry_id, new_triage_score=item.triage_score)
+    rescore_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    queue.get_queue_list()
+    list_ms = (time.perf_counter() - started) * 1000
+
+    return {
+        "bytes_per_patient": current / patients,
+        "stats_ms": stats_ms,
+        "rescore_ms": rescore_ms,
+        "list_ms": list_ms,
+    }
+
+
+def main(patients: int = 50_000):
+    print(f"\n🧮 {patients:,} queued patients\n")
+    print(f"   {'engine':<12}{'bytes/patient':>15}{'get_stats':>12}{'rescore all':>14}{'sorted list':>14}")
+    results = {}
+    for name, engine in (("indexed", SmartPriorityQueue), ("columnar", ColumnarPriorityQueue)):
+        r = measure(engine, patients)
+        results[name] = r
+        print(f"   {name:<12}{r['bytes_per_patient']:>15,.0f}{r['stats_ms']:>10.1f}ms"
+              f"{r['rescore_ms']:>12.1f}ms{r['list_ms']:>12.1f}ms")
+    ratio = results["indexed"]["bytes_per_patient"] / results["columnar"]["bytes_per_patient"]
+    print(f"\n   columnar uses {ratio:.1f}x less memory per patient\n")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
@@ -0,0 +1,110 @@
+"""
+Redis Queue Benchmark
+Compares throughput of the in-memory SmartPriorityQueue and the Redis
+sorted-set backend on check-in, re-triage, position lookup, queue listing
+and call-next.
+
+Uses the Redis at REDIS_URL if it answers, otherwise an in-process fake
+(pip install "fakeredis[lua]"), which measures the code path but not
+network latency. Keys go under a throwaway prefix and are deleted after.
+
+Run from the backend directory:
+   cd backend && python -m app.scripts.benchmark_redis_queue
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import random
+import time
+from datetime import datetime, timedelta
+
+import redis
+
+from app.core.config import settings
+from app.services.priority_queue import SmartPriorityQueue
+from app.services.redis_queue import RedisPriorityQueue
+
+DEPARTMENTS = ["general", "emergency", "pediatrics", "cardiology", "orthopedics", "neurology"]
+
+
+def connect():
+    """(client, label): the configured Redis, or a fake one when it is unreachable."""
+    client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    try:
+        client.ping()
+        return client, settings.REDIS_URL
+    except redis.ConnectionError:
+        import fakeredis
+        return fakeredis.FakeRedis(decode_responses=True), "in-process fakeredis"
+
+
+def timed(label: str, count: int, fn) -> float:
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"   {label:<22} {count / elapsed:>10,.0f} ops/s")
+    return elapsed
+
+
+def run(queue: SmartPriorityQueue, patients: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    start = datetime.utcnow() - timedelta(hours=3)
+    ids = list(range(900_000, 900_000 + patients))
+    lookups = [rng.choice(ids) for _ in range(500)]
+
+    def checkins():
+        for entry_id in ids:
+            queue.push(
+                patient_id=entry_id,
+                entry_id=entry_id,
+                triage_score=rng.randint(1, 10),
+                age_factor=rng.choice([1.0, 1.2, 1.5]),
+                check_in_time=start + timedelta(seconds=rng.randrange(10_800)),
+                patient_info={"name": f"Patient {entry_id}", "department": rng.choice(DEPARTMENTS)}
+            )
+
+    def retriage():
+        for entry_id in lookups:
+            queue.update_priority(entry_id, new_triage_score=rng.randint(1, 10))
+
+    def positions():
+        for entry_id in lookups:
+            queue.rank(entry_id)
+
+    def listing():
+        queue.get_queue_list()
+
+    def call_next():
+        for _ in range(200):
+            queue.call_next(rng.choice(DEPARTMENTS))
+            queue.clear_current_patient(rng.choice(DEPARTMENTS))
+
+    timed("push", patients, checkins)
+    timed("update_priority", len(lookups), retriage)
+    timed("rank", len(lookups), positions)
+    timed("get_queue_list (full)", 1, listing)
+    timed("call_next", 200, call_next)
+
+
+def main(patients: int = 5_000):
+    client, label = connect()
+    prefix = f"bench:{os.getpid()}"
+
+    print(f"\n📊 {patients:,} patients\n")
+    print("   in-memory (indexed heap)")
+    run(SmartPriorityQueue(), patients)
+
+    print(f"\n   redis ({label})")
+    queue = RedisPriorityQueue(client, prefix=prefix)
+    try:
+        run(queue, patients)
+    finally:
+        for key in client.scan_iter(match=f"{prefix}:*"):
+            client.delete(key)
+    print()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5_000)
@@ -0,0 +1,115 @@
+"""
+Symptom Matcher Benchmark
+Grows the triage lexicon to 10k synthetic clinical phrases (spread over
+the five tiers like the real constants) and times matching symptom texts
+with the phrase index (tokenize once, then n-gram lookups) against one
+`keyword in text` test per keyword. Matches are checked against a plain
+per-keyword scan of the same tokens.
+
+Run from the backend directory:
+   cd backend && python -m app.scripts.benchmark_symptom_matcher [keywords] [texts]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import random
+import time
+from typing import Dict, List
+
+from app.core.constants import (
+    CRITICAL_SYMPTOMS, URGENT_SYMPTOMS, MODERATE_SYMPTOMS, LOW_SYMPTOMS, ROUTINE_SYMPTOMS
+)
+from app.services.symptom_matcher import TieredLexicon
+from app.services.symptom_text import SymptomTokens, tokenize
+
+TIERS = ["CRITICAL", "URGENT", "MODERATE", "LOW", "ROUTINE"]
+BODY_PARTS = ["chest", "abdomen", "back", "neck", "knee", "wrist", "ankle", "jaw", "eye", "ear",
+              "throat", "shoulder", "hip", "lower back", "upper arm", "left leg", "right hand"]
+QUALIFIERS = ["sharp", "dull", "burning", "throbbing", "intermittent", "sudden", "chronic",
+              "radiating", "stabbing", "mild", "acute", "recurring"]
+COMPLAINTS = ["pain", "swelling", "numbness", "stiffness", "itching", "bleeding", "cramps",
+              "tenderness", "weakness", "discharge", "spasm", "rash"]
+
+
+def build_lexicon(keywords: int, seed: int = 11) -> List[Dict[str, int]]:
+    """The real tiers plus synthetic phrases, about one in five per tier."""
+    rng = random.Random(seed)
+    tiers = [dict(CRITICAL_SYMPTOMS), dict(URGENT_SYMPTOMS), dict(MODERATE_SYMPTOMS),
+             dict(LOW_SYMPTOMS), dict(ROUTINE_SYMPTOMS)]
+    total = sum(len(t) for t in tiers)
+    while total < keywords:
+        phrase = f"{rng.choice(QUALIFIERS)} {rng.choice(BODY_PARTS)} {rng.choice(COMPLAINTS)} {rng.randint(1, 99)}"
+        tier = tiers[rng.randrange(len(tiers))]
+        if phrase not in tier:
+            tier[phrase] = 5 - tiers.index(tier)
+            total += 1
+    return tiers
+
+
+def build_texts(tiers: List[Dict[str, int]], texts: int, seed: int = 12) -> List[str]:
+    rng = random.Random(seed)
+    keywords = [k for tier in tiers for k in tier]
+    samples = []
+    for _ in range(texts):
+        words = [rng.choice(keywords) for _ in range(rng.randint(1, 3))]
+        words += [rng.choice(QUALIFIERS + BODY_PARTS) for _ in range(rng.randint(2, 8))]
+        rng.shuffle(words)
+        samples.append(" ".join(words))
+    return samples
+
+
+def scan(tiers: List[Dict[str, int]], text: str) -> List[List[str]]:
+    """The per-keyword substring scan the phrase index replaces."""
+    return [[keyword for keyword in tier if keyword in text] for tier in tiers]
+
+
+def token_scan(tiers: List[Dict[str, int]], tokens: SymptomTokens) -> List[List[str]]:
+    """Reference matches: every keyword's words searched for in the tokens, one keyword at a time."""
+    matched = []
+    for tier in tiers:
+        found = []
+        for keyword in tier:
+            key = tuple(w for w in tokenize(keyword).words if w is not None)
+            if any(
+                tokens.words[i:i + len(key)] == key and not tokens.negated[i]
+                for i in range(len(tokens.words))
+            ):
+                found.append(keyword)
+        matched.append(found)
+    return matched
+
+
+def main(keywords: int = 10_000, texts: int = 2_000):
+    tiers = build_lexicon(keywords)
+    samples = build_texts(tiers, texts)
+
+    started = time.perf_counter()
+    lexicon = TieredLexicon(list(zip(TIERS, tiers)))
+    build_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    for text in samples:
+        scan(tiers, text)
+    scan_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matched = [lexicon.match(tokenize(text)) for text in samples]
+    index_s = time.perf_counter() - started
+
+    checked = samples[:100]
+    assert matched[:len(checked)] == [token_scan(tiers, tokenize(text)) for text in checked], \
+        "phrase index and token scan disagree"
+    avg_len = sum(map(len, samples)) / len(samples)
+    print(f"\n⏱️  {sum(map(len, tiers))} keywords, {texts} texts (avg {avg_len:.0f} chars)\n")
+    print(f"   phrase index build {build_ms:.0f} ms\n")
+    print(f"   {'method':<16}{'us/text':>10}{'texts/s':>12}")
+    print(f"   {'substring scan':<16}{scan_s / texts * 1e6:>10.1f}{texts / scan_s:>12.0f}")
+    print(f"   {'phrase index':<16}{index_s / texts * 1e6:>10.1f}{texts / index_s:>12.0f}")
+    print(f"\n   {scan_s / index_s:.0f}x faster\n")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,74 @@
+"""
+Batch Triage Benchmark
+Generates a backlog of assessments (kiosk-like: a few thousand distinct
+symptom combinations, varied ages and self-reported severities), checks
+that TriageEngine.perform_triage_batch matches the scalar path, and times
+both.
+
+Run from the backend directory:
+   cd backend && python -m app.scripts.benchmark_triage_batch [assessments] [distinct]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import random
+import time
+from typing import Dict, List
+
+from app.core.constants import (
+    CRITICAL_SYMPTOMS, URGENT_SYMPTOMS, MODERATE_SYMPTOMS, LOW_SYMPTOMS, ROUTINE_SYMPTOMS,
+    CHRONIC_CONDITIONS
+)
+from app.services.triage_engine import TriageEngine
+
+KEYWORDS = [k for tier in (CRITICAL_SYMPTOMS, URGENT_SYMPTOMS, MODERATE_SYMPTOMS, LOW_SYMPTOMS, ROUTINE_SYMPTOMS)
+            for k in tier]
+DESCRIPTIONS = ["", "started this morning", "no chest pain", "mild cough since yesterday", "denies fever"]
+
+
+def build_backlog(assessments: int, distinct: int, seed: int = 3) -> List[Dict]:
+    rng = random.Random(seed)
+    combos = [
+        {
+            "symptoms": [k.replace(" ", "_") for k in rng.sample(KEYWORDS, rng.randint(1, 3))],
+            "description": rng.choice(DESCRIPTIONS),
+            "chronic_conditions": rng.sample(list(CHRONIC_CONDITIONS), rng.choice([0, 0, 1, 2])),
+            "duration_hours": rng.choice([0, 1, 6, 30, 96]),
+            "is_emergency": rng.random() < 0.03,
+        }
+        for _ in range(distinct)
+    ]
+    return [
+        {**rng.choice(combos), "age": rng.randint(0, 95), "self_severity": rng.randint(1, 10)}
+        for _ in range(assessments)
+    ]
+
+
+def main(assessments: int = 100_000, distinct: int = 2_000):
+    backlog = build_backlog(assessments, distinct)
+    print(f"\n⏱️  {assessments} assessments ({distinct} distinct symptom combinations)\n")
+
+    timings = []
+    for _ in range(3):
+        started = time.perf_counter()
+        results = TriageEngine.perform_triage_batch(backlog)
+        timings.append(time.perf_counter() - started)
+    batch_s = min(timings)
+
+    sample = backlog[:20_000]
+    started = time.perf_counter()
+    scalar = [TriageEngine.compute_triage(**a) for a in sample]
+    scalar_s = (time.perf_counter() - started) * len(backlog) / len(sample)
+
+    assert results[:len(sample)] == scalar, "batch and scalar triage disagree"
+    print(f"   {'method':<10}{'s':>10}{'assessments/s':>16}")
+    print(f"   {'scalar':<10}{scalar_s:>10.2f}{assessments / scalar_s:>16.0f}   (extrapolated from {len(sample)})")
+    print(f"   {'batch':<10}{batch_s:>10.2f}{assessments / batch_s:>16.0f}")
+    print(f"\n   {scalar_s / batch_s:.1f}x faster, identical results on {len(sample)} checked\n")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
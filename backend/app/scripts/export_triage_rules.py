@@ -0,0 +1,38 @@
+"""
+Export Triage Rules
+Writes the built-in triage rules (app/core/constants.py) as a versioned
+JSON rules file, the starting point for clinical teams editing the rules.
+Point TRIAGE_RULES_FILE at the file; running API processes pick up saved
+changes within TRIAGE_RULES_CHECK_SECONDS.
+
+Run from the backend directory:
+   cd backend && python -m app.scripts.export_triage_rules triage_rules.json [version]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import json
+from datetime import date
+
+from app.services.triage_rules import constant_rules, load_rules_file
+
+
+def main(path: str = "triage_rules.json", version: str = ""):
+    rules = constant_rules()
+    document = {"version": version or date.today().isoformat()}
+    for section, value in rules.items():
+        if section == "AGE_RISK_FACTORS":
+            value = [[lo, hi, factor] for (lo, hi), factor in value.items()]
+        document[section] = value
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
+
+    compiled = load_rules_file(path)  # fail here rather than in the API
+    print(f"📋 Wrote triage rules {compiled.version} to {path} "
+          f"({len(compiled.keyword_tiers)} keywords, {len(compiled.chronic_boosts)} chronic conditions)")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
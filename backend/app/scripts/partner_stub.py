@@ -0,0 +1,112 @@
+"""
+Partner Hospital Stub
+A minimal partner hospital implementing the spare doctor interface of
+app/services/partner_federation.py, for local development and benchmarks.
+
+Run from the backend directory, then point the API at it:
+   cd backend && python -m app.scripts.partner_stub --name "City Hospital" --port 9101
+   cd backend && PARTNER_HOSPITALS='["City Hospital=http://127.0.0.1:9101"]' uvicorn app.main:app
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from typing import Dict, List
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+SPECIALTIES = ["GENERAL", "GENERAL", "EMERGENCY", "PEDIATRICS", "CARDIOLOGY", "ORTHOPEDICS", "NEUROLOGY"]
+
+
+class ReservationRequest(BaseModel):
+    doctor_id: str
+    department: str
+    ttl_seconds: int = 120
+
+
+def demo_doctors(hospital: str, count: int, seed: int = 0) -> List[Dict]:
+    rng = random.Random(f"{hospital}-{seed}")
+    return [
+        {
+            "doctor_id": f"D{i:03d}",
+            "name": f"Dr. {hospital.split()[0]} {i}",
+            "specialty": rng.choice(SPECIALTIES),
+            "max_patients": 10,
+            "patients_seen": 0,
+            "supports_teleconsult": True
+        }
+        for i in range(count)
+    ]
+
+
+def create_partner_app(hospital: str, doctors: List[Dict], latency_ms: float = 0.0) -> FastAPI:
+    """A partner hospital lending `doctors`; every response is delayed by latency_ms."""
+    app = FastAPI(title=f"{hospital} (partner stub)")
+    app.state.doctors = {doc["doctor_id"]: doc for doc in doctors}
+    # reservation id -> (doctor id, expires at (monotonic) or None once confirmed)
+    reservations: Dict[str, list] = {}
+
+    def held() -> set:
+        now = time.monotonic()
+        for rid, (_, expires) in list(reservations.items()):
+            if expires is not None and expires <= now:
+                del reservations[rid]
+        return {doctor_id for doctor_id, _ in reservations.values()}
+
+    @app.middleware("http")
+    async def delay(request, call_next):
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        return await call_next(request)
+
+    @app.get("/spare-doctors")
+    async def spare_doctors():
+        taken = held()
+        return {"hospital": hospital, "doctors": [d for i, d in app.state.doctors.items() if i not in taken]}
+
+    @app.post("/reservations", status_code=201)
+    async def reserve(request: ReservationRequest):
+        if request.doctor_id not in app.state.doctors or request.doctor_id in held():
+            raise HTTPException(409, "Doctor is not available")
+        rid = uuid.uuid4().hex
+        reservations[rid] = [request.doctor_id, time.monotonic() + request.ttl_seconds]
+        return {"reservation_id": rid, "expires_in": request.ttl_seconds}
+
+    @app.post("/reservations/{rid}/confirm")
+    async def confirm(rid: str):
+        held()
+        if rid not in reservations:
+            raise HTTPException(404, "Reservation expired or unknown")
+        reservations[rid][1] = None
+        return {"reservation_id": rid, "confirmed": True}
+
+    @app.delete("/reservations/{rid}")
+    async def cancel(rid: str):
+        reservations.pop(rid, None)
+        return {"reservation_id": rid, "cancelled": True}
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Partner hospital stub")
+    parser.add_argument("--name", default="City Hospital")
+    parser.add_argument("--port", type=int, default=9101)
+    parser.add_argument("--doctors", type=int, default=25)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    app = create_partner_app(args.name, demo_doctors(args.name, args.doctors), args.latency_ms)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Shared State Owner
+Holds the queue, crowd manager, spare doctor pool, allocator, override
+system and activity log for several uvicorn workers (see
+app/services/shared_state.py).
+
+Run from the backend directory, then start the API with the same address:
+   cd backend && SHARED_STATE_ADDRESS=/tmp/smartcare-state.sock python -m app.scripts.serve_shared_state
+   cd backend && SHARED_STATE_ADDRESS=/tmp/smartcare-state.sock uvicorn app.main:app --workers 4 --port 8000
+"""
+
+import sys
+import os
+import signal
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.core.config import settings
+from app.services.priority_queue import get_priority_queue
+from app.services.queue_journal import open_queue_journal, close_queue_journal
+from app.services.periodic_jobs import start_periodic_jobs_thread
+from app.services.partner_federation import start_partner_federation
+from app.services.shared_state import serve_shared_state
+
+
+def main():
+    if not settings.SHARED_STATE_ADDRESS:
+        sys.exit("Set SHARED_STATE_ADDRESS to the Unix socket path the workers will use.")
+
+    if settings.QUEUE_JOURNAL_DIR:
+        recovery = open_queue_journal(settings.QUEUE_JOURNAL_DIR, get_priority_queue())
+        print(f"💾 Queue recovered: {recovery['entries']} patients "
+              f"({recovery['replayed']} log records replayed) in {recovery['elapsed_ms']} ms")
+
+    # Partner hospitals, re-prioritization and status refresh run here, not in every worker
+    start_partner_federation()
+    start_periodic_jobs_thread()
+
+    # Stop cleanly (final snapshot) on SIGTERM as well as Ctrl+C
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"🔗 Serving shared queue state on {settings.SHARED_STATE_ADDRESS}")
+    try:
+        serve_shared_state(settings.SHARED_STATE_ADDRESS, settings.SECRET_KEY)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_queue_journal()
+
+
+if __name__ == "__main__":
+    main()
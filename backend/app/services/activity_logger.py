@@ -11,10 +11,12 @@ Logs:
 5. System events
 """
 
-from typing import Dict, List, Optional
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from enum import Enum
 from dataclasses import dataclass
+from app.services.shared_state import get_shared_service
 
 
 class ActivityType(str, Enum):
@@ -333,6 +335,17 @@ class ActivityLogger:
         # Return most recent first
         return [l.to_dict() for l in reversed(logs[-limit:])]
     
+    def get_checkin_times(self, start: datetime, end: datetime) -> List[Tuple[datetime, str]]:
+        """(timestamp, department) of patient check-ins logged in [start, end)."""
+        # Logs are appended in time order
+        first = bisect_left(self._logs, start, key=lambda l: l.timestamp)
+        last = bisect_left(self._logs, end, lo=first, key=lambda l: l.timestamp)
+        return [
+            (l.timestamp, l.department)
+            for l in self._logs[first:last]
+            if l.activity_type == ActivityType.PATIENT_CHECKIN
+        ]
+    
     def get_stats(self) -> Dict:
         """Get activity statistics."""
         now = datetime.utcnow()
@@ -375,6 +388,9 @@ _activity_logger = None
 def get_activity_logger() -> ActivityLogger:
     """Get the global activity logger instance."""
     global _activity_logger
+    shared = get_shared_service("activity_logger")
+    if shared is not None:
+        return shared
     if _activity_logger is None:
         _activity_logger = ActivityLogger()
     return _activity_logger
@@ -10,14 +10,21 @@ Uses predictive analytics and rule-based AI to:
 4. Optimize doctor-patient matching based on specialty
 """
 
-from typing import Dict, List, Optional, Tuple
-from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
 from dataclasses import dataclass
-import statistics
+import time
 
+from app.core.constants import SPARE_DOCTOR_CONFIG
 from app.services.spare_doctor_pool import get_spare_doctor_pool, DoctorStatus
+from app.services.spare_assignment import DepartmentDemand, SpareAssignment, solve_assignments
 from app.services.crowd_manager import get_crowd_manager
 from app.services.priority_queue import get_priority_queue
+from app.services.queue_forecast import DepartmentForecaster
+from app.services.arrival_forecast import get_arrival_forecaster
+from app.services.shared_state import get_shared_service
+
+_EMPTY_SUMMARY = {"size": 0, "critical": 0, "avg_wait_minutes": 0.0}
 
 
 @dataclass
@@ -78,119 +85,119 @@ class AIDoctorAllocator:
     CRITICAL_PATIENT_THRESHOLD = 2
     HIGH_WAIT_THRESHOLD_MINUTES = 30
     
+    # Departments analyzed on every pass
+    DEPARTMENTS = ["general", "emergency", "pediatrics", "cardiology", "orthopedics", "neurology"]
+    
+    # Queue metrics are reused within a tick while the queue is unchanged
+    METRICS_TICK_SECONDS = 5
+    
+    # 30-minute forecast change (patients) that counts as a growing/shrinking queue
+    TREND_THRESHOLD = 2
+    
+    # Expected arrivals relative to the average hour that count as peak / quiet
+    PEAK_ARRIVAL_RATIO = 1.3
+    QUIET_ARRIVAL_RATIO = 0.6
+    
+    # Urgency of wait-time protection in the global assignment (AI scores are 0-1)
+    PROTECTION_WEIGHT = 2.0
+    
     def __init__(self):
-        self._queue_history: Dict[str, List[Tuple[datetime, int]]] = {}
+        self._forecasters: Dict[str, DepartmentForecaster] = {}
         self._allocation_history: List[AllocationDecision] = []
         self._last_check: Dict[str, datetime] = {}
+        self._snapshot: Optional[Tuple[Tuple[int, int], Dict[str, Tuple[Dict, str, int]]]] = None
         
-    def analyze_department(self, department: str) -> DepartmentMetrics:
-        """Gather real-time metrics for a department."""
+    def _queue_snapshot(self) -> Dict[str, Tuple[Dict, str, int]]:
+        """
+        (queue summary, trend, predicted queue in 30 min) for the standard
+        departments and any other department with waiting patients.
+        
+        Built from one aggregation pass over the queue and shared by every
+        caller within the same tick while the queue is unchanged; each new
+        pass adds one sample to the department forecasters.
+        """
         pq = get_priority_queue()
+        key = (pq.version, int(time.time() // self.METRICS_TICK_SECONDS))
+        if self._snapshot is not None and self._snapshot[0] == key:
+            return self._snapshot[1]
+        
+        summaries = pq.department_summaries()
+        departments = self.DEPARTMENTS + [d for d in summaries if d not in self.DEPARTMENTS]
+        now = time.time()
+        snapshot = {}
+        for dept in departments:
+            summary = summaries.get(dept) or _EMPTY_SUMMARY
+            forecast = self._forecaster(dept).observe(now, summary["size"])
+            trend, predicted = self._trend_and_prediction(summary["size"], forecast)
+            snapshot[dept] = (summary, trend, predicted)
+        
+        self._snapshot = (key, snapshot)
+        return snapshot
+    
+    def _department_metrics(self, department: str, queue_metrics: Tuple[Dict, str, int]) -> DepartmentMetrics:
+        """Combine queue-derived metrics with current staffing."""
         cm = get_crowd_manager()
         pool = get_spare_doctor_pool()
-        
-        # Get queue data
-        queue_list = pq.get_queue_list()
-        dept_queue = [p for p in queue_list if p.get("department", "").upper() == department.upper()]
-        
-        current_queue = len(dept_queue)
-        
-        # Count critical patients (severity 4-5)
-        critical_count = sum(
-            1 for p in dept_queue 
-            if p.get("severity", "").upper() in ["CRITICAL", "HIGH"]
-        )
+        summary, trend, predicted = queue_metrics
+        current_queue = summary["size"]
         
         # Get department status from crowd manager
         dept_status = cm.get_department_status(department)
         capacity = dept_status.capacity if dept_status else 10
-        active_doctors = dept_status.active_doctors if dept_status else 1
         
         # Calculate utilization
         utilization = min((current_queue / max(capacity, 1)) * 100, 100)
         
-        # Calculate average wait
-        if dept_queue:
-            now = datetime.utcnow()
-            waits = []
-            for p in dept_queue:
-                try:
-                    checkin = datetime.fromisoformat(p.get("check_in_time", "").replace("Z", ""))
-                    waits.append((now - checkin).total_seconds() / 60)
-                except:
-                    waits.append(0)
-            avg_wait = statistics.mean(waits) if waits else 0
-        else:
-            avg_wait = 0
-        
-        # Get assigned spare doctors
-        spare_assigned = len(pool.get_assigned_doctors(department))
-        
-        # Calculate trend
-        trend = self._calculate_trend(department, current_queue)
-        
-        # Predict queue in 30 minutes
-        predicted = self._predict_queue(department, current_queue, trend)
-        
-        # Store history
-        if department not in self._queue_history:
-            self._queue_history[department] = []
-        self._queue_history[department].append((datetime.utcnow(), current_queue))
-        # Keep only last 30 minutes of history
-        cutoff = datetime.utcnow() - timedelta(minutes=30)
-        self._queue_history[department] = [
-            (t, q) for t, q in self._queue_history[department] if t > cutoff
-        ]
-        
         return DepartmentMetrics(
             department=department,
             current_queue=current_queue,
             capacity=capacity,
             utilization=utilization,
-            avg_wait_minutes=avg_wait,
-            critical_patients=critical_count,
-            spare_doctors_assigned=spare_assigned,
+            avg_wait_minutes=summary["avg_wait_minutes"],
+            critical_patients=summary["critical"],
+            spare_doctors_assigned=pool.count_assigned(department),
             trend=trend,
             predicted_queue_30min=predicted
         )
     
-    def _calculate_trend(self, department: str, current: int) -> str:
-        """Calculate queue trend based on history."""
-        history = self._queue_history.get(department, [])
-        
-        if len(history) < 3:
-            return "stable"
-        
-        # Get last 5 readings
-        recent = [q for _, q in history[-5:]]
-        
-        if len(recent) < 2:
-            return "stable"
-        
-        # Calculate slope
-        diffs = [recent[i+1] - recent[i] for i in range(len(recent)-1)]
-        avg_diff = statistics.mean(diffs)
-        
-        if avg_diff > 0.5:
-            return "increasing"
-        elif avg_diff < -0.5:
-            return "decreasing"
-        return "stable"
+    def analyze_all_departments(self) -> Dict[str, DepartmentMetrics]:
+        """Real-time metrics for every department from a single queue pass."""
+        return {
+            dept: self._department_metrics(dept, queue_metrics)
+            for dept, queue_metrics in self._queue_snapshot().items()
+        }
+    
+    def analyze_department(self, department: str) -> DepartmentMetrics:
+        """Gather real-time metrics for a department."""
+        queue_metrics = self._queue_snapshot().get(department.lower())
+        if queue_metrics is None:
+            # Department without patients outside the standard set
+            queue_metrics = (_EMPTY_SUMMARY, "stable", 0)
+        return self._department_metrics(department, queue_metrics)
     
-    def _predict_queue(self, department: str, current: int, trend: str) -> int:
-        """Predict queue size in 30 minutes using simple linear regression."""
-        history = self._queue_history.get(department, [])
-        
-        if len(history) < 2:
-            return current
-        
-        # Use trend to estimate
-        if trend == "increasing":
-            # Assume 1-2 patients every 10 minutes
-            return current + 4
-        elif trend == "decreasing":
-            return max(0, current - 3)
-        return current
+    def _forecaster(self, department: str) -> DepartmentForecaster:
+        forecaster = self._forecasters.get(department)
+        if forecaster is None:
+            forecaster = self._forecasters[department] = DepartmentForecaster()
+        return forecaster
+    
+    def _trend_and_prediction(self, current: int, forecast: Dict[int, float]) -> Tuple[str, int]:
+        """Trend label and predicted queue in 30 minutes from the regression forecast."""
+        predicted = round(forecast[30])
+        if predicted - current > self.TREND_THRESHOLD:
+            return "increasing", predicted
+        if predicted - current < -self.TREND_THRESHOLD:
+            return "decreasing", predicted
+        return "stable", predicted
+    
+    def record_arrivals(self, department: str, count: int = 1) -> None:
+        """Count check-ins for a department's arrival-rate forecast."""
+        self._forecaster(department.lower()).record_arrivals(count)
+    
+    def get_forecasts(self) -> Dict[str, Dict]:
+        """Queue length and arrival forecasts with their error metrics, per department."""
+        self._queue_snapshot()
+        return {dept: forecaster.summary() for dept, forecaster in self._forecasters.items()}
     
     def calculate_assignment_score(self, metrics: DepartmentMetrics) -> Tuple[float, List[str]]:
         """
@@ -243,15 +250,28 @@ class AIDoctorAllocator:
         score += wait_score * self.WEIGHTS["wait_time"]
         
         # Factor 5: Time of Day (0-1)
-        hour = datetime.utcnow().hour
-        # Peak hours: 9-12, 16-19
-        if 9 <= hour <= 12 or 16 <= hour <= 19:
-            time_score = 0.8
-            factors.append("Peak hours - higher demand expected")
-        elif 6 <= hour <= 22:
-            time_score = 0.5
+        forecaster = get_arrival_forecaster()
+        peak_ratio = forecaster.peak_ratio(metrics.department)
+        if peak_ratio is not None:
+            # Learned hour-of-week arrival profile of this department
+            if peak_ratio >= self.PEAK_ARRIVAL_RATIO:
+                time_score = 0.8
+                expected = forecaster.expected_arrivals(metrics.department)
+                factors.append(f"Arrival peak - ~{expected:.0f} check-ins expected this hour")
+            elif peak_ratio >= self.QUIET_ARRIVAL_RATIO:
+                time_score = 0.5
+            else:
+                time_score = 0.2
         else:
-            time_score = 0.2
+            # Not enough history yet: assume typical peak hours (9-12, 16-19)
+            hour = datetime.utcnow().hour
+            if 9 <= hour <= 12 or 16 <= hour <= 19:
+                time_score = 0.8
+                factors.append("Peak hours - higher demand expected")
+            elif 6 <= hour <= 22:
+                time_score = 0.5
+            else:
+                time_score = 0.2
         score += time_score * self.WEIGHTS["time_factor"]
         
         # Bonus: Predicted surge
@@ -261,23 +281,25 @@ class AIDoctorAllocator:
         
         return min(score, 1.0), factors
     
-    def make_allocation_decision(self, department: str) -> AllocationDecision:
+    def make_allocation_decision(
+        self,
+        department: str,
+        metrics: Optional[DepartmentMetrics] = None
+    ) -> AllocationDecision:
         """
         AI decision engine for doctor allocation.
         
         Returns recommendation with confidence and explanation.
         """
         pool = get_spare_doctor_pool()
-        metrics = self.analyze_department(department)
+        if metrics is None:
+            metrics = self.analyze_department(department)
         
         # Calculate assignment score
         score, factors = self.calculate_assignment_score(metrics)
         
         # Check for release condition first
-        if (metrics.utilization < self.RELEASE_UTILIZATION_THRESHOLD * 100 and 
-            metrics.critical_patients == 0 and
-            metrics.spare_doctors_assigned > 0):
-            
+        if self._should_release(metrics):
             assigned = pool.get_assigned_doctors(department)
             if assigned:
                 return AllocationDecision(
@@ -295,15 +317,10 @@ class AIDoctorAllocator:
         if (score >= self.ASSIGN_CONFIDENCE_THRESHOLD and 
             metrics.spare_doctors_assigned < max_spare):
             
-            # Find best matching doctor
-            available = pool.get_available_doctors(department)
-            if not available:
-                available = pool.get_available_doctors("GENERAL")
+            # Find best matching doctor: most remaining capacity, specialist first
+            best_doctor = pool.get_most_available_doctor(department) or pool.get_most_available_doctor("GENERAL")
             
-            if available:
-                # Pick doctor with most remaining capacity
-                best_doctor = max(available, key=lambda d: d.max_patients - d.patients_seen)
-                
+            if best_doctor is not None:
                 return AllocationDecision(
                     action="assign",
                     department=department,
@@ -334,17 +351,111 @@ class AIDoctorAllocator:
             factors=factors if factors else ["All metrics within normal range"]
         )
     
+    def _should_release(self, metrics: DepartmentMetrics) -> bool:
+        return (metrics.utilization < self.RELEASE_UTILIZATION_THRESHOLD * 100 and
+                metrics.critical_patients == 0 and
+                metrics.spare_doctors_assigned > 0)
+    
+    def plan_spare_assignments(self, protect: Iterable[str] = ()) -> List[SpareAssignment]:
+        """
+        One global assignment of the available spare doctors (see spare_assignment.py).
+        
+        Every department whose AI score clears the assignment threshold asks
+        for one doctor; departments in `protect` also ask for their wait-time
+        protection shortfall, at PROTECTION_WEIGHT urgency. Nothing is executed.
+        """
+        cm = get_crowd_manager()
+        pool = get_spare_doctor_pool()
+        all_metrics = self.analyze_all_departments()
+        protect = {dept.lower() for dept in protect}
+        max_spare = SPARE_DOCTOR_CONFIG["max_spare_doctors_per_dept"]
+        
+        demands = []
+        for dept in self.DEPARTMENTS + sorted(protect - set(self.DEPARTMENTS)):
+            metrics = all_metrics.get(dept) or self.analyze_department(dept)
+            room = max_spare - metrics.spare_doctors_assigned
+            if room <= 0 or self._should_release(metrics):
+                continue
+            
+            score, _ = self.calculate_assignment_score(metrics)
+            slots = 1 if score >= self.ASSIGN_CONFIDENCE_THRESHOLD else 0
+            weight, reason = score, "High load detected - recommending spare doctor assignment"
+            if dept in protect:
+                impact = self.calculate_wait_time_impact(dept)
+                shortfall = impact["extra_doctors_needed"] - impact["spare_doctors_assigned"]
+                if shortfall > 0:
+                    slots += shortfall
+                    weight = self.PROTECTION_WEIGHT
+                    reason = f"Wait Time Protection: {impact['critical_patients']} critical patients in queue"
+            if slots == 0:
+                continue
+            
+            dept_status = cm.get_department_status(dept)
+            active_doctors = dept_status.active_doctors if dept_status else 1
+            demands.append(DepartmentDemand(
+                department=dept,
+                slots=min(slots, room),
+                queue=metrics.current_queue,
+                doctors=active_doctors + metrics.spare_doctors_assigned,
+                weight=weight,
+                reason=reason
+            ))
+        
+        return solve_assignments(demands, pool.get_available_doctors(), max_spare)
+    
     def auto_allocate_all_departments(self) -> List[Dict]:
         """
         Run AI allocation check for all departments.
         Executes assignments automatically.
+        
+        Releases are decided per department; spare doctors are then assigned
+        from one global plan, so a specialist goes to the department where
+        they cut waiting the most rather than the first one to ask.
         """
-        departments = ["general", "emergency", "pediatrics", "cardiology", "orthopedics", "neurology"]
         results = []
         pool = get_spare_doctor_pool()
+        all_metrics = self.analyze_all_departments()
+        decisions = {dept: self.make_allocation_decision(dept, all_metrics[dept]) for dept in self.DEPARTMENTS}
+        
+        # Release first so released doctors can be planned again
+        releases = {}
+        for dept, decision in decisions.items():
+            if decision.action == "release" and decision.doctor_id:
+                releases[dept] = pool.release_doctor(
+                    decision.doctor_id,
+                    f"AI Auto-Release: {decision.reason}",
+                    "ai_system"
+                )
         
-        for dept in departments:
-            decision = self.make_allocation_decision(dept)
+        planned = {}
+        for assignment in self.plan_spare_assignments():
+            planned.setdefault(assignment.department, assignment)
+        
+        # Partner doctors in the plan are reserved together, in one round trip;
+        # the state lock is released meanwhile, so assign_doctor re-checks each one
+        pool.reserve_doctors([
+            (planned[dept].doctor.doctor_id, dept)
+            for dept, decision in decisions.items()
+            if decision.action == "assign" and dept in planned
+        ])
+        
+        for dept in self.DEPARTMENTS:
+            decision = decisions[dept]
+            if decision.action == "assign":
+                assignment = planned.get(dept)
+                if assignment is not None:
+                    decision.doctor_id = assignment.doctor.doctor_id
+                    decision.doctor_name = assignment.doctor.name
+                else:
+                    decision = AllocationDecision(
+                        action="none",
+                        department=dept,
+                        doctor_id=None,
+                        doctor_name=None,
+                        confidence=decision.confidence,
+                        reason="Spare doctors are needed more in other departments",
+                        factors=decision.factors
+                    )
             
             result = {
                 "department": dept,
@@ -368,11 +479,7 @@ class AIDoctorAllocator:
                     result["doctor_assigned"] = decision.doctor_name
                     
             elif decision.action == "release" and decision.doctor_id:
-                release = pool.release_doctor(
-                    decision.doctor_id,
-                    f"AI Auto-Release: {decision.reason}",
-                    "ai_system"
-                )
+                release = releases.get(dept)
                 if release and release.get("success"):
                     result["executed"] = True
                     result["doctor_released"] = decision.doctor_name
@@ -386,15 +493,15 @@ class AIDoctorAllocator:
         """Get AI system insights and statistics."""
         pool = get_spare_doctor_pool()
         
-        total_available = len(pool.get_available_doctors())
-        total_assigned = len(pool.get_assigned_doctors())
+        total_available = pool.count_available()
+        total_assigned = pool.count_assigned()
         
         # Analyze all departments
-        departments = ["general", "emergency", "pediatrics", "cardiology", "orthopedics", "neurology"]
+        all_metrics = self.analyze_all_departments()
         dept_analysis = []
         
-        for dept in departments:
-            metrics = self.analyze_department(dept)
+        for dept in self.DEPARTMENTS:
+            metrics = all_metrics[dept]
             score, factors = self.calculate_assignment_score(metrics)
             
             dept_analysis.append({
@@ -404,6 +511,7 @@ class AIDoctorAllocator:
                 "critical_patients": metrics.critical_patients,
                 "trend": metrics.trend,
                 "predicted_30min": metrics.predicted_queue_30min,
+                "forecast": self._forecasters[dept].summary()["forecast"],
                 "spare_doctors": metrics.spare_doctors_assigned,
                 "ai_score": round(score, 2),
                 "needs_attention": score >= self.ASSIGN_CONFIDENCE_THRESHOLD
@@ -459,25 +567,19 @@ class AIDoctorAllocator:
         - Need extra doctors = K * avg_time / original_wait
         - Or: extra_doctors_needed = ceil(K / current_doctors)
         """
-        pq = get_priority_queue()
         cm = get_crowd_manager()
         pool = get_spare_doctor_pool()
         
-        queue_list = pq.get_queue_list()
-        dept_queue = [p for p in queue_list if p.get("department", "").upper() == department.upper()]
-        
         # Separate critical and non-critical patients
-        critical_patients = [p for p in dept_queue if p.get("severity", "").upper() in ["CRITICAL", "HIGH"]]
-        regular_patients = [p for p in dept_queue if p.get("severity", "").upper() not in ["CRITICAL", "HIGH"]]
-        
-        num_critical = len(critical_patients)
-        num_regular = len(regular_patients)
-        total_queue = len(dept_queue)
+        metrics = self.analyze_department(department)
+        num_critical = metrics.critical_patients
+        total_queue = metrics.current_queue
+        num_regular = total_queue - num_critical
         
         # Get current doctor count
         dept_status = cm.get_department_status(department)
         active_doctors = dept_status.active_doctors if dept_status else 1
-        spare_assigned = len(pool.get_assigned_doctors(department))
+        spare_assigned = pool.count_assigned(department)
         total_doctors = active_doctors + spare_assigned
         
         # Average time per patient (minutes)
@@ -527,7 +629,7 @@ class AIDoctorAllocator:
             extra_doctors_needed = 0
         
         # Check if we can protect wait times
-        available_spare = len(pool.get_available_doctors(department)) + len(pool.get_available_doctors("GENERAL"))
+        available_spare = pool.count_available(department) + pool.count_available("GENERAL")
         can_protect = available_spare >= extra_doctors_needed
         
         return {
@@ -602,18 +704,17 @@ class AIDoctorAllocator:
             result["message"] = "Sufficient doctors already assigned"
             return result
         
-        # Try to assign doctors
+        # Plan against every department's needs, so protection takes a
+        # general doctor rather than a specialist another department lacks
+        plan = [
+            a for a in self.plan_spare_assignments(protect=[department])
+            if a.department == department.lower()
+        ][:doctors_to_assign]
+        pool.reserve_doctors([(planned.doctor.doctor_id, department) for planned in plan])
+        
         assigned_count = 0
-        for _ in range(doctors_to_assign):
-            # Try specialty match first, then general
-            available = pool.get_available_doctors(department)
-            if not available:
-                available = pool.get_available_doctors("GENERAL")
-            
-            if not available:
-                break
-            
-            doctor = available[0]
+        for planned in plan:
+            doctor = planned.doctor
             assignment = pool.assign_doctor(
                 doctor.doctor_id,
                 department,
@@ -664,7 +765,7 @@ class AIDoctorAllocator:
         
         This should be called whenever critical patients are added to the queue.
         """
-        departments = ["general", "emergency", "pediatrics", "cardiology", "orthopedics", "neurology"]
+        departments = self.DEPARTMENTS
         results = {
             "timestamp": datetime.utcnow().isoformat(),
             "departments_checked": len(departments),
@@ -691,6 +792,9 @@ _ai_allocator = None
 def get_ai_allocator() -> AIDoctorAllocator:
     """Get the global AI allocator instance."""
     global _ai_allocator
+    shared = get_shared_service("ai_allocator")
+    if shared is not None:
+        return shared
     if _ai_allocator is None:
         _ai_allocator = AIDoctorAllocator()
     return _ai_allocator
@@ -0,0 +1,212 @@
+"""
+SmartCare Allocation Worker
+============================
+Runs AI doctor allocation in the background instead of on the check-in
+request path.
+
+How it works:
+1. Endpoints that change the queue call `schedule_allocation(departments,
+   critical)`; this only records the departments and wakes the worker.
+2. The worker waits until events stop arriving for `debounce_ms`, but never
+   longer than `max_staleness_ms` after the first pending event, then runs
+   one round for everything that accumulated: wait-time protection for
+   departments that received critical/high patients, followed by a single
+   `auto_allocate_all_departments()`. The round holds STATE_LOCK. A round
+   that raises is logged (traceback to the server log, a system event to the
+   activity log) and its error kept in the round summary.
+3. Tests (or callers that need the outcome) can `flush()` to run pending
+   events now, or `wait_for_round()` / `await next_round()` to block until
+   the next round ends.
+
+Without a running worker (scripts, tests without the app lifespan)
+`schedule_allocation` runs the round inline, as check-in used to.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set
+
+from app.core.config import settings
+from app.services.activity_logger import get_activity_logger
+from app.services.ai_doctor_allocator import get_ai_allocator
+from app.services.state_lock import STATE_LOCK
+
+logger = logging.getLogger(__name__)
+
+
+def run_allocation_round(departments: Set[str], critical: Set[str]) -> Dict:
+    """Protect wait times for `critical` departments, then auto-allocate once."""
+    allocator = get_ai_allocator()
+    protection = {department: allocator.protect_wait_times(department) for department in sorted(critical)}
+    results = allocator.auto_allocate_all_departments()
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "departments": sorted(departments),
+        "wait_time_protection": protection,
+        "ai_actions_taken": len([r for r in results if r.get("executed")])
+    }
+
+
+class AllocationWorker:
+    """Background thread coalescing queue-change events into allocation rounds."""
+
+    def __init__(self, debounce_ms: int = 100, max_staleness_ms: int = 1000):
+        self.debounce = debounce_ms / 1000
+        self.max_staleness = max(max_staleness_ms, debounce_ms) / 1000
+
+        self._departments: Set[str] = set()
+        self._critical: Set[str] = set()
+        self._first_event: Optional[float] = None  # monotonic time of oldest pending event
+        self._last_event = 0.0
+        self._flush = False
+        self._rounds = 0
+        self._last_round: Optional[Dict] = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def rounds(self) -> int:
+        return self._rounds
+
+    @property
+    def last_round(self) -> Optional[Dict]:
+        return self._last_round
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="allocation-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Run what is still pending, then stop the thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def notify(self, departments: Iterable[str], critical: Iterable[str] = ()) -> None:
+        """Record queue changes in `departments` (critical: received a critical/high patient)."""
+        now = time.monotonic()
+        with self._cond:
+            self._departments.update(departments)
+            self._critical.update(critical)
+            if self._first_event is None:
+                self._first_event = now
+            self._last_event = now
+            self._cond.notify_all()
+
+    def wait_for_round(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Block until the next round finishes; its summary, or None on timeout."""
+        with self._cond:
+            target = self._rounds + 1
+            self._cond.wait_for(lambda: self._rounds >= target or self._stopped, timeout)
+            return self._last_round if self._rounds >= target else None
+
+    async def next_round(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Async form of wait_for_round() (does not block the event loop)."""
+        return await asyncio.to_thread(self.wait_for_round, timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Run pending events now (skipping the debounce) and wait for that round."""
+        with self._cond:
+            if self._first_event is None:
+                return self._last_round
+            self._flush = True
+            self._cond.notify_all()
+        return self.wait_for_round(timeout)
+
+    def _due_in(self) -> Optional[float]:
+        """Seconds until the pending events should run (None: nothing pending)."""
+        if self._first_event is None:
+            return None
+        if self._flush or self._closed:
+            return 0.0
+        quiet = self._last_event + self.debounce
+        stale = self._first_event + self.max_staleness
+        return min(quiet, stale) - time.monotonic()
+
+    @staticmethod
+    def _report(summary: Dict, exc: Exception) -> None:
+        """Log a failed round: traceback to the server log, summary to the activity log."""
+        logger.exception("Allocation round for %s failed", ", ".join(summary["departments"]))
+        with STATE_LOCK:
+            get_activity_logger().log_system_event(
+                title="AI allocation round failed",
+                description=f"{type(exc).__name__}: {exc}",
+                details={"departments": summary["departments"]}
+            )
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    due = self._due_in()
+                    if due is None and self._closed:
+                        self._stopped = True
+                        self._cond.notify_all()
+                        return
+                    if due is not None and due <= 0:
+                        break
+                    self._cond.wait(due)
+                departments, critical = self._departments, self._critical
+                self._departments, self._critical = set(), set()
+                self._first_event, self._flush = None, False
+
+            try:
+                with STATE_LOCK:
+                    summary = run_allocation_round(departments, critical)
+            except Exception as exc:  # keep the worker alive; next event retries
+                summary = {"timestamp": datetime.utcnow().isoformat(), "departments": sorted(departments), "error": str(exc)}
+                self._report(summary, exc)
+
+            with self._cond:
+                self._rounds += 1
+                self._last_round = summary
+                self._cond.notify_all()
+
+
+# Worker for this process (started from the app lifespan)
+_worker: Optional[AllocationWorker] = None
+
+
+def start_allocation_worker() -> AllocationWorker:
+    """Start the background allocation worker for this process."""
+    global _worker
+    if _worker is None:
+        _worker = AllocationWorker(
+            debounce_ms=settings.ALLOCATION_DEBOUNCE_MS,
+            max_staleness_ms=settings.ALLOCATION_MAX_STALENESS_MS
+        )
+        _worker.start()
+    return _worker
+
+
+def stop_allocation_worker() -> None:
+    """Run pending allocation and stop the worker."""
+    global _worker
+    if _worker is not None:
+        _worker.stop()
+        _worker = None
+
+
+def get_allocation_worker() -> Optional[AllocationWorker]:
+    """The running worker, or None when allocation runs inline."""
+    return _worker
+
+
+def schedule_allocation(departments: Iterable[str], critical: Iterable[str] = ()) -> Optional[Dict]:
+    """
+    Ask for an allocation round after queue changes in `departments`.
+
+    Returns None when the worker will pick it up, or the round summary when
+    there is no worker and the round ran inline.
+    """
+    if _worker is not None:
+        _worker.notify(departments, critical)
+        return None
+    return run_allocation_round(set(departments), set(critical))
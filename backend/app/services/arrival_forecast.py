@@ -0,0 +1,251 @@
+"""
+SmartCare Arrival Forecasting
+==============================
+Hour-of-week arrival profiles per department, learned from past
+check-ins, so staffing decisions can anticipate the weekly rhythm instead
+of assuming fixed peak hours.
+
+Model (per department, hourly check-in counts):
+- Additive Holt-Winters with a 168-hour (weekly) season and damped trend:
+    level    = α(y - S[h]) + (1 - α)(level + φ·trend)
+    trend    = β(level - level_prev) + (1 - β)φ·trend
+    S[h]     = γ(y - level) + (1 - γ)S[h]
+    forecast = level + (φ + … + φ^k)·trend + S[h + k]
+- A department's first fit reads at most HISTORY_WEEKS of history
+  (starting at its first check-in) and seeds the season from the average
+  week. After that, refits are incremental: only
+  hours completed since the last fit are read and folded in, so training
+  cost does not grow with total history.
+
+Data sources:
+- `queue_entries` table (legacy queue check-ins; department is the
+  assigned doctor's specialty, "general" without one)
+- activity log check-ins (smart queue)
+
+Refit runs as a periodic background job (see periodic_jobs.py). After each
+refit the next week's expected arrivals are cached per department, so
+`expected_arrivals()` is a lookup.
+"""
+
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.shared_state import get_shared_service
+
+SEASON_HOURS = 168
+_EPOCH = datetime(1970, 1, 5)  # a Monday, so hour % 168 == 0 is Monday 00:00 UTC
+
+
+def hour_index(when: datetime) -> int:
+    """Whole hours since _EPOCH (UTC)."""
+    if when.tzinfo is not None:
+        when = (when - when.utcoffset()).replace(tzinfo=None)
+    return int((when - _EPOCH).total_seconds() // 3600)
+
+
+def hour_start(index: int) -> datetime:
+    return _EPOCH + timedelta(hours=index)
+
+
+class SeasonalProfile:
+    """Damped-trend additive Holt-Winters on one department's hourly counts."""
+
+    def __init__(self, alpha: float = 0.1, beta: float = 0.01, gamma: float = 0.2, phi: float = 0.9):
+        self.alpha, self.beta, self.gamma, self.phi = alpha, beta, gamma, phi
+        self.level = 0.0
+        self.trend = 0.0
+        self.seasonal = np.zeros(SEASON_HOURS)
+        self.next_hour: Optional[int] = None  # first hour not yet folded in
+        self.hours_fitted = 0
+
+    def initialize(self, start_hour: int, counts: np.ndarray) -> None:
+        """Seed level and season from the average week of `counts` (hourly, from start_hour)."""
+        weeks = np.zeros(SEASON_HOURS)
+        seen = np.zeros(SEASON_HOURS)
+        np.add.at(weeks, (start_hour + np.arange(len(counts))) % SEASON_HOURS, counts)
+        np.add.at(seen, (start_hour + np.arange(len(counts))) % SEASON_HOURS, 1)
+        profile = np.divide(weeks, seen, out=np.zeros(SEASON_HOURS), where=seen > 0)
+        self.level = float(counts.mean()) if len(counts) else 0.0
+        self.seasonal = np.where(seen > 0, profile - self.level, 0.0)
+        self.trend = 0.0
+        self.next_hour = start_hour
+        self.update(counts)
+
+    def update(self, counts: np.ndarray) -> None:
+        """Fold in consecutive hourly counts starting at next_hour."""
+        alpha, beta, gamma, phi = self.alpha, self.beta, self.gamma, self.phi
+        level, trend, seasonal = self.level, self.trend, self.seasonal
+        h = self.next_hour
+        for y in counts.tolist():
+            s = h % SEASON_HOURS
+            previous = level
+            level = alpha * (y - seasonal[s]) + (1 - alpha) * (level + phi * trend)
+            trend = beta * (level - previous) + (1 - beta) * phi * trend
+            seasonal[s] = gamma * (y - level) + (1 - gamma) * seasonal[s]
+            h += 1
+        self.level, self.trend = level, trend
+        self.next_hour = h
+        self.hours_fitted += len(counts)
+
+    def forecast(self, hours: int = SEASON_HOURS) -> np.ndarray:
+        """Expected arrivals for each of the next `hours` hours (from next_hour)."""
+        steps = np.arange(1, hours + 1)
+        damping = np.cumsum(self.phi ** steps)
+        season = self.seasonal[(self.next_hour + steps - 1) % SEASON_HOURS]
+        return np.maximum(0.0, self.level + damping * self.trend + season)
+
+
+class ArrivalForecaster:
+    """Per-department SeasonalProfiles with incremental refits and a cached outlook."""
+
+    HISTORY_WEEKS = 8
+    MIN_HOURS = SEASON_HOURS  # a full week before forecasts are trusted
+
+    def __init__(self):
+        self._profiles: Dict[str, SeasonalProfile] = {}
+        self._outlook: Dict[str, Tuple[int, np.ndarray]] = {}  # dept -> (first hour, next week)
+        self._fitted_until: Optional[int] = None  # hours before this are folded in
+        self._last_refit: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------------------------------
+    # Fitting
+    # -------------------------------------------------------------------------
+
+    def refit(
+        self,
+        sources: Iterable[Callable[[datetime, datetime], List[Tuple[datetime, str]]]] = None,
+        now: datetime = None
+    ) -> Dict:
+        """
+        Fold in every hour completed since the last refit.
+
+        `sources` return (check-in time, department) pairs within [start, end)
+        (default: the queue_entries table and the activity log).
+        """
+        sources = sources or (database_checkins, activity_checkins)
+        now = now or datetime.utcnow()
+        until = hour_index(now)  # current hour is still filling up
+        with self._lock:
+            since = self._fitted_until
+            if since is None:
+                since = until - self.HISTORY_WEEKS * SEASON_HOURS
+            if since >= until:
+                return {"hours": 0, "departments": len(self._profiles)}
+
+            counts: Dict[str, np.ndarray] = {}
+            start, end = hour_start(since), hour_start(until)
+            for source in sources:
+                for when, department in source(start, end):
+                    h = hour_index(when)
+                    if since <= h < until:
+                        department = (department or "general").lower()
+                        if department not in counts:
+                            counts[department] = np.zeros(until - since)
+                        counts[department][h - since] += 1
+
+            for department in set(counts) | set(self._profiles):
+                series = counts.get(department, np.zeros(until - since))
+                profile = self._profiles.get(department)
+                if profile is None:
+                    # A department's history starts with its first check-in
+                    first = int(np.flatnonzero(series)[0])
+                    profile = self._profiles[department] = SeasonalProfile()
+                    profile.initialize(since + first, series[first:])
+                else:
+                    profile.update(series)
+                self._outlook[department] = (until, profile.forecast())
+
+            self._fitted_until = until
+            self._last_refit = now
+            return {"hours": until - since, "departments": len(self._profiles)}
+
+    # -------------------------------------------------------------------------
+    # Forecasts
+    # -------------------------------------------------------------------------
+
+    def expected_arrivals(self, department: str, at: datetime = None, hours: int = 1) -> Optional[float]:
+        """
+        Expected check-ins in the `hours` hours starting with the hour of `at`
+        (default: now). None until the department has a week of history.
+        """
+        department = department.lower()
+        profile = self._profiles.get(department)
+        if profile is None or profile.hours_fitted < self.MIN_HOURS:
+            return None
+        first, outlook = self._outlook[department]
+        offset = hour_index(at or datetime.utcnow()) - first
+        if offset < 0 or offset + hours > len(outlook):
+            return None
+        return float(outlook[offset:offset + hours].sum())
+
+    def peak_ratio(self, department: str, at: datetime = None) -> Optional[float]:
+        """Expected arrivals this hour relative to the department's average hour."""
+        expected = self.expected_arrivals(department, at)
+        if expected is None:
+            return None
+        first, outlook = self._outlook[department.lower()]
+        average = float(outlook.mean())
+        return expected / average if average > 0 else None
+
+    def get_profiles(self) -> Dict:
+        """Fitted state and next-week outlook per department."""
+        return {
+            "last_refit": self._last_refit.isoformat() if self._last_refit else None,
+            "departments": {
+                department: {
+                    "hours_fitted": profile.hours_fitted,
+                    "ready": profile.hours_fitted >= self.MIN_HOURS,
+                    "level_per_hour": round(profile.level, 2),
+                    "next_24h": [round(v, 2) for v in self._outlook[department][1][:24].tolist()],
+                    "outlook_start": hour_start(self._outlook[department][0]).isoformat()
+                }
+                for department, profile in self._profiles.items()
+            }
+        }
+
+
+# =============================================================================
+# DATA SOURCES
+# =============================================================================
+
+def database_checkins(start: datetime, end: datetime) -> List[Tuple[datetime, str]]:
+    """Check-ins recorded in the queue_entries table."""
+    from app.db.session import SessionLocal
+    from app.models.queue import QueueEntry
+    from app.models.doctor import Doctor
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(QueueEntry.check_in_time, Doctor.specialty)
+            .outerjoin(Doctor, QueueEntry.doctor_id == Doctor.id)
+            .filter(QueueEntry.check_in_time >= start, QueueEntry.check_in_time < end)
+            .all()
+        )
+        return [(when, specialty or "general") for when, specialty in rows if when is not None]
+    finally:
+        db.close()
+
+
+def activity_checkins(start: datetime, end: datetime) -> List[Tuple[datetime, str]]:
+    """Smart queue check-ins from the activity log."""
+    from app.services.activity_logger import get_activity_logger
+    return get_activity_logger().get_checkin_times(start, end)
+
+
+# Singleton
+_arrival_forecaster = None
+
+def get_arrival_forecaster() -> ArrivalForecaster:
+    """Get the global arrival forecaster instance."""
+    global _arrival_forecaster
+    shared = get_shared_service("arrival_forecaster")
+    if shared is not None:
+        return shared
+    if _arrival_forecaster is None:
+        _arrival_forecaster = ArrivalForecaster()
+    return _arrival_forecaster
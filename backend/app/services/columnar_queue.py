@@ -0,0 +1,500 @@
+"""
+SmartCare Columnar Priority Queue
+==================================
+Struct-of-arrays backend for SmartPriorityQueue, for mass-screening days
+with tens of thousands of simultaneous check-ins.
+
+Per-patient fields live in preallocated NumPy columns indexed by slot, and
+freed slots are recycled through a free-list. Apart from the
+entry_id -> slot map there are no per-entry Python objects; QueueItems are
+materialized only when a caller asks for one.
+
+Trade-offs vs the indexed heap:
+- push / remove / update:  O(1) amortized
+- peek / rank:             O(n), vectorized
+- sorted list / entry_at:  O(n log n), vectorized, memoized per version + aging tick
+                           (and until the order changes)
+- get_stats:               O(1), running counters
+- rescore:                 O(n), vectorized
+
+Ordering is identical to SmartPriorityQueue (same exact integer keys).
+Enable with QUEUE_BACKEND=columnar.
+"""
+
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.constants import PRIORITY_WEIGHTS
+from app.services.priority_queue import (
+    SmartPriorityQueue, QueueItem, QueueCounters, severity_bucket,
+    AGING_EPOCH, _SCORE_UNITS, _MICROSECOND
+)
+
+
+def score_units(
+    triage: np.ndarray,
+    age_factor: np.ndarray,
+    chronic_factor: np.ndarray,
+    is_emergency: np.ndarray
+) -> np.ndarray:
+    """
+    Vectorized SmartPriorityQueue.calculate_priority_score at zero wait,
+    in 1e-4 score units.
+    """
+    age = np.round(age_factor.astype(np.float64), 6)
+    chronic = np.round(chronic_factor.astype(np.float64), 6)
+    score = (
+        (triage / 5.0) * PRIORITY_WEIGHTS["severity"] +
+        np.minimum(age / 1.5, 1.0) * PRIORITY_WEIGHTS["age_factor"] +
+        np.minimum(chronic, 1.0) * PRIORITY_WEIGHTS["chronic_factor"] +
+        is_emergency * (PRIORITY_WEIGHTS["emergency_flag"] + 10.0)  # weight + top-of-queue boost
+    )
+    return np.rint(score * _SCORE_UNITS).astype(np.int32)
+
+
+class ColumnarPriorityQueue(SmartPriorityQueue):
+    """
+    SmartPriorityQueue with entries stored column-wise in NumPy arrays.
+
+    Same public API as SmartPriorityQueue; patient display info is still
+    kept per entry in _patient_info.
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    # (attribute, dtype) of every per-slot column
+    _COLUMNS = (
+        ("_base", np.int32),       # score at zero wait, 1e-4 units
+        ("_checkin", np.int64),    # check-in time, µs since AGING_EPOCH
+        ("_triage", np.int8),
+        ("_emergency", np.bool_),
+        ("_age", np.float32),
+        ("_chronic", np.float32),
+        ("_dept", np.int16),       # index into _dept_names
+        ("_patient", np.int64),
+        ("_entry", np.int64),
+        ("_alive", np.bool_),
+    )
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        super().__init__()
+        self._capacity = 0
+        for name, dtype in self._COLUMNS:
+            setattr(self, name, np.zeros(0, dtype=dtype))
+        self._grow(capacity)
+
+        self._slots: Dict[int, int] = {}  # entry_id -> slot
+        self._free: List[int] = []        # released slots, reused before growing
+        self._high_water = 0              # slots [0, high_water) have been handed out
+
+        self._dept_codes: Dict[str, int] = {}
+        self._dept_names: List[str] = []
+        self._dept_sizes: List[int] = []
+        self._dept_versions: List[int] = []
+
+        # Sorted slot order and the time it stops holding (µs, None = never),
+        # memoized like the base class snapshots
+        self._orders: Dict[Optional[str], Tuple[Tuple[int, int], Optional[int], np.ndarray]] = {}
+        self._last_advance_us: Optional[int] = None
+
+    # -------------------------------------------------------------------------
+    # Slot and column management
+    # -------------------------------------------------------------------------
+
+    def _grow(self, capacity: int) -> None:
+        for name, dtype in self._COLUMNS:
+            column = np.zeros(capacity, dtype=dtype)
+            old = getattr(self, name)
+            column[:len(old)] = old
+            setattr(self, name, column)
+        self._capacity = capacity
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        if self._high_water == self._capacity:
+            self._grow(max(2 * self._capacity, self.INITIAL_CAPACITY))
+        slot = self._high_water
+        self._high_water += 1
+        return slot
+
+    def _code(self, department: str) -> int:
+        code = self._dept_codes.get(department)
+        if code is None:
+            code = len(self._dept_names)
+            self._dept_codes[department] = code
+            self._dept_names.append(department)
+            self._dept_sizes.append(0)
+            self._dept_versions.append(0)
+        return code
+
+    def _write(self, slot: int, item: QueueItem) -> None:
+        self._base[slot] = round(-item.priority * _SCORE_UNITS)
+        self._checkin[slot] = (item.timestamp - AGING_EPOCH) // _MICROSECOND
+        self._triage[slot] = item.triage_score
+        self._emergency[slot] = item.is_emergency
+        self._age[slot] = item.age_factor
+        self._chronic[slot] = item.chronic_factor
+        self._dept[slot] = self._code(item.department)
+        self._patient[slot] = item.patient_id
+        self._entry[slot] = item.entry_id
+        self._alive[slot] = True
+
+    def _item(self, slot: int) -> QueueItem:
+        """Materialize the QueueItem stored in a slot."""
+        return QueueItem(
+            priority=-int(self._base[slot]) / _SCORE_UNITS,
+            timestamp=AGING_EPOCH + timedelta(microseconds=int(self._checkin[slot])),
+            patient_id=int(self._patient[slot]),
+            entry_id=int(self._entry[slot]),
+            triage_score=int(self._triage[slot]),
+            is_emergency=bool(self._emergency[slot]),
+            age_factor=round(float(self._age[slot]), 6),
+            chronic_factor=round(float(self._chronic[slot]), 6),
+            department=self._dept_names[self._dept[slot]]
+        )
+
+    def _store(self, item: QueueItem) -> None:
+        slot = self._allocate()
+        self._write(slot, item)
+        self._slots[item.entry_id] = slot
+        self._dept_sizes[self._dept[slot]] += 1
+        self._count(item, 1)
+
+    def _release(self, slot: int) -> str:
+        """Free a slot; returns the department it belonged to."""
+        self._count(self._item(slot), -1)
+        code = self._dept[slot]
+        self._alive[slot] = False
+        del self._slots[int(self._entry[slot])]
+        self._free.append(slot)
+        self._dept_sizes[code] -= 1
+        return self._dept_names[code]
+
+    def _touch(self, *departments: str) -> None:
+        self._version += 1
+        for department in departments:
+            self._dept_versions[self._code(department)] += 1
+
+    def department_version(self, department: str) -> int:
+        code = self._dept_codes.get(department.lower())
+        return self._dept_versions[code] if code is not None else 0
+
+    # -------------------------------------------------------------------------
+    # Vectorized ordering
+    # -------------------------------------------------------------------------
+
+    def _now_us(self, now: datetime) -> int:
+        return (now - AGING_EPOCH) // _MICROSECOND
+
+    def _live(self, department: Optional[str]) -> np.ndarray:
+        """Slots of live entries, optionally restricted to one department."""
+        n = self._high_water
+        mask = self._alive[:n]
+        if department is not None:
+            code = self._dept_codes.get(department)
+            if code is None:
+                return np.zeros(0, dtype=np.intp)
+            mask = mask & (self._dept[:n] == code)
+        return np.flatnonzero(mask)
+
+    def _keys(self, slots: np.ndarray, now: datetime) -> np.ndarray:
+        """
+        Effective ordering key at now (ascending = served first). Equal to
+        the base class lane key minus its shift, so both engines agree.
+        """
+        wait = np.minimum(self._now_us(now) - self._checkin[slots], self._max_wait_us)
+        return -(self._base[slots].astype(np.int64) * self._max_wait_us + self._wait_units * wait)
+
+    def _order(self, department: Optional[str], now: datetime) -> np.ndarray:
+        """Live slots in priority order (ties: check-in, then entry id)."""
+        return self._sorted(department, now)[2]
+
+    def _sorted(self, department: Optional[str], now: datetime) -> Tuple[Tuple[int, int], Optional[int], np.ndarray]:
+        """Memoized (version and aging tick, reorder time in µs, order) at now."""
+        now_us = self._now_us(now)
+        stamp = (self._version_of(department), self.aging_tick(now))
+        cached = self._orders.get(department)
+        if cached is None or cached[0] != stamp or (cached[1] is not None and now_us >= cached[1]):
+            slots = self._live(department)
+            keys = self._keys(slots, now)
+            order = slots[np.lexsort((self._entry[slots], self._checkin[slots], keys))]
+            cached = (stamp, self._reorder_us(order, now_us), order)
+            self._orders[department] = cached
+        return cached
+
+    def _reorder_us(self, order: np.ndarray, now_us: int) -> Optional[int]:
+        """Vectorized SmartPriorityQueue._reorder_time for slots in priority order."""
+        checkin = self._checkin[order]
+        cap = checkin + self._max_wait_us
+        capped = cap <= now_us
+        if capped.all():
+            return None
+        base = self._base[order].astype(np.int64) * self._max_wait_us
+        candidates = [cap[~capped]]
+        if self._wait_units:
+            # Uncapped entries right behind a capped one: aging key - credit(t) < capped key
+            behind = np.flatnonzero(~capped[1:] & capped[:-1]) + 1
+            aging_key = self._wait_units * checkin[behind] - base[behind]
+            capped_key = -base[behind - 1] - self._wait_units * self._max_wait_us
+            candidates.append((aging_key - capped_key) // self._wait_units)
+        return int(min(c.min() for c in candidates if len(c)))
+
+    def _clock(self) -> datetime:
+        # Ordering is computed from check-in times; there are no lanes to advance
+        return datetime.utcnow()
+
+    def _advance(self, now: datetime) -> int:
+        """Entries whose wait reached the cap since the last call."""
+        now_us = self._now_us(now)
+        n = self._high_water
+        cap = self._checkin[:n] + self._max_wait_us
+        crossed = self._alive[:n] & (cap <= now_us)
+        if self._last_advance_us is not None:
+            crossed &= cap > self._last_advance_us
+        self._last_advance_us = now_us
+        return int(np.count_nonzero(crossed))
+
+    # -------------------------------------------------------------------------
+    # Queue operations
+    # -------------------------------------------------------------------------
+
+    def push(
+        self,
+        patient_id: int,
+        entry_id: int,
+        triage_score: int,
+        age_factor: float = 1.0,
+        chronic_factor: float = 0.0,
+        is_emergency: bool = False,
+        check_in_time: datetime = None,
+        patient_info: Dict = None,
+        department: str = None
+    ) -> float:
+        now = datetime.utcnow()
+        item = self._new_item(
+            patient_id, entry_id, triage_score, age_factor, chronic_factor,
+            is_emergency, check_in_time, patient_info, department, now
+        )
+
+        if entry_id in self._slots:
+            self._touch(self._release(self._slots[entry_id]))
+        self._store(item)
+        if patient_info is not None:
+            self._patient_info[entry_id] = patient_info
+        self._touch(item.department)
+        self._log_push(item, patient_info)
+
+        return self.effective_priority(item, now)
+
+    def _top(self, department: Optional[str], now: datetime) -> Optional[int]:
+        slots = self._live(department)
+        if not len(slots):
+            return None
+        keys = self._keys(slots, now)
+        best = slots[keys == keys.min()]
+        if len(best) > 1:
+            best = best[np.lexsort((self._entry[best], self._checkin[best]))]
+        return int(best[0])
+
+    def peek(self, department: str = None) -> Optional[QueueItem]:
+        slot = self._top(department.lower() if department else None, datetime.utcnow())
+        return self._item(slot) if slot is not None else None
+
+    def pop(self, department: str = None) -> Optional[QueueItem]:
+        slot = self._top(department.lower() if department else None, datetime.utcnow())
+        if slot is None:
+            return None
+        item = self._item(slot)
+        self._release(slot)
+        self._patient_info.pop(item.entry_id, None)
+        self._touch(item.department)
+        self._log("remove", item.entry_id)
+        return item
+
+    def remove(self, entry_id: int) -> bool:
+        slot = self._slots.get(entry_id)
+        if slot is None:
+            return False
+        department = self._release(slot)
+        self._patient_info.pop(entry_id, None)
+        self._touch(department)
+        self._log("remove", entry_id)
+        return True
+
+    def _reindex(self, old_item: QueueItem, new_item: QueueItem) -> None:
+        slot = self._slots[new_item.entry_id]
+        if old_item.department != new_item.department:
+            self._dept_sizes[self._dept[slot]] -= 1
+            self._dept_sizes[self._code(new_item.department)] += 1
+        self._write(slot, new_item)
+        self._count(old_item, -1)
+        self._count(new_item, 1)
+
+    def get_item(self, entry_id: int) -> Optional[QueueItem]:
+        slot = self._slots.get(entry_id)
+        return self._item(slot) if slot is not None else None
+
+    def departments(self) -> Dict[str, int]:
+        return {
+            name: size for name, size in zip(self._dept_names, self._dept_sizes) if size
+        }
+
+    def department_size(self, department: str) -> int:
+        code = self._dept_codes.get(department.lower())
+        return self._dept_sizes[code] if code is not None else 0
+
+    def _entry_department(self, entry_id: int) -> Optional[str]:
+        slot = self._slots.get(entry_id)
+        return self._dept_names[self._dept[slot]] if slot is not None else None
+
+    def iter_items(self, department: str = None) -> Iterator[QueueItem]:
+        for slot in self._order(department.lower() if department else None, datetime.utcnow()):
+            yield self._item(slot)
+
+    def _capture_entries(self) -> Callable[[], List[Tuple]]:
+        """Copies of the live slots' columns; rows are materialized when called."""
+        live = np.flatnonzero(self._alive[:self._high_water])
+        base, checkin, triage, emergency, age, chronic, dept, patient, entry = (
+            getattr(self, name)[live] for name, _ in self._COLUMNS[:-1]  # all but _alive
+        )
+        dept_names = list(self._dept_names)
+        return lambda: [
+            (entry_id, patient_id, base_units / _SCORE_UNITS, checkin_us, triage_score,
+             is_emergency, round(age_factor, 6), round(chronic_factor, 6), dept_names[code])
+            for entry_id, patient_id, base_units, checkin_us, triage_score, is_emergency,
+                age_factor, chronic_factor, code in zip(
+                entry.tolist(), patient.tolist(), base.tolist(), checkin.tolist(), triage.tolist(),
+                emergency.tolist(), age.tolist(), chronic.tolist(), dept.tolist()
+            )
+        ]
+
+    def rank(self, entry_id: int, department: str = None) -> Optional[int]:
+        """1-based position: one vectorized comparison over the live entries."""
+        slot = self._slots.get(entry_id)
+        if slot is None:
+            return None
+        if department is not None:
+            if department.lower() != self._dept_names[self._dept[slot]]:
+                return None
+            department = department.lower()
+        now = datetime.utcnow()
+        slots = self._live(department)
+        keys = self._keys(slots, now)
+        key = self._keys(np.array([slot]), now)[0]
+        checkin = self._checkin[slots]
+        tie = keys == key
+        ahead = (keys < key) | (tie & (checkin < self._checkin[slot])) | (
+            tie & (checkin == self._checkin[slot]) & (self._entry[slots] < entry_id)
+        )
+        return int(np.count_nonzero(ahead)) + 1
+
+    def entry_at(self, position: int, department: str = None) -> Optional[QueueItem]:
+        order = self._order(department.lower() if department else None, datetime.utcnow())
+        if 1 <= position <= len(order):
+            return self._item(order[position - 1])
+        return None
+
+    def _build_snapshot(self, department: Optional[str], now: datetime) -> Tuple[List[Dict], Optional[datetime]]:
+        _, reorder_us, order = self._sorted(department, now)
+        rows = [
+            self._entry_to_dict(self._item(slot), i + 1, now, self._patient_info.get(int(self._entry[slot])))
+            for i, slot in enumerate(order)
+        ]
+        return rows, AGING_EPOCH + reorder_us * _MICROSECOND if reorder_us is not None else None
+
+    def rescore(
+        self,
+        entry_ids: Sequence[int] = None,
+        triage_scores: Sequence[int] = None
+    ) -> int:
+        """
+        Vectorized bulk re-scoring: recompute base priorities from the factor
+        columns, optionally assigning new triage scores first (aligned with
+        entry_ids). Unknown entry ids are skipped.
+
+        Returns: number of entries rescored
+        """
+        if entry_ids is None:
+            slots = self._live(None)
+            picked = np.arange(len(slots))
+        else:
+            found = [(self._slots[e], i) for i, e in enumerate(entry_ids) if e in self._slots]
+            slots = np.array([slot for slot, _ in found], dtype=np.intp)
+            picked = np.array([i for _, i in found], dtype=np.intp)
+        if not len(slots):
+            return 0
+
+        if triage_scores is not None:
+            self._triage[slots] = np.asarray(triage_scores, dtype=np.int8)[picked]
+        self._base[slots] = score_units(
+            self._triage[slots], self._age[slots], self._chronic[slots], self._emergency[slots]
+        )
+        if triage_scores is not None:
+            self._recount()
+        self._touch(*(self._dept_names[code] for code in np.unique(self._dept[slots])))
+        self._log(
+            "rescore",
+            list(entry_ids) if entry_ids is not None else None,
+            list(triage_scores) if triage_scores is not None else None
+        )
+        return len(slots)
+
+    def apply_record(self, record: Tuple) -> None:
+        if record[0] == "rescore":
+            self.rescore(*record[1:])
+        else:
+            super().apply_record(record)
+
+    def _bulk_index(self, items: List[QueueItem], now: datetime) -> None:
+        """Write many new items into fresh slots with one assignment per column."""
+        count = len(items)
+        if self._high_water + count > self._capacity:
+            self._grow(max(2 * self._capacity, self._high_water + count))
+        slots = np.arange(self._high_water, self._high_water + count)
+        self._high_water += count
+
+        self._base[slots] = [round(-item.priority * _SCORE_UNITS) for item in items]
+        self._checkin[slots] = [(item.timestamp - AGING_EPOCH) // _MICROSECOND for item in items]
+        self._triage[slots] = [item.triage_score for item in items]
+        self._emergency[slots] = [item.is_emergency for item in items]
+        self._age[slots] = [item.age_factor for item in items]
+        self._chronic[slots] = [item.chronic_factor for item in items]
+        self._dept[slots] = [self._code(item.department) for item in items]
+        self._patient[slots] = [item.patient_id for item in items]
+        self._entry[slots] = [item.entry_id for item in items]
+        self._alive[slots] = True
+
+        for slot, item in zip(slots.tolist(), items):
+            self._slots[item.entry_id] = slot
+            self._dept_sizes[self._dept_codes[item.department]] += 1
+        self._recount()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _reset(self) -> None:
+        self._alive[:self._high_water] = False
+        self._high_water = 0
+        self._slots.clear()
+        self._free.clear()
+        self._dept_sizes = [0] * len(self._dept_names)
+        self._department_totals.clear()
+        self._patient_info.clear()
+        self._current_patients.clear()
+        self._touch(*self._dept_names)
+
+    def _recount(self) -> None:
+        """Rebuild the running statistics from the columns (after bulk edits)."""
+        self._department_totals.clear()
+        buckets = np.array([severity_bucket(score) for score in range(11)])
+        for code, department in enumerate(self._dept_names):
+            slots = self._live(department)
+            counters = QueueCounters()
+            counters.size = len(slots)
+            names, counts = np.unique(buckets[self._triage[slots]], return_counts=True)
+            counters.severity.update(zip(names.tolist(), counts.tolist()))
+            counters.emergency = int(np.count_nonzero(self._emergency[slots]))
+            counters.checkin_sum_us = int(self._checkin[slots].sum())
+            self._department_totals[department] = counters
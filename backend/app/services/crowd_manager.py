@@ -19,6 +19,8 @@ from app.core.constants import (
     QUEUE_THRESHOLDS, BASE_WAIT_TIMES, TELECONSULT_ELIGIBLE,
     DEPARTMENTS, SEVERITY_DESCRIPTIONS
 )
+from app.services.arrival_forecast import get_arrival_forecaster
+from app.services.shared_state import get_shared_service
 
 
 class CrowdLevel(str, Enum):
@@ -89,6 +91,35 @@ class CrowdManager:
         self._department_stats: Dict[str, DepartmentStatus] = {}
         self._teleconsult_queue: List[Dict] = []
         self._redirect_history: List[Dict] = []
+        
+        # Running hospital totals, adjusted whenever a department status
+        # changes so the overview never re-sums every department
+        self._total_queue = 0
+        self._total_capacity = 0
+        self._level_counts: Dict[CrowdLevel, int] = dict.fromkeys(CrowdLevel, 0)
+        
+        # Bumped on every department status change
+        self._version = 0
+    
+    @property
+    def version(self) -> int:
+        """Department status change counter (usable in an ETag)."""
+        return self._version
+    
+    def _tally(self, status: DepartmentStatus, delta: int) -> None:
+        """Add (delta=1) or retract (delta=-1) a department status from the totals."""
+        self._total_queue += delta * status.current_queue
+        self._total_capacity += delta * status.capacity
+        self._level_counts[status.crowd_level] += delta
+    
+    def reset(self) -> None:
+        """Forget all department statuses and teleconsult entries."""
+        self._department_stats.clear()
+        self._teleconsult_queue.clear()
+        self._total_queue = 0
+        self._total_capacity = 0
+        self._level_counts = dict.fromkeys(CrowdLevel, 0)
+        self._version += 1
     
     def calculate_crowd_level(self, current: int, capacity: int) -> CrowdLevel:
         """
@@ -252,7 +283,12 @@ class CrowdManager:
             teleconsult_redirects=teleconsult_redirects
         )
         
+        previous = self._department_stats.get(department)
+        if previous is not None:
+            self._tally(previous, -1)
+        self._tally(status, 1)
         self._department_stats[department] = status
+        self._version += 1
         return status
     
     def get_all_departments_status(self) -> List[Dict]:
@@ -260,10 +296,13 @@ class CrowdManager:
         # Standard departments
         standard_depts = ["general", "emergency", "pediatrics", "cardiology", "neurology", "orthopedics"]
         
+        forecaster = get_arrival_forecaster()
         result = []
         for dept in standard_depts:
             if dept in self._department_stats:
-                result.append(self._department_stats[dept].to_dict())
+                status = self._department_stats[dept].to_dict()
+                status["expected_arrivals_next_hour"] = forecaster.expected_arrivals(dept)
+                result.append(status)
             else:
                 # Return default status for departments not yet tracked
                 result.append({
@@ -279,7 +318,8 @@ class CrowdManager:
                     "utilization_percent": 0,
                     "active_doctors": 2,
                     "spare_doctors_assigned": 0,
-                    "teleconsult_redirects": 0
+                    "teleconsult_redirects": 0,
+                    "expected_arrivals_next_hour": forecaster.expected_arrivals(dept)
                 })
         return result
     
@@ -295,14 +335,13 @@ class CrowdManager:
                 "teleconsult_queue": len(self._teleconsult_queue)
             }
         
-        total_queue = sum(d.current_queue for d in self._department_stats.values())
-        total_capacity = sum(d.capacity for d in self._department_stats.values())
+        total_queue = self._total_queue
+        total_capacity = self._total_capacity
         
         utilization = (total_queue / total_capacity * 100) if total_capacity > 0 else 0
         
-        departments_critical = sum(
-            1 for d in self._department_stats.values() 
-            if d.crowd_level in [CrowdLevel.HIGH, CrowdLevel.CRITICAL]
+        departments_critical = (
+            self._level_counts[CrowdLevel.HIGH] + self._level_counts[CrowdLevel.CRITICAL]
         )
         
         overall_level = self.calculate_crowd_level(total_queue, total_capacity)
@@ -395,6 +434,17 @@ class CrowdManager:
                     "reason": f"Queue length: {dept.current_queue}, utilization: {dept.utilization:.0f}%",
                     "priority": "medium"
                 })
+            
+            else:
+                # Not crowded yet, but the arrival profile says it will be
+                expected = get_arrival_forecaster().expected_arrivals(dept.department)
+                if expected is not None and dept.current_queue + expected > dept.capacity:
+                    suggestions.append({
+                        "action": "ACTIVATE_SPARE",
+                        "department": dept.department,
+                        "reason": f"~{expected:.0f} arrivals expected this hour would exceed capacity ({dept.capacity})",
+                        "priority": "low"
+                    })
         
         return suggestions
 
@@ -405,6 +455,9 @@ _crowd_manager = None
 def get_crowd_manager() -> CrowdManager:
     """Get the global crowd manager instance."""
     global _crowd_manager
+    shared = get_shared_service("crowd_manager")
+    if shared is not None:
+        return shared
     if _crowd_manager is None:
         _crowd_manager = CrowdManager()
     return _crowd_manager
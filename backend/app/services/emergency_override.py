@@ -16,6 +16,7 @@ from datetime import datetime
 from enum import Enum
 from dataclasses import dataclass
 from app.services.priority_queue import get_priority_queue
+from app.services.shared_state import get_shared_service
 
 
 class OverrideType(str, Enum):
@@ -173,18 +174,8 @@ class EmergencyOverrideSystem:
         # Get priority queue
         pq = get_priority_queue()
         
-        # Get current state (for logging)
-        queue_list = pq.get_queue_list()
-        current_entry = None
-        previous_position = 0
-        previous_priority = 0
-        
-        for i, entry in enumerate(queue_list):
-            if entry["entry_id"] == queue_entry_id:
-                current_entry = entry
-                previous_position = entry["position"]
-                previous_priority = entry["priority_score"]
-                break
+        # Get current state (for logging) - O(log n) rank lookup
+        current_entry = pq.get_item(queue_entry_id)
         
         if not current_entry:
             return {
@@ -192,6 +183,9 @@ class EmergencyOverrideSystem:
                 "error": f"Queue entry {queue_entry_id} not found"
             }
         
+        previous_position = pq.rank(queue_entry_id)
+        previous_priority = pq.effective_priority(current_entry)
+        
         # Perform emergency override
         new_priority = pq.emergency_override(queue_entry_id)
         
@@ -201,13 +195,8 @@ class EmergencyOverrideSystem:
                 "error": "Failed to apply emergency override"
             }
         
-        # Get new position
-        new_queue = pq.get_queue_list()
-        new_position = 1  # Emergency should be at top
-        for entry in new_queue:
-            if entry["entry_id"] == queue_entry_id:
-                new_position = entry["position"]
-                break
+        # Get new position (emergency should be at top)
+        new_position = pq.rank(queue_entry_id) or 1
         
         # Create audit log
         log = OverrideLog(
@@ -272,20 +261,8 @@ class EmergencyOverrideSystem:
         
         pq = get_priority_queue()
         
-        # Get current state
-        queue_list = pq.get_queue_list()
-        current_entry = None
-        previous_position = 0
-        previous_priority = 0
-        current_triage = 3
-        
-        for entry in queue_list:
-            if entry["entry_id"] == queue_entry_id:
-                current_entry = entry
-                previous_position = entry["position"]
-                previous_priority = entry["priority_score"]
-                current_triage = entry["triage_score"]
-                break
+        # Get current state - O(log n) rank lookup
+        current_entry = pq.get_item(queue_entry_id)
         
         if not current_entry:
             return {
@@ -293,6 +270,10 @@ class EmergencyOverrideSystem:
                 "error": f"Queue entry {queue_entry_id} not found"
             }
         
+        previous_position = pq.rank(queue_entry_id)
+        previous_priority = pq.effective_priority(current_entry)
+        current_triage = current_entry.triage_score
+        
         # Calculate new triage score (don't exceed 5)
         new_triage = min(5, current_triage + boost_amount)
         
@@ -309,12 +290,7 @@ class EmergencyOverrideSystem:
             }
         
         # Get new position
-        new_queue = pq.get_queue_list()
-        new_position = previous_position
-        for entry in new_queue:
-            if entry["entry_id"] == queue_entry_id:
-                new_position = entry["position"]
-                break
+        new_position = pq.rank(queue_entry_id) or previous_position
         
         # Create audit log
         log = OverrideLog(
@@ -411,6 +387,9 @@ _override_system = None
 def get_override_system() -> EmergencyOverrideSystem:
     """Get the global emergency override system."""
     global _override_system
+    shared = get_shared_service("override_system")
+    if shared is not None:
+        return shared
     if _override_system is None:
         _override_system = EmergencyOverrideSystem()
     return _override_system
@@ -0,0 +1,202 @@
+"""
+SmartCare Entry ID Allocator
+=============================
+Snowflake-style queue entry IDs: unique across API processes, increasing
+over time, and allocated without coordination.
+
+Layout (53 bits, so IDs stay exact as JavaScript numbers in the frontend):
+  | 40 bits: ms since ID_EPOCH | 4 bits: node | 9 bits: sequence |
+
+- 512 IDs per millisecond per node (~500k/s). A node that runs out of
+  sequence numbers borrows the next millisecond instead of waiting, so it
+  never blocks and IDs stay monotonic; the clock catches up when the burst
+  ends. A clock that steps backwards is handled the same way.
+- 16 nodes. Each API process needs its own node number: set ENTRY_ID_NODE,
+  or leave it at -1 to claim a free one. With QUEUE_BACKEND=redis (API
+  nodes on several hosts) the claim is a lease in Redis (SET NX with a
+  TTL, renewed in the background), so nodes are unique across hosts;
+  otherwise it is a lock file on this host (one per uvicorn worker).
+- 40 bits of milliseconds last ~34 years from ID_EPOCH.
+"""
+
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from app.core.config import settings
+
+ID_EPOCH = datetime(2024, 1, 1)
+_EPOCH_MS = int((ID_EPOCH - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+TIME_BITS = 40
+NODE_BITS = 4
+SEQUENCE_BITS = 9
+
+MAX_NODE = (1 << NODE_BITS) - 1
+_MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+_NODE_SHIFT = SEQUENCE_BITS
+_TIME_SHIFT = SEQUENCE_BITS + NODE_BITS
+
+# Redis node leases (QUEUE_BACKEND=redis): key per node, renewed every third of the TTL
+NODE_LEASE_KEY = "smartcare:id-node:{node}"
+NODE_LEASE_SECONDS = 60
+
+
+class EntryIdAllocator:
+    """Allocates (time, node, sequence) IDs for one process."""
+
+    def __init__(self, node: int):
+        if not 0 <= node <= MAX_NODE:
+            raise ValueError(f"ID node must be between 0 and {MAX_NODE}, got {node}")
+        self.node = node
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._sequence = 0
+
+    @staticmethod
+    def _now_ms() -> int:
+        return time.time_ns() // 1_000_000 - _EPOCH_MS
+
+    def _reserve(self, count: int) -> Tuple[int, int]:
+        """Reserve count consecutive sequence numbers; returns (ms, first sequence)."""
+        with self._lock:
+            now = self._now_ms()
+            if now > self._last_ms:
+                self._last_ms, self._sequence = now, 0
+            elif self._sequence + count > _MAX_SEQUENCE + 1:
+                # Sequence space of this millisecond used up: borrow the next one
+                self._last_ms, self._sequence = self._last_ms + 1, 0
+            first = self._sequence
+            self._sequence += count
+            return self._last_ms, first
+
+    def _compose(self, ms: int, sequence: int) -> int:
+        return (ms << _TIME_SHIFT) | (self.node << _NODE_SHIFT) | sequence
+
+    def next_id(self) -> int:
+        """One new entry ID."""
+        return self._compose(*self._reserve(1))
+
+    def next_ids(self, count: int) -> List[int]:
+        """count new, increasing entry IDs (one lock round per 512)."""
+        ids = []
+        while len(ids) < count:
+            chunk = min(count - len(ids), _MAX_SEQUENCE + 1)
+            ms, first = self._reserve(chunk)
+            ids.extend(self._compose(ms, sequence) for sequence in range(first, first + chunk))
+        return ids
+
+    @staticmethod
+    def decompose(entry_id: int) -> Tuple[datetime, int, int]:
+        """(allocation time, node, sequence) encoded in an ID."""
+        ms = entry_id >> _TIME_SHIFT
+        node = (entry_id >> _NODE_SHIFT) & MAX_NODE
+        return ID_EPOCH + timedelta(milliseconds=ms), node, entry_id & _MAX_SEQUENCE
+
+
+def queue_token(entry_id: int) -> str:
+    """Patient-facing token for a queue entry."""
+    return f"TKN-{entry_id}"
+
+
+# Lock file keeping this process's node number claimed (held until exit)
+_node_lock = None
+
+def _claim_node() -> int:
+    """Lock the first free node number on this host."""
+    global _node_lock
+    try:
+        import fcntl
+    except ImportError:  # no flock (Windows): best effort
+        return os.getpid() % (MAX_NODE + 1)
+
+    directory = os.path.join(tempfile.gettempdir(), "smartcare-id-nodes")
+    os.makedirs(directory, exist_ok=True)
+    for node in range(MAX_NODE + 1):
+        handle = open(os.path.join(directory, f"node-{node:02d}.lock"), "w")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            continue
+        _node_lock = handle
+        return node
+    raise RuntimeError(f"All {MAX_NODE + 1} entry ID nodes on this host are in use")
+
+
+# Extends a node lease only while this process still owns it
+_RENEW_LEASE = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then return 0 end
+return redis.call('EXPIRE', KEYS[1], ARGV[2])
+"""
+
+
+def _claim_redis_node() -> int:
+    """Lease the first free node number in Redis (shared by every API host)."""
+    import redis
+    client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+    for node in range(MAX_NODE + 1):
+        key = NODE_LEASE_KEY.format(node=node)
+        if client.set(key, owner, nx=True, ex=NODE_LEASE_SECONDS):
+            threading.Thread(
+                target=_keep_node_lease, args=(client, key, owner), name="id-node-lease", daemon=True
+            ).start()
+            return node
+    raise RuntimeError(
+        f"All {MAX_NODE + 1} entry ID nodes are leased in Redis; stop an API process or set ENTRY_ID_NODE"
+    )
+
+
+def _keep_node_lease(client, key: str, owner: str) -> None:
+    """Renew a node lease until exit. A lapsed lease is taken back if still free."""
+    import redis
+    renew = client.register_script(_RENEW_LEASE)
+    while True:
+        time.sleep(NODE_LEASE_SECONDS / 3)
+        try:
+            if renew(keys=[key], args=[owner, NODE_LEASE_SECONDS]):
+                continue
+            if client.set(key, owner, nx=True, ex=NODE_LEASE_SECONDS):
+                continue
+            holder = client.get(key)
+        except redis.RedisError:
+            continue  # Redis unreachable; retry on the next round
+        from app.services.activity_logger import get_activity_logger
+        get_activity_logger().log_system_event(
+            title="Entry ID node conflict",
+            description=f"Lease {key} lapsed and was claimed by {holder}; "
+                        "queue entry IDs from both processes may collide",
+            details={"key": key, "owner": owner}
+        )
+        return
+
+
+# Singleton allocator for this process
+_allocator = None
+_allocator_lock = threading.Lock()
+
+def get_entry_id_allocator() -> EntryIdAllocator:
+    """Get the process-wide allocator (node from ENTRY_ID_NODE or claimed)."""
+    global _allocator
+    if _allocator is None:
+        with _allocator_lock:
+            if _allocator is None:
+                if settings.ENTRY_ID_NODE >= 0:
+                    node = settings.ENTRY_ID_NODE
+                elif settings.QUEUE_BACKEND == "redis":
+                    node = _claim_redis_node()
+                else:
+                    node = _claim_node()
+                _allocator = EntryIdAllocator(node)
+    return _allocator
+
+
+def next_entry_id() -> int:
+    """Allocate one queue entry ID."""
+    return get_entry_id_allocator().next_id()
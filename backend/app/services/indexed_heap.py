@@ -0,0 +1,175 @@
+"""
+SmartCare Indexed Heap
+=======================
+Addressable binary min-heap used by the smart priority queue.
+
+Unlike a plain heapq list, every entry's slot is tracked in a position
+map, so an entry can be re-prioritized or removed in place in O(log n).
+No tombstones are left behind - the heap always holds exactly the live
+entries.
+
+Operations:
+- push / pop:      O(log n)
+- peek:            O(1)
+- update / remove: O(log n) via the position map
+- heapify:         O(n) bulk build
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class IndexedHeap:
+    """
+    Binary min-heap of (sort_key, entry_id) pairs with a position map.
+
+    The sort key can be any comparable value (SmartPriorityQueue uses
+    (negative priority, check-in time) tuples). Entry ids must be unique.
+    """
+
+    __slots__ = ("_heap", "_pos")
+
+    def __init__(self):
+        self._heap: List[Tuple[Any, int]] = []
+        self._pos: Dict[int, int] = {}  # entry_id -> index in _heap
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, entry_id: int) -> bool:
+        return entry_id in self._pos
+
+    def __iter__(self) -> Iterator[int]:
+        """Iterate entry ids in heap (not sorted) order."""
+        return (entry_id for _, entry_id in self._heap)
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._pos.clear()
+
+    def sort_key_of(self, entry_id: int) -> Optional[Any]:
+        """Current sort key of an entry, or None if absent."""
+        index = self._pos.get(entry_id)
+        if index is None:
+            return None
+        return self._heap[index][0]
+
+    def push(self, entry_id: int, sort_key: Any) -> None:
+        """Insert an entry. Re-pushing an existing id updates it in place."""
+        if entry_id in self._pos:
+            self.update(entry_id, sort_key)
+            return
+        self._heap.append((sort_key, entry_id))
+        self._pos[entry_id] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+
+    def peek(self) -> Optional[Tuple[Any, int]]:
+        """Smallest (sort_key, entry_id) without removing it."""
+        return self._heap[0] if self._heap else None
+
+    def pop(self) -> Optional[Tuple[Any, int]]:
+        """Remove and return the smallest (sort_key, entry_id)."""
+        if not self._heap:
+            return None
+        return self._remove_at(0)
+
+    def remove(self, entry_id: int) -> bool:
+        """Remove an entry by id. Returns False if it was not present."""
+        index = self._pos.get(entry_id)
+        if index is None:
+            return False
+        self._remove_at(index)
+        return True
+
+    def update(self, entry_id: int, sort_key: Any) -> bool:
+        """
+        Change an entry's sort key in place (decrease- or increase-key).
+        Returns False if the entry is not present.
+        """
+        index = self._pos.get(entry_id)
+        if index is None:
+            return False
+        old_key = self._heap[index][0]
+        self._heap[index] = (sort_key, entry_id)
+        if sort_key < old_key:
+            self._sift_up(index)
+        elif old_key < sort_key:
+            self._sift_down(index)
+        return True
+
+    def heapify(self, items: Iterable[Tuple[int, Any]]) -> None:
+        """
+        Bulk-insert (entry_id, sort_key) pairs with a single O(n) rebuild.
+        Existing entries are kept; duplicate ids are updated.
+        """
+        for entry_id, sort_key in items:
+            index = self._pos.get(entry_id)
+            if index is None:
+                self._pos[entry_id] = len(self._heap)
+                self._heap.append((sort_key, entry_id))
+            else:
+                self._heap[index] = (sort_key, entry_id)
+        for index in reversed(range(len(self._heap) // 2)):
+            self._sift_down(index)
+
+    # -------------------------------------------------------------------------
+    # Internal sift operations
+    # -------------------------------------------------------------------------
+
+    def _remove_at(self, index: int) -> Tuple[Any, int]:
+        heap = self._heap
+        removed = heap[index]
+        del self._pos[removed[1]]
+
+        last = heap.pop()
+        if index < len(heap):
+            heap[index] = last
+            self._pos[last[1]] = index
+            # The moved element may need to travel either direction
+            if index > 0 and last[0] < heap[(index - 1) >> 1][0]:
+                self._sift_up(index)
+            else:
+                self._sift_down(index)
+        return removed
+
+    def _sift_up(self, index: int, stop: int = 0) -> None:
+        """Move the item at index towards the root, no higher than stop."""
+        heap = self._heap
+        pos = self._pos
+        item = heap[index]
+        key = item[0]
+        while index > stop:
+            parent = (index - 1) >> 1
+            parent_item = heap[parent]
+            if not key < parent_item[0]:
+                break
+            heap[index] = parent_item
+            pos[parent_item[1]] = index
+            index = parent
+        heap[index] = item
+        pos[item[1]] = index
+
+    def _sift_down(self, index: int) -> None:
+        """
+        Bottom-up sift (as in heapq): walk the hole down along the smaller
+        children to a leaf, one comparison per level, then sift the item
+        back up. The item usually came from the bottom of the heap, so this
+        takes about half the comparisons of the textbook sift-down.
+        """
+        heap = self._heap
+        pos = self._pos
+        size = len(heap)
+        start = index
+        item = heap[index]
+        child = 2 * index + 1
+        while child < size:
+            right = child + 1
+            if right < size and not heap[child][0] < heap[right][0]:
+                child = right
+            child_item = heap[child]
+            heap[index] = child_item
+            pos[child_item[1]] = index
+            index = child
+            child = 2 * index + 1
+        heap[index] = item
+        pos[item[1]] = index
+        self._sift_up(index, start)
@@ -0,0 +1,244 @@
+"""
+SmartCare Order-Statistic Index
+================================
+Answers "where am I in line" in O(log n) without materializing the
+sorted queue.
+
+Entries are kept in sorted buckets (bounded-size Python lists) and a
+Fenwick tree over bucket sizes turns "entries before bucket b" into a
+prefix sum. Locating an entry is a bisect over bucket maxima plus a
+bisect inside one bucket, so the heavy lifting runs in C.
+
+Writes are staged: insert/remove/update only record the entry's new key,
+and the buckets catch up on the next positional read. The queue's hot
+push/update/pop path never reads positions, so it pays a dict write per
+change instead of a bisect, an in-bucket shift and a Fenwick update. A few
+staged changes are applied one by one; many are merged in a single pass.
+
+Operations:
+- insert / remove / update: O(1) (staged)
+- bulk_load: O(k) staged; applied in O(n + k log k)
+- rank / select / count_less: O(log n) after applying staged changes
+  (O(log n) each, or O(n + k log k) for k changes when k is large)
+- in-order iteration: O(n)
+"""
+
+from bisect import bisect_left, insort
+from heapq import merge
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_ABSENT = object()  # staged marker: entry not placed in the buckets
+
+
+class OrderStatisticTree:
+    """
+    Ordered set of entries keyed by (sort_key, entry_id).
+
+    Entries are ordered by sort_key ascending (the same key the priority
+    queue heap uses); entry_id breaks exact ties deterministically.
+    """
+
+    BUCKET_SIZE = 512  # buckets split at 2x this size
+    MERGE_RATIO = 16   # merge staged changes in one pass above len / MERGE_RATIO
+
+    def __init__(self):
+        self._buckets: List[List[Tuple[Any, int]]] = []
+        self._maxes: List[Tuple[Any, int]] = []  # last key of each bucket
+        self._fenwick: List[int] = []  # 1-based Fenwick tree over bucket sizes
+        self._fenwick_dirty = False
+        self._keys: Dict[int, Any] = {}  # entry_id -> sort_key (current)
+        self._staged: Dict[int, Any] = {}  # entry_id -> sort_key it has in the buckets (or _ABSENT)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, entry_id: int) -> bool:
+        return entry_id in self._keys
+
+    def __iter__(self) -> Iterator[Tuple[Any, int]]:
+        """In-order iteration of (sort_key, entry_id)."""
+        self._apply_staged()
+        return chain.from_iterable(self._buckets)
+
+    def clear(self) -> None:
+        self._buckets.clear()
+        self._maxes.clear()
+        self._fenwick.clear()
+        self._fenwick_dirty = False
+        self._keys.clear()
+        self._staged.clear()
+
+    def sort_key_of(self, entry_id: int) -> Optional[Any]:
+        return self._keys.get(entry_id)
+
+    def insert(self, entry_id: int, sort_key: Any) -> None:
+        """Insert an entry; re-inserting an existing id moves it."""
+        if entry_id not in self._staged:
+            self._staged[entry_id] = self._keys.get(entry_id, _ABSENT)
+        self._keys[entry_id] = sort_key
+
+    def bulk_load(self, items: Iterable[Tuple[int, Any]]) -> None:
+        """
+        Insert many (entry_id, sort_key) pairs at once. Existing ids are
+        moved. The changes are merged with the existing order in one pass
+        on the next read.
+        """
+        staged, keys = self._staged, self._keys
+        for entry_id, sort_key in items:
+            if entry_id not in staged:
+                staged[entry_id] = keys.get(entry_id, _ABSENT)
+            keys[entry_id] = sort_key
+
+    def remove(self, entry_id: int) -> bool:
+        if entry_id not in self._keys:
+            return False
+        if entry_id not in self._staged:
+            self._staged[entry_id] = self._keys[entry_id]
+        del self._keys[entry_id]
+        return True
+
+    def update(self, entry_id: int, sort_key: Any) -> bool:
+        if entry_id not in self._keys:
+            return False
+        self.insert(entry_id, sort_key)
+        return True
+
+    def rank(self, entry_id: int) -> Optional[int]:
+        """0-based rank of an entry (entries ahead of it), or None."""
+        if entry_id not in self._keys:
+            return None
+        return self._count_below((self._keys[entry_id], entry_id))
+
+    def count_less(self, sort_key: Any) -> int:
+        """Number of entries whose sort_key is strictly less than sort_key."""
+        # (sort_key,) sorts before every (sort_key, entry_id) pair
+        return self._count_below((sort_key,))
+
+    def select(self, index: int) -> Optional[Tuple[Any, int]]:
+        """(sort_key, entry_id) at 0-based rank, or None if out of range."""
+        if index < 0 or index >= len(self._keys):
+            return None
+        self._apply_staged()
+        b, offset = self._fenwick_find(index)
+        return self._buckets[b][offset]
+
+    # -------------------------------------------------------------------------
+    # Bucket / Fenwick internals
+    # -------------------------------------------------------------------------
+
+    def _apply_staged(self) -> None:
+        """Bring the buckets up to date with the staged changes."""
+        staged = self._staged
+        if not staged:
+            return
+        keys = self._keys
+        if len(staged) * self.MERGE_RATIO > len(keys):
+            # One pass: keep the untouched entries in order, merge in the changed ones
+            kept = [pair for pair in chain.from_iterable(self._buckets) if pair[1] not in staged]
+            new = sorted((keys[entry_id], entry_id) for entry_id in staged if entry_id in keys)
+            ordered = list(merge(kept, new))
+            size = self.BUCKET_SIZE
+            self._buckets = [ordered[i:i + size] for i in range(0, len(ordered), size)]
+            self._maxes = [bucket[-1] for bucket in self._buckets]
+            self._fenwick_dirty = True
+        else:
+            for entry_id, old_key in staged.items():
+                if old_key is not _ABSENT:
+                    self._unplace((old_key, entry_id))
+                new_key = keys.get(entry_id, _ABSENT)
+                if new_key is not _ABSENT:
+                    self._place((new_key, entry_id))
+        staged.clear()
+
+    def _place(self, key: Tuple[Any, int]) -> None:
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._fenwick_dirty = True
+            return
+
+        b = bisect_left(self._maxes, key)
+        if b == len(self._maxes):
+            b -= 1
+            self._buckets[b].append(key)
+            self._maxes[b] = key
+        else:
+            insort(self._buckets[b], key)
+        self._fenwick_add(b, 1)
+
+        if len(self._buckets[b]) > 2 * self.BUCKET_SIZE:
+            self._split_bucket(b)
+
+    def _unplace(self, key: Tuple[Any, int]) -> None:
+        b = bisect_left(self._maxes, key)
+        bucket = self._buckets[b]
+        del bucket[bisect_left(bucket, key)]
+
+        if bucket:
+            self._maxes[b] = bucket[-1]
+            self._fenwick_add(b, -1)
+        else:
+            del self._buckets[b]
+            del self._maxes[b]
+            self._fenwick_dirty = True
+
+    def _count_below(self, key) -> int:
+        self._apply_staged()
+        b = bisect_left(self._maxes, key)
+        if b == len(self._maxes):
+            return len(self._keys)
+        return self._fenwick_prefix(b) + bisect_left(self._buckets[b], key)
+
+    def _split_bucket(self, b: int) -> None:
+        bucket = self._buckets[b]
+        half = len(bucket) // 2
+        self._buckets[b:b + 1] = [bucket[:half], bucket[half:]]
+        self._maxes[b:b + 1] = [bucket[half - 1], bucket[-1]]
+        self._fenwick_dirty = True
+
+    def _rebuild_fenwick(self) -> None:
+        tree = [0] + [len(bucket) for bucket in self._buckets]
+        size = len(tree)
+        for i in range(1, size):
+            parent = i + (i & -i)
+            if parent < size:
+                tree[parent] += tree[i]
+        self._fenwick = tree
+        self._fenwick_dirty = False
+
+    def _fenwick_add(self, b: int, delta: int) -> None:
+        if self._fenwick_dirty:
+            return  # rebuilt from bucket sizes on next read
+        tree = self._fenwick
+        i = b + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _fenwick_prefix(self, b: int) -> int:
+        """Total size of buckets [0, b)."""
+        if self._fenwick_dirty:
+            self._rebuild_fenwick()
+        tree = self._fenwick
+        total = 0
+        i = b
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def _fenwick_find(self, index: int) -> Tuple[int, int]:
+        """(bucket, offset) holding the entry at 0-based rank index."""
+        if self._fenwick_dirty:
+            self._rebuild_fenwick()
+        tree = self._fenwick
+        b = 0
+        step = 1 << (len(tree).bit_length() - 1)
+        while step:
+            nxt = b + step
+            if nxt < len(tree) and tree[nxt] <= index:
+                index -= tree[nxt]
+                b = nxt
+            step >>= 1
+        return b, index
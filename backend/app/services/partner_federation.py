@@ -0,0 +1,350 @@
+"""
+SmartCare Partner Hospital Federation
+======================================
+Spare doctors lent by partner hospitals, fetched over HTTP instead of
+being hardcoded in the pool.
+
+Partner interface (see app/scripts/partner_stub.py for a reference server):
+- GET    /spare-doctors                     -> {"hospital", "doctors": [...]}
+  each doctor: doctor_id, name, specialty, max_patients, patients_seen,
+  supports_teleconsult (available doctors only)
+- POST   /reservations                      -> 201 {"reservation_id", "expires_in"}
+  body: doctor_id, department, ttl_seconds; 409 when the doctor is gone
+- POST   /reservations/{id}/confirm         -> 200; 404 once expired
+- DELETE /reservations/{id}                 -> 200; cancels or ends the loan
+
+How it works:
+1. Availability: every partner is queried concurrently (asyncio.gather)
+   with its own timeout, so a refresh takes one round trip to the slowest
+   responding partner, not the sum. Answers are cached for CACHE_TTL
+   seconds; a partner that fails or times out keeps its previous answer
+   (marked stale) until it responds again. The periodic job refreshes the
+   cache and syncs the pool, so allocation decisions read local state.
+2. Reservation/confirm: before a partner doctor is assigned, the pool
+   reserves it (all doctors of an allocation round concurrently, one
+   round trip, with STATE_LOCK released). The local assignment then
+   confirms the reservation in the background, retrying once after a
+   timeout or connection error; if the partner still does not confirm,
+   the assignment is revoked, the reservation cancelled and the release
+   written to the activity log. A release cancels the reservation. A
+   declined reservation takes the doctor offline until the next refresh.
+3. The HTTP client runs on the federation's own event loop thread, so the
+   synchronous pool (and the allocation worker thread) can wait on it
+   without blocking, or deadlocking with, the app's event loop.
+
+Partner doctors get pool ids from PARTNER_ID_BASE upwards, stable per
+(partner, partner's doctor id).
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from itertools import count
+from typing import Any, Coroutine, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+from app.services.activity_logger import get_activity_logger
+from app.services.spare_doctor_pool import SpareDoctor, get_spare_doctor_pool
+from app.services.state_lock import STATE_LOCK
+
+PARTNER_ID_BASE = 100_000
+
+
+@dataclass
+class PartnerHospital:
+    """A partner hospital's spare doctor endpoint."""
+    name: str
+    base_url: str
+
+
+@dataclass
+class PartnerAvailability:
+    """Cached answer of one partner."""
+    doctors: List[Dict]
+    fetched_at: float          # monotonic time of the last successful fetch
+    latency_ms: float = 0.0
+    error: Optional[str] = None  # last failure; the doctors are stale while set
+
+
+def parse_partners(entries: List[str]) -> List[PartnerHospital]:
+    """PartnerHospitals from "Name=http://host:port" entries (PARTNER_HOSPITALS)."""
+    partners = []
+    for entry in entries:
+        name, _, url = entry.partition("=")
+        if not url:
+            raise ValueError(f"partner entry must look like 'Name=http://host:port', got {entry!r}")
+        partners.append(PartnerHospital(name.strip(), url.strip().rstrip("/")))
+    return partners
+
+
+class PartnerFederation:
+    """Concurrent availability, reservation and release calls to partner hospitals."""
+
+    CONFIRM_ATTEMPTS = 2  # a timed-out confirm is retried once
+
+    def __init__(
+        self,
+        partners: List[PartnerHospital],
+        timeout_ms: int = 500,
+        cache_ttl_seconds: float = 30,
+        reservation_ttl_seconds: int = 120
+    ):
+        self.partners = {partner.name: partner for partner in partners}
+        self.timeout = timeout_ms / 1000
+        self.cache_ttl = cache_ttl_seconds
+        self.reservation_ttl = reservation_ttl_seconds
+
+        self._cache: Dict[str, PartnerAvailability] = {}
+        self._ids: Dict[Tuple[str, str], int] = {}  # (partner, partner's doctor id) -> pool id
+        self._next_id = count(PARTNER_ID_BASE)
+        self._failed_confirms = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    # -------------------------------------------------------------------------
+    # Event loop thread
+    # -------------------------------------------------------------------------
+
+    def start(self) -> None:
+        ready = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._client = httpx.AsyncClient(limits=httpx.Limits(max_connections=4 * max(len(self.partners), 1)))
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, name="partner-federation", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+        self.call(self._client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Schedule a coroutine on the federation loop (fire and forget)."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def call(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the federation loop and wait for its result."""
+        return self.submit(coro).result(timeout)
+
+    # -------------------------------------------------------------------------
+    # Availability
+    # -------------------------------------------------------------------------
+
+    async def _fetch(self, partner: PartnerHospital) -> None:
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(self._client.get(f"{partner.base_url}/spare-doctors"), self.timeout)
+            response.raise_for_status()
+            doctors = response.json()["doctors"]
+        except Exception as exc:  # timeouts, refused connections, bad payloads
+            previous = self._cache.get(partner.name)
+            error = f"{type(exc).__name__}: {exc}" if str(exc) else type(exc).__name__
+            self._cache[partner.name] = PartnerAvailability(
+                doctors=previous.doctors if previous else [],
+                fetched_at=previous.fetched_at if previous else 0.0,
+                latency_ms=(time.perf_counter() - started) * 1000,
+                error=error
+            )
+            return
+        self._cache[partner.name] = PartnerAvailability(
+            doctors=doctors,
+            fetched_at=time.monotonic(),
+            latency_ms=(time.perf_counter() - started) * 1000
+        )
+
+    async def fetch_all(self, force: bool = False) -> Dict[str, PartnerAvailability]:
+        """Availability of every partner; only expired (or failed) entries are fetched, concurrently."""
+        now = time.monotonic()
+        due = [
+            partner for name, partner in self.partners.items()
+            if force or name not in self._cache or self._cache[name].error
+            or now - self._cache[name].fetched_at >= self.cache_ttl
+        ]
+        if due:
+            await asyncio.gather(*(self._fetch(partner) for partner in due))
+        return dict(self._cache)
+
+    def _pool_id(self, partner: str, partner_doctor_id: Any) -> int:
+        key = (partner, str(partner_doctor_id))
+        pool_id = self._ids.get(key)
+        if pool_id is None:
+            pool_id = self._ids[key] = next(self._next_id)
+        return pool_id
+
+    def refresh(self, force: bool = False) -> Dict:
+        """Fetch partner availability and sync it into the spare doctor pool."""
+        availability = self.call(self.fetch_all(force))
+        offered = {
+            name: [
+                SpareDoctor(
+                    doctor_id=self._pool_id(name, doc["doctor_id"]),
+                    name=doc["name"],
+                    specialty=doc["specialty"],
+                    hospital_origin=name,
+                    patients_seen=doc.get("patients_seen", 0),
+                    max_patients=doc.get("max_patients", 10),
+                    supports_teleconsult=doc.get("supports_teleconsult", True),
+                    partner=name,
+                    partner_doctor_id=str(doc["doctor_id"])
+                )
+                for doc in answer.doctors
+            ]
+            for name, answer in availability.items()
+        }
+        with STATE_LOCK:
+            pool = get_spare_doctor_pool()
+            for name, doctors in offered.items():
+                pool.sync_partner_doctors(name, doctors)
+        return self.get_status()
+
+    # -------------------------------------------------------------------------
+    # Reservations (called by the pool through the gateway methods below)
+    # -------------------------------------------------------------------------
+
+    async def _reserve(self, doctor: SpareDoctor, department: str) -> Optional[str]:
+        partner = self.partners.get(doctor.partner)
+        if partner is None:
+            return None
+        try:
+            response = await asyncio.wait_for(self._client.post(
+                f"{partner.base_url}/reservations",
+                json={"doctor_id": doctor.partner_doctor_id, "department": department, "ttl_seconds": self.reservation_ttl}
+            ), self.timeout)
+        except Exception:
+            return None
+        if response.status_code != 201:
+            return None
+        return response.json()["reservation_id"]
+
+    async def _reserve_all(self, requests: List[Tuple[SpareDoctor, str]]) -> List[Optional[str]]:
+        return await asyncio.gather(*(self._reserve(doctor, department) for doctor, department in requests))
+
+    async def _confirm(self, doctor_id: int, partner: str, reservation_id: str) -> bool:
+        error = None
+        for _ in range(self.CONFIRM_ATTEMPTS):
+            try:
+                response = await asyncio.wait_for(
+                    self._client.post(f"{self.partners[partner].base_url}/reservations/{reservation_id}/confirm"),
+                    self.timeout
+                )
+            except Exception as exc:  # the partner may not have seen it; try again
+                error = f"{type(exc).__name__}: {exc}" if str(exc) else type(exc).__name__
+                continue
+            if response.status_code == 200:
+                return True
+            error = f"HTTP {response.status_code}"  # expired or refused; a retry would not help
+            break
+        self._failed_confirms += 1
+        await self._cancel(partner, reservation_id)
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._revoke, doctor_id, partner, reservation_id, error
+        )
+        return False
+
+    def _revoke(self, doctor_id: int, partner: str, reservation_id: str, error: str) -> None:
+        """Undo the local assignment of a doctor whose loan the partner did not confirm."""
+        reason = f"{partner} did not confirm the loan ({error})"
+        with STATE_LOCK:
+            result = get_spare_doctor_pool().revoke_partner_assignment(doctor_id, reservation_id, reason)
+            if result is None:
+                return  # released (or re-reserved) in the meantime
+            get_activity_logger().log_doctor_released(
+                doctor_id=doctor_id,
+                doctor_name=result["doctor"]["name"],
+                department=result["department"] or "unknown",
+                reason=reason,
+                initiated_by="partner"
+            )
+
+    async def _cancel(self, partner: str, reservation_id: str) -> None:
+        try:
+            await asyncio.wait_for(
+                self._client.delete(f"{self.partners[partner].base_url}/reservations/{reservation_id}"),
+                self.timeout
+            )
+        except Exception:
+            pass  # the partner's reservation TTL frees the doctor anyway
+
+    def reserve(self, requests: List[Tuple[SpareDoctor, str]]) -> Dict[int, Optional[str]]:
+        """Reserve partner doctors for departments, concurrently; doctor id -> reservation id (None: declined)."""
+        reservations = self.call(self._reserve_all(requests))
+        return {doctor.doctor_id: reservation for (doctor, _), reservation in zip(requests, reservations)}
+
+    def confirm(self, doctor: SpareDoctor) -> None:
+        if doctor.partner in self.partners and doctor.reservation_id:
+            self.submit(self._confirm(doctor.doctor_id, doctor.partner, doctor.reservation_id))
+
+    def release(self, doctor: SpareDoctor) -> None:
+        if doctor.partner in self.partners and doctor.reservation_id:
+            self.submit(self._cancel(doctor.partner, doctor.reservation_id))
+
+    # -------------------------------------------------------------------------
+    # Status
+    # -------------------------------------------------------------------------
+
+    def get_status(self) -> Dict:
+        now = time.monotonic()
+        return {
+            "partners": {
+                name: {
+                    "base_url": partner.base_url,
+                    "doctors_offered": len(self._cache[name].doctors) if name in self._cache else 0,
+                    "age_seconds": round(now - self._cache[name].fetched_at, 1)
+                    if name in self._cache and self._cache[name].fetched_at else None,
+                    "latency_ms": round(self._cache[name].latency_ms, 1) if name in self._cache else None,
+                    "error": self._cache[name].error if name in self._cache else None
+                }
+                for name, partner in self.partners.items()
+            },
+            "failed_confirms": self._failed_confirms
+        }
+
+
+# Federation for this process (started by the state owner when partners are configured)
+_federation: Optional[PartnerFederation] = None
+
+
+def start_partner_federation() -> Optional[PartnerFederation]:
+    """Connect the spare doctor pool to the configured partner hospitals."""
+    global _federation
+    if _federation is None and settings.PARTNER_HOSPITALS:
+        _federation = PartnerFederation(
+            parse_partners(settings.PARTNER_HOSPITALS),
+            timeout_ms=settings.PARTNER_TIMEOUT_MS,
+            cache_ttl_seconds=settings.PARTNER_CACHE_TTL_SECONDS,
+            reservation_ttl_seconds=settings.PARTNER_RESERVATION_TTL_SECONDS
+        )
+        _federation.start()
+        with STATE_LOCK:
+            get_spare_doctor_pool().set_partner_gateway(_federation)
+    return _federation
+
+
+def stop_partner_federation() -> None:
+    global _federation
+    if _federation is not None:
+        with STATE_LOCK:
+            get_spare_doctor_pool().set_partner_gateway(None)
+        _federation.stop()
+        _federation = None
+
+
+def get_partner_federation() -> Optional[PartnerFederation]:
+    """The running federation, or None without partner hospitals."""
+    return _federation
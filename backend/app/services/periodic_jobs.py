@@ -0,0 +1,296 @@
+"""
+SmartCare Periodic Jobs
+========================
+Asyncio scheduler for background maintenance, started from the app
+lifespan (or by the shared state owner).
+
+Default jobs, every QUEUE_UPDATE_INTERVAL seconds:
+- reprioritize: apply wait-time cap crossings to the queue
+- crowd_status: refresh CrowdManager department statuses from queue counts
+- allocator_history: record a queue-length sample per department for the
+  AI allocator's trend and prediction
+- arrival_profile (every ARRIVAL_REFIT_INTERVAL): fold newly completed
+  hours of check-ins into the seasonal arrival profiles
+- partner_availability (every PARTNER_CACHE_TTL_SECONDS, with partner
+  hospitals configured): fetch partner spare doctors into the pool
+
+Scheduling:
+- Each run is jittered by ±QUEUE_UPDATE_JITTER of the interval so jobs (and
+  workers) don't fire in lockstep.
+- A job never overlaps itself. A run that outlasts its interval counts as
+  an overrun and the next run starts one interval after it ends, instead
+  of a burst of catch-up runs; a manual `run_now()` while a run is in
+  flight is skipped.
+- Jobs run "inline" (on the event loop; cheap work only), in a "thread"
+  pool or in a "process" pool (the function and its result must pickle,
+  and it cannot see this process's in-memory services). Thread jobs that
+  touch the services hold STATE_LOCK.
+- Per-job timing and outcome counters are available from `metrics()`.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.priority_queue import get_priority_queue
+from app.services.crowd_manager import get_crowd_manager
+from app.services.ai_doctor_allocator import get_ai_allocator
+from app.services.arrival_forecast import get_arrival_forecaster, database_checkins, activity_checkins
+from app.services.partner_federation import get_partner_federation
+from app.services.state_lock import STATE_LOCK
+
+EXECUTORS = ("inline", "thread", "process")
+
+STANDARD_DEPARTMENTS = ["general", "emergency", "pediatrics", "cardiology", "neurology", "orthopedics"]
+
+
+@dataclass
+class JobStats:
+    """Timing and outcome counters for one job."""
+    runs: int = 0
+    failures: int = 0
+    overruns: int = 0   # runs that took longer than the interval
+    skipped: int = 0    # manual runs dropped because a run was in flight
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last_ms: float = 0.0
+    last_run: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+    def record(self, elapsed_ms: float, error: Optional[str]) -> None:
+        self.runs += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.last_ms = elapsed_ms
+        self.last_run = datetime.utcnow()
+        self.last_error = error
+        if error is not None:
+            self.failures += 1
+
+    def to_dict(self) -> Dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "avg_ms": round(self.total_ms / self.runs, 2) if self.runs else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "last_ms": round(self.last_ms, 2),
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "last_error": self.last_error
+        }
+
+
+@dataclass
+class PeriodicJob:
+    """A function run every `interval` seconds (± jitter)."""
+    name: str
+    func: Callable[[], Any]
+    interval: float
+    jitter: float = 0.1
+    executor: str = "thread"
+    first_delay: Optional[float] = None  # seconds before the first run (default: one interval)
+    stats: JobStats = field(default_factory=JobStats)
+    running: bool = False
+
+    def next_delay(self) -> float:
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class PeriodicScheduler:
+    """Runs PeriodicJobs as asyncio tasks on the current event loop."""
+
+    def __init__(self, max_threads: int = 2, max_processes: int = 1):
+        self._jobs: Dict[str, PeriodicJob] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._threads = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="periodic-job")
+        self._max_processes = max_processes
+        self._processes: Optional[ProcessPoolExecutor] = None  # created on first process job
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        interval: float,
+        jitter: float = 0.1,
+        executor: str = "thread",
+        first_delay: Optional[float] = None
+    ) -> PeriodicJob:
+        if executor not in EXECUTORS:
+            raise ValueError(f"executor must be one of {EXECUTORS}, got {executor!r}")
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, got {interval}")
+        job = PeriodicJob(name, func, interval, min(max(jitter, 0.0), 1.0), executor, first_delay)
+        self._jobs[name] = job
+        return job
+
+    def start(self) -> None:
+        """Start every job's loop (call from a running event loop)."""
+        for job in self._jobs.values():
+            self._tasks.append(asyncio.create_task(self._loop(job), name=f"periodic-{job.name}"))
+
+    async def stop(self) -> None:
+        """Cancel the job loops and shut the pools down (runs in flight finish)."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._threads.shutdown(wait=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=True)
+
+    async def run_now(self, name: str) -> Any:
+        """Run a job immediately; None if it is already running."""
+        job = self._jobs[name]
+        if job.running:
+            job.stats.skipped += 1
+            return None
+        return await self._run(job)
+
+    def metrics(self) -> Dict[str, Dict]:
+        return {
+            name: {"interval_seconds": job.interval, "executor": job.executor, **job.stats.to_dict()}
+            for name, job in self._jobs.items()
+        }
+
+    async def _loop(self, job: PeriodicJob) -> None:
+        loop = asyncio.get_running_loop()
+        next_at = loop.time() + (job.first_delay if job.first_delay is not None else job.next_delay())
+        while True:
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+            if job.running:  # a manual run_now() is in flight
+                next_at = loop.time() + job.next_delay()
+                continue
+            started = loop.time()
+            await self._run(job)
+            next_at = started + job.next_delay()
+            if loop.time() >= next_at:
+                job.stats.overruns += 1
+                next_at = loop.time() + job.next_delay()
+
+    async def _run(self, job: PeriodicJob) -> Any:
+        job.running = True
+        started = time.perf_counter()
+        result, error = None, None
+        try:
+            if job.executor == "inline":
+                result = job.func()
+            elif job.executor == "thread":
+                result = await asyncio.get_running_loop().run_in_executor(self._threads, job.func)
+            else:
+                if self._processes is None:
+                    self._processes = ProcessPoolExecutor(max_workers=self._max_processes)
+                result = await asyncio.get_running_loop().run_in_executor(self._processes, job.func)
+        except Exception as exc:  # keep the schedule going; the error is in the metrics
+            error = f"{type(exc).__name__}: {exc}"
+        finally:
+            job.running = False
+            job.stats.record((time.perf_counter() - started) * 1000, error)
+        return result
+
+
+# =============================================================================
+# DEFAULT JOBS
+# =============================================================================
+
+def reprioritize_queue() -> int:
+    """Apply wait-time cap crossings; returns the number of entries moved."""
+    with STATE_LOCK:
+        return get_priority_queue().recalculate_all_priorities()
+
+
+def refresh_department_statuses() -> int:
+    """Re-derive each department's crowd status from its current queue length."""
+    with STATE_LOCK:
+        pq = get_priority_queue()
+        cm = get_crowd_manager()
+        for dept in STANDARD_DEPARTMENTS:
+            previous = cm.get_department_status(dept)
+            cm.update_department_status(
+                department=dept,
+                current_queue=pq.department_size(dept),
+                active_doctors=previous.active_doctors if previous else 2,  # Default
+                spare_doctors=previous.spare_doctors_assigned if previous else 0,
+                teleconsult_redirects=previous.teleconsult_redirects if previous else 0
+            )
+        return len(STANDARD_DEPARTMENTS)
+
+
+def record_allocator_history() -> int:
+    """Sample every department so allocator trends advance without traffic."""
+    with STATE_LOCK:
+        return len(get_ai_allocator().analyze_all_departments())
+
+
+def refit_arrival_profiles() -> Dict:
+    """Fold the hours completed since the last refit into the arrival profiles."""
+    def logged_checkins(start: datetime, end: datetime):
+        with STATE_LOCK:
+            return activity_checkins(start, end)
+
+    # The database read runs without the state lock
+    return get_arrival_forecaster().refit(sources=(database_checkins, logged_checkins))
+
+
+def refresh_partner_availability() -> Dict:
+    """Fetch expired partner availability (concurrently) and sync it into the pool."""
+    federation = get_partner_federation()
+    return federation.refresh() if federation is not None else {}
+
+
+def create_default_scheduler() -> PeriodicScheduler:
+    scheduler = PeriodicScheduler()
+    interval, jitter = settings.QUEUE_UPDATE_INTERVAL, settings.QUEUE_UPDATE_JITTER
+    scheduler.add_job("reprioritize", reprioritize_queue, interval, jitter)
+    scheduler.add_job("crowd_status", refresh_department_statuses, interval, jitter)
+    scheduler.add_job("allocator_history", record_allocator_history, interval, jitter)
+    # First fit shortly after startup, then hourly folds of the new data
+    scheduler.add_job("arrival_profile", refit_arrival_profiles, settings.ARRIVAL_REFIT_INTERVAL, jitter, first_delay=10)
+    if settings.PARTNER_HOSPITALS:
+        scheduler.add_job(
+            "partner_availability", refresh_partner_availability,
+            settings.PARTNER_CACHE_TTL_SECONDS, jitter, first_delay=0
+        )
+    return scheduler
+
+
+# Scheduler for this process
+_scheduler: Optional[PeriodicScheduler] = None
+
+
+def start_periodic_jobs() -> PeriodicScheduler:
+    """Start the default jobs on the running event loop."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = create_default_scheduler()
+        _scheduler.start()
+    return _scheduler
+
+
+async def stop_periodic_jobs() -> None:
+    global _scheduler
+    if _scheduler is not None:
+        await _scheduler.stop()
+        _scheduler = None
+
+
+def start_periodic_jobs_thread() -> threading.Thread:
+    """Run the default jobs on an event loop of their own (for processes without one)."""
+    async def serve():
+        start_periodic_jobs()
+        await asyncio.Event().wait()
+
+    thread = threading.Thread(target=asyncio.run, args=(serve(),), name="periodic-jobs", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_periodic_scheduler() -> Optional[PeriodicScheduler]:
+    """The running scheduler, or None when periodic jobs are not started."""
+    return _scheduler
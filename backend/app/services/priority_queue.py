@@ -2,6 +2,8 @@
 SmartCare Priority Queue System
 ================================
 Max-heap based priority queue with dynamic recalculation.
+Backed by an indexed heap: updates and removals happen in place.
+Wait-time aging is analytic - time passing never re-keys the queue.
 NO FIFO - patients are served by medical urgency!
 
 Key Features:
@@ -12,20 +14,50 @@ Key Features:
 """
 
 import heapq
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Iterable, Optional, Tuple, Iterator
 from datetime import datetime, timedelta
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
+from app.core.config import settings
 from app.core.constants import (
     PRIORITY_WEIGHTS, QUEUE_THRESHOLDS, BASE_WAIT_TIMES,
     SEVERITY_DESCRIPTIONS
 )
+from app.services.indexed_heap import IndexedHeap
+from app.services.order_statistic import OrderStatisticTree
+from app.services.shared_state import get_shared_service
+
+
+# Fixed reference point for the time-invariant aging key. Any constant works;
+# it only keeps the key magnitudes small.
+AGING_EPOCH = datetime(2024, 1, 1)
+
+# Lane keys are exact integers so equal priorities tie exactly and fall back
+# to check-in order: scores in 1e-4 units (calculate_priority_score rounds to
+# 4 dp), times in microseconds.
+_SCORE_UNITS = 10_000
+_MICROSECOND = timedelta(microseconds=1)
+
+_MAX_WAIT_MINUTES = QUEUE_THRESHOLDS["max_wait_time_minutes"]
+_WAIT_WEIGHT = PRIORITY_WEIGHTS["wait_time"]
+
+# Distinct (triage, age, chronic, emergency) base scores memoized per queue;
+# the inputs come from small lookup tables, so the cache rarely fills up.
+BASE_SCORE_CACHE_SIZE = 4096
+
+# Uncapped entries age continuously, so their order relative to capped entries
+# drifts with time. Memoized snapshots (and the /list ETag) roll over once per
+# tick even without a mutation.
+AGING_TICK_SECONDS = 60
 
 
 @dataclass(order=True)
 class QueueItem:
     """
     Queue item with comparison support for heap operations.
-    Uses negative priority for max-heap behavior (Python's heapq is min-heap).
+    Uses negative priority for max-heap behavior (the indexed heap is a min-heap).
+    
+    priority is the score at zero wait; the wait-time component is applied
+    analytically by SmartPriorityQueue (see effective_priority).
     """
     priority: float = field(compare=True)
     timestamp: datetime = field(compare=True)  # For tie-breaking (FIFO within same priority)
@@ -33,6 +65,9 @@ class QueueItem:
     entry_id: int = field(compare=False)
     triage_score: int = field(compare=False)
     is_emergency: bool = field(compare=False, default=False)
+    age_factor: float = field(compare=False, default=1.0)
+    chronic_factor: float = field(compare=False, default=0.0)
+    department: str = field(compare=False, default="general")
     
     def to_dict(self) -> Dict:
         return {
@@ -45,6 +80,140 @@ class QueueItem:
         }
 
 
+class _Lane:
+    """
+    Entries sharing one ordering key: an indexed heap for peek/pop and an
+    order-statistic index for positions and sorted iteration.
+    """
+    
+    __slots__ = ("heap", "ranks")
+    
+    def __init__(self):
+        self.heap = IndexedHeap()
+        self.ranks = OrderStatisticTree()
+    
+    def __len__(self) -> int:
+        return len(self.heap)
+    
+    def add(self, entry_id: int, sort_key: Tuple) -> None:
+        self.heap.push(entry_id, sort_key)
+        self.ranks.insert(entry_id, sort_key)
+    
+    def discard(self, entry_id: int) -> None:
+        self.heap.remove(entry_id)
+        self.ranks.remove(entry_id)
+    
+    def rekey(self, entry_id: int, sort_key: Tuple) -> None:
+        self.heap.update(entry_id, sort_key)
+        self.ranks.insert(entry_id, sort_key)  # moves the entry
+    
+    def clear(self) -> None:
+        self.heap.clear()
+        self.ranks.clear()
+
+
+class _DepartmentQueue:
+    """
+    One department's sub-queue, split into an aging lane (wait below the
+    cap) and a capped lane (wait bonus maxed out).
+    """
+    
+    __slots__ = ("aging", "capped", "version")
+    
+    def __init__(self):
+        self.aging = _Lane()
+        self.capped = _Lane()
+        self.version = 0  # bumped on every change to this department
+    
+    def __len__(self) -> int:
+        return len(self.aging) + len(self.capped)
+    
+    def clear(self) -> None:
+        self.aging.clear()
+        self.capped.clear()
+
+
+# Info severities that count as critical for staffing decisions
+CRITICAL_SEVERITIES = ("CRITICAL", "HIGH")
+
+
+def severity_bucket(triage_score: int) -> str:
+    """get_stats bucket of a 1-10 triage score."""
+    if triage_score >= 9:
+        return "critical"
+    if triage_score >= 7:
+        return "urgent"
+    if triage_score >= 5:
+        return "moderate"
+    if triage_score >= 3:
+        return "low"
+    return "minimal"
+
+
+_SEVERITY_BUCKETS = {score: severity_bucket(score) for score in range(11)}
+
+
+class QueueCounters:
+    """
+    Running totals behind get_stats, maintained on every add/remove so
+    counts and average wait are O(1). Average wait is derived from the sum
+    of check-in times: now - mean(check_in).
+    
+    The queue keeps one per department; hospital-wide figures are the
+    combined department counters.
+    """
+    
+    __slots__ = ("size", "severity", "emergency", "checkin_sum_us")
+    
+    def __init__(self):
+        self.size = 0
+        self.severity = dict.fromkeys(("critical", "urgent", "moderate", "low", "minimal"), 0)
+        self.emergency = 0
+        self.checkin_sum_us = 0  # µs since AGING_EPOCH
+    
+    def add(self, triage_score: int, is_emergency: bool, checkin_us: int, delta: int = 1) -> None:
+        self.size += delta
+        self.severity[_SEVERITY_BUCKETS.get(triage_score) or severity_bucket(triage_score)] += delta
+        if is_emergency:
+            self.emergency += delta
+        self.checkin_sum_us += delta * checkin_us
+    
+    @classmethod
+    def combined(cls, parts: Iterable["QueueCounters"]) -> "QueueCounters":
+        """Sum of several counters (e.g. all departments)."""
+        total = cls()
+        for part in parts:
+            total.size += part.size
+            total.emergency += part.emergency
+            total.checkin_sum_us += part.checkin_sum_us
+            for bucket, count in part.severity.items():
+                total.severity[bucket] += count
+        return total
+    
+    def to_stats(self, now: datetime) -> Dict:
+        if not self.size:
+            avg_wait = 0
+        else:
+            now_us = (now - AGING_EPOCH) // _MICROSECOND
+            avg_wait = round((now_us - self.checkin_sum_us / self.size) / 60_000_000, 1)
+        return {
+            "total_patients": self.size,
+            "avg_wait_minutes": avg_wait,
+            "critical_count": self.severity["critical"],
+            "urgent_count": self.severity["urgent"],
+            "moderate_count": self.severity["moderate"],
+            "low_count": self.severity["low"],
+            "minimal_count": self.severity["minimal"],
+            "emergency_count": self.emergency
+        }
+
+
+def _shifted(ranks: OrderStatisticTree, shift: int) -> Iterator[Tuple[Tuple, int]]:
+    """A lane's in-order (sort_key, entry_id) pairs with the priority term shifted."""
+    for key, entry_id in ranks:
+        yield (key[0] - shift,) + key[1:], entry_id
+
+
 class SmartPriorityQueue:
     """
     Priority Queue using Max-Heap for patient scheduling.
@@ -61,16 +230,101 @@ class SmartPriorityQueue:
     - age_factor: 0-1 (higher for elderly/infants)
     - chronic_factor: 0-1 (higher for chronic conditions)
     - emergency_boost: 0 or 1 (manual override)
-    """
     
+    Storage:
+    ========
+    One sub-queue per department (heap + rank index). Department reads and
+    pops touch only that department; the global view is a k-way merge of
+    the department sub-queues.
+    
+    Aging:
+    ======
+    The wait-time term grows linearly until max_wait_time_minutes, so it is
+    never stored. Each department keeps two lanes:
+    - aging:  wait below the cap, keyed by base - rate × (check_in - epoch).
+              Everyone ages at the same rate, so this key stays correctly
+              ordered as time passes.
+    - capped: wait at the cap, keyed by base + wait weight.
+    A cap-crossing schedule (min-heap on check_in + max wait) moves entries
+    between lanes in O(log n) when their cap passes; reads merge the lanes
+    at the current time. No entry is ever re-keyed just because time passed.
+
+    Hot path:
+    =========
+    push/update/pop sift the lane heaps, stage the new key in the lane's
+    rank index (applied on the next position read, see order_statistic.py)
+    and append to the cap schedule. Entries leaving an aging lane are not
+    searched out of the schedule; they are skipped when their time comes.
+    """
+
     def __init__(self):
-        self._heap: List[Tuple[float, datetime, QueueItem]] = []
+        self._departments: Dict[str, _DepartmentQueue] = {}  # department -> sub-queue
         self._entries: Dict[int, QueueItem] = {}  # entry_id -> QueueItem
-        self._removed: set = set()  # Set of removed entry_ids (lazy deletion)
         self._patient_info: Dict[int, Dict] = {}  # entry_id -> patient display info
         self._queue: List = []  # Alias for compatibility
         self._entry_map: Dict[int, QueueItem] = {}  # Alias for compatibility
         self._current_patients: Dict[str, Dict] = {}  # department -> current patient being seen
+        
+        # Cap-crossing schedule: heapq of (time the wait reaches the cap,
+        # entry_id) covering every entry in an aging lane. Entries that left
+        # their aging lane stay until popped (stale) or compacted away.
+        self._cap_events: List[Tuple[datetime, int]] = []
+        self._max_wait = timedelta(minutes=QUEUE_THRESHOLDS["max_wait_time_minutes"])
+        self._max_wait_us = self._max_wait // _MICROSECOND
+        self._wait_units = round(PRIORITY_WEIGHTS["wait_time"] * _SCORE_UNITS)
+        self._base_scores: Dict[Tuple, float] = {}  # see base_score
+        
+        # Mutation version: bumped on every change to queued entries or their
+        # display info. Sorted snapshots are memoized against it (per
+        # department against that department's own version) and the aging tick.
+        # A snapshot is also dropped once its order would change by aging
+        # alone, so its positions always agree with rank().
+        self._version = 0
+        self._snapshots: Dict[Optional[str], Tuple[Tuple[int, int], Optional[datetime], List[Dict]]] = {}
+        
+        # Incrementally maintained statistics per department
+        self._department_totals: Dict[str, QueueCounters] = {}
+        
+        # Write-ahead journal receiving every mutation (see queue_journal.py)
+        self._journal = None
+    
+    @property
+    def version(self) -> int:
+        """Monotonically increasing queue mutation counter (usable as an ETag)."""
+        return self._version
+    
+    def department_version(self, department: str) -> int:
+        """Mutation counter of a single department's sub-queue."""
+        dq = self._departments.get(department.lower())
+        return dq.version if dq else 0
+    
+    def aging_tick(self, now: datetime = None) -> int:
+        """Index of the current AGING_TICK_SECONDS window since AGING_EPOCH."""
+        now = now or datetime.utcnow()
+        return int((now - AGING_EPOCH).total_seconds() // AGING_TICK_SECONDS)
+    
+    def _version_of(self, department: Optional[str]) -> int:
+        return self._version if department is None else self.department_version(department)
+    
+    def _touch(self, *departments: str) -> None:
+        """Record a mutation; invalidates the memoized queue snapshots."""
+        self._version += 1
+        for department in departments:
+            self._departments[department].version += 1
+    
+    def _department(self, department: str) -> _DepartmentQueue:
+        if department not in self._departments:
+            self._departments[department] = _DepartmentQueue()
+        return self._departments[department]
+    
+    def attach_journal(self, journal) -> None:
+        """Send every subsequent mutation to a write-ahead journal."""
+        self._journal = journal
+    
+    def _log(self, *record) -> None:
+        """Append a mutation record to the attached journal, if any."""
+        if self._journal is not None:
+            self._journal.append(*record)
     
     def calculate_priority_score(
         self,
@@ -116,6 +370,121 @@ class SmartPriorityQueue:
         
         return round(score, 4)
     
+    def base_score(self, triage_score: int, age_factor: float, chronic_factor: float,
+                   is_emergency: bool) -> float:
+        """calculate_priority_score at zero wait, memoized (round() dominates its cost)."""
+        key = (triage_score, age_factor, chronic_factor, is_emergency)
+        score = self._base_scores.get(key)
+        if score is None:
+            if len(self._base_scores) >= BASE_SCORE_CACHE_SIZE:
+                self._base_scores.clear()
+            score = self._base_scores[key] = self.calculate_priority_score(
+                triage_score, 0, age_factor, chronic_factor, is_emergency
+            )
+        return score
+    
+    def effective_priority(self, item: QueueItem, now: datetime = None) -> float:
+        """Priority score of a queued item including its wait-time component at now."""
+        now = now or datetime.utcnow()
+        wait_norm = (now - item.timestamp).total_seconds() / 60 / _MAX_WAIT_MINUTES
+        if wait_norm > 1.0:
+            wait_norm = 1.0
+        return -item.priority + wait_norm * _WAIT_WEIGHT
+    
+    # -------------------------------------------------------------------------
+    # Analytic aging
+    # -------------------------------------------------------------------------
+    
+    # Keys below are scores scaled by _SCORE_UNITS × max wait (µs), so the
+    # wait term wait_weight × wait / max_wait is an integer too.
+    
+    def _aging_credit(self, when: datetime) -> int:
+        """Uncapped wait-time score accrued from AGING_EPOCH until when (scaled)."""
+        return self._wait_units * ((when - AGING_EPOCH) // _MICROSECOND)
+    
+    def _base_units(self, item: QueueItem) -> int:
+        return round(-item.priority * _SCORE_UNITS) * self._max_wait_us
+    
+    def _aging_key(self, item: QueueItem, checkin_us: int = None) -> Tuple[int, datetime, int]:
+        """Aging-lane key: -(base - credit(check_in)). Effective key = key - credit(now)."""
+        if checkin_us is None:
+            checkin_us = (item.timestamp - AGING_EPOCH) // _MICROSECOND
+        key = self._wait_units * checkin_us - round(-item.priority * _SCORE_UNITS) * self._max_wait_us
+        return (key, item.timestamp, item.entry_id)
+    
+    def _capped_key(self, item: QueueItem) -> Tuple[int, datetime, int]:
+        """Capped-lane key: -(base + full wait weight), already effective."""
+        key = -self._base_units(item) - self._wait_units * self._max_wait_us
+        return (key, item.timestamp, item.entry_id)
+    
+    def _advance(self, now: datetime) -> int:
+        """
+        Move entries whose wait reached the cap by now into the capped lane.
+        O(log n) per crossing. Returns the number of entries moved.
+        """
+        events = self._cap_events
+        moved = 0
+        while events and events[0][0] <= now:
+            cap_time, entry_id = heapq.heappop(events)
+            item = self._entries.get(entry_id)
+            if item is None or item.timestamp + self._max_wait != cap_time:
+                continue  # removed, or re-checked-in with a new time
+            dq = self._departments[item.department]
+            if entry_id not in dq.aging.heap:
+                continue  # already moved by an earlier copy of this event
+            dq.aging.discard(entry_id)
+            dq.capped.add(entry_id, self._capped_key(item))
+            moved += 1
+        return moved
+    
+    def _clock(self) -> datetime:
+        """Current time, with cap crossings up to it applied."""
+        now = datetime.utcnow()
+        if self._cap_events and self._cap_events[0][0] <= now:
+            self._advance(now)
+        return now
+    
+    def _lanes(self, department: Optional[str], now: datetime) -> List[Tuple[_Lane, int]]:
+        """
+        Non-empty lanes (all departments, or one) paired with the shift that
+        turns a lane key into the effective key at now: effective = key - shift.
+        """
+        if department is None:
+            queues = self._departments.values()
+        else:
+            dq = self._departments.get(department)
+            queues = (dq,) if dq else ()
+        credit = self._aging_credit(now)
+        lanes = []
+        for dq in queues:
+            if len(dq.aging):
+                lanes.append((dq.aging, credit))
+            if len(dq.capped):
+                lanes.append((dq.capped, 0))
+        return lanes
+    
+    @staticmethod
+    def _count_ahead(lanes: List[Tuple[_Lane, int]], own: _Lane, key: Tuple, shift: int) -> int:
+        """Entries across lanes ordered before the entry with lane key `key` in `own`."""
+        effective = key[0] - shift
+        ahead = own.ranks.count_less(key)
+        for lane, lane_shift in lanes:
+            if lane is not own:
+                ahead += lane.ranks.count_less((effective + lane_shift,) + key[1:])
+        return ahead
+    
+    def _ordered(self, department: Optional[str], now: datetime) -> Iterator[Tuple[Tuple, int]]:
+        """(effective key, entry_id) in priority order: a lazy merge of the lanes."""
+        streams = [
+            _shifted(lane.ranks, shift) if shift else iter(lane.ranks)
+            for lane, shift in self._lanes(department, now)
+        ]
+        return heapq.merge(*streams)
+    
+    # -------------------------------------------------------------------------
+    # Queue operations
+    # -------------------------------------------------------------------------
+    
     def push(
         self,
         patient_id: int,
@@ -124,126 +493,398 @@ class SmartPriorityQueue:
         age_factor: float = 1.0,
         chronic_factor: float = 0.0,
         is_emergency: bool = False,
-        check_in_time: datetime = None
+        check_in_time: datetime = None,
+        patient_info: Dict = None,
+        department: str = None
     ) -> float:
         """
         Add patient to priority queue.
         
+        Department defaults to the one in patient_info, else "general".
+        
         Returns: calculated priority score
         """
-        check_in_time = check_in_time or datetime.utcnow()
-        wait_minutes = 0  # Just checked in
-        
-        priority_score = self.calculate_priority_score(
-            triage_score=triage_score,
-            wait_minutes=wait_minutes,
-            age_factor=age_factor,
-            chronic_factor=chronic_factor,
-            is_emergency=is_emergency
+        now = datetime.utcnow()
+        item = self._new_item(
+            patient_id, entry_id, triage_score, age_factor, chronic_factor,
+            is_emergency, check_in_time, patient_info, department, now
         )
         
-        item = QueueItem(
+        if entry_id in self._entries:
+            old_item = self._entries[entry_id]
+            self._unindex(old_item)
+            self._touch(old_item.department)
+        self._index(item, now)
+        if patient_info is not None:
+            self._patient_info[entry_id] = patient_info
+        self._touch(item.department)
+        self._log_push(item, patient_info)
+        
+        return self.effective_priority(item, now)
+    
+    def push_many(self, patients: List[Dict]) -> List[float]:
+        """
+        Add many patients at once. Each dict takes push()'s keyword
+        arguments; an entry_id repeated later in the batch wins. As with
+        push(), an entry pushed without patient_info keeps the info it had.
+        
+        New entries are indexed in bulk (one heapify and one sorted merge
+        per lane) instead of one O(log n) insert each.
+        
+        Returns: priority scores, aligned with patients
+        """
+        now = datetime.utcnow()
+        batch: Dict[int, Tuple[QueueItem, Optional[Dict]]] = {}
+        for patient in patients:
+            item = self._new_item(now=now, **patient)
+            patient_info = patient.get("patient_info")
+            if patient_info is None:
+                earlier = batch.get(item.entry_id)
+                patient_info = earlier[1] if earlier else self._patient_info.get(item.entry_id)
+            batch[item.entry_id] = (item, patient_info)
+        
+        for entry_id in batch:
+            self.remove(entry_id)  # re-check-in replaces the old entry (info carried over above)
+        self._bulk_index([item for item, _ in batch.values()], now)
+        for item, patient_info in batch.values():
+            if patient_info is not None:
+                self._patient_info[item.entry_id] = patient_info
+            self._log_push(item, patient_info)
+        self._touch(*{item.department for item, _ in batch.values()})
+        
+        return [
+            self.effective_priority(batch[patient["entry_id"]][0], now) for patient in patients
+        ]
+    
+    def _new_item(
+        self,
+        patient_id: int,
+        entry_id: int,
+        triage_score: int,
+        age_factor: float = 1.0,
+        chronic_factor: float = 0.0,
+        is_emergency: bool = False,
+        check_in_time: datetime = None,
+        patient_info: Dict = None,
+        department: str = None,
+        now: datetime = None
+    ) -> QueueItem:
+        """QueueItem for push() arguments (base score at zero wait)."""
+        if department is None:
+            department = (patient_info or {}).get("department") or "general"
+        priority_score = self.base_score(triage_score, age_factor, chronic_factor, is_emergency)
+        return QueueItem(
             priority=-priority_score,  # Negative for max-heap
-            timestamp=check_in_time,
+            timestamp=check_in_time or now or datetime.utcnow(),
             patient_id=patient_id,
             entry_id=entry_id,
             triage_score=triage_score,
-            is_emergency=is_emergency
+            is_emergency=is_emergency,
+            age_factor=age_factor,
+            chronic_factor=chronic_factor,
+            department=department.lower()
         )
-        
-        heapq.heappush(self._heap, (item.priority, item.timestamp, item))
-        self._entries[entry_id] = item
-        
-        return priority_score
     
-    def pop(self) -> Optional[QueueItem]:
+    def _log_push(self, item: QueueItem, patient_info: Optional[Dict]) -> None:
+        if self._journal is None:
+            return
+        self._log(
+            "push", item.patient_id, item.entry_id, item.triage_score, item.age_factor,
+            item.chronic_factor, item.is_emergency, (item.timestamp - AGING_EPOCH) // _MICROSECOND,
+            patient_info, item.department
+        )
+    
+    def pop(self, department: str = None) -> Optional[QueueItem]:
         """
         Remove and return highest priority patient.
-        Uses lazy deletion for efficiency.
-        """
-        while self._heap:
-            priority, timestamp, item = heapq.heappop(self._heap)
-            
-            # Skip if this entry was removed
-            if item.entry_id in self._removed:
-                self._removed.discard(item.entry_id)
-                continue
-            
-            # Valid entry - remove from tracking
-            if item.entry_id in self._entries:
-                del self._entries[item.entry_id]
-            
-            return item
-        
-        return None
+        With a department, pops from that department's sub-queue only.
+        """
+        item = self.peek(department)
+        if item is None:
+            return None
+        self._unindex(item)
+        self._patient_info.pop(item.entry_id, None)
+        self._touch(item.department)
+        self._log("remove", item.entry_id)
+        return item
     
-    def peek(self) -> Optional[QueueItem]:
-        """Get highest priority patient without removing."""
-        while self._heap:
-            priority, timestamp, item = self._heap[0]
-            
-            if item.entry_id in self._removed:
-                heapq.heappop(self._heap)
-                self._removed.discard(item.entry_id)
-                continue
-            
-            return item
-        
-        return None
+    def peek(self, department: str = None) -> Optional[QueueItem]:
+        """
+        Get highest priority patient without removing.
+        Compares the lane heap tops (two per department) at the current time.
+        """
+        now = self._clock()
+        if department is None:
+            queues = self._departments.values()
+        else:
+            dq = self._departments.get(department.lower())
+            queues = (dq,) if dq else ()
+        credit = self._aging_credit(now)
+        best = None
+        for dq in queues:
+            for heap, shift in ((dq.aging.heap, credit), (dq.capped.heap, 0)):
+                top = heap.peek()
+                if top is None:
+                    continue
+                key, entry_id = top
+                key = (key[0] - shift,) + key[1:]
+                if best is None or key < best[0]:
+                    best = (key, entry_id)
+        if best is None:
+            return None
+        return self._entries[best[1]]
     
     def remove(self, entry_id: int) -> bool:
-        """Mark entry for lazy deletion."""
+        """Remove entry from the queue in place (O(log n))."""
         if entry_id in self._entries:
-            self._removed.add(entry_id)
-            del self._entries[entry_id]
+            item = self._entries[entry_id]
+            self._unindex(item)
+            self._patient_info.pop(entry_id, None)
+            self._touch(item.department)
+            self._log("remove", entry_id)
             return True
         return False
     
+    def _count(self, item: QueueItem, delta: int, checkin_us: int = None) -> None:
+        """Add (delta=1) or retract (delta=-1) an item from the running statistics."""
+        if checkin_us is None:
+            checkin_us = (item.timestamp - AGING_EPOCH) // _MICROSECOND
+        department_totals = self._department_totals.get(item.department)
+        if department_totals is None:
+            department_totals = self._department_totals[item.department] = QueueCounters()
+        department_totals.add(item.triage_score, item.is_emergency, checkin_us, delta)
+    
+    def _recount_severity(self, department: str, old_score: int, new_score: int) -> None:
+        """Move one entry between severity buckets in the running statistics."""
+        old_bucket, new_bucket = severity_bucket(old_score), severity_bucket(new_score)
+        if old_bucket != new_bucket:
+            severity = self._department_totals[department].severity
+            severity[old_bucket] -= 1
+            severity[new_bucket] += 1
+    
+    def _index(self, item: QueueItem, now: datetime) -> None:
+        """Add an item to the right lane of its department sub-queue."""
+        self._entries[item.entry_id] = item
+        checkin_us = (item.timestamp - AGING_EPOCH) // _MICROSECOND
+        self._count(item, 1, checkin_us)
+        dq = self._departments.get(item.department) or self._department(item.department)
+        cap_time = item.timestamp + self._max_wait
+        if cap_time <= now:
+            dq.capped.add(item.entry_id, self._capped_key(item))
+        else:
+            dq.aging.add(item.entry_id, self._aging_key(item, checkin_us))
+            heapq.heappush(self._cap_events, (cap_time, item.entry_id))
+    
+    def _unindex(self, item: QueueItem) -> None:
+        """Remove an item from its department sub-queue (and the cap schedule)."""
+        del self._entries[item.entry_id]
+        self._count(item, -1)
+        dq = self._departments[item.department]
+        if item.entry_id in dq.aging.heap:
+            dq.aging.discard(item.entry_id)  # its cap event goes stale
+            if len(self._cap_events) > 2 * len(self._entries) + 1024:
+                self._compact_cap_events()
+        else:
+            dq.capped.discard(item.entry_id)
+    
+    def _compact_cap_events(self) -> None:
+        """Drop stale cap events (entries no longer in an aging lane)."""
+        self._cap_events = [
+            (self._entries[entry_id].timestamp + self._max_wait, entry_id)
+            for dq in self._departments.values() for entry_id in dq.aging.heap
+        ]
+        heapq.heapify(self._cap_events)
+    
+    def _reindex(self, old_item: QueueItem, new_item: QueueItem) -> None:
+        """Re-key an item in place (decrease/increase-key), moving departments if needed."""
+        entry_id = new_item.entry_id
+        self._entries[entry_id] = new_item
+        if old_item.department != new_item.department or old_item.is_emergency != new_item.is_emergency:
+            self._count(old_item, -1)
+            self._count(new_item, 1)
+        elif old_item.triage_score != new_item.triage_score:
+            self._recount_severity(old_item.department, old_item.triage_score, new_item.triage_score)
+        old_dq = self._departments[old_item.department]
+        new_dq = old_dq if new_item.department == old_item.department else self._department(new_item.department)
+        # Check-in time is unchanged, so the entry stays in the same kind of lane
+        if entry_id in old_dq.aging.heap:
+            old_lane, new_lane, key = old_dq.aging, new_dq.aging, self._aging_key(new_item)
+        else:
+            old_lane, new_lane, key = old_dq.capped, new_dq.capped, self._capped_key(new_item)
+        if old_lane is new_lane:
+            new_lane.rekey(entry_id, key)
+        else:
+            old_lane.discard(entry_id)
+            new_lane.add(entry_id, key)
+    
+    def _lane_of(self, item: QueueItem) -> _Lane:
+        dq = self._departments[item.department]
+        return dq.aging if item.entry_id in dq.aging.heap else dq.capped
+    
+    def departments(self) -> Dict[str, int]:
+        """Queue length per department (departments with waiting patients)."""
+        return {name: len(dq) for name, dq in self._departments.items() if len(dq)}
+    
+    def department_size(self, department: str) -> int:
+        """Number of patients waiting in one department (O(1))."""
+        dq = self._departments.get(department.lower())
+        return len(dq) if dq else 0
+    
+    def iter_items(self, department: str = None) -> Iterator[QueueItem]:
+        """
+        Queued items in priority order. The global order is a lazy k-way
+        merge of the department lanes.
+        """
+        now = self._clock()
+        for _, entry_id in self._ordered(department.lower() if department else None, now):
+            yield self._entries[entry_id]
+    
+    def get_item(self, entry_id: int) -> Optional[QueueItem]:
+        """Queued item for an entry, or None."""
+        return self._entries.get(entry_id)
+    
+    def rank(self, entry_id: int, department: str = None) -> Optional[int]:
+        """
+        1-based queue position of an entry in O(L log n) for L lanes.
+        
+        With a department, returns the position within that department's
+        queue (None if the entry belongs to another department).
+        """
+        item = self._entries.get(entry_id)
+        if item is None:
+            return None
+        if department is not None and department.lower() != item.department:
+            return None
+        now = self._clock()
+        lanes = self._lanes(item.department if department is not None else None, now)
+        own = self._lane_of(item)
+        shift = next(lane_shift for lane, lane_shift in lanes if lane is own)
+        return self._count_ahead(lanes, own, own.ranks.sort_key_of(entry_id), shift) + 1
+    
+    def entry_at(self, position: int, department: str = None) -> Optional[QueueItem]:
+        """Item at a 1-based queue position (optionally within a department)."""
+        department = department.lower() if department else None
+        now = self._clock()
+        
+        cached = self._memoized_snapshot(department, now)
+        if cached is not None:
+            if 1 <= position <= len(cached[2]):
+                return self._entries[cached[2][position - 1]["entry_id"]]
+            return None
+        entry_id = self._select(position - 1, self._lanes(department, now))
+        return self._entries[entry_id] if entry_id is not None else None
+    
+    def _select(self, index: int, lanes: List[Tuple[_Lane, int]]) -> Optional[int]:
+        """
+        Entry id at 0-based rank across lanes without merging them: binary
+        search each lane for the element whose merged rank equals index.
+        O(L² log² n) for L lanes.
+        """
+        for lane, shift in lanes:
+            lo, hi = 0, len(lane) - 1
+            while lo <= hi:
+                mid = (lo + hi) // 2
+                key, entry_id = lane.ranks.select(mid)
+                merged_rank = self._count_ahead(lanes, lane, key, shift)
+                if merged_rank == index:
+                    return entry_id
+                if merged_rank < index:
+                    lo = mid + 1
+                else:
+                    hi = mid - 1
+        return None
+    
+    def get_entry(self, entry_id: int) -> Optional[Dict]:
+        """Serialized entry with its global and department positions."""
+        item = self.get_item(entry_id)
+        if item is None:
+            return None
+        data = self._entry_to_dict(
+            item, self.rank(entry_id), datetime.utcnow(), self.get_patient_info(entry_id)
+        )
+        data["department_position"] = self.rank(entry_id, item.department)
+        return data
+    
+    def get_patient_info(self, entry_id: int) -> Optional[Dict]:
+        """Display info stored for a queued entry."""
+        return self._patient_info.get(entry_id)
+    
+    def set_patient_info(self, entry_id: int, info: Dict) -> None:
+        """Attach (or replace) display info for a queued entry."""
+        self._patient_info[entry_id] = info
+        self._sync_department(entry_id)
+        self._touch(*self._departments_of(entry_id))
+        self._log("info", entry_id, info)
+    
+    def update_patient_info(self, entry_id: int, **fields) -> bool:
+        """Merge fields into an entry's display info."""
+        if entry_id not in self._patient_info:
+            return False
+        # Replaced rather than edited in place, for capture_state()
+        self._patient_info[entry_id] = {**self._patient_info[entry_id], **fields}
+        self._sync_department(entry_id)
+        self._touch(*self._departments_of(entry_id))
+        self._log("info", entry_id, self._patient_info[entry_id])
+        return True
+    
+    def _departments_of(self, entry_id: int) -> Tuple[str, ...]:
+        item = self.get_item(entry_id)
+        return (item.department,) if item else ()
+    
+    def _sync_department(self, entry_id: int) -> None:
+        """Move an entry between department indexes if its info changed department."""
+        item = self.get_item(entry_id)
+        department = self._patient_info[entry_id].get("department")
+        if item is None or not department or department.lower() == item.department:
+            return
+        self._reindex(item, replace(item, department=department.lower()))
+        self._touch(item.department)
+    
     def update_priority(
         self,
         entry_id: int,
         new_triage_score: int = None,
         age_factor: float = None,
         chronic_factor: float = None,
-        is_emergency: bool = None,
-        wait_minutes: int = None
+        is_emergency: bool = None
     ) -> Optional[float]:
         """
-        Update patient's priority (e.g., when wait time increases).
-        Uses lazy deletion + re-insertion for heap property.
+        Update patient's priority (e.g., re-triage or emergency flag).
+        Factors left as None keep the entry's current values. Waiting time
+        is accounted for automatically (see Aging).
+        The heap entry is re-keyed in place (decrease/increase-key).
+        
+        Returns: new effective priority score
         """
-        if entry_id not in self._entries:
+        old_item = self.get_item(entry_id)
+        if old_item is None:
             return None
         
-        old_item = self._entries[entry_id]
-        
-        # Remove old entry (lazy)
-        self._removed.add(entry_id)
+        triage_score = new_triage_score or old_item.triage_score
+        age_factor = age_factor if age_factor is not None else old_item.age_factor
+        chronic_factor = chronic_factor if chronic_factor is not None else old_item.chronic_factor
+        is_emergency = is_emergency if is_emergency is not None else old_item.is_emergency
         
-        # Recalculate with new values
-        new_score = self.calculate_priority_score(
-            triage_score=new_triage_score or old_item.triage_score,
-            wait_minutes=wait_minutes or 0,
-            age_factor=age_factor or 1.0,
-            chronic_factor=chronic_factor or 0.0,
-            is_emergency=is_emergency if is_emergency is not None else old_item.is_emergency
-        )
+        # Recalculate the base score with new values
+        new_score = self.base_score(triage_score, age_factor, chronic_factor, is_emergency)
         
-        # Re-insert with new priority
         new_item = QueueItem(
             priority=-new_score,
             timestamp=old_item.timestamp,
             patient_id=old_item.patient_id,
             entry_id=entry_id,
-            triage_score=new_triage_score or old_item.triage_score,
-            is_emergency=is_emergency if is_emergency is not None else old_item.is_emergency
+            triage_score=triage_score,
+            is_emergency=is_emergency,
+            age_factor=age_factor,
+            chronic_factor=chronic_factor,
+            department=old_item.department
         )
         
-        heapq.heappush(self._heap, (new_item.priority, new_item.timestamp, new_item))
-        self._entries[entry_id] = new_item
-        self._removed.discard(entry_id)
+        self._reindex(old_item, new_item)
+        self._touch(new_item.department)
+        self._log("update", entry_id, triage_score, age_factor, chronic_factor, is_emergency)
         
-        return new_score
+        return self.effective_priority(new_item)
     
     def emergency_override(self, entry_id: int) -> Optional[float]:
         """
@@ -252,132 +893,213 @@ class SmartPriorityQueue:
         """
         return self.update_priority(entry_id, is_emergency=True)
     
-    def get_queue_list(self) -> List[Dict]:
+    def escalate(self, entry_id: int, triage_score: int, severity: str) -> Optional[Dict]:
+        """
+        Emergency escalation in one call: new triage score plus the
+        emergency flag, the severity label in the patient info, and the
+        resulting position. Through a shared-state proxy the whole sequence
+        runs in the state owner, so no other worker can pop the entry
+        halfway through.
+        
+        Returns None if the entry is not queued.
+        """
+        item = self.get_item(entry_id)
+        if item is None:
+            return None
+        new_priority = self.update_priority(entry_id, new_triage_score=triage_score, is_emergency=True)
+        if new_priority is None:
+            return None  # called by another node meanwhile (Redis backend)
+        self.update_patient_info(entry_id, severity=severity)
+        info = self.get_patient_info(entry_id) or {}
+        return {
+            "entry_id": entry_id,
+            "patient_name": info.get("name", f"Patient #{item.patient_id}"),
+            "old_triage_score": item.triage_score,
+            "new_priority": new_priority,
+            "position": self.rank(entry_id) or 1
+        }
+    
+    def get_queue_list(self, department: str = None) -> List[Dict]:
         """
         Get sorted list of all patients in queue.
         Does NOT modify the heap.
+        
+        With a department, only that department's sub-queue is read and
+        "position" is the position within the department.
+        
+        The sorted snapshot is memoized until the next mutation, aging tick
+        or change of order (see _reorder_time), so repeated reads within a
+        request are O(1) and positions always match rank(). The returned
+        list is a fresh copy but the per-entry dicts are shared - treat them
+        as read-only.
+        """
+        return list(self._snapshot(department.lower() if department else None)[2])
+    
+    def list_stamp(self, department: str = None) -> Tuple[int, int, int]:
         """
-        # Filter out removed entries
-        valid_items = [
-            (p, t, item) for p, t, item in self._heap 
-            if item.entry_id not in self._removed
+        Identifies what get_queue_list(department) returns right now: it
+        changes with every mutation, aging tick and change of order (usable
+        in an ETag).
+        """
+        stamp, reorder_at, _ = self._snapshot(department.lower() if department else None)
+        return stamp + ((reorder_at - AGING_EPOCH) // _MICROSECOND if reorder_at else 0,)
+    
+    def _snapshot(self, department: Optional[str]) -> Tuple[Tuple[int, int], Optional[datetime], List[Dict]]:
+        """(version and aging tick, reorder time, rows) of the current sorted snapshot."""
+        now = self._clock()
+        cached = self._memoized_snapshot(department, now)
+        if cached is None:
+            rows, reorder_at = self._build_snapshot(department, now)
+            cached = ((self._version_of(department), self.aging_tick(now)), reorder_at, rows)
+            self._snapshots[department] = cached
+        return cached
+    
+    def _memoized_snapshot(self, department: Optional[str], now: datetime) -> Optional[Tuple]:
+        """The memoized snapshot of a department (or all) if it still holds at now."""
+        cached = self._snapshots.get(department)
+        if cached is None or cached[0] != (self._version_of(department), self.aging_tick(now)):
+            return None
+        if cached[1] is not None and now >= cached[1]:
+            return None
+        return cached
+    
+    def _build_snapshot(self, department: Optional[str], now: datetime) -> Tuple[List[Dict], Optional[datetime]]:
+        """Serialize live entries in rank order (lane indexes are already sorted)."""
+        items = [self._entries[entry_id] for _, entry_id in self._ordered(department, now)]
+        rows = [
+            self._entry_to_dict(item, i + 1, now, self._patient_info.get(item.entry_id))
+            for i, item in enumerate(items)
         ]
-        
-        # Sort by priority (already negative, so ascending = highest priority first)
-        sorted_items = sorted(valid_items, key=lambda x: (x[0], x[1]))
-        
-        result = []
-        for i, (priority, timestamp, item) in enumerate(sorted_items):
-            data = item.to_dict()
-            data["position"] = i + 1
-            data["severity_info"] = SEVERITY_DESCRIPTIONS.get(item.triage_score, {})
-            
-            # Add patient display info if available
-            if item.entry_id in self._patient_info:
-                info = self._patient_info[item.entry_id]
-                data["patient_name"] = info.get("name", f"Patient #{item.patient_id}")
-                data["age"] = info.get("age", 0)
-                data["symptoms"] = info.get("symptoms", [])
-                data["chronic_conditions"] = info.get("chronic_conditions", [])
-                data["department"] = info.get("department", "general")
-                data["severity"] = info.get("severity", "MEDIUM")
-                data["triage_explanation"] = info.get("explanation", [])
-            else:
-                data["patient_name"] = f"Patient #{item.patient_id}"
-                data["age"] = 0
-                data["symptoms"] = []
-                data["chronic_conditions"] = []
-                data["department"] = "general"
-                data["severity"] = "MEDIUM"
-                data["triage_explanation"] = []
-                
-            result.append(data)
-        
-        return result
+        return rows, self._reorder_time(items, now)
     
-    def recalculate_all_priorities(self, current_time: datetime = None) -> int:
+    def _reorder_time(self, items: List[QueueItem], now: datetime) -> Optional[datetime]:
         """
-        Recalculate priorities for all patients (e.g., for wait time updates).
-        Called periodically or when queue needs rebalancing.
-        
-        Returns: number of entries updated
+        Earliest time the order of items (sorted at now) can change without
+        a mutation, None if it never does. Entries below the wait cap all
+        age at the same rate, so the order only changes when one of them
+        overtakes the capped entry right ahead of it, or reaches the cap
+        itself (after which the ones behind it may overtake it).
         """
-        current_time = current_time or datetime.utcnow()
-        updated = 0
+        now_us = (now - AGING_EPOCH) // _MICROSECOND
+        reorder_us = None
+        capped_ahead = None  # capped-lane key of the previous item, if it is capped
+        for item in items:
+            checkin_us = (item.timestamp - AGING_EPOCH) // _MICROSECOND
+            cap_us = checkin_us + self._max_wait_us
+            if cap_us <= now_us:
+                capped_ahead = self._capped_key(item)[0]
+                continue
+            candidates = [cap_us]
+            if capped_ahead is not None and self._wait_units:
+                # Aging key - credit(t) drops below the capped key
+                candidates.append((self._aging_key(item, checkin_us)[0] - capped_ahead) // self._wait_units)
+            reorder_us = min(candidates + ([reorder_us] if reorder_us is not None else []))
+            capped_ahead = None
+        return AGING_EPOCH + reorder_us * _MICROSECOND if reorder_us is not None else None
+    
+    def _entry_to_dict(self, item: QueueItem, position: int, now: datetime, info: Optional[Dict]) -> Dict:
+        """Serialize one entry with its display info."""
+        data = item.to_dict()
+        data["priority_score"] = round(self.effective_priority(item, now), 4)
+        data["position"] = position
+        data["severity_info"] = SEVERITY_DESCRIPTIONS.get(item.triage_score, {})
         
-        # Get all current entries
-        entries_to_update = list(self._entries.items())
+        # Add patient display info if available
+        if info is not None:
+            data["patient_name"] = info.get("name", f"Patient #{item.patient_id}")
+            data["age"] = info.get("age", 0)
+            data["symptoms"] = info.get("symptoms", [])
+            data["chronic_conditions"] = info.get("chronic_conditions", [])
+            data["department"] = info.get("department", item.department)
+            data["severity"] = info.get("severity", "MEDIUM")
+            data["triage_explanation"] = info.get("explanation", [])
+        else:
+            data["patient_name"] = f"Patient #{item.patient_id}"
+            data["age"] = 0
+            data["symptoms"] = []
+            data["chronic_conditions"] = []
+            data["department"] = item.department
+            data["severity"] = "MEDIUM"
+            data["triage_explanation"] = []
         
-        for entry_id, item in entries_to_update:
-            # Calculate wait time
-            wait_minutes = (current_time - item.timestamp).total_seconds() / 60
-            
-            # Update priority with new wait time
-            self.update_priority(
-                entry_id=entry_id,
-                wait_minutes=int(wait_minutes)
-            )
-            updated += 1
+        return data
+    
+    def recalculate_all_priorities(self, current_time: datetime = None) -> int:
+        """
+        Bring wait-time aging up to date.
         
-        return updated
+        Aging is implicit in the lane keys, so the only work left is moving
+        entries whose wait reached the cap since the last call: O(k log n)
+        for k crossings instead of re-pushing the whole queue.
+        
+        Returns: number of entries whose ordering key changed
+        """
+        return self._advance(current_time or datetime.utcnow())
     
     def __len__(self) -> int:
         """Number of active entries in queue."""
         return len(self._entries)
     
-    def get_stats(self) -> Dict:
-        """Get queue statistics."""
-        if not self._entries:
-            return {
-                "total_patients": 0,
-                "avg_wait_minutes": 0,
-                "critical_count": 0,
-                "urgent_count": 0,
-                "moderate_count": 0,
-                "low_count": 0,
-                "minimal_count": 0,
-                "emergency_count": 0
-            }
-        
-        now = datetime.utcnow()
-        total_wait = 0
-        critical_count = 0
-        urgent_count = 0
-        moderate_count = 0
-        low_count = 0
-        minimal_count = 0
-        emergency_count = 0
-        
-        for item in self._entries.values():
-            wait = (now - item.timestamp).total_seconds() / 60
-            total_wait += wait
-            
-            # Count by severity level using 1-10 scale
-            score = item.triage_score
-            if score >= 9:
-                critical_count += 1
-            elif score >= 7:
-                urgent_count += 1
-            elif score >= 5:
-                moderate_count += 1
-            elif score >= 3:
-                low_count += 1
-            else:
-                minimal_count += 1
-                
-            if item.is_emergency:
-                emergency_count += 1
+    def clear(self) -> None:
+        """Drop every queued entry, patient info and current patient."""
+        self._reset()
+        self._log("clear")
+    
+    def _reset(self) -> None:
+        for dq in self._departments.values():
+            dq.clear()
+        self._cap_events.clear()
+        self._entries.clear()
+        self._department_totals.clear()
+        self._patient_info.clear()
+        self._current_patients.clear()
+        self._touch(*self._departments)
+    
+    def get_stats(self, department: str = None) -> Dict:
+        """
+        Get queue statistics (hospital-wide or for one department).
+        O(1) (per department): served from counters maintained on
+        push/pop/remove/update.
+        """
+        if department is None:
+            counters = QueueCounters.combined(self._department_totals.values())
+        else:
+            counters = self._department_totals.get(department.lower()) or QueueCounters()
+        return counters.to_stats(datetime.utcnow())
+    
+    def department_summaries(self) -> Dict[str, Dict]:
+        """
+        Size, critical/high patient count and average wait of every
+        department with waiting patients, in one pass.
         
-        return {
-            "total_patients": len(self._entries),
-            "avg_wait_minutes": round(total_wait / len(self._entries), 1),
-            "critical_count": critical_count,
-            "urgent_count": urgent_count,
-            "moderate_count": moderate_count,
-            "low_count": low_count,
-            "minimal_count": minimal_count,
-            "emergency_count": emergency_count
-        }
+        Sizes and waits come from the running counters; only the severity
+        labels in the patient info need a scan, so this is O(n) for all
+        departments instead of building (and re-parsing) one sorted list each.
+        """
+        critical = self._critical_counts()
+        summaries = {}
+        for department in self.departments():
+            stats = self.get_stats(department)
+            summaries[department] = {
+                "size": stats["total_patients"],
+                "critical": critical.get(department, 0),
+                "avg_wait_minutes": stats["avg_wait_minutes"]
+            }
+        return summaries
+    
+    def _critical_counts(self) -> Dict[str, int]:
+        """Queued entries per department whose info severity is CRITICAL or HIGH."""
+        counts: Dict[str, int] = {}
+        for entry_id, info in self._patient_info.items():
+            if str(info.get("severity", "")).upper() in CRITICAL_SEVERITIES:
+                department = self._entry_department(entry_id)
+                if department is not None:
+                    counts[department] = counts.get(department, 0) + 1
+        return counts
+    
+    def _entry_department(self, entry_id: int) -> Optional[str]:
+        item = self._entries.get(entry_id)
+        return item.department if item is not None else None
 
     def set_current_patient(self, department: str, patient_data: Dict) -> None:
         """Set the current patient being seen for a department."""
@@ -386,6 +1108,7 @@ class SmartPriorityQueue:
             **patient_data,
             "started_at": datetime.utcnow().isoformat()
         }
+        self._log("current", dept_key, self._current_patients[dept_key])
     
     def get_current_patient(self, department: str) -> Optional[Dict]:
         """Get the current patient being seen for a department."""
@@ -397,20 +1120,187 @@ class SmartPriorityQueue:
         dept_key = department.lower() if department else "general"
         if dept_key in self._current_patients:
             del self._current_patients[dept_key]
+            self._log("current", dept_key, None)
             return True
         return False
     
     def get_all_current_patients(self) -> Dict[str, Dict]:
         """Get all current patients being seen across all departments."""
         return self._current_patients.copy()
+    
+    def call_next(self, department: str = None) -> Tuple[str, Optional[Dict]]:
+        """
+        Move the highest priority patient (of one department, or overall)
+        into the department's consultation slot.
+        
+        Returns ("busy", current patient) if someone is still being seen,
+        ("empty", None) if nobody is waiting, else ("called", patient data).
+        """
+        dept_key = department or "general"
+        current = self.get_current_patient(dept_key)
+        if current:
+            return "busy", current
+        top = self.peek(department)
+        if top is None:
+            return "empty", None
+        
+        patient_data = self._consultation_data(self.get_entry(top.entry_id))
+        self.remove(top.entry_id)  # also drops its patient info
+        self.set_current_patient(dept_key, patient_data)
+        return "called", patient_data
+    
+    @staticmethod
+    def _consultation_data(entry: Dict) -> Dict:
+        """Current-patient record built from a serialized queue entry."""
+        return {
+            "entry_id": str(entry.get("entry_id", "")),
+            "patient_name": entry.get("patient_name", f"Patient #{entry.get('patient_id', '')}"),
+            "symptoms": entry.get("symptoms", []),
+            "chronic_conditions": entry.get("chronic_conditions", []),
+            "severity": entry.get("severity", "MEDIUM"),
+            "triage_explanation": entry.get("triage_explanation", []),
+            "check_in_time": entry.get("check_in_time", ""),
+            "age": entry.get("age", 0),
+            "department": entry.get("department", "general"),
+            "priority_score": entry.get("priority_score", 0)
+        }
+
+    
+    # -------------------------------------------------------------------------
+    # Persistence (snapshots and journal replay)
+    # -------------------------------------------------------------------------
+    
+    def export_state(self) -> Dict:
+        """Plain-data copy of the queue contents, e.g. for a snapshot."""
+        return self.capture_state()()
+    
+    def capture_state(self) -> Callable[[], Dict]:
+        """
+        Point-in-time capture of the queue contents, cheap enough to take
+        under the state lock: shallow copies of the entry table and the info
+        dicts (queue items and patient info are replaced on change, never
+        edited in place). Calling the result builds the export_state() copy
+        and may happen later, on another thread.
+        """
+        entries = self._capture_entries()
+        patient_info = dict(self._patient_info)
+        current_patients = dict(self._current_patients)
+        return lambda: {
+            "entries": entries(),
+            "patient_info": patient_info,
+            "current_patients": current_patients,
+        }
+    
+    def _capture_entries(self) -> Callable[[], List[Tuple]]:
+        """capture_state() for the entries: a callable returning their export_state() rows."""
+        items = list(self._entries.values())
+        return lambda: [
+            (item.entry_id, item.patient_id, -item.priority,
+             (item.timestamp - AGING_EPOCH) // _MICROSECOND, item.triage_score,
+             item.is_emergency, item.age_factor, item.chronic_factor, item.department)
+            for item in items
+        ]
+    
+    def load_state(self, state: Dict) -> None:
+        """Replace the queue contents with an export_state() copy in one bulk build."""
+        self._reset()
+        items = [
+            QueueItem(
+                priority=-score,
+                timestamp=AGING_EPOCH + timedelta(microseconds=checkin_us),
+                patient_id=patient_id,
+                entry_id=entry_id,
+                triage_score=triage_score,
+                is_emergency=is_emergency,
+                age_factor=age_factor,
+                chronic_factor=chronic_factor,
+                department=department
+            )
+            for (entry_id, patient_id, score, checkin_us, triage_score,
+                 is_emergency, age_factor, chronic_factor, department) in state["entries"]
+        ]
+        self._bulk_index(items, datetime.utcnow())
+        self._patient_info.update(state["patient_info"])
+        self._current_patients.update(state["current_patients"])
+        self._touch(*{item.department for item in items})
+    
+    def _bulk_index(self, items: List[QueueItem], now: datetime) -> None:
+        """
+        Index many new items at once: one heapify and one sorted merge per
+        lane instead of an O(log n) insert per item.
+        """
+        pending: Dict[int, Tuple[_Lane, List]] = {}
+        cap_events = self._cap_events
+        for item in items:
+            self._entries[item.entry_id] = item
+            self._count(item, 1)
+            dq = self._department(item.department)
+            cap_time = item.timestamp + self._max_wait
+            if cap_time <= now:
+                lane, key = dq.capped, self._capped_key(item)
+            else:
+                lane, key = dq.aging, self._aging_key(item)
+                cap_events.append((cap_time, item.entry_id))
+            pending.setdefault(id(lane), (lane, []))[1].append((item.entry_id, key))
+        for lane, pairs in pending.values():
+            lane.heap.heapify(pairs)
+            lane.ranks.bulk_load(pairs)
+        heapq.heapify(cap_events)
+    
+    def apply_record(self, record: Tuple) -> None:
+        """Re-apply one journaled mutation (used by journal replay)."""
+        op, args = record[0], record[1:]
+        if op == "push":
+            (patient_id, entry_id, triage_score, age_factor, chronic_factor,
+             is_emergency, checkin_us, patient_info, department) = args
+            self.push(
+                patient_id=patient_id,
+                entry_id=entry_id,
+                triage_score=triage_score,
+                age_factor=age_factor,
+                chronic_factor=chronic_factor,
+                is_emergency=is_emergency,
+                check_in_time=AGING_EPOCH + timedelta(microseconds=checkin_us),
+                patient_info=patient_info,
+                department=department
+            )
+        elif op == "update":
+            self.update_priority(*args)
+        elif op == "remove":
+            self.remove(*args)
+        elif op == "info":
+            self.set_patient_info(*args)
+        elif op == "current":
+            department, patient_data = args
+            if patient_data is None:
+                self._current_patients.pop(department, None)
+            else:
+                self._current_patients[department] = patient_data
+        elif op == "clear":
+            self._reset()
+        else:
+            raise ValueError(f"Unknown journal record: {op}")
 
 
 # Singleton for application-wide queue (can also be per-department)
 _global_queue = None
 
 def get_priority_queue() -> SmartPriorityQueue:
-    """Get the global priority queue instance."""
+    """
+    Get the global priority queue instance (backend chosen by QUEUE_BACKEND),
+    or a proxy to the state owner's queue when workers share state.
+    """
     global _global_queue
+    shared = get_shared_service("priority_queue")
+    if shared is not None:
+        return shared
     if _global_queue is None:
-        _global_queue = SmartPriorityQueue()
+        if settings.QUEUE_BACKEND == "columnar":
+            from app.services.columnar_queue import ColumnarPriorityQueue
+            _global_queue = ColumnarPriorityQueue()
+        elif settings.QUEUE_BACKEND == "redis":
+            from app.services.redis_queue import RedisPriorityQueue
+            _global_queue = RedisPriorityQueue()
+        else:
+            _global_queue = SmartPriorityQueue()
     return _global_queue
@@ -0,0 +1,200 @@
+"""
+SmartCare Queue Forecasting
+============================
+Per-department time series of queue length and check-in arrivals with
+short-horizon forecasts for the AI allocator.
+
+How it works:
+1. Samples (time, queue length, cumulative arrivals) go into a fixed-size
+   NumPy ring buffer: O(1) append, oldest samples overwritten.
+2. Queue length forecast: least-squares slope over the last
+   WINDOW_MINUTES of samples, extrapolated from the latest observation to
+   each horizon (15/30/60 min), never below zero.
+3. Arrival rate: exponentially smoothed from the growth of the cumulative
+   arrival count. The smoothing weight depends on the gap between samples
+   (alpha = 1 - exp(-dt / SMOOTHING_MINUTES)), so irregular sampling is fine.
+4. Accuracy: every forecast waits until its horizon passes and is then
+   scored against the first sample at or after its target time: MAE,
+   RMSE, bias, and how often predicted surges actually happened.
+"""
+
+import math
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+import numpy as np
+
+HORIZONS_MINUTES = (15, 30, 60)
+
+# A queue growing by more than this is a surge (matches the allocator's bonus rule)
+SURGE_MARGIN = 3
+
+
+class RingSeries:
+    """Fixed-capacity time series; appending past capacity overwrites the oldest sample."""
+
+    def __init__(self, capacity: int = 4096, columns: int = 1):
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self._values = np.zeros((capacity, columns), dtype=np.float64)
+        self._next = 0
+        self._size = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._times)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, t: float, *values: float) -> None:
+        self._times[self._next] = t
+        self._values[self._next] = values
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def last(self) -> Optional[Tuple[float, np.ndarray]]:
+        if not self._size:
+            return None
+        i = (self._next - 1) % self.capacity
+        return float(self._times[i]), self._values[i]
+
+    def since(self, t0: float) -> Tuple[np.ndarray, np.ndarray]:
+        """(times, values) of the samples taken at or after t0, oldest first (times must not decrease)."""
+        if self._size < self.capacity:
+            times, values = self._times[:self._size], self._values[:self._size]
+        else:
+            times = np.concatenate((self._times[self._next:], self._times[:self._next]))
+            values = np.concatenate((self._values[self._next:], self._values[:self._next]))
+        start = int(np.searchsorted(times, t0, side="left"))
+        return times[start:], values[start:]
+
+
+class ForecastAccuracy:
+    """Running error statistics of one forecast horizon."""
+
+    __slots__ = ("scored", "abs_error", "sq_error", "error", "surges_predicted", "surges_confirmed", "surges_missed")
+
+    def __init__(self):
+        self.scored = 0
+        self.abs_error = 0.0
+        self.sq_error = 0.0
+        self.error = 0.0  # signed: forecast - actual
+        self.surges_predicted = 0
+        self.surges_confirmed = 0
+        self.surges_missed = 0
+
+    def add(self, predicted: float, actual: float, base: float) -> None:
+        error = predicted - actual
+        self.scored += 1
+        self.abs_error += abs(error)
+        self.sq_error += error * error
+        self.error += error
+        predicted_surge = predicted > base + SURGE_MARGIN
+        actual_surge = actual > base + SURGE_MARGIN
+        self.surges_predicted += predicted_surge
+        self.surges_confirmed += predicted_surge and actual_surge
+        self.surges_missed += actual_surge and not predicted_surge
+
+    def to_dict(self) -> Dict:
+        n = self.scored
+        detected = self.surges_confirmed + self.surges_missed
+        return {
+            "scored": n,
+            "mae": round(self.abs_error / n, 2) if n else None,
+            "rmse": round(math.sqrt(self.sq_error / n), 2) if n else None,
+            "bias": round(self.error / n, 2) if n else None,
+            "surges_predicted": self.surges_predicted,
+            "surge_precision": round(self.surges_confirmed / self.surges_predicted, 2) if self.surges_predicted else None,
+            "surge_recall": round(self.surges_confirmed / detected, 2) if detected else None
+        }
+
+
+class DepartmentForecaster:
+    """Queue length / arrival series and forecasts for one department."""
+
+    WINDOW_MINUTES = 30
+    SMOOTHING_MINUTES = 15
+    MIN_SAMPLES = 3
+    MIN_SPAN_MINUTES = 1.0
+
+    def __init__(self, capacity: int = 4096):
+        self.series = RingSeries(capacity, columns=2)  # queue length, cumulative arrivals
+        self.arrivals = 0
+        self.arrival_rate: Optional[float] = None  # smoothed arrivals per minute
+        self._pending: Dict[int, Deque[Tuple[float, float, float]]] = {h: deque() for h in HORIZONS_MINUTES}
+        self.accuracy: Dict[int, ForecastAccuracy] = {h: ForecastAccuracy() for h in HORIZONS_MINUTES}
+
+    def record_arrivals(self, count: int = 1) -> None:
+        self.arrivals += count
+
+    def observe(self, t: float, queue_length: int) -> Dict[int, float]:
+        """
+        Add a sample at epoch seconds t; returns the forecast per horizon (minutes).
+        A t before the previous sample (the wall clock stepped back) is taken
+        as the previous sample's time, so the series stays sorted for since().
+        """
+        previous = self.series.last()
+        if previous is not None:
+            t = max(t, previous[0])
+        self._score(t, queue_length)
+
+        if previous is not None and t > previous[0]:
+            dt = (t - previous[0]) / 60
+            rate = (self.arrivals - previous[1][1]) / dt
+            alpha = 1 - math.exp(-dt / self.SMOOTHING_MINUTES)
+            self.arrival_rate = rate if self.arrival_rate is None else self.arrival_rate + alpha * (rate - self.arrival_rate)
+        self.series.append(t, queue_length, self.arrivals)
+
+        forecast = self.forecast()
+        for horizon, predicted in forecast.items():
+            self._pending[horizon].append((t + horizon * 60, predicted, queue_length))
+        return forecast
+
+    def slope(self) -> float:
+        """Least-squares queue growth (patients per minute) over the window."""
+        last = self.series.last()
+        if last is None:
+            return 0.0
+        times, values = self.series.since(last[0] - self.WINDOW_MINUTES * 60)
+        if len(times) < self.MIN_SAMPLES:
+            return 0.0
+        x = (times - times[-1]) / 60
+        if x[-1] - x[0] < self.MIN_SPAN_MINUTES:
+            return 0.0
+        y = values[:, 0]
+        x_mean = x.mean()
+        return float(((x - x_mean) * (y - y.mean())).sum() / ((x - x_mean) ** 2).sum())
+
+    def forecast(self) -> Dict[int, float]:
+        """Expected queue length at each horizon from the latest sample."""
+        last = self.series.last()
+        if last is None:
+            return {h: 0.0 for h in HORIZONS_MINUTES}
+        current = float(last[1][0])
+        slope = self.slope()
+        return {h: max(0.0, current + slope * h) for h in HORIZONS_MINUTES}
+
+    def _score(self, t: float, actual: int) -> None:
+        """Score pending forecasts whose target time has been reached."""
+        for horizon, pending in self._pending.items():
+            # Forecasts whose target passed long before this sample are dropped unscored
+            tolerance = max(60.0, horizon * 15.0)
+            while pending and pending[0][0] <= t:
+                target, predicted, base = pending.popleft()
+                if t - target <= tolerance:
+                    self.accuracy[horizon].add(predicted, actual, base)
+
+    def summary(self) -> Dict:
+        last = self.series.last()
+        return {
+            "samples": len(self.series),
+            "current_queue": int(last[1][0]) if last is not None else 0,
+            "trend_per_hour": round(self.slope() * 60, 2),
+            "forecast": {f"{h}min": round(v, 1) for h, v in self.forecast().items()},
+            "arrival_rate_per_hour": round(self.arrival_rate * 60, 2) if self.arrival_rate is not None else None,
+            "expected_arrivals": {
+                f"{h}min": round(self.arrival_rate * h, 1) if self.arrival_rate is not None else None
+                for h in HORIZONS_MINUTES
+            },
+            "accuracy": {f"{h}min": acc.to_dict() for h, acc in self.accuracy.items()}
+        }
@@ -0,0 +1,293 @@
+"""
+SmartCare Queue Journal
+========================
+Write-ahead log + snapshots so the in-memory priority queue survives a
+restart.
+
+How it works:
+1. Every queue mutation (push, update, remove, patient info, current
+   patient set/clear, clear) is appended as a framed record
+   (length, CRC32, pickled payload) tagged with a log sequence number.
+2. A background writer group-commits: it drains everything appended since
+   its last write and fsyncs once, so requests never wait on the disk.
+3. Every `snapshot_every` records the queue contents are captured
+   (capture_state: shallow copies, taken on the request thread) and the
+   writer exports, pickles and atomically writes them as a compact binary
+   snapshot. Log segments and snapshots it supersedes are deleted.
+4. On startup the newest snapshot is bulk-loaded and the log tail is
+   replayed. A torn final record (crash mid-write) ends a segment.
+
+Cost on the request path: one pickle per mutation, plus an O(n) shallow
+copy of the entry table once every `snapshot_every` mutations (a few ms
+per 100k entries, under the caller's lock). Journaling is off when
+QUEUE_JOURNAL_DIR is empty.
+
+Files in the journal directory:
+  snapshot-<lsn>.bin   queue state as of record <lsn>
+  wal-<lsn>.log        records starting at <lsn>
+"""
+
+import gc
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+_FRAME = struct.Struct("<II")  # payload length, CRC32 of payload
+_PICKLE = pickle.HIGHEST_PROTOCOL
+
+
+class QueueJournal:
+    """Write-ahead log with group commit and periodic snapshots for SmartPriorityQueue."""
+
+    SNAPSHOT_EVERY = 10_000  # records between snapshots
+
+    def __init__(self, directory: str, snapshot_every: int = SNAPSHOT_EVERY):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        os.makedirs(directory, exist_ok=True)
+
+        self._queue = None
+        self._lsn = 0              # last assigned sequence number
+        self._durable_lsn = 0      # last sequence number known to be on disk
+        self._since_snapshot = 0
+        self._pending: List = []   # framed records and ("snapshot", lsn, capture) markers
+        self._cond = threading.Condition()
+        self._closed = False
+        self._segment = None
+        self._writer: Optional[threading.Thread] = None
+
+    @property
+    def lsn(self) -> int:
+        return self._lsn
+
+    @property
+    def durable_lsn(self) -> int:
+        return self._durable_lsn
+
+    # -------------------------------------------------------------------------
+    # Recovery
+    # -------------------------------------------------------------------------
+
+    def recover(self, queue) -> Dict:
+        """
+        Rebuild `queue` from the newest snapshot plus the log tail, then
+        attach the journal to it and start the background writer.
+        """
+        started = time.perf_counter()
+        # Recovery allocates hundreds of thousands of long-lived objects;
+        # cyclic GC passes over them would dominate the load time.
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            snapshot_lsn, replayed = self._restore(queue)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+        self._open_segment(self._lsn + 1)
+        self._queue = queue
+        queue.attach_journal(self)
+        self._writer = threading.Thread(target=self._run, name="queue-journal", daemon=True)
+        self._writer.start()
+
+        return {
+            "snapshot_lsn": snapshot_lsn,
+            "replayed": replayed,
+            "entries": len(queue),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    def _restore(self, queue) -> Tuple[int, int]:
+        """Load the newest snapshot and replay the log after it; returns (snapshot lsn, records replayed)."""
+        snapshot_lsn = 0
+        snapshots = self._files("snapshot-", ".bin")
+        if snapshots:
+            snapshot_lsn, path = snapshots[-1]
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+            queue.load_state(state)
+
+        last = snapshot_lsn
+        replayed = 0
+        for _, path in self._files("wal-", ".log"):
+            for record in self._read_segment(path):
+                if record[0] <= last:
+                    continue
+                queue.apply_record(record[1:])
+                last = record[0]
+                replayed += 1
+
+        self._lsn = self._durable_lsn = last
+        return snapshot_lsn, replayed
+
+    def _files(self, prefix: str, suffix: str) -> List[Tuple[int, str]]:
+        """(lsn, path) of journal files of one kind, oldest first."""
+        found = []
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name.endswith(suffix):
+                lsn = name[len(prefix):-len(suffix)]
+                if lsn.isdigit():
+                    found.append((int(lsn), os.path.join(self.directory, name)))
+        return sorted(found)
+
+    @staticmethod
+    def _read_segment(path: str) -> Iterator[Tuple]:
+        with open(path, "rb") as f:
+            data = f.read()
+        offset = 0
+        while offset + _FRAME.size <= len(data):
+            length, crc = _FRAME.unpack_from(data, offset)
+            payload = data[offset + _FRAME.size:offset + _FRAME.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return  # torn or corrupt tail
+            yield pickle.loads(payload)
+            offset += _FRAME.size + length
+
+    # -------------------------------------------------------------------------
+    # Appending (request path)
+    # -------------------------------------------------------------------------
+
+    def append(self, *record) -> int:
+        """Queue a mutation record for the writer; returns its sequence number."""
+        with self._cond:
+            self._lsn += 1
+            lsn = self._lsn
+            payload = pickle.dumps((lsn,) + record, protocol=_PICKLE)
+            self._pending.append(_FRAME.pack(len(payload), zlib.crc32(payload)) + payload)
+            self._since_snapshot += 1
+            self._cond.notify()
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot()
+        return lsn
+
+    def snapshot(self) -> int:
+        """
+        Queue a snapshot of the attached queue as of the latest record. Only
+        the capture happens here; the writer exports and pickles it.
+        """
+        capture = self._queue.capture_state()
+        with self._cond:
+            lsn = self._lsn
+            self._pending.append(("snapshot", lsn, capture))
+            self._since_snapshot = 0
+            self._cond.notify()
+        return lsn
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until everything appended so far is durable."""
+        with self._cond:
+            target = self._lsn
+            return self._cond.wait_for(lambda: self._durable_lsn >= target, timeout)
+
+    def close(self) -> None:
+        """Write a final snapshot, drain the log and stop the writer."""
+        if self._writer is None:
+            return
+        if self._queue is not None:
+            self._queue.attach_journal(None)
+            self.snapshot()
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._writer.join()
+        self._writer = None
+        self._segment.close()
+
+    # -------------------------------------------------------------------------
+    # Background writer
+    # -------------------------------------------------------------------------
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, []
+                target = self._lsn
+            self._write(batch)
+            with self._cond:
+                self._durable_lsn = target
+                self._cond.notify_all()
+
+    def _write(self, batch: List) -> None:
+        """Write one group commit: consecutive records share a single fsync."""
+        records = []
+        for item in batch:
+            if isinstance(item, bytes):
+                records.append(item)
+                continue
+            self._write_records(records)
+            records = []
+            _, lsn, capture = item
+            state = capture()
+            state["lsn"] = lsn
+            self._write_snapshot(lsn, pickle.dumps(state, protocol=_PICKLE))
+        self._write_records(records)
+
+    def _write_records(self, records: List[bytes]) -> None:
+        if not records:
+            return
+        self._segment.write(b"".join(records))
+        self._segment.flush()
+        os.fsync(self._segment.fileno())
+
+    def _write_snapshot(self, lsn: int, data: bytes) -> None:
+        path = os.path.join(self.directory, f"snapshot-{lsn:012d}.bin")
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self._fsync_directory()
+
+        # Later records go to a fresh segment; everything older is superseded
+        self._segment.close()
+        self._open_segment(lsn + 1)
+        for old_lsn, old_path in self._files("snapshot-", ".bin"):
+            if old_lsn < lsn:
+                os.remove(old_path)
+        for start, old_path in self._files("wal-", ".log"):
+            if start <= lsn:
+                os.remove(old_path)
+
+    def _open_segment(self, start: int) -> None:
+        # Truncate: a segment with this name can only hold a torn record
+        self._segment = open(os.path.join(self.directory, f"wal-{start:012d}.log"), "wb")
+        self._fsync_directory()
+
+    def _fsync_directory(self) -> None:
+        if hasattr(os, "O_DIRECTORY"):
+            fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+
+# Singleton journal for the application-wide queue
+_journal = None
+
+def get_queue_journal() -> Optional[QueueJournal]:
+    """The journal attached at startup, or None if journaling is disabled."""
+    return _journal
+
+
+def open_queue_journal(directory: str, queue) -> Dict:
+    """Recover `queue` from `directory` and keep journaling to it."""
+    global _journal
+    _journal = QueueJournal(directory)
+    return _journal.recover(queue)
+
+
+def close_queue_journal() -> None:
+    global _journal
+    if _journal is not None:
+        _journal.close()
+        _journal = None
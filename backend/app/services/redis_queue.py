@@ -0,0 +1,731 @@
+"""
+SmartCare Redis Priority Queue
+===============================
+SmartPriorityQueue backend stored in Redis, so several API nodes can serve
+one queue.
+
+Layout (all keys under one prefix, default "smartcare:queue"):
+  <p>:e:<entry_id>       hash   entry fields (score, check-in, department, ...)
+  <p>:aging:<dept>       zset   entries below the wait cap, score = aging key
+  <p>:capped:<dept>      zset   entries at the wait cap, score = capped key
+  <p>:cap                zset   entry_id -> time its wait reaches the cap (µs)
+  <p>:depts              set    departments that ever had an entry
+  <p>:i:<entry_id>       hash   patient display info, field -> JSON value
+  <p>:current            hash   department -> current patient (JSON)
+  <p>:stats[:<dept>]     hash   running counters behind get_stats
+  <p>:version            int    mutation counter (ETag); <p>:dversion per department
+
+Ordering uses the same two-lane analytic aging as SmartPriorityQueue, with
+float scores (minutes-scaled, exact enough for ordering). Zset members are
+"<check-in µs>:<entry id>", zero padded, so equal scores fall back to
+check-in order.
+
+Every mutation runs as one Lua script, so counters, lanes and versions can
+never disagree: pop applies due cap crossings and removes the top entry in
+one script, and call_next claims the head of the queue and sets the
+department's current patient atomically (two nodes can never call the same
+patient, and never one that is no longer first). Patient info updates merge
+fields in a script too, so concurrent updates from different nodes all
+land. rank is a script as well, so a position is never computed from lanes
+another node changed halfway through. Reads that merge the lanes apply due
+cap crossings first (see _clock).
+
+Single Redis instance only (replicas / Sentinel failover are fine, Redis
+Cluster is not): the scripts build key names from the prefix passed in
+ARGV instead of declaring them in KEYS, because the entry, lane and
+counter keys a script touches (e.g. every department's lanes on pop, every
+due entry on a cap crossing) are only known once it runs.
+
+Redis persistence (AOF/RDB) replaces the queue journal for this backend.
+Enable with QUEUE_BACKEND=redis (uses REDIS_URL).
+"""
+
+import json
+import redis
+from datetime import datetime
+from heapq import merge
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.constants import PRIORITY_WEIGHTS
+from app.services.priority_queue import (
+    SmartPriorityQueue, QueueItem, QueueCounters, severity_bucket, CRITICAL_SEVERITIES,
+    AGING_EPOCH, _MICROSECOND
+)
+
+
+# Shared Lua helpers; every script receives the key prefix as ARGV[1]
+_PRELUDE = """
+local P = ARGV[1]
+local unpack = unpack or table.unpack  -- Lua 5.1 (Redis) or 5.4 (fakeredis)
+
+local function load(id)
+    local raw = redis.call('HGETALL', P .. ':e:' .. id)
+    if #raw == 0 then return nil end
+    local e = {}
+    for i = 1, #raw, 2 do e[raw[i]] = raw[i + 1] end
+    return e
+end
+
+local function count(e, delta)
+    local sign = delta < 0 and '-' or ''
+    for _, key in ipairs({P .. ':stats', P .. ':stats:' .. e.department}) do
+        redis.call('HINCRBY', key, 'size', delta)
+        redis.call('HINCRBY', key, e.bucket, delta)
+        if e.is_emergency == '1' then redis.call('HINCRBY', key, 'emergency', delta) end
+        redis.call('HINCRBY', key, 'checkin_sum_us', sign .. e.checkin_us)
+    end
+end
+
+local function touch(department)
+    redis.call('INCR', P .. ':version')
+    redis.call('HINCRBY', P .. ':dversion', department, 1)
+end
+
+local function index(id, e, now_us)
+    count(e, 1)
+    redis.call('SADD', P .. ':depts', e.department)
+    if tonumber(e.cap_us) <= now_us then
+        redis.call('ZADD', P .. ':capped:' .. e.department, e.capped, e.member)
+    else
+        redis.call('ZADD', P .. ':aging:' .. e.department, e.aging, e.member)
+        redis.call('ZADD', P .. ':cap', e.cap_us, id)
+    end
+end
+
+local function unindex(id, e)
+    count(e, -1)
+    if redis.call('ZREM', P .. ':cap', id) == 1 then
+        redis.call('ZREM', P .. ':aging:' .. e.department, e.member)
+    else
+        redis.call('ZREM', P .. ':capped:' .. e.department, e.member)
+    end
+end
+
+local function advance(now_us)
+    local ids = redis.call('ZRANGEBYSCORE', P .. ':cap', '-inf', now_us)
+    for _, id in ipairs(ids) do
+        local e = load(id)
+        redis.call('ZREM', P .. ':aging:' .. e.department, e.member)
+        redis.call('ZADD', P .. ':capped:' .. e.department, e.capped, e.member)
+        redis.call('ZREM', P .. ':cap', id)
+    end
+    return #ids
+end
+
+local function departments(department)
+    if department ~= '' then return {department} end
+    return redis.call('SMEMBERS', P .. ':depts')
+end
+
+-- Id of the entry at the head of the queue (one department, or all), or nil
+local function head(credit, department)
+    local best_score, best_member
+    for _, name in ipairs(departments(department)) do
+        for _, lane in ipairs({{'aging', credit}, {'capped', 0}}) do
+            local top = redis.call('ZRANGE', P .. ':' .. lane[1] .. ':' .. name, 0, 0, 'WITHSCORES')
+            if #top > 0 then
+                local score = tonumber(top[2]) - lane[2]
+                if not best_member or score < best_score or (score == best_score and top[1] < best_member) then
+                    best_score, best_member = score, top[1]
+                end
+            end
+        end
+    end
+    if not best_member then return nil end
+    return string.match(best_member, ':0*(%d+)$')
+end
+
+local function drop(id)
+    local e = load(id)
+    if not e then return false end
+    unindex(id, e)
+    redis.call('DEL', P .. ':e:' .. id)
+    redis.call('DEL', P .. ':i:' .. id)
+    touch(e.department)
+    return true
+end
+
+-- Overwrite some of an entry's fields and re-index it. Check-in time never
+-- changes, so the entry stays in the same kind of lane.
+local function rekey(id, old, fields)
+    local aging = redis.call('ZSCORE', P .. ':cap', id)
+    unindex(id, old)
+    redis.call('HSET', P .. ':e:' .. id, unpack(fields))
+    local e = load(id)
+    count(e, 1)
+    redis.call('SADD', P .. ':depts', e.department)
+    if aging then
+        redis.call('ZADD', P .. ':aging:' .. e.department, e.aging, e.member)
+        redis.call('ZADD', P .. ':cap', e.cap_us, id)
+    else
+        redis.call('ZADD', P .. ':capped:' .. e.department, e.capped, e.member)
+    end
+    touch(old.department)
+    if e.department ~= old.department then touch(e.department) end
+end
+
+-- After an info change: move the entry to the department its info names
+-- (a JSON string), and record the change
+local function follow(id)
+    local e = load(id)
+    if not e then
+        redis.call('INCR', P .. ':version')
+        return
+    end
+    local named = string.match(redis.call('HGET', P .. ':i:' .. id, 'department') or '', '^"(.+)"$')
+    if named and string.lower(named) ~= e.department then
+        rekey(id, e, {'department', string.lower(named)})
+    else
+        touch(e.department)
+    end
+end
+"""
+
+# ARGV: prefix, entry_id, now_us, n, info field, JSON value, ... (n arguments;
+# n = -1 keeps the current info), entry field, value, ...
+_PUSH = _PRELUDE + """
+local id = ARGV[2]
+local n = tonumber(ARGV[4])
+local old = load(id)
+if old then
+    unindex(id, old)
+    redis.call('DEL', P .. ':e:' .. id)
+    touch(old.department)
+end
+redis.call('HSET', P .. ':e:' .. id, unpack(ARGV, 5 + math.max(n, 0)))
+index(id, load(id), tonumber(ARGV[3]))
+if n >= 0 then
+    redis.call('DEL', P .. ':i:' .. id)
+    if n > 0 then redis.call('HSET', P .. ':i:' .. id, unpack(ARGV, 5, 4 + n)) end
+end
+touch(load(id).department)
+return 1
+"""
+
+# ARGV: prefix, entry_id, field, value, ... (check-in time never changes)
+_REKEY = _PRELUDE + """
+local id = ARGV[2]
+local old = load(id)
+if not old then return 0 end
+rekey(id, old, {unpack(ARGV, 3)})
+return 1
+"""
+
+# ARGV: prefix, entry_id, info field, JSON value, ... Replaces the entry's info.
+_SET_INFO = _PRELUDE + """
+local key = P .. ':i:' .. ARGV[2]
+redis.call('DEL', key)
+if #ARGV > 2 then redis.call('HSET', key, unpack(ARGV, 3)) end
+follow(ARGV[2])
+return 1
+"""
+
+# ARGV: prefix, entry_id, info field, JSON value, ... Merges into the entry's
+# info; returns 0 if it has none.
+_UPDATE_INFO = _PRELUDE + """
+local key = P .. ':i:' .. ARGV[2]
+if redis.call('EXISTS', key) == 0 then return 0 end
+if #ARGV > 2 then redis.call('HSET', key, unpack(ARGV, 3)) end
+follow(ARGV[2])
+return 1
+"""
+
+# ARGV: prefix, entry_id
+_REMOVE = _PRELUDE + """
+return drop(ARGV[2]) and 1 or 0
+"""
+
+# ARGV: prefix, now_us. Moves entries whose wait reached the cap into the capped lane.
+_ADVANCE = _PRELUDE + """
+return advance(ARGV[2])
+"""
+
+# ARGV: prefix, now_us, aging credit at now, department ("" = all).
+# Removes the top entry; returns {entry_id, field, value, ...}, or nil if empty.
+_POP = _PRELUDE + """
+advance(ARGV[2])
+local id = head(tonumber(ARGV[3]), ARGV[4])
+if not id then return false end
+local fields = redis.call('HGETALL', P .. ':e:' .. id)
+drop(id)
+table.insert(fields, 1, id)
+return fields
+"""
+
+# ARGV: prefix, now_us, aging credit at now, entry_id, department ("" = whole queue).
+# Returns the 1-based position, or nil if the entry is not queued (in that department).
+_RANK = _PRELUDE + """
+advance(ARGV[2])
+local credit = tonumber(ARGV[3])
+local id = ARGV[4]
+local e = load(id)
+if not e or (ARGV[5] ~= '' and ARGV[5] ~= e.department) then return false end
+local aging = redis.call('ZSCORE', P .. ':cap', id) ~= false
+local own = P .. (aging and ':aging:' or ':capped:') .. e.department
+local score = tonumber(redis.call('ZSCORE', own, e.member))
+local effective = aging and score - credit or score
+local ahead = redis.call('ZRANK', own, e.member)
+
+-- Other lanes: entries with a lower score, plus equal scores that checked
+-- in earlier (compared on the member, like within a lane). Lanes of the
+-- same kind share a shift, so they compare raw scores.
+for _, department in ipairs(departments(ARGV[5])) do
+    for _, lane in ipairs({{'aging', credit}, {'capped', 0}}) do
+        local key = P .. ':' .. lane[1] .. ':' .. department
+        if key ~= own then
+            local bound = ((lane[1] == 'aging') == aging) and score or effective + lane[2]
+            local text = string.format('%.17g', bound)
+            ahead = ahead + redis.call('ZCOUNT', key, '-inf', '(' .. text)
+            for _, other in ipairs(redis.call('ZRANGEBYSCORE', key, text, text)) do
+                if other < e.member then ahead = ahead + 1 end
+            end
+        end
+    end
+end
+return ahead + 1
+"""
+
+# ARGV: prefix, now_us, aging credit at now, department ("" = all), entry_id,
+# department key, current patient JSON. Claims the entry only if it is still
+# the head of the queue. Returns -1 if the department is busy, 0 if the
+# queue is empty, 1 when claimed, 2 if another entry is at the head now.
+_CLAIM = _PRELUDE + """
+if redis.call('HEXISTS', P .. ':current', ARGV[6]) == 1 then return -1 end
+advance(ARGV[2])
+local id = head(tonumber(ARGV[3]), ARGV[4])
+if not id then return 0 end
+if id ~= ARGV[5] then return 2 end
+drop(id)
+redis.call('HSET', P .. ':current', ARGV[6], ARGV[7])
+return 1
+"""
+
+
+def _member(item: QueueItem) -> str:
+    """Zset member: ties on score order by check-in, then entry id."""
+    return f"{(item.timestamp - AGING_EPOCH) // _MICROSECOND:016d}:{item.entry_id:020d}"
+
+
+def _entry_id(member: str) -> int:
+    return int(member.rsplit(":", 1)[1])
+
+
+def _shifted(entries: List[Tuple[str, float]], shift: float) -> Iterator[Tuple[Tuple, int]]:
+    """A lane's (member, score) range as ((effective score, member), entry_id)."""
+    for member, score in entries:
+        yield (score - shift, member), _entry_id(member)
+
+
+class RedisPriorityQueue(SmartPriorityQueue):
+    """
+    SmartPriorityQueue whose entries, display info, current patients and
+    statistics live in Redis. Same public API; state is shared by every
+    process using the same Redis and prefix.
+
+    Sorted snapshots are still memoized per process, keyed by the shared
+    version counter, so get_queue_list costs one round trip when nothing
+    changed.
+    """
+
+    def __init__(self, client: "redis.Redis" = None, prefix: str = "smartcare:queue"):
+        super().__init__()
+        # decode_responses=True is required if a client is passed in
+        self._redis = client or redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        self._prefix = prefix
+        self._push_script = self._redis.register_script(_PUSH)
+        self._rekey_script = self._redis.register_script(_REKEY)
+        self._remove_script = self._redis.register_script(_REMOVE)
+        self._advance_script = self._redis.register_script(_ADVANCE)
+        self._claim_script = self._redis.register_script(_CLAIM)
+        self._set_info_script = self._redis.register_script(_SET_INFO)
+        self._update_info_script = self._redis.register_script(_UPDATE_INFO)
+        self._pop_script = self._redis.register_script(_POP)
+        self._rank_script = self._redis.register_script(_RANK)
+
+    def _key(self, *parts) -> str:
+        return ":".join((self._prefix,) + tuple(str(part) for part in parts))
+
+    # -------------------------------------------------------------------------
+    # Versions and aging
+    # -------------------------------------------------------------------------
+
+    @property
+    def version(self) -> int:
+        return int(self._redis.get(self._key("version")) or 0)
+
+    def department_version(self, department: str) -> int:
+        return int(self._redis.hget(self._key("dversion"), department.lower()) or 0)
+
+    def _version_of(self, department: Optional[str]) -> int:
+        return self.version if department is None else self.department_version(department)
+
+    def _touch(self, *departments: str) -> None:
+        # Versions are bumped by the mutation scripts themselves
+        pass
+
+    def _credit(self, when: datetime) -> float:
+        """Uncapped wait-time score accrued from AGING_EPOCH until when."""
+        return PRIORITY_WEIGHTS["wait_time"] * ((when - AGING_EPOCH) / self._max_wait)
+
+    def _advance(self, now: datetime) -> int:
+        return self._advance_script(args=[self._prefix, (now - AGING_EPOCH) // _MICROSECOND])
+
+    def _clock(self) -> datetime:
+        """Current time, with cap crossings up to it applied. The cap schedule
+        lives in Redis, so this is one script call on every read."""
+        now = datetime.utcnow()
+        self._advance(now)
+        return now
+
+    def _department_names(self, department: Optional[str]) -> List[str]:
+        if department is not None:
+            return [department]
+        return sorted(self._redis.smembers(self._key("depts")))
+
+    def _lane_ranges(self, department: Optional[str], now: datetime, limit: int = None) -> List[Tuple[List, float]]:
+        """Head of every lane (all of it without a limit) with the shift that makes its scores effective."""
+        departments = self._department_names(department)
+        stop = -1 if limit is None else limit - 1
+        pipe = self._redis.pipeline(transaction=False)
+        for name in departments:
+            pipe.zrange(self._key("aging", name), 0, stop, withscores=True)
+            pipe.zrange(self._key("capped", name), 0, stop, withscores=True)
+        results = pipe.execute()
+        credit = self._credit(now)
+        return [(entries, credit if i % 2 == 0 else 0.0) for i, entries in enumerate(results) if entries]
+
+    def _ordered(self, department: Optional[str], now: datetime, limit: int = None) -> Iterator[Tuple[Tuple, int]]:
+        """((effective score, member), entry_id) in priority order across lanes."""
+        return merge(*(
+            _shifted(entries, shift) for entries, shift in self._lane_ranges(department, now, limit)
+        ))
+
+    # -------------------------------------------------------------------------
+    # Entries
+    # -------------------------------------------------------------------------
+
+    def _fields(self, item: QueueItem) -> List:
+        """Flattened entry hash, including both lane scores."""
+        base = -item.priority
+        checkin_us = (item.timestamp - AGING_EPOCH) // _MICROSECOND
+        fields = {
+            "patient_id": item.patient_id,
+            "triage_score": item.triage_score,
+            "is_emergency": int(item.is_emergency),
+            "age_factor": repr(float(item.age_factor)),
+            "chronic_factor": repr(float(item.chronic_factor)),
+            "department": item.department,
+            "priority": repr(float(item.priority)),
+            "checkin_us": checkin_us,
+            "cap_us": checkin_us + self._max_wait_us,
+            "member": _member(item),
+            "aging": repr(self._credit(item.timestamp) - base),
+            "capped": repr(-(base + PRIORITY_WEIGHTS["wait_time"])),
+            "bucket": severity_bucket(item.triage_score),
+        }
+        return [value for pair in fields.items() for value in pair]
+
+    @staticmethod
+    def _item(entry_id: int, fields: Dict[str, str]) -> QueueItem:
+        return QueueItem(
+            priority=float(fields["priority"]),
+            timestamp=AGING_EPOCH + int(fields["checkin_us"]) * _MICROSECOND,
+            patient_id=int(fields["patient_id"]),
+            entry_id=entry_id,
+            triage_score=int(fields["triage_score"]),
+            is_emergency=fields["is_emergency"] == "1",
+            age_factor=float(fields["age_factor"]),
+            chronic_factor=float(fields["chronic_factor"]),
+            department=fields["department"]
+        )
+
+    @staticmethod
+    def _info_args(info: Dict) -> List:
+        """Patient info as script arguments: field, JSON value, ..."""
+        return [part for field, value in info.items() for part in (field, json.dumps(value))]
+
+    def _push_args(self, item: QueueItem, now_us: int, info: Optional[Dict]) -> List:
+        info_args = self._info_args(info) if info is not None else []
+        return [
+            self._prefix, item.entry_id, now_us, len(info_args) if info is not None else -1,
+            *info_args, *self._fields(item)
+        ]
+
+    def _items(self, entry_ids: List[int]) -> List[Optional[QueueItem]]:
+        pipe = self._redis.pipeline(transaction=False)
+        for entry_id in entry_ids:
+            pipe.hgetall(self._key("e", entry_id))
+        return [
+            self._item(entry_id, fields) if fields else None
+            for entry_id, fields in zip(entry_ids, pipe.execute())
+        ]
+
+    def get_item(self, entry_id: int) -> Optional[QueueItem]:
+        fields = self._redis.hgetall(self._key("e", entry_id))
+        return self._item(entry_id, fields) if fields else None
+
+    # -------------------------------------------------------------------------
+    # Queue operations
+    # -------------------------------------------------------------------------
+
+    def push(
+        self,
+        patient_id: int,
+        entry_id: int,
+        triage_score: int,
+        age_factor: float = 1.0,
+        chronic_factor: float = 0.0,
+        is_emergency: bool = False,
+        check_in_time: datetime = None,
+        patient_info: Dict = None,
+        department: str = None
+    ) -> float:
+        now = datetime.utcnow()
+        item = self._new_item(
+            patient_id, entry_id, triage_score, age_factor, chronic_factor,
+            is_emergency, check_in_time, patient_info, department, now
+        )
+        self._push_script(args=self._push_args(item, (now - AGING_EPOCH) // _MICROSECOND, patient_info))
+        return self.effective_priority(item, now)
+
+    def push_many(self, patients: List[Dict]) -> List[float]:
+        """One pipelined round trip; each push is still its own atomic script."""
+        now = datetime.utcnow()
+        now_us = (now - AGING_EPOCH) // _MICROSECOND
+        items = []
+        pipe = self._redis.pipeline(transaction=False)
+        for patient in patients:
+            item = self._new_item(now=now, **patient)
+            self._push_script(args=self._push_args(item, now_us, patient.get("patient_info")), client=pipe)
+            items.append(item)
+        pipe.execute()
+        return [self.effective_priority(item, now) for item in items]
+
+    def peek(self, department: str = None) -> Optional[QueueItem]:
+        now = self._clock()
+        best = next(self._ordered(department.lower() if department else None, now, limit=1), None)
+        return self.get_item(best[1]) if best else None
+
+    def pop(self, department: str = None) -> Optional[QueueItem]:
+        now = datetime.utcnow()
+        popped = self._pop_script(args=[
+            self._prefix, (now - AGING_EPOCH) // _MICROSECOND, repr(self._credit(now)),
+            department.lower() if department else ""
+        ])
+        if not popped:
+            return None
+        entry_id, *fields = popped
+        return self._item(int(entry_id), dict(zip(fields[0::2], fields[1::2])))
+
+    def remove(self, entry_id: int) -> bool:
+        return self._remove_script(args=[self._prefix, entry_id]) == 1
+
+    def _reindex(self, old_item: QueueItem, new_item: QueueItem) -> None:
+        self._rekey_script(args=[self._prefix, new_item.entry_id, *self._fields(new_item)])
+
+    def departments(self) -> Dict[str, int]:
+        names = self._department_names(None)
+        pipe = self._redis.pipeline(transaction=False)
+        for name in names:
+            pipe.hget(self._key("stats", name), "size")
+        return {name: int(size) for name, size in zip(names, pipe.execute()) if size and int(size)}
+
+    def department_size(self, department: str) -> int:
+        return int(self._redis.hget(self._key("stats", department.lower()), "size") or 0)
+
+    def iter_items(self, department: str = None) -> Iterator[QueueItem]:
+        now = self._clock()
+        entry_ids = [entry_id for _, entry_id in self._ordered(department.lower() if department else None, now)]
+        return iter([item for item in self._items(entry_ids) if item is not None])
+
+    def rank(self, entry_id: int, department: str = None) -> Optional[int]:
+        now = datetime.utcnow()
+        return self._rank_script(args=[
+            self._prefix, (now - AGING_EPOCH) // _MICROSECOND, repr(self._credit(now)),
+            entry_id, department.lower() if department else ""
+        ])
+
+    def entry_at(self, position: int, department: str = None) -> Optional[QueueItem]:
+        if position < 1:
+            return None
+        now = self._clock()
+        ordered = self._ordered(department.lower() if department else None, now, limit=position)
+        found = next(islice(ordered, position - 1, None), None)
+        return self.get_item(found[1]) if found else None
+
+    def _build_snapshot(self, department: Optional[str], now: datetime) -> Tuple[List[Dict], Optional[datetime]]:
+        entry_ids = [entry_id for _, entry_id in self._ordered(department, now)]
+        rows = [
+            (item, info)
+            for item, info in zip(self._items(entry_ids), self._patient_infos(entry_ids))
+            if item is not None  # removed by another node meanwhile
+        ]
+        return (
+            [self._entry_to_dict(item, i + 1, now, info) for i, (item, info) in enumerate(rows)],
+            self._reorder_time([item for item, _ in rows], now)
+        )
+
+    def __len__(self) -> int:
+        return int(self._redis.hget(self._key("stats"), "size") or 0)
+
+    def _reset(self) -> None:
+        # Everything but the version counters, which must stay monotonic
+        keep = {self._key("version"), self._key("dversion")}
+        keys = [key for key in self._redis.scan_iter(match=f"{self._prefix}:*", count=1000) if key not in keep]
+        departments = self._department_names(None)
+        pipe = self._redis.pipeline()
+        for i in range(0, len(keys), 1000):
+            pipe.delete(*keys[i:i + 1000])
+        pipe.incr(self._key("version"))
+        for name in departments:
+            pipe.hincrby(self._key("dversion"), name, 1)
+        pipe.execute()
+
+    def get_stats(self, department: str = None) -> Dict:
+        key = self._key("stats") if department is None else self._key("stats", department.lower())
+        raw = self._redis.hgetall(key)
+        counters = QueueCounters()
+        counters.size = int(raw.get("size", 0))
+        counters.emergency = int(raw.get("emergency", 0))
+        counters.checkin_sum_us = int(raw.get("checkin_sum_us", 0))
+        for bucket in counters.severity:
+            counters.severity[bucket] = int(raw.get(bucket, 0))
+        return counters.to_stats(datetime.utcnow())
+
+    # -------------------------------------------------------------------------
+    # Patient info and current patients
+    # -------------------------------------------------------------------------
+
+    def _patient_infos(self, entry_ids: List[int]) -> List[Optional[Dict]]:
+        if not entry_ids:
+            return []
+        pipe = self._redis.pipeline(transaction=False)
+        for entry_id in entry_ids:
+            pipe.hgetall(self._key("i", entry_id))
+        return [
+            {field: json.loads(value) for field, value in raw.items()} if raw else None
+            for raw in pipe.execute()
+        ]
+
+    def get_patient_info(self, entry_id: int) -> Optional[Dict]:
+        return self._patient_infos([entry_id])[0]
+
+    def _critical_counts(self) -> Dict[str, int]:
+        entry_ids = [entry_id for _, entry_id in self._ordered(None, datetime.utcnow())]
+        if not entry_ids:
+            return {}
+        pipe = self._redis.pipeline(transaction=False)
+        for entry_id in entry_ids:
+            pipe.hget(self._key("i", entry_id), "severity")
+            pipe.hget(self._key("e", entry_id), "department")
+        results = pipe.execute()
+        counts: Dict[str, int] = {}
+        for severity, department in zip(results[0::2], results[1::2]):
+            if severity is None or department is None:
+                continue
+            if str(json.loads(severity)).upper() in CRITICAL_SEVERITIES:
+                counts[department] = counts.get(department, 0) + 1
+        return counts
+
+    def set_patient_info(self, entry_id: int, info: Dict) -> None:
+        self._set_info_script(args=[self._prefix, entry_id, *self._info_args(info)])
+
+    def update_patient_info(self, entry_id: int, **fields) -> bool:
+        """Atomic across nodes: the fields are merged in one script."""
+        return self._update_info_script(args=[self._prefix, entry_id, *self._info_args(fields)]) == 1
+
+    def set_current_patient(self, department: str, patient_data: Dict) -> None:
+        dept_key = department.lower() if department else "general"
+        record = {**patient_data, "started_at": datetime.utcnow().isoformat()}
+        self._redis.hset(self._key("current"), dept_key, json.dumps(record))
+
+    def get_current_patient(self, department: str) -> Optional[Dict]:
+        dept_key = department.lower() if department else "general"
+        raw = self._redis.hget(self._key("current"), dept_key)
+        return json.loads(raw) if raw is not None else None
+
+    def clear_current_patient(self, department: str) -> bool:
+        dept_key = department.lower() if department else "general"
+        return self._redis.hdel(self._key("current"), dept_key) == 1
+
+    def get_all_current_patients(self) -> Dict[str, Dict]:
+        return {
+            department: json.loads(raw)
+            for department, raw in self._redis.hgetall(self._key("current")).items()
+        }
+
+    def call_next(self, department: str = None) -> Tuple[str, Optional[Dict]]:
+        """
+        Atomic across nodes: the claim script re-checks the slot and claims
+        the patient only if they are still at the head of the queue.
+        """
+        dept_key = (department or "general").lower()
+        while True:
+            current = self.get_current_patient(dept_key)
+            if current:
+                return "busy", current
+            top = self.peek(department)
+            if top is None:
+                return "empty", None
+
+            entry = self.get_entry(top.entry_id)
+            if entry is None:
+                continue  # another node took this patient meanwhile
+            patient_data = self._consultation_data(entry)
+            now = datetime.utcnow()
+            record = {**patient_data, "started_at": now.isoformat()}
+            claimed = self._claim_script(args=[
+                self._prefix, (now - AGING_EPOCH) // _MICROSECOND, repr(self._credit(now)),
+                department.lower() if department else "", top.entry_id, dept_key, json.dumps(record)
+            ])
+            if claimed == 1:
+                return "called", patient_data
+            # -1: another node just filled the slot (loop reports busy);
+            #  0: the queue emptied meanwhile (loop reports empty);
+            #  2: another node took this patient or someone overtook them - try again
+
+    # -------------------------------------------------------------------------
+    # Persistence
+    # -------------------------------------------------------------------------
+
+    def export_state(self) -> Dict:
+        items = list(self.iter_items())
+        infos = self._patient_infos([item.entry_id for item in items])
+        return {
+            "entries": [
+                (item.entry_id, item.patient_id, -item.priority,
+                 (item.timestamp - AGING_EPOCH) // _MICROSECOND, item.triage_score,
+                 item.is_emergency, item.age_factor, item.chronic_factor, item.department)
+                for item in items
+            ],
+            "patient_info": {
+                item.entry_id: info for item, info in zip(items, infos) if info is not None
+            },
+            "current_patients": self.get_all_current_patients(),
+        }
+
+    def load_state(self, state: Dict) -> None:
+        self._reset()
+        now = datetime.utcnow()
+        now_us = (now - AGING_EPOCH) // _MICROSECOND
+        info = state["patient_info"]
+        pipe = self._redis.pipeline(transaction=False)
+        for (entry_id, patient_id, score, checkin_us, triage_score,
+             is_emergency, age_factor, chronic_factor, department) in state["entries"]:
+            item = QueueItem(
+                priority=-score,
+                timestamp=AGING_EPOCH + checkin_us * _MICROSECOND,
+                patient_id=patient_id,
+                entry_id=entry_id,
+                triage_score=triage_score,
+                is_emergency=is_emergency,
+                age_factor=age_factor,
+                chronic_factor=chronic_factor,
+                department=department
+            )
+            self._push_script(args=self._push_args(item, now_us, info.get(entry_id)), client=pipe)
+        for department, patient in state["current_patients"].items():
+            pipe.hset(self._key("current"), department, json.dumps(patient))
+        pipe.execute()
@@ -0,0 +1,156 @@
+"""
+SmartCare Shared State
+=======================
+Lets several uvicorn workers share one queue, crowd manager, spare doctor
+pool, allocator, override system, activity log and arrival forecaster.
+
+How it works:
+1. One state-owner process (`python -m app.scripts.serve_shared_state`)
+   holds the real singletons and serves them on a local Unix socket.
+2. Each worker calls `connect_shared_state()` at startup; from then on the
+   `get_*()` service getters return proxies instead of local objects.
+3. A proxied call runs in the owner under one global lock, so every
+   worker sees one consistent state and services that call each other
+   (e.g. the allocator reading the queue) stay atomic. The result is
+   pickled while the lock is still held. The lock is STATE_LOCK, which the
+   owner's own background jobs hold as well.
+
+Public methods, public attributes and properties (read-only) and len()
+work through a proxy; a method call or attribute read is one round trip.
+"""
+
+import os
+import pickle
+import threading
+from multiprocessing.managers import BaseManager, BaseProxy
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.services.state_lock import STATE_LOCK
+
+_PICKLE = pickle.HIGHEST_PROTOCOL
+
+
+def _service_getters() -> Dict[str, Callable[[], Any]]:
+    """Getters of the shared services (imported lazily: they import this module)."""
+    from app.services.priority_queue import get_priority_queue
+    from app.services.crowd_manager import get_crowd_manager
+    from app.services.spare_doctor_pool import get_spare_doctor_pool
+    from app.services.ai_doctor_allocator import get_ai_allocator
+    from app.services.emergency_override import get_override_system
+    from app.services.activity_logger import get_activity_logger
+    from app.services.arrival_forecast import get_arrival_forecaster
+    return {
+        "priority_queue": get_priority_queue,
+        "crowd_manager": get_crowd_manager,
+        "spare_doctor_pool": get_spare_doctor_pool,
+        "ai_allocator": get_ai_allocator,
+        "override_system": get_override_system,
+        "activity_logger": get_activity_logger,
+        "arrival_forecaster": get_arrival_forecaster,
+    }
+
+
+# Special methods a proxy forwards, with how the owner evaluates them
+_FORWARDED_DUNDERS: Dict[str, Callable[[Any], Any]] = {"__len__": len, "__bool__": bool}
+
+
+class _SerializedService:
+    """Owner-side wrapper: runs one public method or attribute read under the shared lock."""
+
+    def __init__(self, target: Any, lock: threading.Lock):
+        self._target = target
+        self._lock = lock
+
+    def call(self, name: str, args: Tuple, kwargs: Dict) -> bytes:
+        if name in _FORWARDED_DUNDERS:
+            with self._lock:
+                return pickle.dumps(_FORWARDED_DUNDERS[name](self._target), protocol=_PICKLE)
+        if name.startswith("_"):
+            raise AttributeError(f"{name} is not shared")
+        with self._lock:
+            result = getattr(self._target, name)(*args, **kwargs)
+            return pickle.dumps(result, protocol=_PICKLE)
+
+    def get(self, name: str) -> Tuple[bool, bytes]:
+        """(True, b"") if `name` is a method, else (False, its pickled value)."""
+        if name.startswith("_"):
+            raise AttributeError(f"{name} is not shared")
+        with self._lock:
+            value = getattr(self._target, name)
+            if callable(value):
+                return True, b""
+            return False, pickle.dumps(value, protocol=_PICKLE)
+
+
+class ServiceProxy(BaseProxy):
+    """
+    Worker-side stand-in for a shared service. Attribute reads go to the
+    owner; names found to be methods are remembered (per service type), so
+    calling one again costs a single round trip.
+    """
+
+    _exposed_ = ("call", "get")
+    _method_names: Dict[str, set] = {}  # service typeid -> names known to be methods
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        methods = ServiceProxy._method_names.setdefault(self._token.typeid, set())
+        if name not in methods:
+            is_method, value = self._callmethod("get", (name,))
+            if not is_method:
+                return pickle.loads(value)
+            methods.add(name)
+
+        def method(*args, **kwargs):
+            return pickle.loads(self._callmethod("call", (name, args, kwargs)))
+
+        method.__name__ = name
+        return method
+
+    def __len__(self) -> int:
+        return pickle.loads(self._callmethod("call", ("__len__", (), {})))
+
+    def __bool__(self) -> bool:
+        return pickle.loads(self._callmethod("call", ("__bool__", (), {})))
+
+
+class SharedStateManager(BaseManager):
+    """Manager serving (owner) or reaching (workers) the shared services."""
+
+
+# Proxies for this process once connect_shared_state() has been called
+_proxies: Dict[str, ServiceProxy] = {}
+
+
+def get_shared_service(name: str) -> Optional[ServiceProxy]:
+    """Proxy for a shared service, or None when state is local to this process."""
+    return _proxies.get(name)
+
+
+def _authkey(secret: str) -> bytes:
+    return secret.encode()
+
+
+def serve_shared_state(address: str, secret: str) -> None:
+    """Run the state owner on a Unix socket until interrupted."""
+    for name, getter in _service_getters().items():
+        service = _SerializedService(getter(), STATE_LOCK)
+        SharedStateManager.register(name, callable=lambda service=service: service, proxytype=ServiceProxy)
+
+    # A socket file left behind by a previous owner blocks the bind
+    if os.path.exists(address):
+        os.remove(address)
+    manager = SharedStateManager(address=address, authkey=_authkey(secret))
+    manager.get_server().serve_forever()
+
+
+def connect_shared_state(address: str, secret: str) -> None:
+    """Route this worker's service getters to the state owner at `address`."""
+    names = list(_service_getters())
+    for name in names:
+        SharedStateManager.register(name, proxytype=ServiceProxy)
+    manager = SharedStateManager(address=address, authkey=_authkey(secret))
+    manager.connect()
+    for name in names:
+        _proxies[name] = getattr(manager, name)()
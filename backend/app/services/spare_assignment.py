@@ -0,0 +1,185 @@
+"""
+SmartCare Spare Doctor Assignment
+==================================
+Assigns available spare doctors to every department that wants one in a
+single optimization, instead of department by department in a fixed order
+where an early department can take a specialist that a later one needs
+more.
+
+Model (a min-cost bipartite flow, solved as an assignment problem):
+- Each department asks for `slots` extra doctors. Slot k is worth the
+  reduction in the last waiting patient's wait from the k-th extra doctor:
+      queue * AVG_CONSULTATION_MINUTES * (1/(doctors + k - 1) - 1/(doctors + k))
+  scaled by the department's urgency `weight` (its AI score, or more for
+  wait-time protection). Later slots are worth less, so extra doctors go
+  where they help most.
+- A doctor's value for a slot is the slot's worth times
+    * specialty match: 1.0 for the department's own specialty,
+      GENERAL_MATCH for a general doctor, ineligible otherwise
+    * remaining capacity: available patient slots / max patients
+- Cost = -value. Ineligible pairs cost 0, the same as leaving the slot
+  empty, and are dropped from the result.
+
+`min_cost_assignment` is a shortest augmenting path solver (Jonker-Volgenant
+style, as in scipy's linear_sum_assignment) vectorized over columns with
+NumPy: O(rows^2 * cols) worst case, a few milliseconds at 150 slots x 500
+doctors (see app/scripts/benchmark_spare_assignment.py).
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.spare_doctor_pool import SpareDoctor
+
+AVG_CONSULTATION_MINUTES = 15
+
+# Value of a general doctor relative to a specialist of the department
+GENERAL_MATCH = 0.7
+
+
+@dataclass
+class DepartmentDemand:
+    """Extra doctors a department asks for in one assignment round."""
+    department: str
+    slots: int
+    queue: int
+    doctors: int          # doctors already serving the department
+    weight: float = 1.0   # urgency multiplier
+    reason: str = ""
+
+    def slot_value(self, k: int) -> float:
+        """Minutes the k-th extra doctor (1-based) takes off the last patient's wait."""
+        before = max(self.doctors + k - 1, 1)
+        return self.weight * self.queue * AVG_CONSULTATION_MINUTES * (1 / before - 1 / (before + 1))
+
+
+@dataclass
+class SpareAssignment:
+    """One doctor-to-department assignment of a solved round."""
+    department: str
+    doctor: SpareDoctor
+    value: float          # weighted wait reduction (minutes)
+    reason: str
+
+
+def specialty_match(doctor: SpareDoctor, department: str) -> float:
+    specialty = doctor.specialty.upper()
+    if specialty == department.upper():
+        return 1.0
+    if specialty == "GENERAL":
+        return GENERAL_MATCH
+    return 0.0
+
+
+def remaining_capacity(doctor: SpareDoctor) -> float:
+    if doctor.max_patients <= 0:
+        return 0.0
+    return max(doctor.max_patients - doctor.patients_seen, 0) / doctor.max_patients
+
+
+def min_cost_assignment(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Minimum-cost matching of every row of `cost` (rows <= columns).
+
+    Returns (rows, columns) index arrays like scipy.optimize.linear_sum_assignment.
+    Costs must be finite.
+    """
+    n, m = cost.shape
+    if n > m:
+        cols, rows = min_cost_assignment(cost.T)
+        order = np.argsort(rows)
+        return rows[order], cols[order]
+
+    u = np.zeros(n)                          # row potentials
+    v = np.zeros(m)                          # column potentials
+    col4row = np.full(n, -1, dtype=np.int64)
+    row4col = np.full(m, -1, dtype=np.int64)
+
+    for start in range(n):
+        # Dijkstra over reduced costs from `start` until a free column is reached
+        shortest = np.full(m, np.inf)
+        path = np.full(m, -1, dtype=np.int64)
+        unscanned = np.ones(m, dtype=bool)
+        scanned_rows = np.zeros(n, dtype=bool)
+        distance = 0.0
+        i = start
+        while True:
+            scanned_rows[i] = True
+            reduced = distance + cost[i] - u[i] - v
+            closer = unscanned & (reduced < shortest)
+            path[closer] = i
+            shortest[closer] = reduced[closer]
+            candidates = np.where(unscanned, shortest, np.inf)
+            distance = candidates.min()
+            # Among equally short paths prefer one ending at a free column
+            ties = np.flatnonzero(candidates == distance)
+            free = ties[row4col[ties] < 0]
+            j = int(free[0] if len(free) else ties[0])
+            unscanned[j] = False
+            if row4col[j] < 0:
+                sink = j
+                break
+            i = row4col[j]
+
+        # Update potentials so reduced costs stay non-negative
+        u[start] += distance
+        others = scanned_rows.copy()
+        others[start] = False
+        u[others] += distance - shortest[col4row[others]]
+        scanned = ~unscanned
+        v[scanned] -= distance - shortest[scanned]
+
+        # Flip the augmenting path
+        j = sink
+        while True:
+            i = path[j]
+            row4col[j] = i
+            col4row[i], j = j, col4row[i]
+            if i == start:
+                break
+
+    return np.arange(n), col4row
+
+
+def solve_assignments(
+    demands: Iterable[DepartmentDemand],
+    doctors: List[SpareDoctor],
+    max_per_department: Optional[int] = None
+) -> List[SpareAssignment]:
+    """
+    Best assignment of `doctors` (all available) to the departments' slots.
+
+    Departments can end up with fewer doctors than asked for when there are
+    not enough eligible doctors, or when a doctor is worth more elsewhere.
+    """
+    slots: List[Tuple[DepartmentDemand, float]] = []
+    for demand in demands:
+        count = demand.slots if max_per_department is None else min(demand.slots, max_per_department)
+        slots.extend((demand, demand.slot_value(k)) for k in range(1, count + 1))
+    if not slots or not doctors:
+        return []
+
+    departments = sorted({demand.department.upper() for demand, _ in slots})
+    column = {department: i for i, department in enumerate(departments)}
+    # Doctor fit per department: specialty match (see specialty_match) x remaining capacity
+    fit = np.zeros((len(doctors), len(departments)))
+    for i, doctor in enumerate(doctors):
+        specialty = doctor.specialty.upper()
+        if specialty == "GENERAL":
+            fit[i] = GENERAL_MATCH
+        if specialty in column:
+            fit[i, column[specialty]] = 1.0
+    fit *= np.array([remaining_capacity(doctor) for doctor in doctors])[:, None]
+
+    worth = np.array([value for _, value in slots])
+    slot_fit = fit[:, [column[demand.department.upper()] for demand, _ in slots]].T
+    value = worth[:, None] * slot_fit
+    rows, cols = min_cost_assignment(-value)
+
+    return [
+        SpareAssignment(slots[r][0].department, doctors[c], float(value[r, c]), slots[r][0].reason)
+        for r, c in zip(rows.tolist(), cols.tolist())
+        if value[r, c] > 0
+    ]
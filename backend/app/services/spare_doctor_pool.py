@@ -11,11 +11,15 @@ Features:
 4. Audit logging for all assignments
 """
 
-from typing import Dict, List, Optional
+import heapq
+from itertools import count
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from enum import Enum
 from dataclasses import dataclass, field
 from app.core.constants import SPARE_DOCTOR_CONFIG, QUEUE_THRESHOLDS
+from app.services.shared_state import get_shared_service
+from app.services.state_lock import state_unlocked
 
 
 class DoctorStatus(str, Enum):
@@ -48,6 +52,9 @@ class SpareDoctor:
     patients_seen: int = 0
     max_patients: int = 10  # Max patients per assignment
     supports_teleconsult: bool = True
+    partner: Optional[str] = None            # lending partner hospital (None: local demo pool)
+    partner_doctor_id: Optional[str] = None  # the doctor's id at that partner
+    reservation_id: Optional[str] = None     # partner reservation held for this doctor
     
     def to_dict(self) -> Dict:
         return {
@@ -61,7 +68,8 @@ class SpareDoctor:
             "patients_seen": self.patients_seen,
             "max_patients": self.max_patients,
             "supports_teleconsult": self.supports_teleconsult,
-            "available_slots": self.max_patients - self.patients_seen
+            "available_slots": self.max_patients - self.patients_seen,
+            "partner": self.partner
         }
 
 
@@ -105,6 +113,29 @@ class SpareDoctorPool:
     - First: Teleconsultation queue
     - Second: Low-priority in-person queue
     - Never: Critical/urgent patients (regular staff only)
+    
+    Indexes:
+    ========
+    Status, (status, specialty) and assigned department each map to the
+    doctor ids in that bucket (dicts used as insertion-ordered sets, so a
+    doctor who became available earlier is listed first). Lookups cost the
+    size of the result, not the pool. Per-specialty max-heaps of remaining
+    capacity answer "available doctor with most capacity left" in
+    O(log n); heap entries go stale when a doctor's status or load changes
+    and are skipped when they reach the top.
+    
+    Every status or load change goes through `_update()` so the indexes
+    stay in step with the doctor records.
+    
+    Partner Doctors:
+    ================
+    Doctors lent by partner hospitals are synced in by the federation
+    layer (partner_federation.py), which is also the pool's partner
+    gateway: a partner doctor is reserved at its hospital before it is
+    assigned, the assignment is confirmed afterwards and a release cancels
+    the reservation. The reservation round trip runs with the state lock
+    released; doctors are checked again once it is back, and a loan the
+    partner does not confirm is revoked.
     """
     
     def __init__(self):
@@ -112,6 +143,18 @@ class SpareDoctorPool:
         self._assignment_logs: List[AssignmentLog] = []
         self._log_counter = 0
         
+        self._by_status: Dict[DoctorStatus, Dict[int, None]] = {status: {} for status in DoctorStatus}
+        self._by_specialty: Dict[Tuple[DoctorStatus, str], Dict[int, None]] = {}
+        self._by_department: Dict[str, Dict[int, None]] = {}
+        # specialty ("" = any) -> heap of (-remaining capacity, seq, doctor id)
+        self._capacity_heaps: Dict[str, List[Tuple[int, int, int]]] = {}
+        self._heap_seq: Dict[int, int] = {}  # doctor id -> seq of its live heap entries
+        self._seq = count()
+        self._by_partner: Dict[str, Dict[int, None]] = {}
+        self._partner_gateway = None  # PartnerFederation when partner hospitals are configured
+        self._reserving: Dict[int, None] = {}  # doctor ids with a reservation round trip in flight
+        self._version = 0  # bumped on every change to a doctor's record (see version)
+        
         # Initialize demo spare doctors
         self._init_demo_pool()
     
@@ -129,43 +172,248 @@ class SpareDoctorPool:
         ]
         
         for doc in demo_doctors:
-            self._pool[doc["id"]] = SpareDoctor(
+            self.add_doctor(SpareDoctor(
                 doctor_id=doc["id"],
                 name=doc["name"],
                 specialty=doc["specialty"],
                 hospital_origin=doc["hospital"]
-            )
+            ))
+    
+    # =========================================================================
+    # INDEXES
+    # =========================================================================
+    
+    @property
+    def version(self) -> int:
+        """Doctor status and load change counter (usable in an ETag)."""
+        return self._version
+    
+    def _index(self, doctor: SpareDoctor) -> None:
+        self._version += 1
+        doctor_id, specialty = doctor.doctor_id, doctor.specialty.upper()
+        self._by_status[doctor.status][doctor_id] = None
+        self._by_specialty.setdefault((doctor.status, specialty), {})[doctor_id] = None
+        if doctor.status == DoctorStatus.ASSIGNED and doctor.assigned_department:
+            self._by_department.setdefault(doctor.assigned_department.upper(), {})[doctor_id] = None
+        if doctor.status == DoctorStatus.AVAILABLE:
+            seq = next(self._seq)
+            self._heap_seq[doctor_id] = seq
+            entry = (-(doctor.max_patients - doctor.patients_seen), seq, doctor_id)
+            for key in (specialty, ""):
+                heap = self._capacity_heaps.setdefault(key, [])
+                heapq.heappush(heap, entry)
+                if len(heap) > 2 * len(self._by_status[DoctorStatus.AVAILABLE]) + 64:
+                    self._compact(key)
+    
+    def _unindex(self, doctor: SpareDoctor) -> None:
+        doctor_id = doctor.doctor_id
+        self._by_status[doctor.status].pop(doctor_id, None)
+        self._by_specialty.get((doctor.status, doctor.specialty.upper()), {}).pop(doctor_id, None)
+        if doctor.assigned_department:
+            self._by_department.get(doctor.assigned_department.upper(), {}).pop(doctor_id, None)
+        self._heap_seq.pop(doctor_id, None)  # its heap entries are stale from now on
+    
+    def _update(self, doctor: SpareDoctor, **changes) -> None:
+        """Change a doctor's fields and re-index it."""
+        self._unindex(doctor)
+        for name, value in changes.items():
+            setattr(doctor, name, value)
+        self._index(doctor)
+    
+    def _compact(self, key: str) -> None:
+        """Drop stale entries from one capacity heap."""
+        heap = [entry for entry in self._capacity_heaps[key] if self._heap_seq.get(entry[2]) == entry[1]]
+        heapq.heapify(heap)
+        self._capacity_heaps[key] = heap
+    
+    def _doctors(self, ids: Dict[int, None]) -> List[SpareDoctor]:
+        return [self._pool[doctor_id] for doctor_id in ids]
+    
+    # =========================================================================
+    # QUERIES
+    # =========================================================================
+    
+    def add_doctor(self, doctor: SpareDoctor) -> None:
+        """Add (or replace) a spare doctor in the pool."""
+        previous = self._pool.get(doctor.doctor_id)
+        if previous is not None:
+            self._unindex(previous)
+        self._pool[doctor.doctor_id] = doctor
+        self._index(doctor)
+        if doctor.partner:
+            self._by_partner.setdefault(doctor.partner, {})[doctor.doctor_id] = None
+    
+    def remove_doctor(self, doctor_id: int) -> bool:
+        """Drop a spare doctor from the pool."""
+        doctor = self._pool.pop(doctor_id, None)
+        if doctor is None:
+            return False
+        self._unindex(doctor)
+        self._version += 1
+        if doctor.partner:
+            self._by_partner.get(doctor.partner, {}).pop(doctor_id, None)
+        return True
+    
+    def get_doctor(self, doctor_id: int) -> Optional[SpareDoctor]:
+        """Get one spare doctor by ID."""
+        return self._pool.get(doctor_id)
+    
+    def get_all_doctors(self) -> List[SpareDoctor]:
+        """Get every spare doctor regardless of status."""
+        return list(self._pool.values())
     
     def get_available_doctors(self, specialty: str = None) -> List[SpareDoctor]:
         """Get list of available spare doctors, optionally filtered by specialty."""
-        available = [
-            doc for doc in self._pool.values()
-            if doc.status == DoctorStatus.AVAILABLE
-        ]
-        
         if specialty:
-            # Filter by specialty (case-insensitive)
-            available = [
-                doc for doc in available
-                if doc.specialty.upper() == specialty.upper()
-            ]
-        
-        return available
+            # Specialty match is case-insensitive
+            return self._doctors(self._by_specialty.get((DoctorStatus.AVAILABLE, specialty.upper()), {}))
+        return self._doctors(self._by_status[DoctorStatus.AVAILABLE])
+    
+    def count_available(self, specialty: str = None) -> int:
+        """Number of available spare doctors, optionally of one specialty."""
+        if specialty:
+            return len(self._by_specialty.get((DoctorStatus.AVAILABLE, specialty.upper()), {}))
+        return len(self._by_status[DoctorStatus.AVAILABLE])
+    
+    def get_most_available_doctor(self, specialty: str = None) -> Optional[SpareDoctor]:
+        """Available doctor with the most remaining capacity (longest available on ties)."""
+        key = specialty.upper() if specialty else ""
+        heap = self._capacity_heaps.get(key)
+        while heap:
+            _, seq, doctor_id = heap[0]
+            if self._heap_seq.get(doctor_id) == seq:
+                return self._pool[doctor_id]
+            heapq.heappop(heap)
+        return None
     
     def get_assigned_doctors(self, department: str = None) -> List[SpareDoctor]:
         """Get list of currently assigned spare doctors."""
-        assigned = [
-            doc for doc in self._pool.values()
-            if doc.status == DoctorStatus.ASSIGNED
-        ]
-        
         if department:
-            assigned = [
-                doc for doc in assigned
-                if doc.assigned_department and doc.assigned_department.upper() == department.upper()
-            ]
+            return self._doctors(self._by_department.get(department.upper(), {}))
+        return self._doctors(self._by_status[DoctorStatus.ASSIGNED])
+    
+    def count_assigned(self, department: str = None) -> int:
+        """Number of assigned spare doctors, optionally in one department."""
+        if department:
+            return len(self._by_department.get(department.upper(), {}))
+        return len(self._by_status[DoctorStatus.ASSIGNED])
+    
+    # =========================================================================
+    # PARTNER HOSPITALS
+    # =========================================================================
+    
+    def set_partner_gateway(self, gateway) -> None:
+        """Route partner doctor reservations through `gateway` (None: partners off)."""
+        self._partner_gateway = gateway
+    
+    def sync_partner_doctors(self, partner: str, offered: List[SpareDoctor]) -> Dict:
+        """
+        Replace a partner's unassigned doctors with the ones it currently offers.
+        Doctors assigned here (or holding or awaiting a reservation) are left alone.
+        """
+        offered_ids = {doctor.doctor_id for doctor in offered}
+        removed = 0
+        for doctor_id in list(self._by_partner.get(partner, {})):
+            if doctor_id not in offered_ids and not self._is_held(self._pool[doctor_id]):
+                removed += self.remove_doctor(doctor_id)
+        
+        added = 0
+        for doctor in offered:
+            current = self._pool.get(doctor.doctor_id)
+            if current is None or not self._is_held(current):
+                added += current is None
+                self.add_doctor(doctor)
+        return {"partner": partner, "offered": len(offered), "added": added, "removed": removed}
+    
+    def _is_held(self, doctor: SpareDoctor) -> bool:
+        """Assigned here, holding a reservation or being reserved right now."""
+        return (
+            doctor.status == DoctorStatus.ASSIGNED or bool(doctor.reservation_id)
+            or doctor.doctor_id in self._reserving
+        )
+    
+    def reserve_doctors(self, requests: List[Tuple[int, str]]) -> Dict[int, bool]:
+        """
+        Reserve partner doctors for (doctor id, department) pairs ahead of
+        assign_doctor, all in one concurrent round trip. Local doctors need
+        no reservation and are left out of the result.
         
-        return assigned
+        Must be called with the state lock held; it is released while the
+        partners answer. A doctor that was removed or stopped being available
+        meanwhile counts as not reserved and its reservation is cancelled.
+        """
+        wanted = [
+            (self._pool[doctor_id], department) for doctor_id, department in requests
+            if doctor_id in self._pool and self._pool[doctor_id].partner
+            and not self._pool[doctor_id].reservation_id and doctor_id not in self._reserving
+        ]
+        if not wanted:
+            return {}
+        gateway = self._partner_gateway
+        if gateway is None:
+            return {doctor.doctor_id: False for doctor, _ in wanted}
+        
+        for doctor, _ in wanted:
+            self._reserving[doctor.doctor_id] = None
+        try:
+            with state_unlocked():
+                reservations = gateway.reserve(wanted)
+        finally:
+            for doctor, _ in wanted:
+                self._reserving.pop(doctor.doctor_id, None)
+        
+        reserved = {}
+        for doctor, _ in wanted:
+            reservation_id = reservations.get(doctor.doctor_id)
+            if self._pool.get(doctor.doctor_id) is not doctor or doctor.status != DoctorStatus.AVAILABLE:
+                # Changed while the partners were answering; hand the doctor back
+                if reservation_id:
+                    doctor.reservation_id = reservation_id
+                    gateway.release(doctor)
+                    doctor.reservation_id = None
+                reserved[doctor.doctor_id] = False
+                continue
+            doctor.reservation_id = reservation_id
+            if reservation_id is None:
+                # Taken at the partner; offline until the next availability sync
+                self._update(doctor, status=DoctorStatus.OFFLINE)
+            reserved[doctor.doctor_id] = reservation_id is not None
+        return reserved
+    
+    def revoke_partner_assignment(self, doctor_id: int, reservation_id: str, reason: str) -> Optional[Dict]:
+        """
+        Undo the assignment of a partner doctor whose hospital did not
+        confirm the loan; the doctor stays offline until the next
+        availability sync. None if the doctor has since been released or
+        holds another reservation.
+        """
+        doctor = self._pool.get(doctor_id)
+        if doctor is None or doctor.status != DoctorStatus.ASSIGNED or doctor.reservation_id != reservation_id:
+            return None
+        
+        department = doctor.assigned_department
+        self._log_assignment(doctor, "released", department or "N/A", reason, "partner")
+        doctor.reservation_id = None
+        self._update(
+            doctor,
+            status=DoctorStatus.OFFLINE,
+            assigned_department=None,
+            assigned_at=None,
+            patients_seen=0
+        )
+        return {
+            "success": True,
+            "doctor": doctor.to_dict(),
+            "department": department,
+            "message": f"Dr. {doctor.name} returned to {doctor.hospital_origin}"
+        }
+    
+    def _drop_reservation(self, doctor: SpareDoctor) -> None:
+        """Hand a reserved or lent partner doctor back to their hospital."""
+        if doctor.reservation_id:
+            if self._partner_gateway is not None:
+                self._partner_gateway.release(doctor)
+            doctor.reservation_id = None
     
     def should_activate_spare_doctors(
         self,
@@ -192,15 +440,13 @@ class SpareDoctorPool:
             current_spare_count < max_spare
         )
         
-        available = self.get_available_doctors(department)
-        
         return {
             "should_activate": should_activate,
             "current_utilization": round(utilization, 1),
             "threshold": threshold,
             "current_spare_doctors": current_spare_count,
             "max_spare_doctors": max_spare,
-            "available_in_pool": len(available),
+            "available_in_pool": self.count_available(department),
             "reason": self._get_activation_reason(utilization, threshold, current_spare_count, max_spare)
         }
     
@@ -242,22 +488,37 @@ class SpareDoctorPool:
                 "error": f"Doctor is currently {doctor.status.value}"
             }
         
+        # Partner doctors must be reserved at their hospital first (the
+        # doctor is re-checked when the lock is back, the department below)
+        if doctor.partner and not doctor.reservation_id:
+            if not self.reserve_doctors([(doctor_id, department)]).get(doctor_id):
+                return {
+                    "success": False,
+                    "error": f"{doctor.hospital_origin} could not confirm {doctor.name}'s availability"
+                }
+        
         # Check max spare doctors per department
-        current_assigned = len(self.get_assigned_doctors(department))
+        current_assigned = self.count_assigned(department)
         if current_assigned >= SPARE_DOCTOR_CONFIG["max_spare_doctors_per_dept"]:
+            self._drop_reservation(doctor)
             return {
                 "success": False,
                 "error": f"Maximum spare doctors ({SPARE_DOCTOR_CONFIG['max_spare_doctors_per_dept']}) already assigned to {department}"
             }
         
         # Assign doctor
-        doctor.status = DoctorStatus.ASSIGNED
-        doctor.assigned_department = department
-        doctor.assigned_at = datetime.utcnow()
-        doctor.patients_seen = 0
+        self._update(
+            doctor,
+            status=DoctorStatus.ASSIGNED,
+            assigned_department=department,
+            assigned_at=datetime.utcnow(),
+            patients_seen=0
+        )
         
         # Log assignment
         self._log_assignment(doctor, "assigned", department, reason, initiated_by)
+        if doctor.partner and self._partner_gateway is not None:
+            self._partner_gateway.confirm(doctor)
         
         return {
             "success": True,
@@ -282,12 +543,16 @@ class SpareDoctorPool:
         
         # Log before changing status
         self._log_assignment(doctor, "released", old_department or "N/A", reason, initiated_by)
+        self._drop_reservation(doctor)
         
         # Reset doctor
-        doctor.status = DoctorStatus.AVAILABLE
-        doctor.assigned_department = None
-        doctor.assigned_at = None
-        doctor.patients_seen = 0
+        self._update(
+            doctor,
+            status=DoctorStatus.AVAILABLE,
+            assigned_department=None,
+            assigned_at=None,
+            patients_seen=0
+        )
         
         return {
             "success": True,
@@ -303,24 +568,17 @@ class SpareDoctorPool:
     ) -> Optional[Dict]:
         """
         Automatically assign an available spare doctor to overloaded department.
-        Uses greedy algorithm - picks first available matching specialist.
+        Uses greedy algorithm - picks the matching specialist with the most
+        remaining capacity, else the general doctor with the most.
         """
-        # Get available doctors with matching specialty
-        available = self.get_available_doctors(department)
+        doctor = self.get_most_available_doctor(department) or self.get_most_available_doctor("GENERAL")
         
-        # If no specialists, get general doctors
-        if not available:
-            available = self.get_available_doctors("GENERAL")
-        
-        if not available:
+        if doctor is None:
             return {
                 "success": False,
                 "error": "No spare doctors available"
             }
         
-        # Pick first available (greedy)
-        doctor = available[0]
-        
         reason = f"Auto-assigned due to high utilization ({utilization:.0f}%)"
         return self.assign_doctor(doctor.doctor_id, department, reason, initiated_by)
     
@@ -356,7 +614,7 @@ class SpareDoctorPool:
             return False
         
         doctor = self._pool[doctor_id]
-        doctor.patients_seen += 1
+        self._update(doctor, patients_seen=doctor.patients_seen + 1)
         
         # Auto-release if max patients reached
         if doctor.patients_seen >= doctor.max_patients:
@@ -408,15 +666,13 @@ class SpareDoctorPool:
     
     def get_pool_status(self) -> Dict:
         """Get overall status of the spare doctor pool."""
-        all_doctors = list(self._pool.values())
-        
         return {
-            "total_doctors": len(all_doctors),
-            "available": len([d for d in all_doctors if d.status == DoctorStatus.AVAILABLE]),
-            "assigned": len([d for d in all_doctors if d.status == DoctorStatus.ASSIGNED]),
-            "on_teleconsult": len([d for d in all_doctors if d.status == DoctorStatus.TELECONSULT]),
-            "offline": len([d for d in all_doctors if d.status == DoctorStatus.OFFLINE]),
-            "doctors": [d.to_dict() for d in all_doctors]
+            "total_doctors": len(self._pool),
+            "available": len(self._by_status[DoctorStatus.AVAILABLE]),
+            "assigned": len(self._by_status[DoctorStatus.ASSIGNED]),
+            "on_teleconsult": len(self._by_status[DoctorStatus.TELECONSULT]),
+            "offline": len(self._by_status[DoctorStatus.OFFLINE]),
+            "doctors": [d.to_dict() for d in self._pool.values()]
         }
     
     def get_specialties_available(self) -> Dict[str, int]:
@@ -437,6 +693,9 @@ _spare_pool = None
 def get_spare_doctor_pool() -> SpareDoctorPool:
     """Get the global spare doctor pool instance."""
     global _spare_pool
+    shared = get_shared_service("spare_doctor_pool")
+    if shared is not None:
+        return shared
     if _spare_pool is None:
         _spare_pool = SpareDoctorPool()
     return _spare_pool
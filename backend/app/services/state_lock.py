@@ -0,0 +1,70 @@
+"""
+SmartCare State Lock
+=====================
+One process-wide lock around the in-memory services (queue, crowd manager,
+spare doctor pool, allocator, override system, activity log), which are not
+thread-safe on their own.
+
+Request handlers run on the event loop while background work (allocation
+worker, periodic jobs, partner refresh) runs in threads; both hold this lock
+while they use the services, so neither sees the other's half-finished
+update. The shared state owner serializes proxied calls with the same lock.
+
+Handlers take it only around their service calls (`async with
+state_locked():`): triage, ID allocation and response encoding stay
+outside. Handlers never await inside the block, so they cannot interleave
+with each other on the event loop; the lock only has to keep the
+background threads out.
+
+Services that wait on the network while called under the lock (partner
+hospital reservations) step out of it with `state_unlocked()` for the
+round trip and re-check what they read before it. Handlers that can reach
+them (anything assigning spare doctors) are plain `def` endpoints, which
+FastAPI runs in its threadpool, and take the lock with `with STATE_LOCK:`;
+on the event loop the round trip, and taking the lock back afterwards,
+would stall every other request of the worker.
+"""
+
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+
+STATE_LOCK = threading.Lock()
+
+
+@asynccontextmanager
+async def state_locked() -> AsyncIterator[None]:
+    """
+    Hold the state lock for one block of a request handler.
+
+    Free (the usual case) it is taken right away; while a background job
+    holds it the wait happens in the default executor, so the event loop
+    keeps serving other requests.
+    """
+    if not STATE_LOCK.acquire(blocking=False):
+        waiter = asyncio.get_running_loop().run_in_executor(None, STATE_LOCK.acquire)
+        try:
+            await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            # The executor thread still gets the lock; hand it back when it does
+            waiter.add_done_callback(lambda _: STATE_LOCK.release())
+            raise
+    try:
+        yield
+    finally:
+        STATE_LOCK.release()
+
+
+@contextmanager
+def state_unlocked() -> Iterator[None]:
+    """
+    Release the state lock, which the caller holds, for the block and take
+    it back afterwards. Anything read under the lock before the block may
+    have changed by the end of it.
+    """
+    STATE_LOCK.release()
+    try:
+        yield
+    finally:
+        STATE_LOCK.acquire()
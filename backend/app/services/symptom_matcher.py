@@ -0,0 +1,52 @@
+"""
+SmartCare Symptom Matcher
+==========================
+Finds every severity keyword in a patient's symptoms in one pass, instead
+of one substring test per keyword.
+
+How it works:
+- All keywords of all tiers go into one PhraseIndex (symptom_text.py):
+  the input is tokenized once and its word n-grams are looked up in a
+  dict, so matching costs O(words x keyword lengths) however large the
+  lexicon grows. Matches are on word boundaries, after normalization and
+  stemming, and negated mentions ("no chest pain") are skipped. Keywords
+  of strict tiers (CRITICAL) are only negated right after the negator.
+- Each keyword knows its tier and its position in the tier's dict, so
+  callers can keep the tier precedence and "first keyword in dict order"
+  explanations.
+
+The triage lexicons are compiled with the rest of the triage rules
+(triage_rules.py). See app/scripts/benchmark_symptom_matcher.py for the
+10k-keyword comparison.
+"""
+
+from typing import Iterable, List, Sequence, Tuple
+
+from app.services.symptom_text import PhraseIndex, SymptomTokens
+
+
+class TieredLexicon:
+    """
+    Keywords grouped into tiers (CRITICAL, URGENT, ...), matched together.
+    `match` returns, per tier, the keywords found in the tier's dict order.
+    Keywords of `strict_tiers` are not dropped on a loose negation scope.
+    """
+
+    def __init__(self, tiers: Sequence[Tuple[str, Iterable[str]]], strict_tiers: Iterable[str] = ()):
+        self.tier_names = [name for name, _ in tiers]
+        strict_tiers = set(strict_tiers)
+        keywords, tier_of, strict = [], [], []
+        for tier, (name, lexicon) in enumerate(tiers):
+            for keyword in lexicon:
+                if name in strict_tiers:
+                    strict.append(len(keywords))
+                keywords.append(keyword)
+                tier_of.append(tier)
+        self._tier_of, self.index = tier_of, PhraseIndex(keywords, strict)
+
+    def match(self, tokens: SymptomTokens) -> List[List[str]]:
+        matched: List[List[str]] = [[] for _ in self.tier_names]
+        # Keyword ids run tier by tier in dict order, so ascending ids keep that order
+        for keyword_id in self.index.find(tokens):
+            matched[self._tier_of[keyword_id]].append(self.index.phrases[keyword_id])
+        return matched
@@ -0,0 +1,154 @@
+"""
+SmartCare Symptom Text
+=======================
+Normalization, tokenization and phrase lookup for symptom input, shared by
+the triage engine, the legacy TriageService and the AI SymptomAnalyzer.
+
+Pipeline:
+1. normalize: lowercase, fold "_", "-" and "/" to spaces and drop
+   apostrophes, so the seeder's "chest_pain", a kiosk's "chest-pain" and
+   typed "Chest pain" all read the same.
+2. tokenize: split every input (symptom item or description) into words.
+   Punctuation and the end of each input are segment breaks; phrases never
+   span them. Words are stemmed with a few suffix rules ("pains", "burns",
+   "allergies", "vomiting"), the same rules used for the keywords.
+3. negation: a negator ("no", "not", "without", "denies", ...) negates the
+   phrase right after it ("no chest pain", "denies any fever", and each
+   item of "no fever or cough"). Its scope covers at most NEGATION_WINDOW
+   words and ends early at words that start a new clause or object
+   ("and", "from", "in", "had", "but", ...): in "no relief from chest
+   pain" or "never had chest pain like this" the chest pain is affirmed.
+   A phrase starting further inside the scope is ignored too, unless the
+   index marks it strict (CRITICAL symptoms): those are only negated right
+   after the negator. Phrases that contain the negator themselves ("not
+   breathing") still match.
+4. PhraseIndex: keywords are stored as tuples of stemmed words in a dict,
+   and a text is matched by looking up its n-grams (n up to the longest
+   keyword), on word boundaries only: "pain" no longer matches inside
+   "painting", nor "cold" inside "scolding".
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+NEGATORS = frozenset({"no", "not", "without", "denies", "deny", "denied", "never", "none", "nor", "negative"})
+# Words ending a negation scope: contrasts, conjunctions, prepositions and
+# verbs opening a new clause ("no pulse and is unconscious")
+NEGATION_END = frozenset({
+    "but", "however", "although", "though", "except",
+    "and", "from", "in", "into", "with", "since", "after", "before", "until", "because", "while", "like",
+    "had", "has", "have", "is", "was", "are", "were"
+})
+NEGATION_SKIP = frozenset({"a", "an", "any", "the"})  # may sit between a negator and its phrase
+NEGATION_WINDOW = 4
+
+_FOLD = re.compile(r"[_\-/]+")
+_APOSTROPHE = re.compile(r"['’]")
+_SEGMENT = re.compile(r"[.,;:!?()\[\]\n]+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase `text`, fold separators to spaces and collapse whitespace."""
+    text = _APOSTROPHE.sub("", _FOLD.sub(" ", text.lower()))
+    return " ".join(text.split())
+
+
+def stem(word: str) -> str:
+    """Strip one common suffix; numbers and short words are kept as they are."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 5 and word.endswith("ing"):
+        return word[:-3]
+    if len(word) > 5 and word.endswith("ed"):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+@dataclass(frozen=True)
+class SymptomTokens:
+    """
+    Stemmed words of one or more inputs. `words` holds None at segment
+    breaks; `negated[i]` tells whether word i lies in a negation scope,
+    `negation_head[i]` whether it directly follows the negator (so a phrase
+    starting there is negated outright) and `surface[i]` is the word before
+    stemming.
+    """
+    words: Tuple[Optional[str], ...]
+    negated: Tuple[bool, ...]
+    negation_head: Tuple[bool, ...]
+    surface: Tuple[Optional[str], ...]
+    
+    def affirmed_text(self) -> str:
+        """The normalized input without its negated words, for pattern rules."""
+        return " ".join(
+            word for word, negated in zip(self.surface, self.negated) if word is not None and not negated
+        )
+
+
+def tokenize(*texts: str) -> SymptomTokens:
+    """Tokens of all `texts`, each its own segment (empty texts are skipped)."""
+    words: List[Optional[str]] = []
+    negated: List[bool] = []
+    heads: List[bool] = []
+    surface: List[Optional[str]] = []
+    for text in texts:
+        if not text:
+            continue
+        for segment in _SEGMENT.split(normalize(text)):
+            scope = 0  # words still negated in this segment
+            head = False  # the next word starts a negated phrase
+            for word in _WORD.findall(segment):
+                if word in NEGATION_END:
+                    scope, head = 0, False
+                words.append(stem(word))
+                negated.append(scope > 0)
+                heads.append(head)
+                surface.append(word)
+                if word in NEGATORS:
+                    scope, head = NEGATION_WINDOW, True
+                elif scope:
+                    scope -= 1
+                    # "no fever or cough" negates both items
+                    head = scope > 0 and (head and word in NEGATION_SKIP or word == "or")
+            if words and words[-1] is not None:
+                words.append(None)
+                negated.append(False)
+                heads.append(False)
+                surface.append(None)
+    return SymptomTokens(tuple(words), tuple(negated), tuple(heads), tuple(surface))
+
+
+class PhraseIndex:
+    """
+    Keywords indexed by their stemmed word tuples; ids follow the input order.
+    Phrases in `strict` are only negated when they directly follow the negator.
+    """
+
+    def __init__(self, phrases: Iterable[str], strict: Iterable[int] = ()):
+        self.phrases = list(phrases)
+        self._strict = frozenset(strict)
+        self._index: Dict[Tuple[str, ...], List[int]] = {}
+        for phrase_id, phrase in enumerate(self.phrases):
+            key = tuple(word for word in tokenize(phrase).words if word is not None)
+            if not key:
+                raise ValueError(f"phrase {phrase!r} has no words")
+            self._index.setdefault(key, []).append(phrase_id)
+        self._lengths = sorted({len(key) for key in self._index})
+        self._first_words = frozenset(key[0] for key in self._index)
+
+    def find(self, tokens: SymptomTokens) -> List[int]:
+        """Ids of the phrases occurring (not negated) in `tokens`, ascending."""
+        words, negated, heads, index = tokens.words, tokens.negated, tokens.negation_head, self._index
+        found = set()
+        for start, word in enumerate(words):
+            if word not in self._first_words or heads[start]:
+                continue
+            for length in self._lengths:
+                ids = index.get(words[start:start + length])
+                if ids:
+                    found.update(ids if not negated[start] else self._strict.intersection(ids))
+        return sorted(found)
@@ -0,0 +1,129 @@
+"""
+SmartCare Triage Cache
+=======================
+Bounded LRU memoization of triage results. Kiosks submit the same
+symptom/age/condition combinations many times a day, and /triage/assess
+is usually followed by /checkin with the same input.
+
+Keys are canonical, so inputs that must triage the same share one entry:
+- symptoms and description: the set of normalized inputs (symptom_text),
+  since each input is matched on its own and matches come back in lexicon
+  order, whatever the input order, case or "_"/"-" spelling
+- chronic conditions: the set of normalized conditions
+- duration: its adjustment band (TriageEngine.get_duration_adjustment),
+  not the raw hours
+- age, emergency flag and self-reported severity as given (all three
+  appear in the explanation)
+
+Bounds: at most TRIAGE_CACHE_SIZE entries (least recently used evicted
+first), each valid for TRIAGE_CACHE_TTL_SECONDS. The whole cache is
+dropped when new triage rules are swapped in (rules_revision changes).
+Results are copied on the way in and out, so callers may modify them.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.triage_rules import rules_revision
+from app.services.symptom_text import normalize
+
+
+def canonical_texts(texts: List[str]) -> Tuple[str, ...]:
+    """Sorted distinct normalized texts (empty ones dropped)."""
+    return tuple(sorted({normalize(text) for text in texts if text and text.strip()}))
+
+
+def copy_result(result: Dict) -> Dict:
+    """Copy a triage result deep enough that its lists and dicts are not shared."""
+    return {
+        **result,
+        "explanation": list(result["explanation"]),
+        "calculation_breakdown": dict(result["calculation_breakdown"])
+    }
+
+
+class TriageCache:
+    """LRU + TTL cache of triage results with hit/miss counters."""
+
+    def __init__(self, max_entries: int = 4096, ttl_seconds: float = 600):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Dict]]" = OrderedDict()  # key -> (expires at, result)
+        self._version = rules_revision()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self) -> None:
+        version = rules_revision()
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+            self.invalidations += 1
+
+    def get(self, key: Hashable) -> Optional[Dict]:
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, result = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy_result(result)
+
+    def put(self, key: Hashable, result: Dict) -> None:
+        if self.max_entries <= 0:
+            return
+        stored = copy_result(result)
+        with self._lock:
+            self._check_version()
+            self._entries[key] = (time.monotonic() + self.ttl, stored)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "rules_revision": self._version
+            }
+
+
+# Singleton (per process: triage is stateless, so workers need not share it)
+_triage_cache = None
+
+def get_triage_cache() -> TriageCache:
+    """Get the global triage cache instance."""
+    global _triage_cache
+    if _triage_cache is None:
+        _triage_cache = TriageCache(settings.TRIAGE_CACHE_SIZE, settings.TRIAGE_CACHE_TTL_SECONDS)
+    return _triage_cache
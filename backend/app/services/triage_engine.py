@@ -14,12 +14,10 @@ Algorithm:
 
 from typing import List, Dict, Optional
 from datetime import datetime, date
-from app.core.constants import (
-    CRITICAL_SYMPTOMS, URGENT_SYMPTOMS, MODERATE_SYMPTOMS, 
-    LOW_SYMPTOMS, ROUTINE_SYMPTOMS, AGE_RISK_FACTORS,
-    CHRONIC_CONDITIONS, SEVERITY_DESCRIPTIONS, BASE_WAIT_TIMES,
-    TELECONSULT_ELIGIBLE
-)
+from app.services.symptom_text import tokenize
+from app.services.triage_rules import CompiledRules, get_rules
+from app.services.triage_cache import get_triage_cache, canonical_texts
+from app.services.triage_batch import triage_batch
 
 
 class TriageEngine:
@@ -35,6 +33,10 @@ class TriageEngine:
                   + emergency_flag_boost
     
     Output: Score 1-5 where 5 = most critical
+    
+    The rules (keywords, age factors, severity tables) come precompiled
+    from triage_rules.py; methods take an optional `rules` so one triage
+    uses a single consistent version across a hot reload.
     """
     
     @staticmethod
@@ -46,7 +48,7 @@ class TriageEngine:
         )
     
     @staticmethod
-    def get_age_risk_factor(age: int) -> float:
+    def get_age_risk_factor(age: int, rules: Optional[CompiledRules] = None) -> float:
         """
         Get risk multiplier based on age.
         
@@ -55,64 +57,52 @@ class TriageEngine:
         - Elderly (70+): 1.4-1.5x risk - higher complication rates
         - Adults (18-60): 1.0x baseline risk
         """
-        for (min_age, max_age), factor in AGE_RISK_FACTORS.items():
-            if min_age <= age <= max_age:
-                return factor
-        return 1.0
+        return (rules or get_rules()).age_factor(age)
     
     @staticmethod
-    def calculate_symptom_score(symptoms: List[str], description: str = "") -> tuple[int, List[str]]:
+    def calculate_symptom_score(
+        symptoms: List[str], description: str = "", rules: Optional[CompiledRules] = None
+    ) -> tuple[int, List[str]]:
         """
         Match symptoms against severity database.
         
+        All tiers are matched in one pass over the normalized words
+        (symptom_matcher.py); the most severe tier with a match decides
+        the score. Negated symptoms ("no chest pain") do not count.
+        
         Returns:
             tuple: (severity_score 1-10, list of matched keywords for explanation)
         """
-        text = " ".join(symptoms).lower() + " " + description.lower()
-        matched_keywords = []
-        
-        # Check critical symptoms first (highest priority) -> 9-10
-        for symptom, score in CRITICAL_SYMPTOMS.items():
-            if symptom in text:
-                matched_keywords.append(f"CRITICAL: {symptom}")
-                return (10, matched_keywords)  # Immediate return for critical
+        lexicon = (rules or get_rules()).symptom_lexicon
+        critical, urgent, moderate, low, routine = lexicon.match(tokenize(*symptoms, description))
         
-        # Check urgent symptoms -> 7-8
-        for symptom, score in URGENT_SYMPTOMS.items():
-            if symptom in text:
-                matched_keywords.append(f"URGENT: {symptom}")
-                return (8, matched_keywords)
+        # Critical symptoms first (highest priority) -> 9-10
+        if critical:
+            return (10, [f"CRITICAL: {critical[0]}"])  # Immediate return for critical
         
-        # Check moderate symptoms -> 5-6
-        max_score = 2
-        for symptom, score in MODERATE_SYMPTOMS.items():
-            if symptom in text:
-                matched_keywords.append(f"MODERATE: {symptom}")
-                max_score = max(max_score, 6)
+        # Urgent symptoms -> 7-8
+        if urgent:
+            return (8, [f"URGENT: {urgent[0]}"])
         
-        if max_score == 6:
-            return (6, matched_keywords)
+        # Moderate symptoms -> 5-6
+        if moderate:
+            return (6, [f"MODERATE: {symptom}" for symptom in moderate])
         
-        # Check low severity symptoms -> 3-4
-        for symptom, score in LOW_SYMPTOMS.items():
-            if symptom in text:
-                matched_keywords.append(f"LOW: {symptom}")
-                max_score = max(max_score, 4)
+        # Low severity symptoms -> 3-4
+        if low:
+            return (4, [f"LOW: {symptom}" for symptom in low])
         
-        if max_score == 4:
-            return (4, matched_keywords)
-        
-        # Check routine symptoms -> 1-2
-        for symptom, score in ROUTINE_SYMPTOMS.items():
-            if symptom in text:
-                matched_keywords.append(f"ROUTINE: {symptom}")
-                return (2, matched_keywords)
+        # Routine symptoms -> 1-2
+        if routine:
+            return (2, [f"ROUTINE: {routine[0]}"])
         
         # Default: low if no match (safety first)
         return (3, ["No specific symptom matched - defaulting to LOW priority"])
     
     @staticmethod
-    def calculate_chronic_boost(conditions: List[str]) -> tuple[float, List[str]]:
+    def calculate_chronic_boost(
+        conditions: List[str], rules: Optional[CompiledRules] = None
+    ) -> tuple[float, List[str]]:
         """
         Calculate priority boost from chronic conditions.
         
@@ -122,12 +112,12 @@ class TriageEngine:
         boost = 0.0
         matched = []
         
-        conditions_text = " ".join(conditions).lower()
-        
-        for condition, boost_value in CHRONIC_CONDITIONS.items():
-            if condition in conditions_text:
-                boost += boost_value
-                matched.append(f"{condition}: +{boost_value}")
+        rules = rules or get_rules()
+        (found,) = rules.chronic_lexicon.match(tokenize(*conditions))
+        for condition in found:
+            boost_value = rules.chronic_boosts[condition]
+            boost += boost_value
+            matched.append(f"{condition}: +{boost_value}")
         
         # Cap total boost at 1.0
         return (min(boost, 1.0), matched)
@@ -166,22 +156,67 @@ class TriageEngine:
         """
         Main triage function - calculates final priority score.
         
-        Returns a complete, explainable triage result.
+        Returns a complete, explainable triage result. Repeated inputs are
+        answered from the triage cache (triage_cache.py).
+        """
+        chronic_conditions = chronic_conditions or []
+        rules = get_rules()
+        cache = get_triage_cache()
+        key = (
+            rules.revision,
+            canonical_texts([*symptoms, description]),
+            canonical_texts(chronic_conditions),
+            age,
+            cls.get_duration_adjustment(duration_hours),
+            bool(is_emergency),
+            self_severity
+        )
+        result = cache.get(key)
+        if result is None:
+            result = cls.compute_triage(
+                symptoms, description, age, chronic_conditions,
+                duration_hours, is_emergency, self_severity, rules
+            )
+            cache.put(key, result)
+        return result
+    
+    @classmethod
+    def perform_triage_batch(cls, assessments: List[Dict]) -> List[Dict]:
+        """
+        Triage many patients at once (perform_triage keyword arguments per
+        item), vectorized with NumPy (triage_batch.py). Results are the
+        same as perform_triage's, in order; the triage cache is bypassed.
         """
+        return triage_batch(assessments, get_rules())
+    
+    @classmethod
+    def compute_triage(
+        cls,
+        symptoms: List[str],
+        description: str,
+        age: int,
+        chronic_conditions: List[str] = None,
+        duration_hours: int = 0,
+        is_emergency: bool = False,
+        self_severity: int = 5,
+        rules: Optional[CompiledRules] = None
+    ) -> Dict:
+        """perform_triage without the cache."""
         chronic_conditions = chronic_conditions or []
+        rules = rules or get_rules()
         explanation_parts = []
         
         # Step 1: Calculate base symptom score
-        base_score, symptom_matches = cls.calculate_symptom_score(symptoms, description)
+        base_score, symptom_matches = cls.calculate_symptom_score(symptoms, description, rules)
         explanation_parts.append(f"Base symptom score: {base_score}/5")
         explanation_parts.extend(symptom_matches)
         
         # Step 2: Apply age factor
-        age_factor = cls.get_age_risk_factor(age)
+        age_factor = cls.get_age_risk_factor(age, rules)
         explanation_parts.append(f"Age ({age} years) risk factor: {age_factor}x")
         
         # Step 3: Calculate chronic condition boost
-        chronic_boost, chronic_matches = cls.calculate_chronic_boost(chronic_conditions)
+        chronic_boost, chronic_matches = cls.calculate_chronic_boost(chronic_conditions, rules)
         if chronic_matches:
             explanation_parts.append(f"Chronic condition boost: +{chronic_boost}")
             explanation_parts.extend(chronic_matches)
@@ -214,22 +249,22 @@ class TriageEngine:
         final_score = max(1, min(10, round(raw_score)))
         
         # Get severity description (1-10 scale)
-        severity_info = SEVERITY_DESCRIPTIONS[final_score]
+        level, color, action = rules.severity[final_score]
         
         # Determine if eligible for teleconsult
         teleconsult_eligible = (
-            final_score <= TELECONSULT_ELIGIBLE["max_severity_score"]
+            final_score <= rules.teleconsult_max_score
             and not is_emergency
         )
         
         # Calculate estimated wait time (1-10 scale)
-        base_wait = BASE_WAIT_TIMES[final_score]
+        base_wait = rules.wait_times[final_score]
         
         return {
             "triage_score": final_score,  # Now 1-10 scale
-            "severity_level": severity_info["level"],
-            "severity_color": severity_info["color"],
-            "recommended_action": severity_info["action"],
+            "severity_level": level,
+            "severity_color": color,
+            "recommended_action": action,
             "estimated_wait_minutes": base_wait,
             "teleconsult_eligible": teleconsult_eligible,
             "explanation": explanation_parts,
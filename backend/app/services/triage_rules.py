@@ -0,0 +1,261 @@
+"""
+SmartCare Triage Rules
+=======================
+Compiles the triage rules (symptom tiers, age risk factors, chronic
+conditions, severity descriptions, wait times, teleconsult limit) into
+flat lookup tables once, instead of walking the constant dicts on every
+triage call, and hot-reloads them from a versioned rules file.
+
+Compiled tables (CompiledRules):
+- age_factors: age 0-120 -> risk factor (first matching range wins; 1.0
+  where no range applies, and for ages outside 0-120)
+- severity: score 0-10 -> (level, color, action) tuple; wait_times: score
+  -> base wait minutes (index 0 unused)
+- keyword_tiers: keyword -> tier id (0 = CRITICAL ... 4 = ROUTINE), and
+  the tiered phrase lexicons built from them (symptom_matcher)
+- service_lexicon: the legacy TriageService's own CRITICAL..LOW tiers
+  (TRIAGE_SERVICE_SYMPTOMS), separate so its 1-5 scores keep their keywords
+- chronic_boosts: condition -> boost, in rule order
+
+Rules file (TRIAGE_RULES_FILE, JSON; see app/scripts/export_triage_rules.py):
+    {"version": "2026-10-01", "CRITICAL_SYMPTOMS": {...}, "AGE_RISK_FACTORS":
+     [[0, 2, 1.5], ...], "SEVERITY_DESCRIPTIONS": {"10": {...}}, ...}
+Sections present in the file replace the ones from app/core/constants.py;
+absent sections keep the constants. A file that fails to compile is
+rejected and the running rules stay in place.
+
+Hot reload: every process (API workers included) runs a watcher thread that
+checks the file's modification time every TRIAGE_RULES_CHECK_SECONDS. A
+changed file is compiled on the watcher thread and swapped in as one
+reference, so requests never wait for a compile and never see half-built
+tables. Each swap bumps `revision`, which drops cached triage results.
+"""
+
+import json
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core import constants
+from app.core.config import settings
+from app.services.symptom_matcher import TieredLexicon
+
+MAX_AGE = 120
+TIERS = ["CRITICAL", "URGENT", "MODERATE", "LOW", "ROUTINE"]
+SERVICE_TIERS = TIERS[:4]
+SECTIONS = [
+    *(f"{tier}_SYMPTOMS" for tier in TIERS), "TRIAGE_SERVICE_SYMPTOMS",
+    "AGE_RISK_FACTORS", "CHRONIC_CONDITIONS", "SEVERITY_DESCRIPTIONS",
+    "BASE_WAIT_TIMES", "TELECONSULT_ELIGIBLE"
+]
+
+
+@dataclass(frozen=True)
+class CompiledRules:
+    """Triage rules as flat lookup tables."""
+    version: str
+    source: str                                   # "constants" or the rules file path
+    revision: int                                 # bumped on every swap in this process
+    age_factors: Tuple[float, ...]                # index: age 0-120
+    severity: Tuple[Optional[Tuple[str, str, str]], ...]  # index: score 0-10 -> (level, color, action)
+    wait_times: Tuple[Optional[int], ...]         # index: score 0-10
+    teleconsult_max_score: int
+    keyword_tiers: Dict[str, int]
+    chronic_boosts: Dict[str, float]
+    symptom_lexicon: TieredLexicon
+    chronic_lexicon: TieredLexicon
+    service_lexicon: TieredLexicon
+
+    def age_factor(self, age: int) -> float:
+        return self.age_factors[age] if 0 <= age <= MAX_AGE else 1.0
+
+
+def constant_rules() -> Dict[str, Any]:
+    """The rules sections as defined in app/core/constants.py."""
+    return {section: getattr(constants, section) for section in SECTIONS}
+
+
+def _age_ranges(section: Any) -> List[Tuple[int, int, float]]:
+    # Constants use {(min, max): factor}; rules files use [[min, max, factor], ...]
+    items = section.items() if isinstance(section, dict) else ((entry[:2], entry[2]) for entry in section)
+    return [(int(lo), int(hi), float(factor)) for (lo, hi), factor in items]
+
+
+def _by_score(section: Dict) -> Dict[int, Any]:
+    # JSON object keys are strings
+    table = {int(score): value for score, value in section.items()}
+    missing = [score for score in range(1, 11) if score not in table]
+    if missing:
+        raise ValueError(f"scores {missing} have no entry")
+    return table
+
+
+def compile_rules(rules: Dict[str, Any], version: str = "constants",
+                  source: str = "constants", revision: int = 0) -> CompiledRules:
+    """Build the lookup tables; raises ValueError on malformed rules."""
+    try:
+        tiers = [(tier, dict(rules[f"{tier}_SYMPTOMS"])) for tier in TIERS]
+        keyword_tiers: Dict[str, int] = {}
+        for tier_id, (_, keywords) in enumerate(tiers):
+            for keyword in keywords:
+                keyword_tiers.setdefault(keyword, tier_id)
+
+        age_factors = [1.0] * (MAX_AGE + 1)
+        ranges = _age_ranges(rules["AGE_RISK_FACTORS"])
+        for age in range(MAX_AGE + 1):
+            for lo, hi, factor in ranges:
+                if lo <= age <= hi:
+                    age_factors[age] = factor
+                    break
+
+        descriptions = _by_score(rules["SEVERITY_DESCRIPTIONS"])
+        waits = _by_score(rules["BASE_WAIT_TIMES"])
+        chronic = {condition: float(boost) for condition, boost in rules["CHRONIC_CONDITIONS"].items()}
+
+        return CompiledRules(
+            version=str(version),
+            source=source,
+            revision=revision,
+            age_factors=tuple(age_factors),
+            severity=(None, *((d["level"], d["color"], d["action"]) for _, d in sorted(descriptions.items()))),
+            wait_times=(None, *(int(w) for _, w in sorted(waits.items()))),
+            teleconsult_max_score=int(rules["TELECONSULT_ELIGIBLE"]["max_severity_score"]),
+            keyword_tiers=keyword_tiers,
+            chronic_boosts=chronic,
+            symptom_lexicon=TieredLexicon(tiers, strict_tiers=["CRITICAL"]),
+            chronic_lexicon=TieredLexicon([("CHRONIC", chronic)]),
+            service_lexicon=TieredLexicon(
+                [(tier, list(rules["TRIAGE_SERVICE_SYMPTOMS"][tier])) for tier in SERVICE_TIERS],
+                strict_tiers=["CRITICAL"]
+            )
+        )
+    except (KeyError, TypeError, ValueError, IndexError) as exc:
+        raise ValueError(f"invalid triage rules: {type(exc).__name__}: {exc}") from exc
+
+
+def load_rules_file(path: str, revision: int = 0) -> CompiledRules:
+    """Compile a rules file on top of the constants."""
+    with open(path) as f:
+        document = json.load(f)
+    if "version" not in document:
+        raise ValueError(f"{path}: rules file has no version")
+    unknown = set(document) - set(SECTIONS) - {"version"}
+    if unknown:
+        raise ValueError(f"{path}: unknown sections {sorted(unknown)}")
+    rules = {**constant_rules(), **{k: v for k, v in document.items() if k != "version"}}
+    return compile_rules(rules, version=document["version"], source=path, revision=revision)
+
+
+# Current rules, compiled at import so the first triage never pays for it
+_rules = compile_rules(constant_rules())
+_swap_lock = threading.Lock()
+
+
+def get_rules() -> CompiledRules:
+    """The rules in force (read once per triage call for a consistent view)."""
+    return _rules
+
+
+def rules_revision() -> int:
+    """Bumped by every swap; anything derived from the rules is stale once it changes."""
+    return _rules.revision
+
+
+def reload_rules(path: Optional[str] = None) -> CompiledRules:
+    """
+    Compile `path` (the constants when empty) and swap it in. Raises
+    ValueError/OSError and keeps the current rules if it does not compile.
+    """
+    global _rules
+    with _swap_lock:
+        revision = _rules.revision + 1
+        compiled = load_rules_file(path, revision) if path else compile_rules(constant_rules(), revision=revision)
+        _rules = compiled
+    return compiled
+
+
+class RulesWatcher:
+    """Background thread reloading the rules file when it changes."""
+
+    def __init__(self, path: str, interval_seconds: float = 5.0):
+        self.path = path
+        self.interval = interval_seconds
+        self.mtime: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_reload: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self) -> bool:
+        """Reload if the file changed since the last check; True when new rules went live."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as exc:
+            self.last_error = f"{type(exc).__name__}: {exc}"
+            return False
+        if mtime == self.mtime:
+            return False
+        self.mtime = mtime
+        try:
+            reload_rules(self.path)
+        except (OSError, ValueError) as exc:  # keep serving the previous rules
+            self.last_error = f"{type(exc).__name__}: {exc}"
+            return False
+        self.last_error = None
+        self.last_reload = datetime.utcnow().isoformat()
+        return True
+
+    def start(self) -> None:
+        self.check()  # load before serving, not on the first request
+        self._thread = threading.Thread(target=self._run, name="triage-rules", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def get_status(self) -> Dict:
+        return {
+            "path": self.path,
+            "check_seconds": self.interval,
+            "last_reload": self.last_reload,
+            "last_error": self.last_error
+        }
+
+
+_watcher: Optional[RulesWatcher] = None
+
+
+def start_rules_watcher() -> Optional[RulesWatcher]:
+    """Load TRIAGE_RULES_FILE and watch it for changes (no-op without a file)."""
+    global _watcher
+    if _watcher is None and settings.TRIAGE_RULES_FILE:
+        _watcher = RulesWatcher(settings.TRIAGE_RULES_FILE, settings.TRIAGE_RULES_CHECK_SECONDS)
+        _watcher.start()
+    return _watcher
+
+
+def stop_rules_watcher() -> None:
+    global _watcher
+    if _watcher is not None:
+        _watcher.stop()
+        _watcher = None
+
+
+def get_rules_status() -> Dict:
+    rules = get_rules()
+    return {
+        "version": rules.version,
+        "source": rules.source,
+        "revision": rules.revision,
+        "keywords": len(rules.keyword_tiers),
+        "chronic_conditions": len(rules.chronic_boosts),
+        "watcher": _watcher.get_status() if _watcher is not None else None
+    }
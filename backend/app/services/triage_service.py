@@ -6,6 +6,8 @@ from typing import List
 import re
 
 from app.schemas.patient import SymptomSubmission, TriageResult
+from app.services.symptom_text import SymptomTokens, tokenize
+from app.services.triage_rules import get_rules
 
 
 class TriageService:
@@ -14,31 +16,9 @@ class TriageService:
     Uses NLP and rule-based scoring for severity assessment.
     """
     
-    # Critical symptoms that indicate high severity
-    CRITICAL_SYMPTOMS = [
-        "chest pain", "difficulty breathing", "severe bleeding",
-        "unconscious", "stroke", "heart attack", "seizure",
-        "severe allergic reaction", "anaphylaxis"
-    ]
-    
-    # Urgent symptoms
-    URGENT_SYMPTOMS = [
-        "high fever", "severe pain", "vomiting blood",
-        "confusion", "severe headache", "abdominal pain",
-        "broken bone", "deep cut", "burns"
-    ]
-    
-    # Moderate symptoms
-    MODERATE_SYMPTOMS = [
-        "fever", "persistent cough", "minor injury",
-        "infection", "rash", "ear pain", "sore throat"
-    ]
-    
-    # Low severity symptoms
-    LOW_SYMPTOMS = [
-        "cold", "mild headache", "runny nose",
-        "minor pain", "prescription refill", "follow-up"
-    ]
+    # 1-5 score per tier (CRITICAL..LOW) of this service's own keyword tiers,
+    # compiled with the triage rules (TRIAGE_SERVICE_SYMPTOMS)
+    TIER_SCORES = [5, 4, 3, 2]
     
     SEVERITY_DESCRIPTIONS = {
         5: "Critical - Immediate attention required",
@@ -61,7 +41,7 @@ class TriageService:
         symptoms_text = " ".join(submission.symptoms).lower() + " " + submission.description.lower()
         
         # Calculate base score from symptoms
-        base_score = self._calculate_symptom_score(symptoms_text)
+        base_score = self._calculate_symptom_score(tokenize(*submission.symptoms, submission.description))
         
         # Adjust based on duration
         duration_factor = self._get_duration_factor(submission.duration)
@@ -97,27 +77,14 @@ class TriageService:
             explanation=explanation
         )
     
-    def _calculate_symptom_score(self, symptoms_text: str) -> int:
+    def _calculate_symptom_score(self, tokens: SymptomTokens) -> int:
         """Calculate severity score based on symptom keywords."""
-        # Check for critical symptoms
-        for symptom in self.CRITICAL_SYMPTOMS:
-            if symptom in symptoms_text:
-                return 5
-        
-        # Check for urgent symptoms
-        for symptom in self.URGENT_SYMPTOMS:
-            if symptom in symptoms_text:
-                return 4
-        
-        # Check for moderate symptoms
-        for symptom in self.MODERATE_SYMPTOMS:
-            if symptom in symptoms_text:
-                return 3
+        matched = get_rules().service_lexicon.match(tokens)
         
-        # Check for low symptoms
-        for symptom in self.LOW_SYMPTOMS:
-            if symptom in symptoms_text:
-                return 2
+        # The most severe tier with a match decides
+        for score, tier_matches in zip(self.TIER_SCORES, matched):
+            if tier_matches:
+                return score
         
         # Default to moderate if no matches
         return 2
@@ -0,0 +1,115 @@
+"""Shared fixtures: partner hospital stubs on local ports, a fresh spare doctor pool and a hand-moved queue clock."""
+
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+import uvicorn
+
+from app.scripts.partner_stub import create_partner_app, demo_doctors
+from app.services import activity_logger, columnar_queue, priority_queue, redis_queue, spare_doctor_pool
+from app.services.activity_logger import ActivityLogger
+from app.services.partner_federation import PartnerFederation, PartnerHospital
+from app.services.spare_doctor_pool import SpareDoctorPool
+from app.services.state_lock import STATE_LOCK
+
+
+class PartnerStub:
+    """A partner_stub app served by uvicorn on a background thread."""
+
+    def __init__(self, name: str, doctors: int = 3, latency_ms: float = 0.0):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.name = name
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.app = create_partner_app(name, demo_doctors(name, doctors), latency_ms)
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def start(self) -> "PartnerStub":
+        self._thread.start()
+        deadline = time.monotonic() + 5
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"partner stub {self.name} did not start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(5)
+
+    @property
+    def hospital(self) -> PartnerHospital:
+        return PartnerHospital(self.name, self.url)
+
+
+@pytest.fixture
+def partner_stub():
+    """Factory starting partner stubs; all are stopped after the test."""
+    stubs = []
+
+    def start(name: str, doctors: int = 3, latency_ms: float = 0.0) -> PartnerStub:
+        stub = PartnerStub(name, doctors, latency_ms).start()
+        stubs.append(stub)
+        return stub
+
+    yield start
+    for stub in stubs:
+        stub.stop()
+
+
+@pytest.fixture
+def pool(monkeypatch) -> SpareDoctorPool:
+    """A fresh spare doctor pool and activity log behind the service getters."""
+    fresh = SpareDoctorPool()
+    monkeypatch.setattr(spare_doctor_pool, "_spare_pool", fresh)
+    monkeypatch.setattr(activity_logger, "_activity_logger", ActivityLogger())
+    return fresh
+
+
+@pytest.fixture
+def federation(pool):
+    """Factory for a started federation acting as the pool's partner gateway."""
+    started = []
+
+    def start(stubs, **kwargs) -> PartnerFederation:
+        fed = PartnerFederation([stub.hospital for stub in stubs], **kwargs)
+        fed.start()
+        with STATE_LOCK:
+            pool.set_partner_gateway(fed)
+        started.append(fed)
+        return fed
+
+    yield start
+    for fed in started:
+        with STATE_LOCK:
+            pool.set_partner_gateway(None)
+        fed.stop()
+
+
+class Clock:
+    """datetime.utcnow() of the queue backends, moved by hand."""
+
+    def __init__(self, monkeypatch):
+        self.now = datetime(2026, 3, 2, 8, 0)
+        clock = self
+
+        class FrozenDatetime(datetime):
+            @classmethod
+            def utcnow(cls):
+                return clock.now
+
+        for module in (priority_queue, columnar_queue, redis_queue):
+            monkeypatch.setattr(module, "datetime", FrozenDatetime)
+
+    def advance(self, **delta) -> None:
+        self.now += timedelta(**delta)
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    return Clock(monkeypatch)
@@ -0,0 +1,28 @@
+"""Allocation worker rounds that fail."""
+
+import logging
+
+from app.services import allocation_worker
+from app.services.activity_logger import get_activity_logger
+from app.services.allocation_worker import AllocationWorker
+
+
+def test_failed_round_is_recorded_and_logged(monkeypatch, pool, caplog):
+    def fail(departments, critical):
+        raise RuntimeError("allocator exploded")
+
+    monkeypatch.setattr(allocation_worker, "run_allocation_round", fail)
+    worker = AllocationWorker(debounce_ms=10)
+    worker.start()
+    try:
+        worker.notify(["cardiology"], ["cardiology"])
+        with caplog.at_level(logging.ERROR, logger=allocation_worker.__name__):
+            summary = worker.flush(timeout=5)
+    finally:
+        worker.stop()
+
+    assert summary["error"] == "allocator exploded"
+    assert "RuntimeError: allocator exploded" in caplog.text
+    [event] = get_activity_logger().get_logs(activity_type="system_event")
+    assert event["description"] == "RuntimeError: allocator exploded"
+    assert event["details"] == {"departments": ["cardiology"]}
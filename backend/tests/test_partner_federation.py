@@ -0,0 +1,168 @@
+"""Partner hospital federation against live partner_stub servers."""
+
+import threading
+import time
+
+import httpx
+
+from app.services.activity_logger import get_activity_logger
+from app.services.spare_doctor_pool import DoctorStatus
+from app.services.state_lock import STATE_LOCK
+
+
+def offered(stub) -> set:
+    """Partner doctor ids the stub currently offers (not reserved or lent)."""
+    return {doc["doctor_id"] for doc in httpx.get(f"{stub.url}/spare-doctors").json()["doctors"]}
+
+
+def partner_doctors(pool, partner: str):
+    return [doctor for doctor in pool.get_all_doctors() if doctor.partner == partner]
+
+
+def wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_refresh_queries_partners_concurrently(partner_stub, federation, pool):
+    stubs = [partner_stub("City Hospital", latency_ms=400), partner_stub("Metro Clinic", latency_ms=400)]
+    fed = federation(stubs, timeout_ms=2000)
+
+    started = time.perf_counter()
+    status = fed.refresh()
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.7  # one round trip, not one per partner
+    assert all(partner["error"] is None for partner in status["partners"].values())
+    assert len(partner_doctors(pool, "City Hospital")) == 3
+    assert len(partner_doctors(pool, "Metro Clinic")) == 3
+
+
+def test_slow_partner_times_out_without_holding_up_the_others(partner_stub, federation, pool):
+    fast = partner_stub("City Hospital")
+    slow = partner_stub("Metro Clinic", latency_ms=1500)
+    fed = federation([fast, slow], timeout_ms=200)
+
+    started = time.perf_counter()
+    status = fed.refresh()
+
+    assert time.perf_counter() - started < 1.0
+    assert status["partners"]["Metro Clinic"]["error"].startswith("TimeoutError")
+    assert status["partners"]["City Hospital"]["error"] is None
+    assert len(partner_doctors(pool, "City Hospital")) == 3
+    assert partner_doctors(pool, "Metro Clinic") == []
+
+
+def test_failed_refresh_keeps_the_stale_answer(partner_stub, federation, pool):
+    stub = partner_stub("City Hospital")
+    fed = federation([stub], timeout_ms=500, cache_ttl_seconds=60)
+    fed.refresh()
+    fetched_at = fed._cache["City Hospital"].fetched_at
+
+    fed.refresh()  # within the TTL: served from the cache
+    assert fed._cache["City Hospital"].fetched_at == fetched_at
+
+    stub.stop()
+    status = fed.refresh(force=True)["partners"]["City Hospital"]
+    assert status["error"] is not None
+    assert status["doctors_offered"] == 3
+    assert fed._cache["City Hospital"].fetched_at == fetched_at
+    assert len(partner_doctors(pool, "City Hospital")) == 3
+
+
+def test_assignment_reserves_confirms_and_release_cancels(partner_stub, federation, pool):
+    stub = partner_stub("City Hospital")
+    fed = federation([stub], timeout_ms=1000, reservation_ttl_seconds=1)
+    fed.refresh()
+    doctor = partner_doctors(pool, "City Hospital")[0]
+
+    with STATE_LOCK:
+        result = pool.assign_doctor(doctor.doctor_id, "general", "Surge")
+    assert result["success"]
+    assert doctor.reservation_id
+    assert doctor.partner_doctor_id not in offered(stub)
+
+    # Confirmed loans outlive the reservation TTL
+    time.sleep(1.5)
+    assert doctor.partner_doctor_id not in offered(stub)
+    assert doctor.status == DoctorStatus.ASSIGNED
+    assert fed.get_status()["failed_confirms"] == 0
+
+    with STATE_LOCK:
+        assert pool.release_doctor(doctor.doctor_id, "Surge over")["success"]
+    assert doctor.reservation_id is None
+    assert wait_for(lambda: doctor.partner_doctor_id in offered(stub))
+
+
+def test_declined_reservation_takes_the_doctor_offline(partner_stub, federation, pool):
+    stub = partner_stub("City Hospital")
+    fed = federation([stub], timeout_ms=1000)
+    fed.refresh()
+    doctor = partner_doctors(pool, "City Hospital")[0]
+
+    # Lent to someone else since the last refresh: the partner answers 409
+    taken = httpx.post(f"{stub.url}/reservations", json={"doctor_id": doctor.partner_doctor_id, "department": "other"})
+    assert taken.status_code == 201
+
+    with STATE_LOCK:
+        result = pool.assign_doctor(doctor.doctor_id, "general", "Surge")
+    assert not result["success"]
+    assert doctor.status == DoctorStatus.OFFLINE
+    assert doctor.reservation_id is None
+
+    # The next refresh no longer offers the doctor, so the pool drops them
+    fed.refresh(force=True)
+    assert pool.get_doctor(doctor.doctor_id) is None
+
+
+def test_unconfirmed_loan_is_revoked_and_logged(partner_stub, federation, pool):
+    stub = partner_stub("City Hospital")
+    # A reservation that has expired by the time the confirm arrives
+    fed = federation([stub], timeout_ms=1000, reservation_ttl_seconds=0)
+    fed.refresh()
+    doctor = partner_doctors(pool, "City Hospital")[0]
+
+    with STATE_LOCK:
+        assert pool.assign_doctor(doctor.doctor_id, "general", "Surge")["success"]
+
+    assert wait_for(lambda: doctor.status == DoctorStatus.OFFLINE)
+    assert doctor.assigned_department is None
+    assert doctor.reservation_id is None
+    assert fed.get_status()["failed_confirms"] == 1
+    released = get_activity_logger().get_logs(activity_type="doctor_released")
+    assert [log["details"]["initiated_by"] for log in released] == ["partner"]
+
+
+def test_reservation_round_trip_runs_without_the_state_lock(partner_stub, federation, pool):
+    stub = partner_stub("City Hospital", latency_ms=500)
+    fed = federation([stub], timeout_ms=2000)
+    fed.refresh()
+    doctor = partner_doctors(pool, "City Hospital")[0]
+
+    results = []
+
+    def assign():
+        with STATE_LOCK:
+            results.append(pool.assign_doctor(doctor.doctor_id, "general", "Surge"))
+
+    worker = threading.Thread(target=assign)
+    worker.start()
+    time.sleep(0.1)
+
+    # The lock is free while the partner answers; the doctor leaves the pool meanwhile
+    assert STATE_LOCK.acquire(timeout=0.3)
+    try:
+        assert worker.is_alive()
+        pool.remove_doctor(doctor.doctor_id)
+    finally:
+        STATE_LOCK.release()
+    worker.join()
+
+    # Re-checked under the lock: not assigned, and the reservation is handed back
+    assert not results[0]["success"]
+    assert doctor.status == DoctorStatus.AVAILABLE
+    assert wait_for(lambda: doctor.partner_doctor_id in offered(stub))
@@ -0,0 +1,157 @@
+"""SmartPriorityQueue (and the columnar backend) against a naive model of the queue."""
+
+import random
+from datetime import timedelta
+from fractions import Fraction
+
+import pytest
+
+from app.core.constants import PRIORITY_WEIGHTS, QUEUE_THRESHOLDS
+from app.services.columnar_queue import ColumnarPriorityQueue
+from app.services.priority_queue import SmartPriorityQueue
+
+DEPARTMENTS = ["general", "cardiology", "pediatrics"]
+
+
+@pytest.fixture(params=[SmartPriorityQueue, ColumnarPriorityQueue], ids=["heap", "columnar"])
+def queue(request):
+    return request.param()
+
+
+def fill(queue, rng: random.Random, now, count: int) -> None:
+    for entry_id in range(1, count + 1):
+        queue.push(
+            patient_id=entry_id,
+            entry_id=entry_id,
+            triage_score=rng.randint(1, 5),
+            age_factor=rng.choice([0.5, 1.0, 1.5]),
+            check_in_time=now - timedelta(seconds=rng.randrange(0, 4 * 3600)),
+            department=rng.choice(DEPARTMENTS),
+        )
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_list_positions_agree_with_rank_as_time_passes(queue, clock, seed):
+    rng = random.Random(seed)
+    fill(queue, rng, clock.now, 60)
+    stamps = set()
+    for _ in range(120):
+        clock.advance(seconds=rng.randrange(1, 40))  # mostly within one aging tick
+        for department in [None] + DEPARTMENTS:
+            listed = queue.get_queue_list(department)
+            for entry in listed:
+                assert queue.rank(entry["entry_id"], department) == entry["position"]
+            assert [queue.entry_at(i, department).entry_id for i in (1, len(listed))] == [
+                listed[0]["entry_id"], listed[-1]["entry_id"]
+            ]
+        stamps.add(queue.list_stamp())
+    assert len(stamps) > 1
+
+
+def test_push_many_keeps_patient_info_like_push(queue):
+    info = {"name": "A", "department": "general"}
+    queue.push_many([
+        {"patient_id": 1, "entry_id": 1, "triage_score": 2, "patient_info": info},
+        {"patient_id": 2, "entry_id": 2, "triage_score": 2, "patient_info": info},
+    ])
+    queue.push(patient_id=1, entry_id=1, triage_score=4)
+    queue.push_many([
+        {"patient_id": 2, "entry_id": 2, "triage_score": 4},
+        {"patient_id": 3, "entry_id": 3, "triage_score": 1, "patient_info": {"name": "C"}},
+        {"patient_id": 3, "entry_id": 3, "triage_score": 5},
+    ])
+    assert [queue.get_patient_info(entry_id) for entry_id in (1, 2, 3)] == [info, info, {"name": "C"}]
+    assert [queue.get_item(entry_id).triage_score for entry_id in (1, 2, 3)] == [4, 4, 5]
+
+
+class NaiveQueue:
+    """The queue as a plain dict, sorted from scratch on every read with exact arithmetic."""
+
+    def __init__(self):
+        self.entries = {}  # entry_id -> (base score, check-in time, department)
+
+    def push(self, queue, entry_id, triage_score, age_factor, chronic_factor, is_emergency, check_in_time, department):
+        base = queue.calculate_priority_score(triage_score, 0, age_factor, chronic_factor, is_emergency)
+        self.entries[entry_id] = (Fraction(round(base * 10_000), 10_000), check_in_time, department)
+
+    def order(self, now, department=None):
+        max_wait = timedelta(minutes=QUEUE_THRESHOLDS["max_wait_time_minutes"])
+        wait_weight = Fraction(str(PRIORITY_WEIGHTS["wait_time"]))
+        microsecond = timedelta(microseconds=1)
+
+        def key(entry_id):
+            base, check_in, _ = self.entries[entry_id]
+            wait = Fraction(min(now - check_in, max_wait) // microsecond, max_wait // microsecond)
+            return -(base + wait_weight * wait), check_in, entry_id
+
+        return sorted((e for e, (_, _, d) in self.entries.items() if department in (None, d)), key=key)
+
+
+def check_reads(queue, model, now):
+    for department in [None] + DEPARTMENTS:
+        expected = model.order(now, department)
+        listed = queue.get_queue_list(department)
+        assert [entry["entry_id"] for entry in listed] == expected
+        assert [entry["position"] for entry in listed] == list(range(1, len(expected) + 1))
+        for position, entry_id in enumerate(expected, start=1):
+            assert queue.rank(entry_id, department) == position
+        for position in {1, (len(expected) + 1) // 2, len(expected)} if expected else ():
+            assert queue.entry_at(position, department).entry_id == expected[position - 1]
+        assert queue.entry_at(len(expected) + 1, department) is None
+        top = queue.peek(department)
+        assert (top.entry_id if top else None) == (expected[0] if expected else None)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_a_naive_sorted_model(queue, clock, seed):
+    rng = random.Random(seed)
+    model = NaiveQueue()
+    next_id = 1
+    for step in range(400):
+        op = rng.choices(["push", "repush", "pop", "update", "remove", "wait", "restore"], [30, 4, 12, 10, 5, 10, 1])[0]
+        if op in ("repush", "update", "remove") and not model.entries:
+            op = "push"
+        if op in ("push", "repush"):
+            if op == "push":
+                entry_id, next_id = next_id, next_id + 1
+            else:
+                entry_id = rng.choice(list(model.entries))
+            patient = {
+                "triage_score": rng.randint(1, 5),
+                "age_factor": rng.choice([0.5, 1.0, 1.5]),
+                "chronic_factor": rng.choice([0.0, 0.5]),
+                "is_emergency": rng.random() < 0.05,
+                # Whole minutes, so equal scores and check-ins tie often
+                "check_in_time": clock.now - timedelta(minutes=rng.choice([0, 0, 30, 119, 120, 121, rng.randrange(300)])),
+                "department": rng.choice(DEPARTMENTS),
+            }
+            queue.push(patient_id=entry_id, entry_id=entry_id, **patient)
+            model.push(queue, entry_id, **patient)
+        elif op == "pop":
+            department = rng.choice([None] + DEPARTMENTS)
+            expected = model.order(clock.now, department)
+            popped = queue.pop(department)
+            assert (popped.entry_id if popped else None) == (expected[0] if expected else None)
+            if popped:
+                del model.entries[popped.entry_id]
+        elif op == "update":
+            entry_id = rng.choice(list(model.entries))
+            item = queue.get_item(entry_id)
+            changes = {"new_triage_score": rng.randint(1, 5), "is_emergency": rng.random() < 0.1}
+            queue.update_priority(entry_id, **changes)
+            model.push(queue, entry_id, changes["new_triage_score"], item.age_factor, item.chronic_factor,
+                       changes["is_emergency"], item.timestamp, item.department)
+        elif op == "remove":
+            entry_id = rng.choice(list(model.entries))
+            assert queue.remove(entry_id)
+            del model.entries[entry_id]
+        elif op == "wait":
+            clock.advance(seconds=rng.choice([1, 30, 60, 600, 3600]))
+        else:
+            restored = type(queue)()
+            restored.load_state(queue.export_state())
+            queue = restored
+        assert len(queue) == len(model.entries)
+        if step % 5 == 0 or op == "restore":
+            check_reads(queue, model, clock.now)
+    check_reads(queue, model, clock.now)
@@ -0,0 +1,20 @@
+"""Queue forecasts with samples that arrive out of order."""
+
+from app.services.queue_forecast import DepartmentForecaster
+
+
+def test_sample_before_the_previous_one_keeps_the_series_sorted():
+    forecaster = DepartmentForecaster()
+    t0 = 1_800_000_000.0
+    for minute, length in enumerate([2, 3, 4, 5, 6]):
+        forecaster.observe(t0 + minute * 60, length)
+    slope = forecaster.slope()
+
+    forecaster.observe(t0 + 90, 7)  # the wall clock stepped back
+
+    times, values = forecaster.series.since(t0)
+    assert list(times) == sorted(times)
+    assert len(times) == 6
+    assert forecaster.series.last()[0] == t0 + 240
+    assert values[-1, 0] == 7
+    assert forecaster.slope() > slope  # the newest sample still counts
@@ -0,0 +1,161 @@
+"""Redis queue backend against an in-process fakeredis, checked against the in-memory queue."""
+
+import random
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.services.priority_queue import SmartPriorityQueue
+from app.services.redis_queue import RedisPriorityQueue
+
+DEPARTMENTS = ["general", "cardiology", "pediatrics"]
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def queues(server):
+    """The same queue twice: in memory and in (fake) Redis."""
+    return SmartPriorityQueue(), RedisPriorityQueue(fakeredis.FakeRedis(server=server, decode_responses=True))
+
+
+def push_both(queues, **patient):
+    for queue in queues:
+        queue.push(**patient)
+
+
+def random_patients(rng: random.Random, count: int, now: datetime):
+    waits = rng.sample(range(0, 600 * 60), count)  # distinct, up to 10 h (the cap is 2 h)
+    for entry_id, wait in enumerate(waits, start=1):
+        department = rng.choice(DEPARTMENTS)
+        yield {
+            "patient_id": 1000 + entry_id,
+            "entry_id": entry_id,
+            "triage_score": rng.randint(1, 5),
+            "age_factor": rng.choice([0.5, 1.0, 1.3, 1.5]),
+            "chronic_factor": rng.choice([0.0, 0.2, 0.5]),
+            "is_emergency": rng.random() < 0.05,
+            "check_in_time": now - timedelta(seconds=wait),
+            "patient_info": {"name": f"Patient {entry_id}", "department": department, "severity": "LOW"},
+        }
+
+
+def order(queue, department=None):
+    return [entry["entry_id"] for entry in queue.get_queue_list(department)]
+
+
+def test_reads_apply_cap_crossings(queues, clock):
+    memory, shared = queues
+    push_both(queues, patient_id=1, entry_id=1, triage_score=3)
+    clock.advance(minutes=100)
+    push_both(queues, patient_id=2, entry_id=2, triage_score=4)
+    assert order(memory) == order(shared) == [1, 2]  # 100 min of waiting outweigh one triage level
+
+    # Both waits have reached the cap since, so triage decides again
+    clock.advance(minutes=300)
+    for queue in queues:
+        assert order(queue) == [2, 1]
+        assert queue.peek().entry_id == 2
+        assert queue.entry_at(1).entry_id == 2
+        assert [item.entry_id for item in queue.iter_items()] == [2, 1]
+        assert queue.rank(2) == 1
+        assert queue.call_next()[1]["entry_id"] == "2"
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_the_in_memory_queue(queues, clock, seed):
+    rng = random.Random(seed)
+    memory, shared = queues
+    for patient in random_patients(rng, 150, clock.now):
+        push_both(queues, **patient)
+    for entry_id in rng.sample(range(1, 151), 20):
+        triage_score = rng.randint(1, 5)
+        for queue in queues:
+            queue.update_priority(entry_id, new_triage_score=triage_score)
+    clock.advance(minutes=rng.randint(1, 120))  # some waits reach the cap without a write
+
+    for department in [None] + DEPARTMENTS:
+        expected = order(memory, department)
+        assert order(shared, department) == expected
+        assert shared.peek(department).entry_id == expected[0]
+        for position in (1, 2, len(expected) // 2, len(expected)):
+            assert shared.entry_at(position, department).entry_id == expected[position - 1]
+        for position, entry_id in enumerate(expected, start=1):
+            assert shared.rank(entry_id, department) == position
+
+    for department in DEPARTMENTS:
+        while True:
+            called = [queue.call_next(department) for queue in queues]
+            assert called[0][0] == called[1][0]
+            if called[0][0] == "empty":
+                break
+            assert called[0][1]["entry_id"] == called[1][1]["entry_id"]
+            for queue in queues:
+                assert queue.clear_current_patient(department)
+    assert len(shared) == len(memory) == 0
+
+
+def test_call_next_never_calls_the_same_patient_twice(server):
+    nodes = [RedisPriorityQueue(fakeredis.FakeRedis(server=server, decode_responses=True)) for _ in range(4)]
+    for patient in random_patients(random.Random(7), 40, datetime.utcnow()):
+        nodes[0].push(**patient)
+    called, errors = [], []
+
+    def serve(node, department):
+        try:
+            while True:
+                outcome, patient = node.call_next(department)
+                if outcome == "empty":
+                    return
+                if outcome == "called":
+                    called.append(patient["entry_id"])
+                node.clear_current_patient(department)
+        except Exception as e:
+            errors.append(e)
+
+    workers = [
+        threading.Thread(target=serve, args=(node, department))
+        for node in nodes for department in DEPARTMENTS
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert errors == []
+    assert sorted(called, key=int) == [str(entry_id) for entry_id in range(1, 41)]
+
+
+def test_concurrent_info_updates_all_land(server):
+    nodes = [RedisPriorityQueue(fakeredis.FakeRedis(server=server, decode_responses=True)) for _ in range(2)]
+    nodes[0].push(patient_id=1, entry_id=1, triage_score=3, patient_info={"name": "A", "department": "general"})
+
+    def update(node, prefix):
+        for i in range(50):
+            assert node.update_patient_info(1, **{f"{prefix}{i}": i})
+
+    workers = [threading.Thread(target=update, args=(node, prefix)) for node, prefix in zip(nodes, "ab")]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    info = nodes[1].get_patient_info(1)
+    assert all(info[f"{prefix}{i}"] == i for prefix in "ab" for i in range(50))
+    assert info["name"] == "A"
+
+
+def test_info_department_moves_the_entry(queues):
+    for queue in queues:
+        queue.push(patient_id=1, entry_id=1, triage_score=3, patient_info={"name": "A", "department": "general", "symptoms": []})
+        version = queue.version
+        assert queue.update_patient_info(1, department="Cardiology")
+        assert queue.version > version
+        assert queue.get_item(1).department == "cardiology"
+        assert queue.department_size("general") == 0
+        assert queue.get_patient_info(1) == {"name": "A", "department": "Cardiology", "symptoms": []}
+        assert not queue.update_patient_info(2, department="general")
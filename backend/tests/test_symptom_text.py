@@ -0,0 +1,44 @@
+"""Negation scopes in symptom text, scored through the triage engine."""
+
+import pytest
+
+from app.services.symptom_text import tokenize
+from app.services.triage_engine import TriageEngine
+
+
+@pytest.mark.parametrize("text, score, matched", [
+    # A negator negates the phrase after it, not the clause after that
+    ("no relief from chest pain", 10, "CRITICAL: chest pain"),
+    ("patient has no pulse and is unconscious", 10, "CRITICAL: unconscious"),
+    ("without warning had a seizure", 10, "CRITICAL: seizure"),
+    ("never had chest pain like this before", 10, "CRITICAL: chest pain"),
+    ("no improvement in severe headache", 8, "URGENT: severe headache"),
+    # Critical symptoms are only negated right after the negator
+    ("no severe chest pain", 10, "CRITICAL: chest pain"),
+    ("not breathing", 10, "CRITICAL: not breathing"),
+    ("no chest pain but severe headache", 8, "URGENT: severe headache"),
+])
+def test_affirmed_symptoms_score(text, score, matched):
+    assert TriageEngine.calculate_symptom_score([], text) == (score, [matched])
+
+
+@pytest.mark.parametrize("text", [
+    "no chest pain",
+    "denies fever",
+    "denies any chest pain",
+    "no shortness of breath",
+    "no fever or cough",
+])
+def test_negated_symptoms_do_not_score(text):
+    assert TriageEngine.calculate_symptom_score([], text)[0] == 3  # default: nothing matched
+
+
+def test_segment_break_ends_negation():
+    assert TriageEngine.calculate_symptom_score([], "no fever, cough") == (6, ["MODERATE: cough"])
+
+
+def test_negation_scope_of_tokens():
+    tokens = tokenize("no relief from chest pain")
+    assert tokens.negated[:5] == (False, True, False, False, False)
+    assert tokens.negation_head[:5] == (False, True, False, False, False)
+    assert tokens.affirmed_text() == "no from chest pain"
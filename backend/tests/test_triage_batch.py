@@ -0,0 +1,70 @@
+"""Batch triage (triage_batch.py) against the scalar TriageEngine.compute_triage on random assessments."""
+
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.constants import (
+    CRITICAL_SYMPTOMS, URGENT_SYMPTOMS, MODERATE_SYMPTOMS, LOW_SYMPTOMS, ROUTINE_SYMPTOMS,
+    CHRONIC_CONDITIONS
+)
+from app.main import app
+from app.services.triage_engine import TriageEngine
+
+KEYWORDS = [k for tier in (CRITICAL_SYMPTOMS, URGENT_SYMPTOMS, MODERATE_SYMPTOMS, LOW_SYMPTOMS, ROUTINE_SYMPTOMS)
+            for k in tier]
+FILLER = ["no", "not", "denies", "without", "since", "and", "but", "mild", "severe", "pain", "the", "a", "x"]
+
+
+def random_text(rng: random.Random) -> str:
+    words = []
+    for _ in range(rng.randint(0, 8)):
+        words.append(rng.choice(KEYWORDS) if rng.random() < 0.4 else rng.choice(FILLER))
+        if rng.random() < 0.15:
+            words[-1] += rng.choice([",", ".", ";", "!"])
+    text = " ".join(words)
+    return text.upper() if rng.random() < 0.1 else text
+
+
+def random_assessment(rng: random.Random) -> dict:
+    return {
+        "symptoms": [
+            rng.choice(KEYWORDS).replace(" ", rng.choice([" ", "_"])) if rng.random() < 0.7 else random_text(rng)
+            for _ in range(rng.randint(0, 3))
+        ],
+        "description": random_text(rng),
+        "age": rng.randint(0, 120),
+        "chronic_conditions": [
+            rng.choice(list(CHRONIC_CONDITIONS)) if rng.random() < 0.8 else random_text(rng)
+            for _ in range(rng.choice([0, 0, 1, 2, 3]))
+        ],
+        "duration_hours": rng.choice([0, 1, 2, 23, 24, 71, 72, rng.randint(0, 500)]),
+        "is_emergency": rng.random() < 0.1,
+        "self_severity": rng.randint(1, 10),
+    }
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_batch_matches_compute_triage(seed):
+    rng = random.Random(seed)
+    assessments = [random_assessment(rng) for _ in range(400)]
+    assert TriageEngine.perform_triage_batch(assessments) == [
+        TriageEngine.compute_triage(**assessment) for assessment in assessments
+    ]
+
+
+def test_batch_endpoint_matches_compute_triage():
+    rng = random.Random(11)
+    assessments = [random_assessment(rng) for _ in range(200)]
+    response = TestClient(app).post("/api/v1/smartqueue/triage/assess/batch", json={"patients": assessments})
+    assert response.status_code == 200
+    assert response.json()["triage"] == [TriageEngine.compute_triage(**assessment) for assessment in assessments]
+
+
+def test_batch_endpoint_rejects_invalid_patients():
+    response = TestClient(app).post(
+        "/api/v1/smartqueue/triage/assess/batch", json={"patients": [{"symptoms": ["cough"], "age": 500}]}
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "patients", 0, "age"]